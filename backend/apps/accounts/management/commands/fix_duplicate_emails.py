@@ -8,7 +8,8 @@ Merges users with the same email address (case-insensitive) by:
 4. Deleting duplicate users
 """
 from django.core.management.base import BaseCommand
-from django.db.models import Count
+from django.db.models import Count, F
+from django.db.models.functions import Lower, Trim
 from apps.accounts.models import User
 from collections import defaultdict
 
@@ -29,12 +30,17 @@ class Command(BaseCommand):
         if dry_run:
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
         
-        # Find all users with duplicate emails (case-insensitive)
+        # Only users whose email is shared (case-insensitive) or not yet normalized are loaded;
+        # the grouping runs in the database
+        normalized = User.objects.annotate(email_lower=Lower(Trim('email')))
+        duplicate_emails = (
+            normalized.values('email_lower').annotate(users=Count('id')).filter(users__gt=1).values('email_lower')
+        )
+        affected = normalized.filter(email_lower__in=duplicate_emails) | normalized.exclude(email=F('email_lower'))
         users_by_email = defaultdict(list)
         
-        for user in User.objects.all():
-            email_lower = user.email.lower().strip() if user.email else ''
-            users_by_email[email_lower].append(user)
+        for user in affected.order_by('id'):
+            users_by_email[user.email_lower].append(user)
         
         duplicates_found = 0
         users_normalized = 0
@@ -94,10 +100,10 @@ class Command(BaseCommand):
                 user = users[0]
                 if user.email and user.email != email_lower:
                     users_normalized += 1
+                    self.stdout.write(f'Normalized email: {user.email} → {email_lower}')
                     if not dry_run:
                         user.email = email_lower
                         user.save(update_fields=['email'])
-                    self.stdout.write(f'Normalized email: {user.email} → {email_lower}')
         
         # Summary
         self.stdout.write(self.style.SUCCESS('\n' + '='*50))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:13
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_case_duplicates(apps, schema_editor):
+    """Fail with instructions (not an IntegrityError) if emails differ only by case."""
+    User = apps.get_model('accounts', 'User')
+    duplicates = (
+        User.objects.annotate(email_lower=Lower('email')).values('email_lower')
+        .annotate(users=Count('id')).filter(users__gt=1).count()
+    )
+    if duplicates:
+        raise RuntimeError(
+            f'{duplicates} email addresses belong to more than one user (differing only by case). '
+            'Run `python manage.py fix_duplicate_emails` before migrating.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_invitation_invitation_valid_role_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='user_email_lower_unique'),
+        ),
+    ]
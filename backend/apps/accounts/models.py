@@ -4,6 +4,7 @@ User, Profile, Manager, and Invitation models.
 """
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from datetime import timedelta
@@ -58,6 +59,8 @@ class User(AbstractUser):
                 check=models.Q(email__isnull=False) & ~models.Q(email=''),
                 name='user_email_not_empty'
             ),
+            # Login and guest email checks look users up with email__lower=...
+            models.UniqueConstraint(Lower('email'), name='user_email_lower_unique'),
         ]
     
     def save(self, *args, **kwargs):
@@ -51,7 +51,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
         # Check for duplicate email (case-insensitive)
         if 'email' in attrs:
             email = attrs['email']
-            existing_user = User.objects.filter(email__iexact=email).first()
+            existing_user = User.objects.filter(email__lower=email.lower()).first()
             if existing_user and (not self.instance or existing_user.id != self.instance.id):
                 raise serializers.ValidationError({
                     "email": "A user with this email address already exists."
@@ -1,4 +1,76 @@
+"""
+Accounts tests.
+
+Email lookups: login and the guest email checks look users and customers up with
+email__lower=..., which the Lower('email') unique constraint on User and index on Customer serve.
+"""
+from datetime import date, time
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.customers.models import Customer
+from apps.orders.models import Order
+
+
+class EmailLookupTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='alice@test.com', password='testpass123', role='customer', username='alice',
+        )
+
+    def test_login_is_case_insensitive(self):
+        response = self.client.post('/api/aut/login/', {'email': ' Alice@Test.COM ', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['success'])
+
+    def test_guest_check_email_finds_user_and_customer(self):
+        Customer.objects.create(name='Bob', email='Bob@Test.com')
+        response = self.client.post('/api/bkg/guest/check-email/', {'email': 'ALICE@test.com'})
+        self.assertTrue(response.data['data']['email_exists'])
+        response = self.client.post('/api/bkg/guest/check-email/', {'email': 'bob@test.com'})
+        self.assertTrue(response.data['data']['customer_exists'])
+
+    def test_guest_link_register_rejects_existing_email_in_any_case(self):
+        order = Order.objects.create(
+            status='pending', total_price=50, scheduled_date=date.today(), scheduled_time=time(10, 0),
+            guest_email='alice@test.com', guest_name='Alice', address_line1='1 High St', city='London',
+            postcode='SW1A 1AA',
+        )
+        response = self.client.post(f'/api/bkg/guest/order/{order.order_number}/link-register/', {
+            'email': 'Alice@Test.com', 'password': 'testpass123', 'password_confirm': 'testpass123',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error']['code'], 'EMAIL_EXISTS')
+
+    def test_emails_differing_only_by_case_are_rejected(self):
+        with self.assertRaises(IntegrityError):
+            # update() skips User.save, which would lowercase the email
+            User.objects.filter(pk=User.objects.create(email='bob@test.com', username='bob').pk).update(
+                email='ALICE@test.com',
+            )
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite-specific')
+    def test_lookups_use_lower_email_indexes(self):
+        for queryset, index in (
+            (User.objects.filter(email__lower='alice@test.com'), 'user_email_lower_unique'),
+            (Customer.objects.filter(email__lower='alice@test.com'), 'customer_email_lower_idx'),
+        ):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertIn(f'USING INDEX {index}', plan)
 
-# Accounts tests
-# Will be implemented later
+    def test_fix_duplicate_emails_normalizes_mixed_case(self):
+        User.objects.filter(pk=self.user.pk).update(email=' Alice@Test.com')
+        call_command('fix_duplicate_emails', stdout=StringIO())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'alice@test.com')
@@ -45,7 +45,7 @@ class RegisterView(generics.CreateAPIView):
         existing_user = None
         if email:
             try:
-                existing_user = User.objects.get(email__iexact=email)
+                existing_user = User.objects.get(email__lower=email.lower())
             except User.DoesNotExist:
                 existing_user = None
         
@@ -155,7 +155,7 @@ class LoginView(TokenObtainPairView):
         
         # Try to get user (case-insensitive lookup)
         try:
-            user = User.objects.get(email__iexact=email)
+            user = User.objects.get(email__lower=email.lower())
         except User.DoesNotExist:
             # Email doesn't exist - return same generic error as wrong password
             # This prevents user enumeration attacks
@@ -314,7 +314,8 @@ def google_oauth_start_view(request):
         )
         
         # Store state in cache so callback works without session cookie (e.g. cross-origin redirect from Google)
-        from django.core.cache import cache
+        from apps.core.caches import AUTH_STATE_CACHE, get_cache
+        cache = get_cache(AUTH_STATE_CACHE)
         cache_key = f'google_oauth_login_state_{state}'
         cache.set(cache_key, {'scopes': oauth_scopes}, timeout=600)
         # Also store in session as fallback
@@ -384,7 +385,8 @@ def google_oauth_callback_view(request):
         return redirect(f"{frontend_url}/login?error=invalid_state")
     
     # Verify state from cache (primary) or session (fallback) so callback works when session cookie is not sent
-    from django.core.cache import cache
+    from apps.core.caches import AUTH_STATE_CACHE, get_cache
+    cache = get_cache(AUTH_STATE_CACHE)
     cache_key = f'google_oauth_login_state_{state}'
     cached_data = cache.get(cache_key)
     if cached_data:
@@ -462,7 +464,7 @@ def google_oauth_callback_view(request):
         from apps.customers.models import Customer
         
         try:
-            user = User.objects.get(email__iexact=email)
+            user = User.objects.get(email__lower=email.lower())
         except User.DoesNotExist:
             # Create new user (customer) and Customer record
             base_username = email.split('@')[0]
@@ -495,7 +497,7 @@ def google_oauth_callback_view(request):
                 )
             except IntegrityError:
                 # Race condition: user was created by another request
-                user = User.objects.get(email__iexact=email)
+                user = User.objects.get(email__lower=email.lower())
         
         if not user.is_active:
             frontend_url = getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')
@@ -599,7 +601,7 @@ def google_login_view(request):
     from apps.customers.models import Customer
 
     try:
-        user = User.objects.get(email__iexact=email)
+        user = User.objects.get(email__lower=email.lower())
     except User.DoesNotExist:
         # Create new user (customer) and Customer record
         base_username = email.split('@')[0]
@@ -630,7 +632,7 @@ def google_login_view(request):
             )
         except IntegrityError:
             # Race: user was created by another request; fetch and continue
-            user = User.objects.get(email__iexact=email)
+            user = User.objects.get(email__lower=email.lower())
 
     if not user.is_active:
         return Response({
@@ -1042,7 +1044,7 @@ def check_email_view(request):
     
     # Normalize email to lowercase for case-insensitive lookup
     email = email.lower().strip()
-    email_exists = User.objects.filter(email__iexact=email).exists()
+    email_exists = User.objects.filter(email__lower=email.lower()).exists()
     
     return Response({
         'success': True,
@@ -1077,7 +1079,7 @@ def password_reset_request_view(request):
     email = email.lower().strip()
     
     try:
-        user = User.objects.get(email__iexact=email)
+        user = User.objects.get(email__lower=email.lower())
         if not user.is_active:
             return Response({
                 'success': False,
@@ -1242,7 +1244,7 @@ def email_verification_request_view(request):
     email = email.lower().strip()
     
     try:
-        user = User.objects.get(email__iexact=email)
+        user = User.objects.get(email__lower=email.lower())
         if user.is_verified:
             return Response({
                 'success': True,
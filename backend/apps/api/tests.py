@@ -0,0 +1,178 @@
+"""
+API query budget tests.
+
+Every list endpoint under apps/api/urls.py is requested with 10, 100 and 1000 rows seeded, and
+the X-DB-Queries header set by QueryCountMiddleware must stay within the endpoint's declared
+budget at every size. A budget is a constant, so an endpoint whose query count grows with the
+number of rows (a per-row query in a serializer) fails here. Caches are cleared before each
+request, so budgets are for cold requests.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.appointments.models import Appointment, CustomerAppointment
+from apps.coupons.models import Coupon
+from apps.customers.models import Address, Customer
+from apps.orders.models import ChangeRequest, Order, OrderItem
+from apps.services.models import Category, Service
+from apps.staff.models import Staff, StaffArea, StaffSchedule, StaffService
+from apps.subscriptions.models import Subscription
+
+User = get_user_model()
+
+SIZES = (10, 100, 1000)
+
+# (path, role, query budget); role None is an anonymous request, {customer} is the seeded customer's id
+ENDPOINTS = [
+    # Public
+    ('/api/stf/', None, 2),
+    ('/api/svc/', None, 1),
+    ('/api/svc/categories/', None, 2),
+    ('/api/coupons/active/', None, 3),
+    # Customer
+    ('/api/aut/me/', 'customer', 0),
+    ('/api/aut/profile/', 'customer', 7),
+    ('/api/cus/profile/', 'customer', 3),
+    ('/api/cus/addresses/', 'customer', 3),
+    ('/api/cus/subscriptions/', 'customer', 3),
+    ('/api/cus/appointments/', 'customer', 3),
+    ('/api/cus/orders/', 'customer', 9),
+    ('/api/bkg/appointments/', 'customer', 3),
+    ('/api/bkg/subscriptions/', 'customer', 4),
+    ('/api/bkg/orders/', 'customer', 8),
+    ('/api/calendar/status/', 'customer', 1),
+    # Staff
+    ('/api/st/schedule/', 'staff', 2),
+    ('/api/st/areas/', 'staff', 3),
+    ('/api/st/categories/', 'staff', 3),
+    ('/api/st/jobs/', 'staff', 3),
+    ('/api/st/services/', 'staff', 5),
+    # Admin
+    ('/api/ad/customers/', 'admin', 2),
+    ('/api/ad/customers/{customer}/bookings/', 'admin', 14),
+    ('/api/ad/orders/', 'admin', 8),
+    ('/api/ad/appointments/', 'admin', 2),
+    ('/api/ad/staff/', 'admin', 2),
+    ('/api/man/staff/', 'admin', 2),
+    ('/api/ad/staff-services/', 'admin', 1),
+    ('/api/ad/services/', 'admin', 1),
+    ('/api/ad/categories/', 'admin', 2),
+    ('/api/ad/users/', 'admin', 1),
+    ('/api/ad/managers/', 'admin', 1),
+    ('/api/ad/coupons/', 'admin', 3),
+    ('/api/ad/change-requests/', 'admin', 2),
+    ('/api/ad/staff-areas/', 'admin', 2),
+    ('/api/ad/staff-schedules/', 'admin', 2),
+    ('/api/ad/reports/dashboard/', 'admin', 12),
+    ('/api/ad/reports/revenue/', 'admin', 4),
+    ('/api/ad/reports/appointments/', 'admin', 1),
+    ('/api/ad/reports/staff-performance/', 'admin', 4),
+    ('/api/ad/jobs/', 'admin', 2),
+]
+
+
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@test.com', password='testpass123', role='admin', username='admin1')
+        customer_user = User.objects.create_user(
+            email='customer@test.com', password='testpass123', role='customer', username='customer1',
+        )
+        staff_user = User.objects.create_user(email='staff@test.com', password='testpass123', role='staff', username='staff1')
+        self.users = {'admin': self.admin, 'customer': customer_user, 'staff': staff_user}
+        self.customer = Customer.objects.create(user=customer_user, name='Carol', email='customer@test.com')
+        self.staff = Staff.objects.create(user=staff_user, name='Sam', email='staff@test.com')
+        self.category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.seeded = 0
+
+    def _seed(self, n):
+        """Grow every collection to n rows (the logged-in customer and staff own the bookings)."""
+        first, self.seeded = self.seeded, n
+        new = range(first, n)
+        if not new:
+            return
+        services = Service.objects.bulk_create([
+            Service(category=self.category, name=f'Service {i}', slug=f'service-{i}', duration=60, price=50,
+                    approval_status='approved')
+            for i in new
+        ])
+        staff = Staff.objects.bulk_create([Staff(name=f'Staff {i}', email=f'staff{i}@test.com') for i in new])
+        StaffService.objects.bulk_create([
+            StaffService(staff=member, service=service) for member, service in zip(staff, services)
+        ] + [StaffService(staff=self.staff, service=service) for service in services])
+        StaffArea.objects.bulk_create([
+            StaffArea(staff=member, postcode='SW1A 1AA', radius_miles=5) for member in staff + [self.staff] * len(new)
+        ])
+        StaffSchedule.objects.bulk_create([
+            StaffSchedule(staff=member, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0)) for member in staff
+        ])
+        Customer.objects.bulk_create([Customer(name=f'Customer {i}', email=f'customer{i}@test.com') for i in new])
+        Address.objects.bulk_create([
+            Address(customer=self.customer, address_line1=f'{i} High St', city='London', postcode='SW1A 1AA') for i in new
+        ])
+        Coupon.objects.bulk_create([
+            Coupon(code=f'SAVE{i}', name=f'Save {i}', discount_type='fixed', discount_value=5,
+                   valid_from=timezone.now() - timedelta(days=1))
+            for i in new
+        ])
+
+        start = timezone.make_aware(datetime(2025, 3, 3, 9, 0))
+        today = date(2025, 3, 3)
+        orders = Order.objects.bulk_create([
+            Order(customer=self.customer, order_number=f'ORD-{i}', tracking_token=uuid4().hex, status='completed',
+                  payment_status='paid', total_price=Decimal('50'), scheduled_date=today, scheduled_time=time(9, 0),
+                  address_line1='1 High St', city='London', postcode='SW1A 1AA')
+            for i in new
+        ])
+        Subscription.objects.bulk_create([
+            Subscription(customer=self.customer, service=service, staff=self.staff, subscription_number=f'SUB-{i}',
+                         tracking_token=uuid4().hex, frequency='weekly', duration_months=1, start_date=today,
+                         end_date=today + timedelta(days=30), total_appointments=4, price_per_appointment=50,
+                         total_price=200, status='active', payment_status='paid',
+                         address_line1='1 High St', city='London', postcode='SW1A 1AA')
+            for i, service in zip(new, services)
+        ])
+        appointments = Appointment.objects.bulk_create([
+            Appointment(staff=self.staff, service=service, order=order, start_time=start + timedelta(hours=i),
+                        end_time=start + timedelta(hours=i, minutes=30), status='completed', appointment_type='order_item')
+            for i, service, order in zip(new, services, orders)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, service=service, staff=self.staff, appointment=appointment, quantity=1,
+                      unit_price=50, total_price=50)
+            for order, service, appointment in zip(orders, services, appointments)
+        ])
+        CustomerAppointment.objects.bulk_create([
+            CustomerAppointment(customer=self.customer, appointment=appointment, total_price=Decimal('50'),
+                                payment_status='paid')
+            for appointment in appointments
+        ])
+        ChangeRequest.objects.bulk_create([
+            ChangeRequest(order=order, requested_date=today + timedelta(days=7), requested_time=time(10, 0), reason='Moving')
+            for order in orders
+        ])
+
+    def _query_count(self, path, role):
+        for cache in caches.all():
+            cache.clear()
+        client = APIClient()
+        if role:
+            client.force_authenticate(user=self.users[role])
+        response = client.get(path.format(customer=self.customer.id))
+        self.assertEqual(response.status_code, 200, path)
+        return int(response['X-DB-Queries'])
+
+    def test_query_counts_stay_within_budget_as_rows_grow(self):
+        for n in SIZES:
+            self._seed(n)
+            for path, role, budget in ENDPOINTS:
+                with self.subTest(path=path, rows=n):
+                    self.assertLessEqual(self._query_count(path, role), budget)
+
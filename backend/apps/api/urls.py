@@ -75,6 +75,8 @@ urlpatterns = [
     path('ad/', include('apps.appointments.urls_admin')),  # Admin appointment endpoints (/api/ad/appointments/)
     path('ad/reports/', include('apps.reports.urls')),  # Admin reports endpoints (/api/ad/reports/)
     path('ad/routes/', include('apps.core.urls_route')),  # Route optimization (/api/ad/routes/)
+    path('ad/jobs/', include('apps.core.urls_jobs')),  # Background job status (/api/ad/jobs/)
+    path('ad/search/', include('apps.core.urls_search')),  # Admin search: customers, orders, staff (/api/ad/search/)
     path('st/', include('apps.staff.urls_staff')),  # Staff self-service endpoints (/api/st/)
     path('', include('apps.staff.urls_protected')),  # Staff admin/manager endpoints (/api/ad/, /api/man/)
 ]
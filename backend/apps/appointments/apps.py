@@ -5,3 +5,7 @@ class AppointmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.appointments'
     verbose_name = 'Appointments'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.appointments.signals  # noqa
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_appointment_appointment_valid_status_and_more'),
+        ('orders', '0003_changerequest_changerequest_valid_status_and_more'),
+        ('services', '0003_category_category_name_not_empty_and_more'),
+        ('staff', '0004_staff_staff_name_not_empty_and_more'),
+        ('subscriptions', '0003_subscription_subscription_valid_frequency_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['start_time', 'service', 'status'], name='appointment_start_t_0af0c5_idx'),
+        ),
+    ]
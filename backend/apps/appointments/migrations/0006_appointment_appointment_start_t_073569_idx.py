@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_appointment_appointment_start_t_0af0c5_idx'),
+        ('orders', '0004_order_orders_orde_created_0fb29d_idx'),
+        ('services', '0003_category_category_name_not_empty_and_more'),
+        ('staff', '0004_staff_staff_name_not_empty_and_more'),
+        ('subscriptions', '0003_subscription_subscription_valid_frequency_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['start_time', 'id'], name='appointment_start_t_073569_idx'),
+        ),
+    ]
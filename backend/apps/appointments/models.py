@@ -123,6 +123,10 @@ class Appointment(TimeStampedModel):
         indexes = [
             models.Index(fields=['staff', 'start_time']),
             models.Index(fields=['status', 'start_time']),
+            # Covers the appointment analytics scan (reports/analytics.py)
+            models.Index(fields=['start_time', 'service', 'status']),
+            # Keyset pagination (core/pagination.py)
+            models.Index(fields=['start_time', 'id']),
             models.Index(fields=['appointment_type']),
             models.Index(fields=['subscription']),
             models.Index(fields=['order']),
@@ -3,12 +3,27 @@ Appointments app serializers.
 Appointment and CustomerAppointment serializers with calendar sync support.
 """
 from rest_framework import serializers
+from apps.core.serializers import SparseFieldsetMixin
 from .models import Appointment, CustomerAppointment
-from apps.staff.serializers import StaffListSerializer
+from apps.staff.serializers import StaffListSerializer, active_service_areas
 from apps.services.serializers import ServiceListSerializer
 from apps.customers.serializers import CustomerSerializer, CustomerListSerializer
 
 
+# Relations AppointmentSerializer reads, followed with select_related
+APPOINTMENT_RELATED = ('staff', 'service__category', 'subscription', 'order', 'customer_booking__customer')
+
+
+def prefetch_appointment_relations(queryset, prefix=''):
+    """
+    Load everything AppointmentSerializer reads, so a list costs a fixed number of queries.
+    prefix is the path to Appointment from the queryset's model (e.g. 'appointment__').
+    """
+    return queryset.select_related(*(prefix + name for name in APPOINTMENT_RELATED)).prefetch_related(
+        active_service_areas(f'{prefix}staff__service_areas')
+    )
+
+
 class CustomerBookingSummarySerializer(serializers.ModelSerializer):
     """Minimal customer booking info for inclusion in Appointment (can_cancel, can_reschedule, price, customer name)."""
     customer = serializers.SerializerMethodField(read_only=True)
@@ -28,7 +43,7 @@ class CustomerBookingSummarySerializer(serializers.ModelSerializer):
         return {'id': obj.customer.id, 'name': obj.customer.name, 'email': getattr(obj.customer, 'email', '') or ''}
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Appointment serializer with calendar sync fields and optional customer_booking.
     """
@@ -53,6 +68,7 @@ class AppointmentSerializer(serializers.ModelSerializer):
                   'location_notes', 'completion_photos',
                   'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        expandable_fields = ['staff', 'service', 'customer_booking']
         extra_kwargs = {
             'calendar_event_id': {'required': False, 'allow_null': True},
             'calendar_synced_to': {'required': False, 'allow_null': True},
@@ -0,0 +1,49 @@
+"""
+Appointment signals.
+
+Invalidate cached available slots (see slots_cache) whenever the data they are built from changes.
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.services.models import Service
+from apps.staff.models import Staff, StaffArea, StaffSchedule, StaffService
+from .models import Appointment
+from .slots_cache import bump_appointment_windows, bump_coverage_version, bump_staff_version
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_previous_slot_window(sender, instance, **kwargs):
+    """Keep the stored staff/time window so a reschedule also frees the old date."""
+    if instance.pk and not instance._state.adding:
+        instance._previous_slot_window = Appointment.objects.filter(pk=instance.pk).values_list(
+            'staff_id', 'start_time', 'end_time'
+        ).first()
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_slots_for_appointment(sender, instance, **kwargs):
+    windows = [(instance.staff_id, instance.start_time, instance.end_time)]
+    previous = getattr(instance, '_previous_slot_window', None)
+    if previous:
+        windows.append(previous)
+    bump_appointment_windows(windows)
+
+
+@receiver(post_save, sender=StaffSchedule)
+@receiver(post_delete, sender=StaffSchedule)
+def invalidate_slots_for_schedule(sender, instance, **kwargs):
+    bump_staff_version(instance.staff_id)
+
+
+@receiver(post_save, sender=StaffArea)
+@receiver(post_delete, sender=StaffArea)
+@receiver(post_save, sender=StaffService)
+@receiver(post_delete, sender=StaffService)
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_slots_for_coverage(sender, instance, **kwargs):
+    bump_coverage_version()
@@ -0,0 +1,134 @@
+"""
+Versioned cache for available slots payloads.
+
+Each cached payload records the version tokens it was computed against:
+- coverage: bumped when StaffArea, StaffService, Staff or Service rows change (who is eligible)
+- staff: bumped when a StaffSchedule row changes (working hours/breaks for every date)
+- staff + date: bumped when an Appointment touching that date changes
+
+A payload is served only while all of its tokens are unchanged, so it can be cached for hours
+and still never outlive the data it was built from. Payloads and tokens live in the 'slots'
+cache namespace, whose TIMEOUT (6h by default) only bounds memory use. Tokens are random (not counters) so an
+evicted version key can never come back with a value an old payload recorded.
+"""
+import secrets
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.utils import timezone
+
+from apps.core.caches import SLOTS_CACHE, get_cache
+
+COVERAGE_VERSION_KEY = 'slots_version_coverage'
+
+
+def staff_version_key(staff_id: int) -> str:
+    return f'slots_version_staff_{staff_id}'
+
+
+def staff_date_version_key(staff_id: int, day) -> str:
+    return f'slots_version_staff_{staff_id}_{day.isoformat()}'
+
+
+def _cache():
+    return get_cache(SLOTS_CACHE)
+
+
+def _new_token() -> str:
+    return secrets.token_hex(8)
+
+
+def get_versions(keys: Iterable[str]) -> Dict[str, str]:
+    """Current version tokens for keys, initializing missing ones (one get_many round trip when warm)."""
+    keys = list(keys)
+    cache = _cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_token(), None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def bump_versions(keys: Iterable[str]) -> None:
+    """Invalidate every cached payload that recorded any of these keys."""
+    keys = set(keys)
+    if keys:
+        _cache().set_many({key: _new_token() for key in keys}, None)
+
+
+def bump_coverage_version() -> None:
+    bump_versions([COVERAGE_VERSION_KEY])
+
+
+def bump_staff_version(staff_id: Optional[int]) -> None:
+    if staff_id:
+        bump_versions([staff_version_key(staff_id)])
+
+
+def bump_appointment_windows(windows: Iterable[Tuple[Optional[int], object, object]]) -> None:
+    """
+    Bump (staff, date) versions for appointment windows [(staff_id, start_time, end_time), ...].
+    Every local date an appointment touches is bumped. Call this after bulk_create/update, which
+    do not send model signals.
+    """
+    keys = set()
+    for staff_id, start_time, end_time in windows:
+        if not staff_id or start_time is None:
+            continue
+        day = timezone.localtime(start_time).date()
+        last_day = timezone.localtime(end_time).date() if end_time else day
+        while day <= last_day:
+            keys.add(staff_date_version_key(staff_id, day))
+            day += timedelta(days=1)
+    bump_versions(keys)
+
+
+def slot_version_keys(staff_ids: List[int], target_date) -> List[str]:
+    """Version keys a payload for these staff on target_date depends on."""
+    keys = [COVERAGE_VERSION_KEY]
+    for staff_id in staff_ids:
+        keys.append(staff_version_key(staff_id))
+        keys.append(staff_date_version_key(staff_id, target_date))
+    return keys
+
+
+def get_cached_slots(cache_key: str) -> Optional[Dict]:
+    """Cached payload if all recorded versions are still current, else None."""
+    cache = _cache()
+    entry = cache.get(cache_key)
+    if not isinstance(entry, dict) or 'versions' not in entry:
+        return None
+    versions = entry['versions']
+    if cache.get_many(list(versions)) != versions:
+        return None
+    return entry['payload']
+
+
+def set_cached_slots(cache_key: str, payload: Dict, versions: Dict[str, str]) -> None:
+    _cache().set(cache_key, {'payload': payload, 'versions': versions})
+
+
+def get_available_slots_versioned(
+    postcode: str,
+    service_id: int,
+    target_date,
+    staff_id: Optional[int] = None,
+    validation_result: Optional[Dict] = None,
+) -> Tuple[List[Dict], Dict[str, str]]:
+    """
+    get_available_slots plus the version tokens read before computing.
+    Tokens are read first so a change that lands mid-computation still invalidates the result.
+    """
+    from apps.services.models import Service
+    from .slots_utils import compute_available_slots, resolve_slot_staff_ids
+
+    versions = get_versions([COVERAGE_VERSION_KEY])
+    service = Service.objects.filter(id=service_id, is_active=True).first()
+    if service is None:
+        return [], versions
+    staff_ids = resolve_slot_staff_ids(
+        postcode, service_id, staff_id=staff_id, validation_result=validation_result
+    )
+    versions.update(get_versions(slot_version_keys(staff_ids, target_date)))
+    return compute_available_slots(service, staff_ids, target_date), versions
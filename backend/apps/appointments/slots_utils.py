@@ -2,14 +2,195 @@
 Available slots calculation utilities.
 """
 from datetime import datetime, timedelta, date, time
-from typing import List, Dict, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from django.utils import timezone
-from django.db.models import Q
 from apps.staff.models import Staff, StaffSchedule, StaffService
 from apps.appointments.models import Appointment
 from apps.services.models import Service
 
 
+# Appointment statuses that occupy a staff member's time
+BLOCKING_APPOINTMENT_STATUSES = ['pending', 'confirmed', 'in_progress']
+
+# Slots are offered at 30-minute intervals
+SLOT_INTERVAL_MINUTES = 30
+
+
+def _parse_breaks(breaks) -> List[Tuple[time, time]]:
+    """Parse schedule breaks JSON ([{"start": "12:00", "end": "13:00"}]) into (start, end) time tuples."""
+    parsed = []
+    for break_period in (breaks or []):
+        break_start = datetime.strptime(break_period.get('start', '00:00'), '%H:%M').time()
+        break_end = datetime.strptime(break_period.get('end', '00:00'), '%H:%M').time()
+        parsed.append((break_start, break_end))
+    return parsed
+
+
+def _merge_intervals(intervals: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """Sort and merge overlapping (start, end) intervals so ends are strictly increasing."""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def load_schedules_by_staff(staff_ids, days_of_week=None) -> Dict[int, Dict[int, Dict]]:
+    """
+    Load active schedules for the given staff in a single query.
+    Returns {staff_id: {day_of_week: {'start': time, 'end': time, 'breaks': [(time, time), ...]}}}.
+    """
+    schedules_qs = StaffSchedule.objects.filter(staff_id__in=staff_ids, is_active=True)
+    if days_of_week is not None:
+        schedules_qs = schedules_qs.filter(day_of_week__in=days_of_week)
+    schedules = {}
+    for schedule in schedules_qs.only('staff_id', 'day_of_week', 'start_time', 'end_time', 'breaks'):
+        schedules.setdefault(schedule.staff_id, {})[schedule.day_of_week] = {
+            'start': schedule.start_time,
+            'end': schedule.end_time,
+            'breaks': _parse_breaks(schedule.breaks),
+        }
+    return schedules
+
+
+def load_busy_intervals(staff_ids, range_start: datetime, range_end: datetime) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    """
+    Load booked intervals overlapping [range_start, range_end) for the given staff in a single query.
+    Returns {staff_id: [(start_time, end_time), ...]} with aware datetimes, sorted by start.
+    """
+    busy = {}
+    rows = Appointment.objects.filter(
+        staff_id__in=staff_ids,
+        start_time__lt=range_end,
+        end_time__gt=range_start,
+        status__in=BLOCKING_APPOINTMENT_STATUSES,
+    ).order_by('start_time').values_list('staff_id', 'start_time', 'end_time')
+    for row_staff_id, start_time, end_time in rows:
+        busy.setdefault(row_staff_id, []).append((start_time, end_time))
+    return busy
+
+
+def build_day_slots(
+    target_date: date,
+    service_duration: int,
+    day_schedules: Dict[int, Dict],
+    busy_by_staff: Dict[int, List[Tuple[datetime, datetime]]],
+) -> List[Dict]:
+    """
+    Compute slot dicts for one day purely in memory.
+
+    day_schedules: {staff_id: {'start': time, 'end': time, 'breaks': [(time, time), ...]}} for target_date.
+    busy_by_staff: {staff_id: [(aware_start, aware_end), ...]} booked intervals (may span other days).
+
+    Breaks and bookings are merged into one sorted busy list per staff; slots are generated in
+    ascending order so each staff keeps a cursor into its list and every interval is visited once.
+    Overlap check uses the full service_duration so back-to-back bookings are only offered when the
+    slot does not overlap an existing appointment (e.g. 1h service at 09:00 blocks 09:00-10:00;
+    next offered slot is 10:00).
+    """
+    if not day_schedules:
+        return []
+
+    staff_intervals = {}
+    for sid, schedule_info in day_schedules.items():
+        intervals = [
+            (
+                timezone.make_aware(datetime.combine(target_date, break_start)),
+                timezone.make_aware(datetime.combine(target_date, break_end)),
+            )
+            for break_start, break_end in schedule_info['breaks']
+        ]
+        intervals.extend(busy_by_staff.get(sid, []))
+        staff_intervals[sid] = _merge_intervals(intervals)
+    cursors = {sid: 0 for sid in day_schedules}
+
+    # Use earliest start time and latest end time across all schedules
+    earliest_start = min(info['start'] for info in day_schedules.values())
+    latest_end = max(info['end'] for info in day_schedules.values())
+
+    slots = []
+    slot_time = datetime.combine(target_date, earliest_start)
+    while True:
+        slot_end = slot_time + timedelta(minutes=service_duration)
+        slot_end_time = slot_end.time()
+        if slot_end_time > latest_end:
+            break
+
+        slot_start_time = slot_time.time()
+        slot_start_datetime = timezone.make_aware(slot_time)
+        slot_end_datetime = timezone.make_aware(slot_end)
+        available_staff_ids = []
+
+        for sid, schedule_info in day_schedules.items():
+            # Check if slot is within working hours
+            if slot_start_time < schedule_info['start'] or slot_end_time > schedule_info['end']:
+                continue
+
+            # Skip busy intervals that end before this slot starts (they cannot affect later slots)
+            intervals = staff_intervals[sid]
+            cursor = cursors[sid]
+            while cursor < len(intervals) and intervals[cursor][1] <= slot_start_datetime:
+                cursor += 1
+            cursors[sid] = cursor
+            if cursor < len(intervals) and intervals[cursor][0] < slot_end_datetime:
+                continue
+
+            available_staff_ids.append(sid)
+
+        # Add slot to results (unavailable = blocked by existing booking or outside hours)
+        slot_available = bool(available_staff_ids)
+        slot_dict = {
+            'time': slot_time.strftime('%H:%M'),
+            'available': slot_available,
+            'staff_ids': available_staff_ids,
+        }
+        if not slot_available:
+            slot_dict['reason'] = 'Booked or unavailable'
+        slots.append(slot_dict)
+
+        slot_time += timedelta(minutes=SLOT_INTERVAL_MINUTES)
+        # Safety check to avoid infinite loop
+        if slot_time.date() > target_date:
+            break
+
+    return slots
+
+
+def get_service_duration(service: Service) -> int:
+    """Service duration in minutes including padding time."""
+    return service.duration + (service.padding_time or 0)
+
+
+def resolve_slot_staff_ids(
+    postcode: str,
+    service_id: int,
+    staff_id: Optional[int] = None,
+    validation_result: Optional[Dict] = None,
+) -> List[int]:
+    """
+    Staff IDs eligible for slots: the selected staff (if active), otherwise staff whose area covers
+    the postcode for this service and who actively provide the service.
+    """
+    from apps.core.postcode_utils import get_staff_for_postcode
+
+    if staff_id:
+        return list(Staff.objects.filter(id=staff_id, is_active=True).values_list('id', flat=True))
+    available_staff = get_staff_for_postcode(postcode, service_id=service_id, validation_result=validation_result)
+    if not hasattr(available_staff, 'filter'):
+        return [s.id for s in available_staff]
+    return list(
+        available_staff.filter(
+            staff_services__service_id=service_id,
+            staff_services__is_active=True
+        ).values_list('id', flat=True).distinct()
+    )
+
+
 def get_available_slots(
     postcode: str,
     service_id: int,
@@ -19,6 +200,10 @@ def get_available_slots(
     """
     Calculate available time slots for a service on a given date.
     
+    Loads the service, eligible staff, their schedules and the day's appointments once, then
+    computes free intervals in memory (see build_day_slots). Query count does not depend on the
+    number of staff or slots.
+    
     Args:
         postcode: Customer postcode (for filtering available staff)
         service_id: Service ID
@@ -32,166 +217,94 @@ def get_available_slots(
             ...
         ]
     """
-    from apps.core.postcode_utils import get_staff_for_postcode
-    
     # Get service
     try:
         service = Service.objects.get(id=service_id, is_active=True)
     except Service.DoesNotExist:
         return []
     
-    # Get service duration (including padding time)
-    service_duration = service.duration
-    if service.padding_time:
-        service_duration += service.padding_time
-    
-    # Get available staff for this postcode and service
-    if staff_id:
-        # Specific staff selected
-        try:
-            available_staff = Staff.objects.filter(id=staff_id, is_active=True)
-        except Staff.DoesNotExist:
-            return []
-    else:
-        # Get staff who can service this postcode for this service (per-service or global areas)
-        available_staff = get_staff_for_postcode(postcode, service_id=service_id)
-        # Filter to only staff who provide this service
-        available_staff = available_staff.filter(
-            staff_services__service_id=service_id,
-            staff_services__is_active=True
-        ).distinct()
-    
-    if not available_staff.exists():
+    staff_ids = resolve_slot_staff_ids(postcode, service_id, staff_id=staff_id)
+    return compute_available_slots(service, staff_ids, target_date)
+
+
+def compute_available_slots(service: Service, staff_ids: List[int], target_date: date) -> List[Dict]:
+    """
+    Slots for an already resolved service and staff set (see get_available_slots).
+    Two queries: schedules for the weekday and blocking appointments for the day.
+    """
+    if not staff_ids:
         return []
     
     # Get day of week (0=Monday, 6=Sunday)
     day_of_week = target_date.weekday()
-    
-    # Get all schedules for available staff on this day
-    schedules = StaffSchedule.objects.filter(
-        staff__in=available_staff,
-        day_of_week=day_of_week,
-        is_active=True
-    ).select_related('staff')
-    
-    if not schedules.exists():
+    schedules = load_schedules_by_staff(staff_ids, days_of_week=[day_of_week])
+    day_schedules = {
+        sid: by_day[day_of_week] for sid, by_day in schedules.items() if day_of_week in by_day
+    }
+    if not day_schedules:
         return []
     
-    # Get existing appointments for this date
     start_of_day = timezone.make_aware(datetime.combine(target_date, time.min))
-    end_of_day = timezone.make_aware(datetime.combine(target_date, time.max))
-    
-    existing_appointments = Appointment.objects.filter(
-        start_time__gte=start_of_day,
-        start_time__lt=end_of_day + timedelta(days=1),
-        status__in=['pending', 'confirmed', 'in_progress']
-    ).select_related('staff', 'service')
-    
-    # Generate time slots at 30-minute intervals. Overlap check uses full service_duration
-    # so back-to-back bookings are only offered when the slot does not overlap an existing
-    # appointment (e.g. 1h service at 09:00 blocks 09:00-10:00; next offered slot is 10:00).
-    slots = []
-    slot_interval_minutes = 30
-    
-    # Combine all working hours from all schedules
-    all_start_times = []
-    all_end_times = []
-    all_breaks = []
-    staff_schedule_map = {}
-    
-    for schedule in schedules:
-        staff_id = schedule.staff.id
-        staff_schedule_map[staff_id] = {
-            'start': schedule.start_time,
-            'end': schedule.end_time,
-            'breaks': schedule.breaks or [],
-        }
-        all_start_times.append(schedule.start_time)
-        all_end_times.append(schedule.end_time)
-        all_breaks.extend(schedule.breaks or [])
-    
-    if not all_start_times:
-        return []
-    
-    # Use earliest start time and latest end time
-    earliest_start = min(all_start_times)
-    latest_end = max(all_end_times)
-    
-    # Generate slots from earliest_start to latest_end
-    current_time = earliest_start
-    slot_time = datetime.combine(target_date, current_time)
+    end_of_day = start_of_day + timedelta(days=1)
+    busy_by_staff = load_busy_intervals(list(day_schedules), start_of_day, end_of_day)
     
-    while True:
-        # Check if this slot would end after latest_end
-        slot_end = slot_time + timedelta(minutes=service_duration)
-        slot_end_time = slot_end.time()
-        
-        if slot_end_time > latest_end:
-            break
-        
-        # Check if slot time is within any staff's working hours
-        slot_available = False
-        available_staff_ids = []
-        
-        for staff_id, schedule_info in staff_schedule_map.items():
-            slot_start_time = slot_time.time()
-            
-            # Check if slot is within working hours
-            if slot_start_time < schedule_info['start'] or slot_end_time > schedule_info['end']:
-                continue
-            
-            # Check if slot conflicts with breaks
-            in_break = False
-            for break_period in schedule_info['breaks']:
-                break_start = datetime.strptime(break_period.get('start', '00:00'), '%H:%M').time()
-                break_end = datetime.strptime(break_period.get('end', '00:00'), '%H:%M').time()
-                
-                # Check if slot overlaps with break
-                if (slot_start_time < break_end and slot_end_time > break_start):
-                    in_break = True
-                    break
-            
-            if in_break:
-                continue
-            
-            # Check if slot conflicts with existing appointments for this staff
-            slot_start_datetime = timezone.make_aware(slot_time)
-            slot_end_datetime = timezone.make_aware(slot_end)
-            
-            conflicting_appointment = existing_appointments.filter(
-                staff_id=staff_id
-            ).filter(
-                Q(start_time__lt=slot_end_datetime, end_time__gt=slot_start_datetime)
-            ).exists()
-            
-            if conflicting_appointment:
-                continue
-            
-            # Slot is available for this staff
-            slot_available = True
-            available_staff_ids.append(staff_id)
-        
-        # Add slot to results (unavailable = blocked by existing booking or outside hours)
-        slot_dict = {
-            'time': slot_time.strftime('%H:%M'),
-            'available': slot_available,
-            'staff_ids': available_staff_ids if slot_available else [],
+    return build_day_slots(target_date, get_service_duration(service), day_schedules, busy_by_staff)
+
+
+def _split_busy_by_date(busy_by_staff: Dict[int, List[Tuple[datetime, datetime]]]) -> Dict[date, Dict[int, List]]:
+    """Bucket booked intervals by every local date they touch: {date: {staff_id: [(start, end), ...]}}."""
+    by_date = {}
+    for sid, intervals in busy_by_staff.items():
+        for start, end in intervals:
+            day = timezone.localtime(start).date()
+            last_day = timezone.localtime(end).date()
+            while day <= last_day:
+                by_date.setdefault(day, {}).setdefault(sid, []).append((start, end))
+                day += timedelta(days=1)
+    return by_date
+
+
+def iter_available_slots_range(
+    postcode: str,
+    service_id: int,
+    date_from: date,
+    date_to: date,
+    staff_id: Optional[int] = None,
+    validation_result: Optional[Dict] = None,
+) -> Iterator[Tuple[date, List[Dict]]]:
+    """
+    Yield (date, slots) for every date in [date_from, date_to], slots in the get_available_slots shape.
+
+    Staff coverage is resolved once, and schedules and appointments for the whole range are loaded
+    in one query each, so the query count does not depend on the number of days.
+    Pass validation_result to reuse an already validated postcode.
+    """
+    num_days = (date_to - date_from).days + 1
+    all_dates = [date_from + timedelta(days=i) for i in range(max(num_days, 0))]
+
+    service = Service.objects.filter(id=service_id, is_active=True).first()
+    staff_ids = []
+    if service is not None:
+        staff_ids = resolve_slot_staff_ids(
+            postcode, service_id, staff_id=staff_id, validation_result=validation_result
+        )
+    if not staff_ids or not all_dates:
+        for day in all_dates:
+            yield day, []
+        return
+
+    schedules = load_schedules_by_staff(staff_ids, days_of_week={d.weekday() for d in all_dates})
+    range_start = timezone.make_aware(datetime.combine(date_from, time.min))
+    range_end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    busy_by_date = _split_busy_by_date(load_busy_intervals(list(schedules), range_start, range_end))
+    service_duration = get_service_duration(service)
+
+    for day in all_dates:
+        day_of_week = day.weekday()
+        day_schedules = {
+            sid: by_day[day_of_week] for sid, by_day in schedules.items() if day_of_week in by_day
         }
-        
-        if not slot_available:
-            slot_dict['reason'] = 'Booked or unavailable'
-        
-        slots.append(slot_dict)
-        
-        # Move to next slot
-        slot_time += timedelta(minutes=slot_interval_minutes)
-        current_time = slot_time.time()
-        
-        # Safety check to avoid infinite loop
-        if slot_time.date() > target_date:
-            break
-    
-    return slots
+        yield day, build_day_slots(day, service_duration, day_schedules, busy_by_date.get(day, {}))
 
 
 def is_staff_available_for_slot(
@@ -1,3 +1,232 @@
+"""
+Appointments tests.
+
+Slot engine: get_available_slots computes free intervals in memory with a constant
+number of queries, independent of staff and slot count. /api/slots/range/ returns
+the same per-day slots for a whole date range in one request. Cached /api/slots/
+payloads are invalidated by model signals.
+"""
+import json
+
+from datetime import datetime, time, timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.appointments.models import Appointment
+from apps.appointments import slots_utils
+from apps.appointments.slots_utils import get_available_slots
+from apps.services.models import Category, Service
+from apps.staff.models import Staff, StaffArea, StaffSchedule, StaffService
+
+POSTCODE = 'SW1A 1AA'
+
+
+def next_weekday(weekday):
+    """Next date (after today) falling on the given weekday (0=Monday)."""
+    today = timezone.now().date()
+    return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+
+
+class SlotFixturesMixin:
+    """One approved 60-minute service; staff work Mondays 09:00-17:00 with a 12:00-13:00 break."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.service = Service.objects.create(
+            category=category, name='Standard clean', slug='standard-clean',
+            duration=60, price=50, approval_status='approved',
+        )
+        self.target_date = next_weekday(0)
+
+    def _add_staff(self, name):
+        staff = Staff.objects.create(name=name, email=f'{name.lower()}@test.com')
+        StaffService.objects.create(staff=staff, service=self.service)
+        StaffArea.objects.create(staff=staff, postcode=POSTCODE, radius_miles=5)
+        StaffSchedule.objects.create(
+            staff=staff, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0),
+            breaks=[{'start': '12:00', 'end': '13:00'}],
+        )
+        return staff
+
+    def _book(self, staff, hour, minutes=60, status='confirmed'):
+        start = timezone.make_aware(datetime.combine(self.target_date, time(hour, 0)))
+        return Appointment.objects.create(
+            staff=staff, service=self.service, start_time=start,
+            end_time=start + timedelta(minutes=minutes), status=status,
+        )
+
+
+class SlotEngineTests(SlotFixturesMixin, TestCase):
+    """get_available_slots: breaks, bookings and query count."""
+
+    def _slots_by_time(self, **kwargs):
+        slots = get_available_slots(POSTCODE, self.service.id, self.target_date, **kwargs)
+        return {s['time']: s for s in slots}
+
+    def test_breaks_and_bookings_block_slots(self):
+        staff = self._add_staff('Alice')
+        self._book(staff, 10)
+        self._book(staff, 14, status='cancelled')
+        slots = self._slots_by_time()
+        self.assertEqual(slots['09:00']['staff_ids'], [staff.id])
+        self.assertFalse(slots['09:30']['available'])  # overlaps 10:00 booking
+        self.assertFalse(slots['10:00']['available'])
+        self.assertEqual(slots['10:00']['reason'], 'Booked or unavailable')
+        self.assertTrue(slots['11:00']['available'])
+        self.assertFalse(slots['11:30']['available'])  # overlaps 12:00 break
+        self.assertFalse(slots['12:30']['available'])
+        self.assertTrue(slots['13:00']['available'])
+        self.assertTrue(slots['14:00']['available'])  # cancelled booking does not block
+        self.assertEqual(max(slots), '16:00')
+
+    def test_slot_lists_only_free_staff(self):
+        alice = self._add_staff('Alice')
+        bob = self._add_staff('Bob')
+        self._book(alice, 9)
+        slots = self._slots_by_time()
+        self.assertEqual(slots['09:00']['staff_ids'], [bob.id])
+        self.assertEqual(set(slots['10:00']['staff_ids']), {alice.id, bob.id})
+        self.assertEqual(self._slots_by_time(staff_id=alice.id)['09:00']['available'], False)
+
+    def test_query_count_independent_of_staff_count(self):
+        staff = self._add_staff('Staff0')
+        self._book(staff, 9)
+        with CaptureQueriesContext(connection) as single:
+            self._slots_by_time()
+        for i in range(1, 10):
+            member = self._add_staff(f'Staff{i}')
+            self._book(member, 9 + i % 6)
+        with CaptureQueriesContext(connection) as many:
+            slots = self._slots_by_time()
+        self.assertEqual(len(many.captured_queries), len(single.captured_queries))
+        self.assertEqual(len(slots['16:00']['staff_ids']), 10)
+
+
+class SlotsRangeViewTests(SlotFixturesMixin, TestCase):
+    """GET /api/slots/range/ - per-day slots and summary mode for a date range."""
+
+    def _get_range(self, **params):
+        params = {
+            'postcode': POSTCODE,
+            'service_id': self.service.id,
+            'date_from': self.target_date.isoformat(),
+            'date_to': (self.target_date + timedelta(days=7)).isoformat(),
+            **params,
+        }
+        return APIClient().get('/api/slots/range/', params)
+
+    def test_range_matches_single_day_slots(self):
+        staff = self._add_staff('Alice')
+        self._book(staff, 10)
+        response = self._get_range()
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertTrue(body['success'])
+        days = {d['date']: d for d in body['data']['days']}
+        self.assertEqual(len(days), 8)
+        self.assertEqual(body['meta'], {'count': 8, 'available_days': 2})
+        for offset in (0, 1, 7):
+            day = self.target_date + timedelta(days=offset)
+            expected = get_available_slots(POSTCODE, self.service.id, day)
+            self.assertEqual(days[day.isoformat()]['slots'], expected)
+
+    def test_queries_run_before_streaming(self):
+        self._add_staff('Alice')
+        response = self._get_range()
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        with CaptureQueriesContext(connection) as streamed:
+            b''.join(response.streaming_content)
+        self.assertEqual(len(streamed.captured_queries), 0)
+
+    def test_failure_mid_stream_closes_json_with_error(self):
+        self._add_staff('Alice')
+        build = slots_utils.build_day_slots
+        calls = []
+
+        def fail_on_third_day(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                raise RuntimeError('boom')
+            return build(*args, **kwargs)
+
+        with mock.patch.object(slots_utils, 'build_day_slots', side_effect=fail_on_third_day):
+            response = self._get_range()
+            body = json.loads(b''.join(response.streaming_content))
+        self.assertFalse(body['success'])
+        self.assertEqual(body['error']['code'], 'SLOTS_CALCULATION_ERROR')
+        self.assertEqual(len(body['data']['days']), 2)
+        self.assertEqual(body['meta']['count'], 2)
+
+    def test_failure_before_streaming_returns_error_response(self):
+        self._add_staff('Alice')
+        with mock.patch.object(slots_utils, 'load_schedules_by_staff', side_effect=RuntimeError('boom')):
+            response = self._get_range()
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.data['error']['code'], 'SLOTS_CALCULATION_ERROR')
+
+    def test_summary_mode(self):
+        self._add_staff('Alice')
+        response = self._get_range(summary='true')
+        self.assertEqual(response.status_code, 200)
+        days = response.data['data']['days']
+        self.assertEqual([d['has_availability'] for d in days], [True] + [False] * 6 + [True])
+        self.assertEqual(response.data['meta']['available_days'], 2)
+
+    def test_rejects_range_over_limit(self):
+        response = self._get_range(date_to=(self.target_date + timedelta(days=40)).isoformat())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error']['code'], 'RANGE_TOO_LARGE')
+
+
+class SlotsCacheInvalidationTests(SlotFixturesMixin, TestCase):
+    """GET /api/slots/ - cached payloads are dropped when bookings, schedules or coverage change."""
+
+    def setUp(self):
+        super().setUp()
+        caches['slots'].clear()
+        self.staff = self._add_staff('Alice')
+
+    def _slots(self):
+        response = APIClient().get('/api/slots/', {
+            'postcode': POSTCODE,
+            'service_id': self.service.id,
+            'date': self.target_date.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        return {s['time']: s for s in response.data['data']['slots']}
+
+    def test_cached_payload_served_without_queries(self):
+        self._slots()
+        with self.assertNumQueries(0):
+            self._slots()
+
+    def test_booking_and_cancellation_invalidate(self):
+        self.assertTrue(self._slots()['10:00']['available'])
+        appointment = self._book(self.staff, 10)
+        self.assertFalse(self._slots()['10:00']['available'])
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertTrue(self._slots()['10:00']['available'])
+
+    def test_reschedule_frees_previous_date(self):
+        appointment = self._book(self.staff, 10)
+        self.assertFalse(self._slots()['10:00']['available'])
+        appointment.start_time += timedelta(days=1)
+        appointment.end_time += timedelta(days=1)
+        appointment.save()
+        self.assertTrue(self._slots()['10:00']['available'])
 
-# Appointments tests
+    def test_schedule_and_coverage_changes_invalidate(self):
+        self.assertIn('09:00', self._slots())
+        StaffSchedule.objects.filter(staff=self.staff).first().delete()
+        self.assertEqual(self._slots(), {})
+        bob = self._add_staff('Bob')
+        self.assertEqual(self._slots()['09:00']['staff_ids'], [bob.id])
+        StaffArea.objects.filter(staff=bob).delete()
+        self.assertEqual(self._slots(), {})
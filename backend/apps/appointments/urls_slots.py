@@ -1,6 +1,6 @@
 """
 Available slots URLs.
-Public: /api/slots/
+Public: /api/slots/, /api/slots/range/
 """
 from django.urls import path
 from . import views
@@ -9,4 +9,5 @@ app_name = 'slots'
 
 urlpatterns = [
     path('', views.available_slots_view, name='available-slots'),
+    path('range/', views.available_slots_range_view, name='available-slots-range'),
 ]
@@ -8,15 +8,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.utils import timezone
 from django.db.models import Q
-from django.core.cache import cache
+from django.http import StreamingHttpResponse
 from datetime import datetime, timedelta
+from apps.core.pagination import AppointmentCursorPagination
 from apps.core.permissions import (
     IsCustomer, IsAdminOrManager, IsStaff, IsStaffOrManager, IsOwnerOrAdmin
 )
 from apps.core.utils import can_cancel_or_reschedule
 from .models import Appointment, CustomerAppointment
 from .serializers import (
-    AppointmentSerializer, CustomerAppointmentSerializer, AppointmentCreateSerializer
+    AppointmentSerializer, CustomerAppointmentSerializer, AppointmentCreateSerializer,
+    prefetch_appointment_relations,
 )
 from apps.customers.models import Customer
 
@@ -27,7 +29,7 @@ class AppointmentPublicViewSet(viewsets.ModelViewSet):
     Public: POST (create appointment - NO LOGIN REQUIRED)
     GET, POST /api/bkg/
     """
-    queryset = Appointment.objects.select_related('staff', 'service').all()
+    queryset = prefetch_appointment_relations(Appointment.objects.all())
     serializer_class = AppointmentSerializer
     permission_classes = [AllowAny]  # Public write access for guest checkout
     
@@ -171,11 +173,10 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     GET /api/cus/appointments/ or /api/st/jobs/ or /api/ad/appointments/
     PATCH /api/ad/appointments/{id}/ for admin/manager to change status.
     """
-    queryset = Appointment.objects.select_related('staff', 'service', 'subscription', 'order').prefetch_related(
-        'customer_booking'
-    ).all()
+    queryset = prefetch_appointment_relations(Appointment.objects.all())
     serializer_class = AppointmentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AppointmentCursorPagination
     http_method_names = ['get', 'post', 'put', 'patch', 'delete', 'head', 'options']
     
     def get_queryset(self):
@@ -244,6 +245,11 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         """List appointments with consistent response format."""
         queryset = self.filter_queryset(self.get_queryset())
+        # ?cursor= pages by (start_time, id); otherwise every matching appointment is listed
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(queryset, many=True)
         return Response({
             'success': True,
@@ -796,15 +802,12 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
 
 
-# Slots response cached 2 min so new bookings appear quickly while reducing DB load
-CACHE_TTL_SLOTS = 120
-
-
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def available_slots_view(request):
     """
-    Get available time slots by postcode/service/staff (public). Cached 2 min per (postcode, service, date, staff).
+    Get available time slots by postcode/service/staff (public). Cached per (postcode, service, date, staff)
+    and invalidated by appointment/schedule/area/service changes via version tokens (see slots_cache).
     GET /api/slots/?postcode=SW1A1AA&service_id=1&date=2024-01-15&staff_id=1
     """
     postcode = request.query_params.get('postcode')
@@ -864,17 +867,18 @@ def available_slots_view(request):
 
     norm_postcode = (validated_postcode or '').upper().replace(' ', '').strip()
     cache_key = f'slots_{norm_postcode}_{service_id}_{date}_{parsed_staff_id or "any"}'
-    cached = cache.get(cache_key)
+    from .slots_cache import get_cached_slots, set_cached_slots, get_available_slots_versioned
+    cached = get_cached_slots(cache_key)
     if cached is not None:
         return Response(cached, status=status.HTTP_200_OK)
 
     try:
-        from .slots_utils import get_available_slots
-        slots = get_available_slots(
+        slots, versions = get_available_slots_versioned(
             postcode=validated_postcode,
             service_id=int(service_id),
             target_date=target_date,
-            staff_id=parsed_staff_id
+            staff_id=parsed_staff_id,
+            validation_result=validation_result,
         )
         payload = {
             'success': True,
@@ -890,7 +894,7 @@ def available_slots_view(request):
                 'available_count': sum(1 for slot in slots if slot['available']),
             }
         }
-        cache.set(cache_key, payload, CACHE_TTL_SLOTS)
+        set_cached_slots(cache_key, payload, versions)
         return Response(payload, status=status.HTTP_200_OK)
     except Exception as e:
         import logging
@@ -903,3 +907,184 @@ def available_slots_view(request):
                 'message': f'Error calculating available slots: {str(e)}',
             }
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Longest range accepted by /api/slots/range/ (one calendar month view)
+MAX_SLOTS_RANGE_DAYS = 31
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def available_slots_range_view(request):
+    """
+    Get available time slots for every date in a range (public), computed in one pass.
+    GET /api/slots/range/?postcode=SW1A1AA&service_id=1&date_from=2024-01-01&date_to=2024-01-31&staff_id=1
+    Optional: summary=true returns only per-day availability flags/counts (month view).
+    Postcode is validated and staff coverage resolved once; schedules and appointments for the whole
+    range are loaded in bulk. Full mode streams {"date", "slots"} entries per day as they are computed.
+    date_from before today is clamped to today; range is limited to MAX_SLOTS_RANGE_DAYS days.
+    """
+    postcode = request.query_params.get('postcode')
+    service_id = request.query_params.get('service_id')
+    date_from_param = request.query_params.get('date_from')
+    date_to_param = request.query_params.get('date_to')
+    staff_id = request.query_params.get('staff_id')
+    summary = (request.query_params.get('summary') or '').lower() in ('1', 'true', 'yes')
+
+    if not postcode or not service_id or not date_from_param or not date_to_param:
+        return Response({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': 'postcode, service_id, date_from and date_to parameters are required',
+            }
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        service_id = int(service_id)
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': {'code': 'VALIDATION_ERROR', 'message': 'service_id must be an integer'},
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        date_from = datetime.strptime(date_from_param, '%Y-%m-%d').date()
+        date_to = datetime.strptime(date_to_param, '%Y-%m-%d').date()
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': {
+                'code': 'INVALID_DATE',
+                'message': 'Invalid date format. Use YYYY-MM-DD format.',
+            }
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    today = timezone.now().date()
+    if date_to < today:
+        return Response({
+            'success': False,
+            'error': {
+                'code': 'INVALID_DATE',
+                'message': 'Cannot book appointments in the past.',
+            }
+        }, status=status.HTTP_400_BAD_REQUEST)
+    date_from = max(date_from, today)
+    if date_to < date_from:
+        return Response({
+            'success': False,
+            'error': {'code': 'INVALID_DATE', 'message': 'date_to must not be before date_from.'},
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if (date_to - date_from).days + 1 > MAX_SLOTS_RANGE_DAYS:
+        return Response({
+            'success': False,
+            'error': {
+                'code': 'RANGE_TOO_LARGE',
+                'message': f'Date range cannot exceed {MAX_SLOTS_RANGE_DAYS} days.',
+            }
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    from apps.core.address import validate_postcode_with_google
+    validation_result = validate_postcode_with_google(postcode)
+    if not validation_result.get('valid') or not validation_result.get('is_uk'):
+        error_msg = validation_result.get('error', 'Invalid UK postcode. MultiBook currently operates only in the UK.')
+        return Response({
+            'success': False,
+            'error': {
+                'code': 'INVALID_POSTCODE',
+                'message': error_msg,
+            }
+        }, status=status.HTTP_400_BAD_REQUEST)
+    validated_postcode = validation_result.get('formatted', postcode)
+
+    parsed_staff_id = None
+    if staff_id:
+        try:
+            parsed_staff_id = int(staff_id)
+        except ValueError:
+            pass
+
+    import itertools
+    import json
+    import logging
+    from .slots_utils import iter_available_slots_range
+    logger = logging.getLogger(__name__)
+
+    def calculation_error(e):
+        logger.error(f"Error calculating slots range: {str(e)}", exc_info=True)
+        return {
+            'code': 'SLOTS_CALCULATION_ERROR',
+            'message': f'Error calculating available slots: {str(e)}',
+        }
+
+    days = iter_available_slots_range(
+        postcode=validated_postcode,
+        service_id=service_id,
+        date_from=date_from,
+        date_to=date_to,
+        staff_id=parsed_staff_id,
+        validation_result=validation_result,
+    )
+    try:
+        # Staff, schedules and bookings for the whole range are loaded before the first day is
+        # yielded, so every query runs here: inside the request (counted in X-DB-Queries) and
+        # before any output, where a failure can still become an error response
+        first = next(days, None)
+    except Exception as e:
+        return Response({'success': False, 'error': calculation_error(e)},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    days = itertools.chain([first], days) if first is not None else iter(())
+    data_header = {
+        'postcode': validated_postcode,
+        'service_id': service_id,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'staff_id': parsed_staff_id,
+    }
+
+    if summary:
+        try:
+            summary_days = []
+            for day, slots in days:
+                available_count = sum(1 for slot in slots if slot['available'])
+                summary_days.append({
+                    'date': day.isoformat(),
+                    'has_availability': available_count > 0,
+                    'available_count': available_count,
+                })
+        except Exception as e:
+            return Response({'success': False, 'error': calculation_error(e)},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'success': True,
+            'data': {**data_header, 'days': summary_days},
+            'meta': {
+                'count': len(summary_days),
+                'available_days': sum(1 for d in summary_days if d['has_availability']),
+            }
+        }, status=status.HTTP_200_OK)
+
+    def stream():
+        # Same envelope as Response payloads; each day is serialized as soon as it is computed.
+        # success comes last: a failure after the first chunk closes the JSON with
+        # "success": false and the error instead of truncating it
+        opening = json.dumps({'data': {**data_header, 'days': []}}).rsplit('[]', 1)[0]
+        yield opening + '['
+        count = available_days = 0
+        error = None
+        try:
+            for day, slots in days:
+                available_count = sum(1 for slot in slots if slot['available'])
+                entry = {
+                    'date': day.isoformat(),
+                    'slots': slots,
+                    'available_count': available_count,
+                }
+                yield (',' if count else '') + json.dumps(entry)
+                count += 1
+                available_days += 1 if available_count else 0
+        except Exception as e:
+            error = calculation_error(e)
+        meta = json.dumps({'count': count, 'available_days': available_days})
+        ending = '"success": true' if error is None else '"success": false, "error": ' + json.dumps(error)
+        yield ']}, "meta": ' + meta + ', ' + ending + '}'
+
+    return StreamingHttpResponse(stream(), content_type='application/json')
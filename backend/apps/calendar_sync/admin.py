@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Calendar Sync admin configuration
+from .models import CalendarEventSync, CalendarFeed
+
+
+@admin.register(CalendarEventSync)
+class CalendarEventSyncAdmin(admin.ModelAdmin):
+    """Per-calendar sync state of appointments (written by incremental calendar sync)."""
+    list_display = ['appointment', 'profile', 'provider', 'revision', 'synced_at']
+    list_filter = ['provider']
+    search_fields = ['event_id', 'profile__user__email']
+    raw_id_fields = ['appointment', 'profile']
+    readonly_fields = ['event_id', 'content_hash', 'revision', 'synced_at', 'created_at', 'updated_at']
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    """iCalendar subscription feeds; the token is secret, so it is not shown."""
+    list_display = ['user', 'created_at', 'updated_at']
+    search_fields = ['user__email']
+    exclude = ['token']
+    raw_id_fields = ['user']
@@ -0,0 +1,196 @@
+"""
+Local fake calendar provider for tests and benchmarks.
+
+A threaded HTTP server speaking the subset of Google Calendar and Microsoft Graph that the
+sync worker uses: OAuth refresh-token grants, Google batch (multipart/mixed) and Graph $batch.
+Events are kept in memory; latency simulates a remote API.
+
+    with FakeCalendarProvider(latency=0.05) as provider:
+        with override_settings(**provider.settings()):
+            ...
+        provider.events['google'], provider.request_count
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote
+
+from .sync_worker import parse_multipart_http
+
+
+class FakeCalendarProvider:
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        # provider -> {event_id: event body}
+        self.events = {'google': {}, 'outlook': {}}
+        # Access tokens the fake rejects with 401 (e.g. expired ones)
+        self.expired_tokens = set()
+        # Number of upcoming event calls to answer with 503 (a provider outage)
+        self.failures = 0
+        self.request_count = 0
+        self.refresh_count = 0
+        self._server = None
+        self._thread = None
+
+    # Lifecycle
+
+    def start(self):
+        provider = self
+
+        class Handler(_Handler):
+            fake = provider
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def settings(self) -> dict:
+        """Settings pointing the sync worker at this server (for override_settings)."""
+        return {
+            'CALENDAR_GOOGLE_API_URL': f'{self.url}/google',
+            'CALENDAR_GOOGLE_TOKEN_URL': f'{self.url}/google/token',
+            'CALENDAR_GRAPH_API_URL': f'{self.url}/graph',
+            'CALENDAR_MICROSOFT_TOKEN_URL': f'{self.url}/microsoft/token',
+        }
+
+    # Event store
+
+    def apply(self, provider, method, path, body):
+        """Apply one calendar call; returns (status, response body)."""
+        parts = [unquote(p) for p in path.strip('/').split('/')]
+        event_id = parts[-1] if parts[-1] != 'events' else None
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                return 503, {'error': {'code': 'ServiceUnavailable', 'message': 'Try again later'}}
+            events = self.events[provider]
+            if method == 'POST' and event_id is None:
+                event_id = uuid.uuid4().hex
+                events[event_id] = dict(body or {}, id=event_id)
+                return 201 if provider == 'outlook' else 200, events[event_id]
+            if event_id not in events:
+                return 404, {'error': {'code': 'NotFound', 'message': 'Event not found'}}
+            if method == 'PATCH':
+                events[event_id].update(body or {})
+                return 200, events[event_id]
+            if method == 'DELETE':
+                del events[event_id]
+                return 204, None
+        return 405, {'error': {'message': 'Method not allowed'}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeCalendarProvider = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode('utf-8') if length else ''
+
+    def _send(self, status, body=b'', content_type='application/json'):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorised(self):
+        token = (self.headers.get('Authorization') or '').replace('Bearer ', '', 1)
+        return bool(token) and token not in self.fake.expired_tokens
+
+    def do_POST(self):
+        fake = self.fake
+        with fake.lock:
+            fake.request_count += 1
+        if fake.latency:
+            time.sleep(fake.latency)
+        body = self._body()
+        if self.path in ('/google/token', '/microsoft/token'):
+            form = parse_qs(body)
+            if form.get('grant_type') != ['refresh_token'] or not form.get('refresh_token'):
+                return self._send(400, {'error': 'invalid_grant'})
+            with fake.lock:
+                fake.refresh_count += 1
+            return self._send(200, {'access_token': f'fresh-{uuid.uuid4().hex}', 'expires_in': 3600})
+        if not self._authorised():
+            return self._send(401, {'error': {'code': 'InvalidAuthenticationToken', 'message': 'Unauthorized'}})
+        if self.path == '/google/batch/calendar/v3':
+            return self._google_batch(body)
+        if self.path == '/graph/$batch':
+            return self._graph_batch(body)
+        return self._send(404, {'error': {'message': 'Not found'}})
+
+    def _google_batch(self, body):
+        requests_by_id = {}
+        boundary = self.headers['Content-Type'].split('boundary=', 1)[1]
+        for part in body.split(f'--{boundary}'):
+            part = part.strip('\r\n')
+            if not part or part == '--':
+                continue
+            outer, _, inner = part.replace('\r\n', '\n').partition('\n\n')
+            content_id = next(
+                line.split(':', 1)[1].strip().strip('<>') for line in outer.split('\n') if line.lower().startswith('content-id:')
+            )
+            request_line, _, rest = inner.partition('\n')
+            method, path, _ = request_line.split(' ', 2)
+            _, _, payload = rest.partition('\n\n')
+            requests_by_id[content_id] = (method, path, json.loads(payload) if payload.strip() else None)
+        boundary_out = f'batch_{uuid.uuid4().hex}'
+        parts = []
+        for content_id, (method, path, payload) in requests_by_id.items():
+            status, result = self.fake.apply('google', method, path, payload)
+            reason = {200: 'OK', 204: 'No Content', 404: 'Not Found'}.get(status, 'Error')
+            lines = [
+                f'--{boundary_out}',
+                'Content-Type: application/http',
+                f'Content-ID: <response-{content_id}>',
+                '',
+                f'HTTP/1.1 {status} {reason}',
+                'Content-Type: application/json',
+                '',
+                json.dumps(result) if result is not None else '',
+            ]
+            parts.append('\r\n'.join(lines))
+        response = '\r\n'.join(parts) + f'\r\n--{boundary_out}--\r\n'
+        # Self-check: the worker's parser must read what the fake writes
+        parse_multipart_http(f'multipart/mixed; boundary={boundary_out}', response)
+        return self._send(200, response, content_type=f'multipart/mixed; boundary={boundary_out}')
+
+    def _graph_batch(self, body):
+        batch = json.loads(body).get('requests', [])
+        if len(batch) > 20:
+            return self._send(400, {'error': {'message': 'Batch limit is 20 requests'}})
+        responses = []
+        for item in batch:
+            status, result = self.fake.apply('outlook', item['method'], item['url'], item.get('body'))
+            responses.append({'id': item['id'], 'status': status, 'body': result})
+        return self._send(200, {'responses': responses})
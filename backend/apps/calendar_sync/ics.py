@@ -0,0 +1,76 @@
+"""
+iCalendar (RFC 5545) serialisation for subscription feeds.
+
+stream_calendar() yields a VCALENDAR piece by piece, so a feed with hundreds of events is
+sent without building the whole document in memory. Text values are escaped and lines folded
+at 75 octets as the RFC requires.
+"""
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+PRODID = '-//MultiBook//Booking System//EN'
+# Hint for clients how often to poll (Apple Calendar, Outlook; Google ignores it)
+REFRESH_INTERVAL = 'PT15M'
+
+
+def escape_text(value: Any) -> str:
+    text = '' if value is None else str(value)
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line: str) -> str:
+    """Fold a content line at 75 octets (continuation lines start with a space)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # the leading space counts
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value) -> str:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def vevent(event_data: Dict[str, Any], last_modified=None, status: str = 'CONFIRMED') -> str:
+    stamp = format_datetime(last_modified or datetime.now(dt_timezone.utc))
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{event_data['uid']}",
+        f'DTSTAMP:{stamp}',
+        f'LAST-MODIFIED:{stamp}',
+        f"DTSTART:{format_datetime(event_data['start'])}",
+        f"DTEND:{format_datetime(event_data['end'])}",
+        f"SUMMARY:{escape_text(event_data.get('summary', 'Appointment'))}",
+        f"DESCRIPTION:{escape_text(event_data.get('description', ''))}",
+        f"LOCATION:{escape_text(event_data.get('location', ''))}",
+        f'STATUS:{status}',
+        'END:VEVENT',
+    ]
+    return ''.join(fold(line) for line in lines)
+
+
+def stream_calendar(events: Iterable[str], name: Optional[str] = None) -> Iterator[str]:
+    """Yield a VCALENDAR wrapping already serialised VEVENTs."""
+    header = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH']
+    if name:
+        header.append(f'X-WR-CALNAME:{escape_text(name)}')
+    header += [f'REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}', f'X-PUBLISHED-TTL:{REFRESH_INTERVAL}']
+    yield ''.join(fold(line) for line in header)
+    yield from events
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0004_invitation_invitation_valid_role_and_more'),
+        ('appointments', '0004_appointment_appointment_valid_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarEventSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('provider', models.CharField(help_text='google, outlook or apple', max_length=20)),
+                ('event_id', models.CharField(help_text='Provider event id', max_length=255)),
+                ('content_hash', models.CharField(help_text='SHA-256 of the event data last pushed', max_length=64)),
+                ('revision', models.PositiveIntegerField(default=1, help_text='Number of times this event was pushed')),
+                ('synced_at', models.DateTimeField()),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_syncs', to='appointments.appointment')),
+                ('profile', models.ForeignKey(help_text='Calendar account the event lives in', on_delete=django.db.models.deletion.CASCADE, related_name='calendar_event_syncs', to='accounts.profile')),
+            ],
+            options={
+                'verbose_name': 'calendar event sync',
+                'verbose_name_plural': 'calendar event syncs',
+                'db_table': 'calendar_event_sync',
+                'ordering': ['-synced_at'],
+                'indexes': [models.Index(fields=['profile', 'appointment'], name='calendar_ev_profile_b1df2a_idx')],
+                'constraints': [models.UniqueConstraint(fields=('appointment', 'profile'), name='calendareventsync_unique_appointment_profile')],
+            },
+        ),
+    ]
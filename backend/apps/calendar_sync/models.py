@@ -1,8 +1,86 @@
 """
 Calendar Sync app models.
-Calendar integration tracking models will be created here.
 Supports Google, Outlook, and Apple Calendar.
 """
+import secrets
+
+from django.contrib.auth import get_user_model
 from django.db import models
 
-# Placeholder - Models will be implemented in Week 5
+from apps.core.models import TimeStampedModel
+
+User = get_user_model()
+
+
+class CalendarEventSync(TimeStampedModel):
+    """
+    Sync state of one appointment in one calendar account (profile).
+    content_hash is the hash of the event data last pushed; sync compares it with the current
+    event data, so unchanged appointments are skipped and only creates, updates and deletes
+    are sent. revision counts the pushes of this event.
+    """
+    appointment = models.ForeignKey(
+        'appointments.Appointment',
+        on_delete=models.CASCADE,
+        related_name='calendar_syncs',
+    )
+    profile = models.ForeignKey(
+        'accounts.Profile',
+        on_delete=models.CASCADE,
+        related_name='calendar_event_syncs',
+        help_text='Calendar account the event lives in'
+    )
+    provider = models.CharField(max_length=20, help_text='google, outlook or apple')
+    event_id = models.CharField(max_length=255, help_text='Provider event id')
+    content_hash = models.CharField(max_length=64, help_text='SHA-256 of the event data last pushed')
+    revision = models.PositiveIntegerField(default=1, help_text='Number of times this event was pushed')
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'calendar_event_sync'
+        verbose_name = 'calendar event sync'
+        verbose_name_plural = 'calendar event syncs'
+        ordering = ['-synced_at']
+        constraints = [
+            models.UniqueConstraint(fields=['appointment', 'profile'], name='calendareventsync_unique_appointment_profile'),
+        ]
+        indexes = [
+            models.Index(fields=['profile', 'appointment']),
+        ]
+
+    def __str__(self):
+        return f"Appointment {self.appointment_id} -> {self.provider} (rev {self.revision})"
+
+
+class CalendarFeed(TimeStampedModel):
+    """
+    Secret iCalendar subscription URL of a user (webcal://.../feed/<token>.ics). The token is
+    the only credential calendar clients send, so rotating it revokes the old URL.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed',
+    )
+    token = models.CharField(max_length=64, unique=True)
+
+    class Meta:
+        db_table = 'calendar_feed'
+        verbose_name = 'calendar feed'
+        verbose_name_plural = 'calendar feeds'
+
+    def __str__(self):
+        return f"Calendar feed of {self.user}"
+
+    @staticmethod
+    def new_token() -> str:
+        return secrets.token_urlsafe(32)
+
+    @classmethod
+    def for_user(cls, user) -> 'CalendarFeed':
+        feed, _ = cls.objects.get_or_create(user=user, defaults={'token': cls.new_token()})
+        return feed
+
+    def rotate(self):
+        self.token = self.new_token()
+        self.save(update_fields=['token', 'updated_at'])
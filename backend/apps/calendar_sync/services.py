@@ -4,14 +4,17 @@ Calendar Sync Service
 Handles calendar integration with Google Calendar, Microsoft Outlook, and Apple Calendar.
 Provides functions to create, update, and delete calendar events.
 """
+import hashlib
 import json
 import logging
-import requests
+from dataclasses import dataclass
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.conf import settings
 
+from .sync_worker import get_session, request_timeout
+
 logger = logging.getLogger(__name__)
 
 # Import OAuth libraries (optional - will handle gracefully if not installed)
@@ -33,16 +36,13 @@ except ImportError:
 
 
 def _get_appointments_for_user(user):
-    """Get appointments relevant to user for calendar sync (future and non-cancelled)."""
+    """Appointments that should be in the user's calendar (future, non-cancelled, with an order)."""
     from django.utils import timezone
     from apps.appointments.models import Appointment
     from apps.orders.models import Order
     from apps.staff.models import Staff
 
     now = timezone.now()
-    provider = (user.profile.calendar_provider or 'none') if hasattr(user, 'profile') else 'none'
-    synced_key = 'calendar_synced_to'  # appointment field
-
     if user.role == 'staff':
         try:
             staff = Staff.objects.get(user=user)
@@ -70,62 +70,222 @@ def _get_appointments_for_user(user):
         # admin/manager: sync all future appointments (optional; for bulk sync we pass user_ids)
         return []
 
-    out = []
-    for apt in qs:
-        synced_to = getattr(apt, synced_key, None) or []
-        if provider != 'none' and provider not in synced_to:
-            out.append(apt)
-    return out
+    return [apt for apt in qs.select_related('order__customer', 'service', 'staff') if apt.order]
 
 
-def sync_user_appointments_to_calendar(user):
-    """
-    Sync current user's appointments to their connected calendar.
-    Returns (synced_count: int, error_message: Optional[str]).
-    """
-    from apps.accounts.models import Profile
-    from apps.appointments.models import Appointment
+def _event_data_for_user(user, appointment) -> Dict[str, Any]:
+    order = appointment.order
+    if user.role == 'staff':
+        return build_staff_event_data(order, appointment)
+    if user.role == 'customer':
+        return build_customer_event_data(order, appointment)
+    return build_manager_event_data(order, appointment)
+
 
-    profile, _ = Profile.objects.get_or_create(user=user)
+def event_hash(event_data: Dict[str, Any]) -> str:
+    """Stable hash of event data; a changed hash means the calendar event must be updated."""
+    return hashlib.sha256(json.dumps(event_data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
 
-    if not profile.calendar_sync_enabled or profile.calendar_provider in ('none', None, ''):
-        return 0, 'Calendar not connected'
 
-    appointments = _get_appointments_for_user(user)
-    synced_count = 0
-    last_error = None
+@dataclass
+class SyncStats:
+    """Outcome of syncing one calendar account."""
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: int = 0  # unchanged since the last push
+    failed: int = 0
+    error: Optional[str] = None
 
-    for appointment in appointments:
-        if not appointment.order:
+    @property
+    def pushed(self) -> int:
+        return self.created + self.updated + self.deleted
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            'created': self.created, 'updated': self.updated, 'deleted': self.deleted,
+            'skipped': self.skipped, 'failed': self.failed, 'pushed': self.pushed,
+        }
+
+
+def push_calendar_events(plans, prune: bool = True) -> Dict[int, SyncStats]:
+    """
+    Bring calendar accounts in line with the events they should contain.
+    plans: [(profile, [(appointment, event_data), ...])]. Compared with CalendarEventSync state,
+    new appointments are created, changed ones updated and unchanged ones skipped. With prune,
+    future events a profile no longer should have (cancelled, reassigned) are deleted.
+    Returns {profile.pk: SyncStats}.
+    """
+    from django.db.models import Q
+    from .models import CalendarEventSync
+    from .sync_worker import BATCH_PROVIDERS, EventOperation, OperationResult, apply_results, run_operations
+
+    if not plans:
+        return {}
+    now = timezone.now()
+    appointment_ids = {appointment.pk for _, desired in plans for appointment, _ in desired}
+    scope = Q(appointment_id__in=appointment_ids)
+    if prune:
+        scope |= Q(appointment__start_time__gte=now)
+    states = {
+        (state.profile_id, state.appointment_id): state
+        for state in CalendarEventSync.objects.filter(scope, profile__in=[profile for profile, _ in plans])
+        .select_related('appointment')
+    }
+    hashes = {}
+    stats = {}
+    operations = {}  # profile pk -> [EventOperation]
+    for profile, desired in plans:
+        profile_stats = stats[profile.pk] = SyncStats()
+        ops = operations[profile.pk] = []
+        wanted = set()
+        for appointment, event_data in desired:
+            key = (profile.pk, appointment.pk)
+            wanted.add(appointment.pk)
+            hashes[key] = event_hash(event_data)
+            state = states.get(key)
+            if state is None:
+                ops.append(EventOperation('create', appointment, event_data))
+            elif state.content_hash != hashes[key]:
+                ops.append(EventOperation('update', appointment, event_data, state.event_id))
+            else:
+                profile_stats.skipped += 1
+        if prune:
+            for (profile_pk, appointment_pk), state in states.items():
+                if profile_pk == profile.pk and appointment_pk not in wanted:
+                    ops.append(EventOperation('delete', state.appointment, None, state.event_id))
+
+    profiles = {profile.pk: profile for profile, _ in plans}
+    batched = [(profile, operations[profile.pk]) for profile, _ in plans if profile.calendar_provider in BATCH_PROVIDERS]
+    results = run_operations(batched)
+    # Events the user deleted in their calendar are created again
+    recreate = []
+    for profile_pk, profile_results in results.items():
+        missing = [r for r in profile_results if r.operation.action == 'update' and r.status in (404, 410)]
+        if missing:
+            missing_ids = {id(r) for r in missing}
+            results[profile_pk] = [r for r in profile_results if id(r) not in missing_ids]
+            recreate.append((profiles[profile_pk], [
+                EventOperation('create', r.operation.appointment, r.operation.event_data) for r in missing
+            ]))
+    for profile_pk, recreated in run_operations(recreate).items():
+        results[profile_pk].extend(recreated)
+
+    # Apple (.ics) events are generated locally, one at a time
+    for profile, _ in plans:
+        if profile.calendar_provider in BATCH_PROVIDERS:
             continue
-        order = appointment.order
-        if user.role == 'staff':
-            event_data = build_staff_event_data(order, appointment)
-        elif user.role == 'customer':
-            event_data = build_customer_event_data(order, appointment)
-        else:
-            event_data = build_manager_event_data(order, appointment)
+        local = results[profile.pk] = []
+        for op in operations[profile.pk]:
+            if op.action == 'delete':
+                local.append(OperationResult(op, True, op.event_id, None))
+                continue
+            event_id = CalendarSyncService.create_event(op.appointment, profile, op.event_data)
+            local.append(OperationResult(op, bool(event_id), event_id, None if event_id else 'Failed to create event'))
+
+    apply_results(results, {profile.pk: profile.calendar_provider for profile, _ in plans})
+    _record_sync_state(results, profiles, states, hashes, stats, now)
+    return stats
+
+
+def _record_sync_state(results, profiles, states, hashes, stats, now):
+    from .models import CalendarEventSync
+
+    new_states, changed_states, deleted_ids = [], [], []
+    for profile_pk, profile_results in results.items():
+        profile = profiles[profile_pk]
+        profile_stats = stats[profile_pk]
+        for result in profile_results:
+            op = result.operation
+            if not result.ok:
+                profile_stats.failed += 1
+                continue
+            state = states.get((profile_pk, op.appointment.pk))
+            if op.action == 'delete':
+                profile_stats.deleted += 1
+                deleted_ids.append(state.pk)
+                continue
+            if op.action == 'create':
+                profile_stats.created += 1
+            else:
+                profile_stats.updated += 1
+            if state is None:
+                new_states.append(CalendarEventSync(
+                    appointment=op.appointment, profile=profile, provider=profile.calendar_provider,
+                    event_id=result.event_id or '', content_hash=hashes[(profile_pk, op.appointment.pk)], synced_at=now,
+                ))
+            else:
+                state.event_id = result.event_id or state.event_id
+                state.content_hash = hashes[(profile_pk, op.appointment.pk)]
+                state.revision += 1
+                state.synced_at = now
+                changed_states.append(state)
+    if new_states:
+        # A concurrent sync (e.g. the order confirmation job) may have created the row meanwhile
+        CalendarEventSync.objects.bulk_create(
+            new_states, update_conflicts=True, unique_fields=['appointment', 'profile'],
+            update_fields=['event_id', 'content_hash', 'synced_at', 'updated_at'],
+        )
+    if changed_states:
+        CalendarEventSync.objects.bulk_update(
+            changed_states, ['event_id', 'content_hash', 'revision', 'synced_at', 'updated_at'],
+        )
+    if deleted_ids:
+        CalendarEventSync.objects.filter(pk__in=deleted_ids).delete()
 
-        event_id = CalendarSyncService.create_event(appointment, profile, event_data)
-        if event_id:
-            synced_count += 1
-            appointment.calendar_event_id = appointment.calendar_event_id or {}
-            appointment.calendar_event_id[profile.calendar_provider] = event_id
-            appointment.calendar_synced_to = list(set((appointment.calendar_synced_to or []) + [profile.calendar_provider]))
-            appointment.save()
-        else:
-            last_error = 'Failed to create one or more events'
 
-    settings_json = profile.calendar_sync_settings or {}
-    settings_json['last_sync_at'] = timezone.now().isoformat()
-    # Error recovery: when nothing synced but we had appointments, suggest reconnecting
-    if last_error and synced_count == 0 and appointments:
-        last_error = 'Sync failed. Try syncing again or reconnect your calendar in settings.'
-    settings_json['last_sync_error'] = last_error
-    profile.calendar_sync_settings = settings_json
-    profile.save()
+def sync_user_appointments_to_calendar(user):
+    """
+    Sync current user's appointments to their connected calendar.
+    Returns (synced_count: int, error_message: Optional[str]); synced_count counts pushed events.
+    """
+    user_stats = sync_users_appointments_to_calendar([user])[user.pk]
+    return user_stats.pushed, user_stats.error
 
-    return synced_count, last_error
+
+def sync_users_appointments_to_calendar(users) -> Dict[Any, SyncStats]:
+    """
+    Incrementally sync appointments of many users in one worker run (Google batch / Graph
+    $batch per profile, profiles in parallel). Returns {user.pk: SyncStats}.
+    """
+    from apps.accounts.models import Profile
+
+    results = {}
+    plans = []
+    owners = {}  # profile pk -> user
+    # One instance per appointment, so a customer's and a staff member's events on the same
+    # appointment are merged into one row update
+    shared = {}
+    for user in users:
+        profile, _ = Profile.objects.get_or_create(user=user)
+        if not profile.calendar_sync_enabled or profile.calendar_provider in ('none', None, ''):
+            results[user.pk] = SyncStats(error='Calendar not connected')
+            continue
+        desired = []
+        for appointment in _get_appointments_for_user(user):
+            appointment = shared.setdefault(appointment.pk, appointment)
+            desired.append((appointment, _event_data_for_user(user, appointment)))
+        plans.append((profile, desired))
+        owners[profile.pk] = user
+
+    stats_by_profile = push_calendar_events(plans)
+
+    for profile, _ in plans:
+        user_stats = stats_by_profile[profile.pk]
+        if user_stats.failed:
+            user_stats.error = 'Failed to sync one or more events'
+            # Error recovery: when nothing synced, suggest reconnecting
+            if not user_stats.pushed:
+                user_stats.error = 'Sync failed. Try syncing again or reconnect your calendar in settings.'
+        settings_json = profile.calendar_sync_settings or {}
+        settings_json['last_sync_at'] = timezone.now().isoformat()
+        settings_json['last_sync_error'] = user_stats.error
+        settings_json['last_sync_stats'] = user_stats.as_dict()
+        profile.calendar_sync_settings = settings_json
+        profile.save(update_fields=['calendar_sync_settings', 'updated_at'])
+        results[owners[profile.pk].pk] = user_stats
+
+    return results
 
 
 class CalendarSyncService:
@@ -450,8 +610,6 @@ class OutlookCalendarService:
                 return None
             
             # Build Microsoft Graph API request
-            import requests
-            
             calendar_id = profile.calendar_calendar_id or 'calendar'
             graph_endpoint = f'https://graph.microsoft.com/v1.0/me/calendars/{calendar_id}/events'
             
@@ -484,7 +642,7 @@ class OutlookCalendarService:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.post(graph_endpoint, json=graph_event, headers=headers)
+            response = get_session().post(graph_endpoint, json=graph_event, headers=headers, timeout=request_timeout())
             
             if response.status_code == 201:
                 created_event = response.json()
@@ -519,7 +677,10 @@ class OutlookCalendarService:
             }
             calendar_id = profile.calendar_calendar_id or 'calendar'
             url = f'https://graph.microsoft.com/v1.0/me/calendars/{calendar_id}/events'
-            resp = requests.post(url, json=graph_event, headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'})
+            resp = get_session().post(
+                url, json=graph_event, timeout=request_timeout(),
+                headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'},
+            )
             if resp.status_code in (200, 201):
                 return resp.json().get('id')
             return None
@@ -575,7 +736,7 @@ class OutlookCalendarService:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.patch(graph_endpoint, json=graph_event, headers=headers)
+            response = get_session().patch(graph_endpoint, json=graph_event, headers=headers, timeout=request_timeout())
             
             if response.status_code == 200:
                 logger.info(f"Updated Outlook Calendar event {event_id} for appointment {appointment.id}")
@@ -612,7 +773,7 @@ class OutlookCalendarService:
                 'Authorization': f'Bearer {access_token}',
             }
             
-            response = requests.delete(graph_endpoint, headers=headers)
+            response = get_session().delete(graph_endpoint, headers=headers, timeout=request_timeout())
             
             if response.status_code == 204:
                 # Remove from appointment.calendar_event_id
@@ -675,7 +836,9 @@ class AppleCalendarService:
             if dt.tzinfo is None:
                 dt = timezone.make_aware(dt)
             return dt.strftime('%Y%m%dT%H%M%SZ')
-        
+
+        # Escaped outside the f-string: backslashes are not allowed in f-string expressions before 3.12
+        description = event_data.get('description', '').replace('\n', '\\n')
         ics_content = f"""BEGIN:VCALENDAR
 VERSION:2.0
 PRODID:-//MultiBook//Booking System//EN
@@ -684,7 +847,7 @@ UID:{event_data.get('uid', f"multibook-{int(timezone.now().timestamp())}")}
 DTSTART:{to_ics_datetime(start_dt)}
 DTEND:{to_ics_datetime(end_dt)}
 SUMMARY:{event_data.get('summary', 'Appointment')}
-DESCRIPTION:{event_data.get('description', '').replace(chr(10), '\\n')}
+DESCRIPTION:{description}
 LOCATION:{event_data.get('location', '')}
 STATUS:CONFIRMED
 END:VEVENT
@@ -0,0 +1,438 @@
+"""
+Calendar sync worker: pushes many event operations to Google Calendar and Microsoft Graph in
+a few HTTP requests.
+
+Operations are grouped by profile (one calendar account each) and sent as Google batch
+requests (up to GOOGLE_BATCH_SIZE calls, multipart/mixed) or Graph $batch requests (up to
+GRAPH_BATCH_SIZE calls, JSON). Profiles are processed concurrently over one pooled
+requests.Session per process. Worker threads only do HTTP; appointments and profiles are
+written by the caller's thread afterwards (apply_results).
+
+Access tokens are cached per profile until they expire. A 401 refreshes the token once with
+the stored refresh token and retries the batch; the new token is saved to the profile.
+
+Provider URLs come from settings (CALENDAR_GOOGLE_API_URL etc.), so tests and benchmarks can
+point the worker at the local fake provider (fake_provider.py).
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_BATCH_SIZE = 50
+GRAPH_BATCH_SIZE = 20  # Graph $batch hard limit
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 15
+# Refresh this long before the provider's expiry
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+
+BATCH_PROVIDERS = ('google', 'outlook')
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# (profile pk, refresh token) -> (access_token, expires_at epoch seconds); reconnecting a
+# calendar changes the refresh token, so stale entries are never used
+_token_cache: Dict[Tuple[int, Optional[str]], Tuple[str, float]] = {}
+_token_lock = threading.Lock()
+
+
+class EventOperation(NamedTuple):
+    action: str  # 'create', 'update' or 'delete'
+    appointment: Any
+    event_data: Optional[Dict[str, Any]] = None
+    event_id: Optional[str] = None  # provider event id for update/delete
+
+
+class OperationResult(NamedTuple):
+    operation: EventOperation
+    ok: bool
+    event_id: Optional[str]
+    error: Optional[str]
+    status: int = 0  # provider HTTP status of the call (0 if it was not sent)
+
+
+class _ProfileSnapshot(NamedTuple):
+    """What a worker thread needs from a Profile (no ORM access off the main thread)."""
+    pk: int
+    provider: str
+    access_token: Optional[str]
+    refresh_token: Optional[str]
+    calendar_id: Optional[str]
+    token_expires_at: Optional[float]
+
+
+class _GroupOutcome(NamedTuple):
+    results: List[OperationResult]
+    refreshed: Optional[Dict[str, Any]]  # {'access_token', 'refresh_token', 'expires_at'}
+
+
+def _workers() -> int:
+    return max(1, int(getattr(settings, 'CALENDAR_SYNC_WORKERS', DEFAULT_WORKERS)))
+
+
+def request_timeout() -> float:
+    return float(getattr(settings, 'CALENDAR_SYNC_TIMEOUT', DEFAULT_TIMEOUT))
+
+
+def get_session() -> requests.Session:
+    """Process-wide session with a connection pool sized for the sync workers."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_workers())
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def clear_token_cache():
+    with _token_lock:
+        _token_cache.clear()
+
+
+def _snapshot(profile) -> _ProfileSnapshot:
+    expires_at = None
+    raw = (profile.calendar_sync_settings or {}).get('token_expires_at')
+    if raw:
+        try:
+            expires_at = datetime.fromisoformat(raw).timestamp()
+        except (TypeError, ValueError):
+            expires_at = None
+    return _ProfileSnapshot(
+        pk=profile.pk,
+        provider=profile.calendar_provider,
+        access_token=profile.calendar_access_token,
+        refresh_token=profile.calendar_refresh_token,
+        calendar_id=profile.calendar_calendar_id,
+        token_expires_at=expires_at,
+    )
+
+
+# Event bodies
+
+def _parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if isinstance(value, str) else value
+
+
+def google_event_body(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'summary': event_data.get('summary', 'Appointment'),
+        'description': event_data.get('description', ''),
+        'location': event_data.get('location', ''),
+        'start': {'dateTime': _parse_iso(event_data['start']).isoformat(), 'timeZone': 'Europe/London'},
+        'end': {'dateTime': _parse_iso(event_data['end']).isoformat(), 'timeZone': 'Europe/London'},
+    }
+
+
+def graph_event_body(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'subject': event_data.get('summary', 'Appointment'),
+        'body': {'contentType': 'text', 'content': event_data.get('description', '')},
+        'start': {'dateTime': _parse_iso(event_data['start']).isoformat(), 'timeZone': 'Europe/London'},
+        'end': {'dateTime': _parse_iso(event_data['end']).isoformat(), 'timeZone': 'Europe/London'},
+        'location': {'displayName': event_data.get('location', '')},
+    }
+
+
+# Tokens
+
+class _Unauthorized(Exception):
+    pass
+
+
+def _cached_token(snapshot: _ProfileSnapshot) -> Optional[str]:
+    with _token_lock:
+        cached = _token_cache.get((snapshot.pk, snapshot.refresh_token))
+    if cached and cached[1] > time.time():
+        return cached[0]
+    if snapshot.token_expires_at and snapshot.token_expires_at <= time.time():
+        return None  # known to be expired: refresh before the first call
+    return snapshot.access_token
+
+
+def _refresh_token(snapshot: _ProfileSnapshot) -> Optional[Dict[str, Any]]:
+    """New access token from the refresh token, or None."""
+    if not snapshot.refresh_token:
+        return None
+    if snapshot.provider == 'google':
+        url = getattr(settings, 'CALENDAR_GOOGLE_TOKEN_URL', 'https://oauth2.googleapis.com/token')
+        data = {
+            'client_id': getattr(settings, 'GOOGLE_CALENDAR_CLIENT_ID', None) or getattr(settings, 'GOOGLE_CLIENT_ID', ''),
+            'client_secret': getattr(settings, 'GOOGLE_CALENDAR_CLIENT_SECRET', None) or getattr(settings, 'GOOGLE_CLIENT_SECRET', ''),
+        }
+    else:
+        url = getattr(settings, 'CALENDAR_MICROSOFT_TOKEN_URL', 'https://login.microsoftonline.com/common/oauth2/v2.0/token')
+        data = {
+            'client_id': getattr(settings, 'OUTLOOK_CLIENT_ID', None) or getattr(settings, 'MICROSOFT_CLIENT_ID', ''),
+            'client_secret': getattr(settings, 'OUTLOOK_CLIENT_SECRET', None) or getattr(settings, 'MICROSOFT_CLIENT_SECRET', ''),
+            'scope': 'https://graph.microsoft.com/Calendars.ReadWrite offline_access',
+        }
+    data.update({'grant_type': 'refresh_token', 'refresh_token': snapshot.refresh_token})
+    try:
+        response = get_session().post(url, data=data, timeout=request_timeout())
+    except requests.RequestException as e:
+        logger.error(f"Calendar token refresh failed for profile {snapshot.pk}: {e}")
+        return None
+    if response.status_code != 200:
+        logger.error(f"Calendar token refresh failed for profile {snapshot.pk}: {response.status_code}")
+        return None
+    payload = response.json()
+    expires_at = time.time() + int(payload.get('expires_in', 3600)) - TOKEN_EXPIRY_MARGIN_SECONDS
+    with _token_lock:
+        _token_cache[(snapshot.pk, snapshot.refresh_token)] = (payload['access_token'], expires_at)
+    return {
+        'access_token': payload['access_token'],
+        'refresh_token': payload.get('refresh_token') or snapshot.refresh_token,
+        'expires_at': expires_at,
+    }
+
+
+# Google batch (multipart/mixed)
+
+def _google_requests(snapshot, operations):
+    calendar_path = f"/calendar/v3/calendars/{quote(snapshot.calendar_id or 'primary', safe='')}/events"
+    for op in operations:
+        if op.action == 'create':
+            yield 'POST', calendar_path, google_event_body(op.event_data)
+        elif op.action == 'update':
+            yield 'PATCH', f"{calendar_path}/{quote(op.event_id, safe='')}", google_event_body(op.event_data)
+        else:
+            yield 'DELETE', f"{calendar_path}/{quote(op.event_id, safe='')}", None
+
+
+def build_google_batch(calls) -> Tuple[str, str]:
+    """multipart/mixed body for [(method, path, json_body)]; returns (boundary, body)."""
+    boundary = f'batch_{uuid.uuid4().hex}'
+    parts = []
+    for index, (method, path, body) in enumerate(calls):
+        lines = [
+            f'--{boundary}',
+            'Content-Type: application/http',
+            f'Content-ID: <item{index}>',
+            '',
+            f'{method} {path} HTTP/1.1',
+        ]
+        if body is not None:
+            lines += ['Content-Type: application/json', '', json.dumps(body)]
+        else:
+            lines += ['']
+        parts.append('\r\n'.join(lines))
+    return boundary, '\r\n'.join(parts) + f'\r\n--{boundary}--\r\n'
+
+
+def parse_multipart_http(content_type: str, body: str) -> Dict[str, Tuple[int, Any]]:
+    """Parse a multipart/mixed batch of HTTP messages: {content_id: (status_or_0, json_or_None)}."""
+    boundary = content_type.split('boundary=', 1)[1].split(';')[0].strip().strip('"')
+    parsed = {}
+    for part in body.split(f'--{boundary}'):
+        part = part.strip('\r\n')
+        if not part or part == '--':
+            continue
+        outer, _, inner = part.replace('\r\n', '\n').partition('\n\n')
+        content_id = ''
+        for line in outer.split('\n'):
+            if line.lower().startswith('content-id:'):
+                content_id = line.split(':', 1)[1].strip().strip('<>')
+        start_line, _, rest = inner.partition('\n')
+        _, _, payload = rest.partition('\n\n')
+        status = 0
+        pieces = start_line.split()
+        if len(pieces) > 1 and pieces[0].startswith('HTTP/') and pieces[1].isdigit():
+            status = int(pieces[1])
+        payload = payload.strip()
+        try:
+            data = json.loads(payload) if payload else None
+        except ValueError:
+            data = None
+        parsed[content_id] = (status, data)
+    return parsed
+
+
+def _send_google_batch(snapshot, token, operations) -> List[OperationResult]:
+    calls = list(_google_requests(snapshot, operations))
+    boundary, body = build_google_batch(calls)
+    url = f"{getattr(settings, 'CALENDAR_GOOGLE_API_URL', 'https://www.googleapis.com')}/batch/calendar/v3"
+    response = get_session().post(
+        url,
+        data=body.encode('utf-8'),
+        headers={'Authorization': f'Bearer {token}', 'Content-Type': f'multipart/mixed; boundary={boundary}'},
+        timeout=request_timeout(),
+    )
+    if response.status_code == 401:
+        raise _Unauthorized()
+    if response.status_code != 200:
+        error = f'Google batch failed: HTTP {response.status_code}'
+        return [OperationResult(op, False, None, error) for op in operations]
+    parts = parse_multipart_http(response.headers.get('Content-Type', ''), response.text)
+    statuses = [parts.get(f'response-item{i}', (0, None)) for i in range(len(operations))]
+    if statuses and all(status == 401 for status, _ in statuses):
+        raise _Unauthorized()
+    return [_result(op, status, data) for op, (status, data) in zip(operations, statuses)]
+
+
+# Graph $batch (JSON)
+
+def _graph_events_path(calendar_id):
+    # 'calendar' (set on connect) and empty mean the default calendar
+    if not calendar_id or calendar_id == 'calendar':
+        return '/me/calendar/events'
+    return f"/me/calendars/{quote(calendar_id, safe='')}/events"
+
+
+def _send_graph_batch(snapshot, token, operations) -> List[OperationResult]:
+    events_path = _graph_events_path(snapshot.calendar_id)
+    batch = []
+    for index, op in enumerate(operations):
+        item = {'id': str(index)}
+        if op.action == 'create':
+            item.update(method='POST', url=events_path, body=graph_event_body(op.event_data))
+        elif op.action == 'update':
+            item.update(method='PATCH', url=f"{events_path}/{quote(op.event_id, safe='')}", body=graph_event_body(op.event_data))
+        else:
+            item.update(method='DELETE', url=f"{events_path}/{quote(op.event_id, safe='')}")
+        if 'body' in item:
+            item['headers'] = {'Content-Type': 'application/json'}
+        batch.append(item)
+    url = f"{getattr(settings, 'CALENDAR_GRAPH_API_URL', 'https://graph.microsoft.com/v1.0')}/$batch"
+    response = get_session().post(
+        url, json={'requests': batch}, headers={'Authorization': f'Bearer {token}'}, timeout=request_timeout(),
+    )
+    if response.status_code == 401:
+        raise _Unauthorized()
+    if response.status_code != 200:
+        error = f'Graph batch failed: HTTP {response.status_code}'
+        return [OperationResult(op, False, None, error) for op in operations]
+    by_id = {item.get('id'): item for item in response.json().get('responses', [])}
+    statuses = [(by_id.get(str(i), {}).get('status', 0), by_id.get(str(i), {}).get('body')) for i in range(len(operations))]
+    if statuses and all(status == 401 for status, _ in statuses):
+        raise _Unauthorized()
+    return [_result(op, status, data) for op, (status, data) in zip(operations, statuses)]
+
+
+def _result(op, status, data) -> OperationResult:
+    if 200 <= status < 300 or (op.action == 'delete' and status in (404, 410)):
+        event_id = (data or {}).get('id') if op.action == 'create' else op.event_id
+        return OperationResult(op, True, event_id, None, status)
+    message = ((data or {}).get('error') or {}).get('message') if isinstance(data, dict) else None
+    return OperationResult(op, False, None, f'HTTP {status}' + (f': {message}' if message else ''), status)
+
+
+# Worker
+
+def _run_group(snapshot: _ProfileSnapshot, operations: List[EventOperation], batch_size: int) -> _GroupOutcome:
+    send = _send_google_batch if snapshot.provider == 'google' else _send_graph_batch
+    refreshed = None
+    token = _cached_token(snapshot)
+    if not token:
+        refreshed = _refresh_token(snapshot)
+        token = refreshed['access_token'] if refreshed else None
+    if not token:
+        return _GroupOutcome([OperationResult(op, False, None, 'Calendar not authorised') for op in operations], None)
+    can_refresh = refreshed is None
+    results = []
+    for start in range(0, len(operations), batch_size):
+        chunk = operations[start:start + batch_size]
+        try:
+            try:
+                results.extend(send(snapshot, token, chunk))
+                continue
+            except _Unauthorized:
+                pass
+            # Stored token rejected: refresh once per run and retry this batch
+            renewed = _refresh_token(snapshot) if can_refresh else None
+            can_refresh = False
+            if renewed:
+                refreshed, token = renewed, renewed['access_token']
+                results.extend(send(snapshot, token, chunk))
+            else:
+                results.extend(OperationResult(op, False, None, 'Calendar authorisation expired') for op in chunk)
+        except _Unauthorized:
+            results.extend(OperationResult(op, False, None, 'Calendar authorisation expired') for op in chunk)
+        except requests.RequestException as e:
+            results.extend(OperationResult(op, False, None, f'Network error: {e}') for op in chunk)
+    return _GroupOutcome(results, refreshed)
+
+
+def run_operations(groups, workers: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[int, List[OperationResult]]:
+    """
+    Push [(profile, [EventOperation, ...]), ...] to the providers.
+    Returns {profile.pk: [OperationResult, ...]}. Refreshed tokens are saved to the profiles.
+    Profiles of other providers (apple/none) are not handled here.
+    """
+    groups = [(profile, ops) for profile, ops in groups if ops and profile.calendar_provider in BATCH_PROVIDERS]
+    if not groups:
+        return {}
+    profiles = {profile.pk: profile for profile, _ in groups}
+    snapshots = [(_snapshot(profile), ops) for profile, ops in groups]
+
+    def run(item):
+        snapshot, ops = item
+        size = batch_size or (GOOGLE_BATCH_SIZE if snapshot.provider == 'google' else GRAPH_BATCH_SIZE)
+        return snapshot.pk, _run_group(snapshot, ops, size)
+
+    with ThreadPoolExecutor(max_workers=min(workers or _workers(), len(snapshots))) as pool:
+        outcomes = list(pool.map(run, snapshots))
+
+    results = {}
+    for profile_pk, outcome in outcomes:
+        results.setdefault(profile_pk, []).extend(outcome.results)
+        if outcome.refreshed:
+            _save_refreshed_token(profiles[profile_pk], outcome.refreshed)
+    return results
+
+
+def _save_refreshed_token(profile, refreshed):
+    profile.calendar_access_token = refreshed['access_token']
+    profile.calendar_refresh_token = refreshed['refresh_token']
+    settings_json = profile.calendar_sync_settings or {}
+    settings_json['token_expires_at'] = datetime.fromtimestamp(refreshed['expires_at']).astimezone().isoformat()
+    profile.calendar_sync_settings = settings_json
+    profile.save(update_fields=['calendar_access_token', 'calendar_refresh_token', 'calendar_sync_settings', 'updated_at'])
+
+
+def apply_results(results_by_profile: Dict[int, List[OperationResult]], providers: Dict[int, str]) -> int:
+    """
+    Record successful operations on the appointments (calendar_event_id / calendar_synced_to)
+    with one bulk_update. providers maps profile pk -> provider. Returns the number of successes.
+    """
+    from apps.appointments.models import Appointment
+
+    appointments = {}
+    succeeded = 0
+    for profile_pk, results in results_by_profile.items():
+        provider = providers[profile_pk]
+        for result in results:
+            if not result.ok:
+                continue
+            succeeded += 1
+            appointment = appointments.setdefault(result.operation.appointment.pk, result.operation.appointment)
+            event_ids = dict(appointment.calendar_event_id or {})
+            synced_to = list(appointment.calendar_synced_to or [])
+            if result.operation.action == 'delete':
+                event_ids.pop(provider, None)
+                synced_to = [p for p in synced_to if p != provider]
+            else:
+                event_ids[provider] = result.event_id
+                if provider not in synced_to:
+                    synced_to.append(provider)
+            appointment.calendar_event_id = event_ids
+            appointment.calendar_synced_to = synced_to
+    if appointments:
+        # Calendar fields do not affect availability, so no slot cache invalidation is needed
+        Appointment.objects.bulk_update(list(appointments.values()), ['calendar_event_id', 'calendar_synced_to'])
+    return succeeded
@@ -163,3 +163,244 @@ class BulkSyncViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data.get('success'))
         self.assertIn('results', response.data.get('data') or {})
+
+
+class CalendarSyncWorkerTests(TestCase):
+    """sync_worker against the local fake provider: batching, token refresh, bulk sync."""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.calendar_sync.fake_provider import FakeCalendarProvider
+        from apps.calendar_sync.sync_worker import clear_token_cache
+        from apps.orders.models import Order
+        from apps.services.models import Category, Service
+
+        clear_token_cache()
+        self.provider = FakeCalendarProvider().start()
+        self.addCleanup(self.provider.stop)
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.service = Service.objects.create(category=category, name='Clean', slug='clean', duration=60, price=50)
+        self.order = Order.objects.create(
+            status='confirmed', total_price=50, scheduled_date=timezone.now().date() + timedelta(days=3),
+            guest_email='guest@test.com', guest_name='Guest',
+            address_line1='1 High St', city='London', postcode='SW1A 1AA',
+        )
+        self.start = timezone.now() + timedelta(days=3)
+
+    def _staff_user(self, index, provider, appointments, token='valid'):
+        from datetime import timedelta
+        from apps.appointments.models import Appointment
+        from apps.staff.models import Staff
+
+        user = User.objects.create_user(
+            email=f'staff{index}@test.com', password='testpass123', role='staff', username=f'staff{index}',
+        )
+        Profile.objects.update_or_create(user=user, defaults={
+            'calendar_sync_enabled': True, 'calendar_provider': provider,
+            'calendar_access_token': token, 'calendar_refresh_token': f'refresh-{index}',
+        })
+        staff = Staff.objects.create(name=f'Staff {index}', email=user.email, user=user)
+        for i in range(appointments):
+            start = self.start + timedelta(hours=i)
+            Appointment.objects.create(
+                staff=staff, service=self.service, order=self.order, status='confirmed',
+                start_time=start, end_time=start + timedelta(hours=1),
+            )
+        return user
+
+    def test_operations_are_batched_per_provider_limit(self):
+        from apps.appointments.models import Appointment
+        from apps.calendar_sync.services import sync_users_appointments_to_calendar
+
+        google = self._staff_user(1, 'google', 60)
+        outlook = self._staff_user(2, 'outlook', 25)
+        with self.settings(**self.provider.settings()):
+            results = sync_users_appointments_to_calendar([google, outlook])
+
+        self.assertEqual((results[google.pk].created, results[google.pk].error), (60, None))
+        self.assertEqual((results[outlook.pk].created, results[outlook.pk].error), (25, None))
+        # 60 Google calls in batches of 50, 25 Graph calls in batches of 20
+        self.assertEqual(self.provider.request_count, 4)
+        self.assertEqual(len(self.provider.events['google']), 60)
+        self.assertEqual(len(self.provider.events['outlook']), 25)
+        appointment = Appointment.objects.filter(staff__user=google).first()
+        self.assertEqual(appointment.calendar_synced_to, ['google'])
+        self.assertIn(appointment.calendar_event_id['google'], self.provider.events['google'])
+
+    def test_rejected_token_is_refreshed_once_and_saved(self):
+        from apps.calendar_sync.services import sync_user_appointments_to_calendar
+
+        user = self._staff_user(1, 'outlook', 3, token='stale')
+        self.provider.expired_tokens.add('stale')
+        with self.settings(**self.provider.settings()):
+            synced_count, error = sync_user_appointments_to_calendar(user)
+            self.assertEqual((synced_count, error), (3, None))
+            self.assertEqual(self.provider.refresh_count, 1)
+            profile = Profile.objects.get(user=user)
+            self.assertTrue(profile.calendar_access_token.startswith('fresh-'))
+            self.assertIn('token_expires_at', profile.calendar_sync_settings)
+            # Already synced: nothing left to push, no further refresh
+            self.assertEqual(sync_user_appointments_to_calendar(user), (0, None))
+            self.assertEqual(self.provider.refresh_count, 1)
+
+    def test_bulk_sync_view_runs_users_together(self):
+        admin = User.objects.create_user(email='admin@test.com', password='testpass123', role='admin', username='admin1')
+        users = [self._staff_user(i, 'google' if i % 2 else 'outlook', 2) for i in range(6)]
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        with self.settings(**self.provider.settings()):
+            response = client.post(
+                '/api/calendar/sync-bulk/', {'user_ids': [u.id for u in users] + [999999]}, format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['data']['results']
+        self.assertEqual([r['synced_count'] for r in results], [2] * 6 + [0])
+        self.assertEqual(results[-1]['error'], 'User not found')
+        self.assertEqual(self.provider.request_count, 6)
+
+    def test_incremental_sync_pushes_only_changes(self):
+        from datetime import timedelta
+        from apps.appointments.models import Appointment
+        from apps.calendar_sync.models import CalendarEventSync
+        from apps.calendar_sync.services import sync_users_appointments_to_calendar
+
+        user = self._staff_user(1, 'google', 3)
+        with self.settings(**self.provider.settings()):
+            first = sync_users_appointments_to_calendar([user])[user.pk]
+            self.assertEqual((first.created, first.skipped), (3, 0))
+            requests_after_first = self.provider.request_count
+
+            again = sync_users_appointments_to_calendar([user])[user.pk]
+            self.assertEqual((again.pushed, again.skipped), (0, 3))
+            self.assertEqual(self.provider.request_count, requests_after_first)
+
+            moved, cancelled, unchanged = Appointment.objects.filter(staff__user=user).order_by('start_time')
+            moved.start_time += timedelta(days=1)
+            moved.end_time += timedelta(days=1)
+            moved.save()
+            cancelled.status = 'cancelled'
+            cancelled.save()
+            Appointment.objects.create(
+                staff=moved.staff, service=self.service, order=self.order, status='confirmed',
+                start_time=self.start + timedelta(days=5), end_time=self.start + timedelta(days=5, hours=1),
+            )
+            stats = sync_users_appointments_to_calendar([user])[user.pk]
+
+        self.assertEqual(stats.as_dict(), {
+            'created': 1, 'updated': 1, 'deleted': 1, 'skipped': 1, 'failed': 0, 'pushed': 3,
+        })
+        self.assertEqual(self.provider.request_count, requests_after_first + 1)
+        self.assertEqual(len(self.provider.events['google']), 3)
+        state = CalendarEventSync.objects.get(appointment=moved)
+        self.assertEqual(state.revision, 2)
+        self.assertEqual(self.provider.events['google'][state.event_id]['start']['dateTime'], moved.start_time.isoformat())
+        self.assertFalse(CalendarEventSync.objects.filter(appointment=cancelled).exists())
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.calendar_synced_to, [])
+        self.assertEqual(Profile.objects.get(user=user).calendar_sync_settings['last_sync_stats']['skipped'], 1)
+
+    def test_event_deleted_in_calendar_is_recreated_on_change(self):
+        from datetime import timedelta
+        from apps.appointments.models import Appointment
+        from apps.calendar_sync.models import CalendarEventSync
+        from apps.calendar_sync.services import sync_users_appointments_to_calendar
+
+        user = self._staff_user(1, 'outlook', 1)
+        with self.settings(**self.provider.settings()):
+            sync_users_appointments_to_calendar([user])
+            self.provider.events['outlook'].clear()
+            appointment = Appointment.objects.get(staff__user=user)
+            appointment.end_time += timedelta(minutes=30)
+            appointment.save()
+            stats = sync_users_appointments_to_calendar([user])[user.pk]
+        self.assertEqual((stats.created, stats.updated, stats.failed), (1, 0, 0))
+        state = CalendarEventSync.objects.get(appointment=appointment)
+        self.assertIn(state.event_id, self.provider.events['outlook'])
+
+
+class CalendarFeedTests(TestCase):
+    """GET /api/calendar/feed/ (subscription link) and the tokenized .ics feed with conditional GET."""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.appointments.models import Appointment
+        from apps.orders.models import Order
+        from apps.services.models import Category, Service
+        from apps.staff.models import Staff
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='staff@test.com', password='testpass123', role='staff', username='staff1')
+        staff = Staff.objects.create(name='Alice', email='staff@test.com', user=self.user)
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        service = Service.objects.create(category=category, name='Deep clean', slug='deep-clean', duration=60, price=50)
+        order = Order.objects.create(
+            status='confirmed', total_price=50, scheduled_date=timezone.now().date() + timedelta(days=3),
+            guest_email='guest@test.com', guest_name='Guest', notes='Ring twice; use side door, please',
+            address_line1='1 High St', city='London', postcode='SW1A 1AA',
+        )
+        start = timezone.now() + timedelta(days=3)
+        self.appointments = [
+            Appointment.objects.create(
+                staff=staff, service=service, order=order, status=status_value,
+                start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1),
+            )
+            for i, status_value in enumerate(['confirmed', 'pending', 'cancelled'])
+        ]
+
+    def _feed_url(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/calendar/feed/')
+        self.client.force_authenticate(user=None)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['data']['webcal_url'].startswith('webcal://'))
+        return response.data['data']['url'].split('testserver', 1)[1]
+
+    def test_feed_streams_all_appointments_in_one_calendar(self):
+        response = self.client.get(self._feed_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        body = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        # Cancelled appointments are left out; pending ones are tentative
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('STATUS:TENTATIVE', body)
+        self.assertIn(r'Ring twice\; use side door\, please', body)
+        self.assertTrue(all(len(line.encode('utf-8')) <= 75 for line in body.split('\r\n')))
+
+    def test_conditional_requests_return_304_until_something_changes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = self._feed_url()
+        first = self.client.get(url)
+        etag = first['ETag']
+        self.assertTrue(first.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Token lookup and one aggregate; no appointment rows rendered
+        self.assertEqual(len(queries.captured_queries), 2)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        appointment = self.appointments[1]
+        appointment.status = 'cancelled'
+        appointment.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(b''.join(response.streaming_content).decode('utf-8').count('BEGIN:VEVENT'), 1)
+
+    def test_rotating_the_token_revokes_the_old_url(self):
+        old_url = self._feed_url()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/calendar/feed/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(old_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self._feed_url()).status_code, status.HTTP_200_OK)
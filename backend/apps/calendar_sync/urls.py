@@ -29,4 +29,7 @@ urlpatterns = [
     
     # Apple Calendar .ics download
     path('ics/<int:appointment_id>/', views.ICalendarDownloadView.as_view(), name='ics_download'),
+    # iCalendar subscription feed (webcal://): link for the current user, and the tokenized feed itself
+    path('feed/', views.CalendarFeedView.as_view(), name='calendar_feed'),
+    path('feed/<str:token>.ics', views.calendar_feed, name='calendar_feed_ics'),
 ]
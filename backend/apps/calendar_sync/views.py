@@ -4,10 +4,13 @@ Calendar Sync app views.
 Handles OAuth 2.0 flows for Google Calendar and Microsoft Outlook,
 and .ics file generation/download for Apple Calendar.
 """
+import hashlib
 import logging
 import json
+from datetime import timedelta
 from django.conf import settings
 from django.shortcuts import redirect
+from django.views.decorators.http import condition, require_http_methods
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
@@ -103,7 +106,8 @@ class GoogleCalendarConnectView(APIView):
             logger.info(f"Created authorization URL with redirect_uri: {redirect_uri}, state: {state[:20]}...")
             
             # Store state->user_id mapping in cache (more reliable than session for OAuth callbacks)
-            from django.core.cache import cache
+            from apps.core.caches import AUTH_STATE_CACHE, get_cache
+            cache = get_cache(AUTH_STATE_CACHE)
             cache_key = f"google_oauth_state_{state}"
             cache.set(cache_key, request.user.id, timeout=600)  # 10 minutes expiry
             
@@ -158,7 +162,8 @@ def google_calendar_callback(request):
             return redirect(f"{frontend_url}/cus/calendar/settings?error=missing_code_or_state")
         
         # Get user_id from cache (primary method)
-        from django.core.cache import cache
+        from apps.core.caches import AUTH_STATE_CACHE, get_cache
+        cache = get_cache(AUTH_STATE_CACHE)
         cache_key = f"google_oauth_state_{state}"
         user_id = cache.get(cache_key)
         
@@ -315,7 +320,8 @@ def google_calendar_callback(request):
         logger.info(f"Calendar sync enabled for user_id: {user_id}")
         
         # Clear cache and session
-        from django.core.cache import cache
+        from apps.core.caches import AUTH_STATE_CACHE, get_cache
+        cache = get_cache(AUTH_STATE_CACHE)
         cache_key = f"google_oauth_state_{state}"
         cache.delete(cache_key)
         
@@ -350,7 +356,8 @@ def google_calendar_callback(request):
             
             # Try cache first
             if state:
-                from django.core.cache import cache
+                from apps.core.caches import AUTH_STATE_CACHE, get_cache
+                cache = get_cache(AUTH_STATE_CACHE)
                 cache_key = f"google_oauth_state_{state}"
                 user_id = cache.get(cache_key)
             
@@ -611,19 +618,20 @@ class ManualSyncView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        from apps.calendar_sync.services import sync_user_appointments_to_calendar
-        synced_count, error_message = sync_user_appointments_to_calendar(request.user)
-        if error_message and synced_count == 0:
+        from apps.calendar_sync.services import sync_users_appointments_to_calendar
+        stats = sync_users_appointments_to_calendar([request.user])[request.user.pk]
+        if stats.error and stats.pushed == 0:
             return Response({
                 'success': False,
-                'error': {'code': 'SYNC_FAILED', 'message': error_message},
+                'error': {'code': 'SYNC_FAILED', 'message': stats.error},
             }, status=status.HTTP_400_BAD_REQUEST)
         return Response({
             'success': True,
             'data': {
-                'synced_count': synced_count,
-                'message': f'Synced {synced_count} appointment(s) to your calendar.',
-                'last_error': error_message,
+                'synced_count': stats.pushed,
+                'message': f'Synced {stats.pushed} change(s) to your calendar; {stats.skipped} unchanged.',
+                'last_error': stats.error,
+                'stats': stats.as_dict(),
             },
         }, status=status.HTTP_200_OK)
 
@@ -634,7 +642,7 @@ class BulkSyncView(APIView):
 
     def post(self, request):
         from django.contrib.auth import get_user_model
-        from apps.calendar_sync.services import sync_user_appointments_to_calendar
+        from apps.calendar_sync.services import SyncStats, sync_users_appointments_to_calendar
 
         if not (getattr(request.user, 'role', None) == 'admin' or request.user.is_superuser):
             return Response({
@@ -643,16 +651,25 @@ class BulkSyncView(APIView):
             }, status=status.HTTP_403_FORBIDDEN)
         user_ids = request.data.get('user_ids') or []
         User = get_user_model()
+        try:
+            users = User.objects.select_related('profile').in_bulk(user_ids)
+        except (TypeError, ValueError):
+            users = {}
+        # One worker run for all users: per-profile batches pushed concurrently
+        try:
+            synced = sync_users_appointments_to_calendar(list(users.values()))
+        except Exception as e:
+            logger.error(f"Bulk calendar sync failed: {e}")
+            synced = {pk: SyncStats(error=str(e)) for pk in users}
         results = []
+        by_id = {str(pk): user for pk, user in users.items()}
         for uid in user_ids:
-            try:
-                user = User.objects.get(id=uid)
-                synced_count, err = sync_user_appointments_to_calendar(user)
-                results.append({'user_id': uid, 'synced_count': synced_count, 'error': err})
-            except User.DoesNotExist:
+            user = by_id.get(str(uid))
+            if user is None:
                 results.append({'user_id': uid, 'synced_count': 0, 'error': 'User not found'})
-            except Exception as e:
-                results.append({'user_id': uid, 'synced_count': 0, 'error': str(e)})
+                continue
+            stats = synced[user.pk]
+            results.append({'user_id': uid, 'synced_count': stats.pushed, 'error': stats.error, 'stats': stats.as_dict()})
         return Response({
             'success': True,
             'data': {'results': results},
@@ -779,6 +796,7 @@ class CalendarStatusView(APIView):
                     'has_refresh_token': bool(profile.calendar_refresh_token),
                     'last_sync_at': settings_json.get('last_sync_at'),
                     'last_sync_error': settings_json.get('last_sync_error'),
+                    'last_sync_stats': settings_json.get('last_sync_stats'),
                 }
             })
         except Profile.DoesNotExist:
@@ -898,3 +916,137 @@ class ICalendarDownloadView(APIView):
                     'message': str(e)
                 }
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# iCalendar subscription feed (webcal://)
+
+# Past appointments kept in the feed; the window starts at midnight so the ETag is stable for a day
+FEED_PAST_DAYS = 30
+# Bump when the feed format changes, so clients holding an old ETag get the new rendering
+FEED_FORMAT_VERSION = 1
+
+
+def _feed_appointments(user):
+    """All appointments (any status) in the user's feed window."""
+    from django.db.models import Q
+
+    since = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=FEED_PAST_DAYS)
+    if user.role == 'staff':
+        qs = Appointment.objects.filter(staff__user=user)
+    elif user.role == 'customer':
+        qs = Appointment.objects.filter(Q(order__customer__user=user) | Q(customer_booking__customer__user=user))
+    else:
+        qs = Appointment.objects.none()
+    return qs.filter(start_time__gte=since), since
+
+
+def _feed_state(request, token):
+    """
+    (feed, last_modified, etag) for a feed token, or None. One aggregate query over the window:
+    any appointment or order change moves Max(updated_at) (a cancellation too, since the
+    aggregate includes cancelled rows) and deletions change the count. Memoized on the
+    request, as the ETag and Last-Modified callbacks both need it.
+    """
+    from django.db.models import Count, Max
+    from .models import CalendarFeed
+
+    if not hasattr(request, '_calendar_feed_state'):
+        state = None
+        feed = CalendarFeed.objects.select_related('user').filter(token=token).first()
+        if feed is not None and feed.user.is_active:
+            appointments, since = _feed_appointments(feed.user)
+            stats = appointments.aggregate(
+                count=Count('id'), latest=Max('updated_at'), order_latest=Max('order__updated_at'),
+            )
+            last_modified = max(t for t in (feed.updated_at, stats['latest'], stats['order_latest']) if t)
+            version = f"{FEED_FORMAT_VERSION}:{feed.token}:{stats['count']}:{stats['latest']}:{stats['order_latest']}:{since.date()}"
+            state = (feed, last_modified, hashlib.sha256(version.encode('utf-8')).hexdigest()[:32])
+        request._calendar_feed_state = state
+    return request._calendar_feed_state
+
+
+def _feed_etag(request, token):
+    state = _feed_state(request, token)
+    return state[2] if state else None
+
+
+def _feed_last_modified(request, token):
+    state = _feed_state(request, token)
+    return state[1] if state else None
+
+
+def _feed_events(user):
+    from apps.calendar_sync.ics import vevent
+    from apps.calendar_sync.services import (
+        build_customer_event_data,
+        build_staff_event_data,
+        build_staff_event_data_from_appointment,
+    )
+
+    appointments, _ = _feed_appointments(user)
+    appointments = appointments.exclude(status__in=['cancelled', 'no_show']).select_related(
+        'order__customer', 'service', 'staff', 'subscription', 'customer_booking__customer',
+    ).order_by('start_time')
+    for appointment in appointments.iterator(chunk_size=200):
+        if appointment.order is None:
+            event_data = build_staff_event_data_from_appointment(appointment)
+        elif user.role == 'staff':
+            event_data = build_staff_event_data(appointment.order, appointment)
+        else:
+            event_data = build_customer_event_data(appointment.order, appointment)
+        yield vevent(
+            event_data,
+            last_modified=appointment.updated_at,
+            status='TENTATIVE' if appointment.status == 'pending' else 'CONFIRMED',
+        )
+
+
+@require_http_methods(['GET', 'HEAD'])
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def calendar_feed(request, token):
+    """
+    Subscription feed: every relevant appointment as one VCALENDAR, streamed. No login; the
+    token in the URL is the credential. Polling clients get 304 while nothing changed.
+    """
+    from django.http import HttpResponseNotFound, StreamingHttpResponse
+    from apps.calendar_sync.ics import stream_calendar
+
+    state = _feed_state(request, token)
+    if state is None:
+        return HttpResponseNotFound('Unknown calendar feed')
+    feed = state[0]
+    response = StreamingHttpResponse(
+        stream_calendar(_feed_events(feed.user), name='MultiBook'),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'inline; filename="multibook.ics"'
+    # Clients must revalidate; the ETag makes that cheap
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class CalendarFeedView(APIView):
+    """Subscription URL of the current user's calendar feed (GET), or a new one (POST revokes the old URL)."""
+    permission_classes = [IsAuthenticated]
+
+    def _response(self, request, feed, status_code=status.HTTP_200_OK):
+        from django.urls import reverse
+
+        url = request.build_absolute_uri(reverse('api:calendar_sync:calendar_feed_ics', args=[feed.token]))
+        return Response({
+            'success': True,
+            'data': {
+                'url': url,
+                'webcal_url': 'webcal://' + url.split('://', 1)[1],
+            },
+        }, status=status_code)
+
+    def get(self, request):
+        from .models import CalendarFeed
+        return self._response(request, CalendarFeed.for_user(request.user))
+
+    def post(self, request):
+        from .models import CalendarFeed
+        feed = CalendarFeed.for_user(request.user)
+        feed.rotate()
+        return self._response(request, feed, status.HTTP_201_CREATED)
@@ -1,10 +1,11 @@
 """
 Address utilities and Google Places API integration.
-Uses Django cache to reduce latency and API calls (transparent for all users).
+Uses the geocode cache namespace to reduce latency and API calls (transparent for all users).
 """
 import requests
 from django.conf import settings
-from django.core.cache import cache
+
+from .caches import GEOCODE_CACHE, get_cache
 
 
 def _geocode_postcode_uncached(postcode):
@@ -98,20 +99,53 @@ def _geocode_postcode_uncached(postcode):
     return None
 
 
+def _geocode_postcode_from_gazetteer(postcode):
+    """
+    Resolve a postcode from the offline gazetteer (see gazetteer.py), in the same shape as
+    _geocode_postcode_uncached. Returns None on a miss.
+    """
+    from .gazetteer import lookup_postcode
+    entry = lookup_postcode(postcode)
+    if entry is None:
+        return None
+    components = {
+        'postal_code': entry['postcode'],
+        'country': 'United Kingdom',
+    }
+    if entry['town']:
+        components['town'] = entry['town']
+    if entry['county']:
+        components['county'] = entry['county']
+    return {
+        'lat': entry['lat'],
+        'lng': entry['lng'],
+        'formatted_address': ', '.join(p for p in [entry['town'], entry['postcode'], 'UK'] if p),
+        'valid': True,
+        'is_uk': True,
+        'components': components,
+        'country_code': 'GB',
+        'source': 'gazetteer',
+    }
+
+
 def geocode_postcode(postcode):
     """
-    Geocode a UK postcode (cached 24h). See _geocode_postcode_uncached for behaviour.
+    Geocode a UK postcode: offline gazetteer first, then the shared geocode cache
+    (in-process LRU + durable table, see geocode_cache.py), then Google.
+    See _geocode_postcode_uncached for behaviour.
     """
+    from . import geocode_cache
     normalized = (postcode or '').upper().replace(' ', '').strip()
     if not normalized:
         return _geocode_postcode_uncached(postcode)
-    cache_key = f'geocode_postcode_{normalized}'
-    result = cache.get(cache_key)
+    local_result = _geocode_postcode_from_gazetteer(normalized)
+    if local_result is not None:
+        return local_result
+    result = geocode_cache.get_cached_geocode(normalized)
     if result is not None:
         return result
     result = _geocode_postcode_uncached(postcode)
-    if result is not None:
-        cache.set(cache_key, result, 86400)  # 24h
+    geocode_cache.store_geocode(normalized, result)
     return result
 
 
@@ -123,6 +157,7 @@ def get_address_autocomplete(query, api_key=None):
     if not query or not query.strip():
         return []
     cache_key = f'addr_autocomplete_{query.strip()[:80]}'
+    cache = get_cache(GEOCODE_CACHE)
     cached = cache.get(cache_key)
     if cached is not None:
         return cached
@@ -202,6 +237,7 @@ def get_place_details(place_id, api_key=None):
     if not place_id:
         return None
     cache_key = f'place_details_{place_id}'
+    cache = get_cache(GEOCODE_CACHE)
     cached = cache.get(cache_key)
     if cached is not None:
         return cached
@@ -271,7 +307,7 @@ def _get_place_details_uncached(place_id, api_key=None):
 
 def validate_postcode_with_google(postcode):
     """
-    Validate UK postcode using Google Maps API.
+    Validate UK postcode using the offline gazetteer, falling back to Google Maps API for misses.
     This provides both format validation and existence verification.
     IMPORTANT: Only accepts UK postcodes - rejects non-UK locations.
     
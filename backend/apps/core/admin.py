@@ -4,6 +4,9 @@ Core admin mixins for role-based access control.
 from django.contrib import admin
 from django.db import models
 
+from .jobs import retry_jobs
+from .models import BackgroundJob, GeocodeCacheEntry
+
 
 class ManagerPermissionMixin:
     """
@@ -274,3 +277,31 @@ class AppointmentManagerPermissionMixin(ManagerPermissionMixin):
         )
         
         return qs.distinct()
+
+
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    """Durable geocode cache (filled by geocode_postcode and warm_geocode_cache)."""
+    list_display = ['postcode', 'lat', 'lng', 'updated_at']
+    search_fields = ['postcode']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['postcode']
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    """Background job status (order confirmation side effects etc., see jobs.py)."""
+    list_display = ['id', 'name', 'dedupe_key', 'status', 'attempts', 'max_attempts', 'run_after', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['dedupe_key', 'name']
+    readonly_fields = [
+        'name', 'payload', 'dedupe_key', 'status', 'attempts', 'run_after',
+        'started_at', 'finished_at', 'last_error', 'created_at', 'updated_at',
+    ]
+    ordering = ['-created_at']
+    actions = ['retry_failed']
+
+    @admin.action(description='Retry selected failed jobs')
+    def retry_failed(self, request, queryset):
+        requeued = retry_jobs(queryset)
+        self.message_user(request, f'{requeued} job(s) requeued.')
@@ -5,3 +5,15 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'Core'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        from django.db.models import CharField
+        from django.db.models.functions import Lower
+
+        import apps.core.signals  # noqa
+
+        # email__lower=value compiles to LOWER(email) = value, which Lower('email') indexes serve;
+        # email__iexact compiles to LIKE (SQLite) or UPPER() (PostgreSQL) and cannot use them.
+        # value is compared as given, so lowercase it at the call: email__lower=email.lower()
+        CharField.register_lookup(Lower)
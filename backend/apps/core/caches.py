@@ -0,0 +1,19 @@
+"""
+Cache namespaces (see CACHE_NAMESPACES in settings).
+Each namespace is its own cache alias with its own TTL and size, so e.g. slot payloads are
+never evicted to make room for autocomplete results. Settings without a namespace alias fall
+back to the default cache.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_CACHE = 'default'
+GEOCODE_CACHE = 'geocode'
+SLOTS_CACHE = 'slots'
+REPORTS_CACHE = 'reports'
+AUTH_STATE_CACHE = 'auth_state'
+
+
+def get_cache(alias: str):
+    """Cache for a namespace alias (default cache if the alias is not configured)."""
+    return caches[alias if alias in settings.CACHES else DEFAULT_CACHE]
@@ -0,0 +1,181 @@
+"""
+In-process geospatial coverage index for StaffArea lookups.
+
+Active StaffArea centres are geocoded once and bucketed into a lat/lng grid: each area is
+inserted into every cell its bounding box overlaps, so a lookup only inspects the areas in the
+customer's cell instead of every area in the table.
+
+The index is rebuilt lazily when StaffArea/Staff rows change (signals bump a shared version
+token so every worker notices), and at most every INDEX_MAX_AGE seconds so centres that failed
+to geocode are retried.
+"""
+import math
+import secrets
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from django.core.cache import cache
+
+# Grid cell size in degrees (~17 miles of latitude; most UK service radii fit in one or two cells)
+GRID_CELL_DEGREES = 0.25
+
+# Rebuild at least this often even without changes (retries centres that failed to geocode)
+INDEX_MAX_AGE = 60 * 60
+
+INDEX_VERSION_KEY = 'coverage_index_version'
+
+MILES_PER_DEGREE_LAT = 69.0
+
+
+def normalize_postcode(postcode: Optional[str]) -> str:
+    return (postcode or '').upper().replace(' ', '').strip()
+
+
+class CoverageArea(NamedTuple):
+    area_id: int
+    staff_id: int
+    service_id: Optional[int]  # None = area applies to all services of the staff member
+    postcode: str  # normalized
+    radius_miles: float
+    lat: Optional[float]
+    lng: Optional[float]
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return math.floor(lat / GRID_CELL_DEGREES), math.floor(lng / GRID_CELL_DEGREES)
+
+
+def _columns(*columns):
+    """Columns as NumPy arrays when available (plain lists otherwise)."""
+    from apps.core.postcode_utils import NUMPY_AVAILABLE, np
+
+    if NUMPY_AVAILABLE:
+        return tuple(np.asarray(column, dtype=float) for column in columns)
+    return columns
+
+
+class CoverageIndex:
+    """Grid of StaffArea coverage circles. Build with CoverageIndex(areas); query with covering()."""
+
+    def __init__(self, areas: List[CoverageArea], version: Optional[str] = None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.areas = areas
+        self._grid: Dict[Tuple[int, int], List[CoverageArea]] = {}
+        self._by_postcode: Dict[str, List[CoverageArea]] = {}
+        for area in areas:
+            self._by_postcode.setdefault(area.postcode, []).append(area)
+            if area.lat is None or area.lng is None:
+                continue
+            dlat = area.radius_miles / MILES_PER_DEGREE_LAT
+            cos_lat = max(math.cos(math.radians(area.lat)), 0.01)
+            dlng = area.radius_miles / (MILES_PER_DEGREE_LAT * cos_lat)
+            min_i, min_j = _cell(area.lat - dlat, area.lng - dlng)
+            max_i, max_j = _cell(area.lat + dlat, area.lng + dlng)
+            for i in range(min_i, max_i + 1):
+                for j in range(min_j, max_j + 1):
+                    self._grid.setdefault((i, j), []).append(area)
+        # Per-cell coordinate/radius columns for one vectorized distance call per lookup
+        self._cell_columns = {
+            cell: _columns([a.lat for a in cell_areas], [a.lng for a in cell_areas], [a.radius_miles for a in cell_areas])
+            for cell, cell_areas in self._grid.items()
+        }
+
+    def candidates(self, lat: float, lng: float) -> List[CoverageArea]:
+        """Areas whose bounding box cell contains the point (superset of covering areas)."""
+        return self._grid.get(_cell(lat, lng), [])
+
+    def covering(
+        self,
+        lat: Optional[float],
+        lng: Optional[float],
+        postcode: str = '',
+        service_id: Optional[int] = None,
+    ) -> List[CoverageArea]:
+        """
+        Areas covering a point. Without coordinates, or for areas whose centre could not be
+        geocoded, falls back to exact (normalized) postcode match.
+        When service_id is set, only areas for that service or for all services are returned.
+        """
+        from apps.core.postcode_utils import within_radius_batch
+
+        postcode = normalize_postcode(postcode)
+        if lat is None or lng is None:
+            matches = list(self._by_postcode.get(postcode, []))
+        else:
+            cell = _cell(lat, lng)
+            candidates = self._grid.get(cell, [])
+            matches = []
+            if candidates:
+                _, mask = within_radius_batch(lat, lng, *self._cell_columns[cell])
+                matches = [area for area, covered in zip(candidates, mask) if covered]
+            matches.extend(
+                area for area in self._by_postcode.get(postcode, []) if area.lat is None or area.lng is None
+            )
+        if service_id is not None:
+            matches = [a for a in matches if a.service_id is None or a.service_id == service_id]
+        return matches
+
+    def covering_pairs(self, *args, **kwargs) -> Set[Tuple[int, Optional[int]]]:
+        """(staff_id, service_id) pairs covering a point; see covering() for arguments."""
+        return {(area.staff_id, area.service_id) for area in self.covering(*args, **kwargs)}
+
+
+def _load_areas() -> List[CoverageArea]:
+    """Active areas of active staff with geocoded centres (stored centres are loaded in one query)."""
+    from apps.core.geocode_cache import prefetch_geocodes
+    from apps.core.postcode_utils import _geocode_postcode_cached
+    from apps.staff.models import StaffArea
+
+    rows = list(StaffArea.objects.filter(is_active=True, staff__is_active=True).values_list(
+        'id', 'staff_id', 'service_id', 'postcode', 'radius_miles'
+    ))
+    prefetch_geocodes(row[3] for row in rows)
+    coords = {}
+    areas = []
+    for area_id, staff_id, service_id, postcode, radius_miles in rows:
+        normalized = normalize_postcode(postcode)
+        if normalized not in coords:
+            geocode_result = _geocode_postcode_cached(postcode)
+            if geocode_result and geocode_result.get('lat') and geocode_result.get('lng'):
+                coords[normalized] = (geocode_result['lat'], geocode_result['lng'])
+            else:
+                coords[normalized] = (None, None)
+        lat, lng = coords[normalized]
+        areas.append(CoverageArea(area_id, staff_id, service_id, normalized, float(radius_miles), lat, lng))
+    return areas
+
+
+_index: Optional[CoverageIndex] = None
+_index_lock = threading.Lock()
+
+
+def _current_version() -> str:
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        cache.add(INDEX_VERSION_KEY, secrets.token_hex(8), None)
+        version = cache.get(INDEX_VERSION_KEY)
+    return version
+
+
+def get_coverage_index() -> CoverageIndex:
+    """Process-wide coverage index, rebuilt when the shared version changes or it gets too old."""
+    global _index
+    version = _current_version()
+    index = _index
+    if index is not None and index.version == version and time.monotonic() - index.built_at < INDEX_MAX_AGE:
+        return index
+    with _index_lock:
+        index = _index
+        if index is None or index.version != version or time.monotonic() - index.built_at >= INDEX_MAX_AGE:
+            index = CoverageIndex(_load_areas(), version=version)
+            _index = index
+    return index
+
+
+def invalidate_coverage_index() -> None:
+    """Drop this process's index and bump the shared version so other workers rebuild too."""
+    global _index
+    cache.set(INDEX_VERSION_KEY, secrets.token_hex(8), None)
+    _index = None
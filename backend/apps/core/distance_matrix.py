@@ -0,0 +1,187 @@
+"""
+Tiled, cached and concurrent travel-time matrix for route optimization.
+
+Google's Distance Matrix API accepts at most 25 origins, 25 destinations and 100 elements per
+request, so get_travel_matrix:
+- serves each cell from the cache first (keyed by origin/destination rounded to
+  COORD_PRECISION decimals, ~10 m), so repeated staff days cost no API calls;
+- splits the missing cells into allowed tiles that ask for no cached or same-point cell (every
+  element is billed) and fetches them concurrently over a pooled HTTP session;
+- fills cells the API could not provide (no key, quota, network error) with the haversine
+  estimate, so callers always get a complete matrix.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .caches import GEOCODE_CACHE, get_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_ORIGINS_PER_REQUEST = 25
+MAX_DESTINATIONS_PER_REQUEST = 25
+MAX_ELEMENTS_PER_REQUEST = 100
+# Origins per band in plan_cell_tiles: a full-width tile (25 destinations) of the element limit
+BAND_ROWS = MAX_ELEMENTS_PER_REQUEST // MAX_DESTINATIONS_PER_REQUEST
+
+# Concurrent tile requests (and HTTP connections in the pool)
+DEFAULT_WORKERS = 4
+
+# Cells keyed to 4 decimal places (~11 m); driving times are cached for a week
+COORD_PRECISION = 4
+CELL_CACHE_TTL = 7 * 24 * 60 * 60
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _workers() -> int:
+    return max(1, int(getattr(settings, 'DISTANCE_MATRIX_WORKERS', DEFAULT_WORKERS)))
+
+
+def get_session() -> requests.Session:
+    """Process-wide session with a connection pool sized for the tile workers."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_workers(), max_retries=1)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def _rounded(point: Dict) -> Optional[Tuple[float, float]]:
+    if not isinstance(point, dict) or point.get('lat') is None or point.get('lng') is None:
+        return None
+    return round(float(point['lat']), COORD_PRECISION), round(float(point['lng']), COORD_PRECISION)
+
+
+def cell_cache_key(origin: Dict, destination: Dict) -> Optional[str]:
+    """Cache key for one origin -> destination cell, or None for points without coordinates."""
+    o, d = _rounded(origin), _rounded(destination)
+    if o is None or d is None:
+        return None
+    return f'dm_{o[0]}_{o[1]}_{d[0]}_{d[1]}'
+
+
+def plan_tiles(rows: List[int], cols: List[int]) -> List[Tuple[List[int], List[int]]]:
+    """Split rows x cols into blocks within the per-request origin/destination/element limits."""
+    if not rows or not cols:
+        return []
+    tile_cols = min(len(cols), MAX_DESTINATIONS_PER_REQUEST)
+    tile_rows = min(MAX_ORIGINS_PER_REQUEST, max(1, MAX_ELEMENTS_PER_REQUEST // tile_cols))
+    return [
+        (rows[i:i + tile_rows], cols[j:j + tile_cols])
+        for i in range(0, len(rows), tile_rows)
+        for j in range(0, len(cols), tile_cols)
+    ]
+
+
+def plan_cell_tiles(needed: Dict[int, List[int]]) -> List[Tuple[List[int], List[int]]]:
+    """
+    Tiles covering exactly the needed cells ({row: [cols]}), never a cell outside them.
+    Rows are taken in bands of BAND_ROWS: destinations every row of the band needs are fetched
+    as blocks; the remaining cells are fetched for rows grouped by identical destination sets.
+    """
+    rows = sorted(row for row, cols in needed.items() if cols)
+    tiles = []
+    leftover: Dict[frozenset, List[int]] = {}
+    for start in range(0, len(rows), BAND_ROWS):
+        band = rows[start:start + BAND_ROWS]
+        common = set.intersection(*(set(needed[row]) for row in band))
+        tiles.extend(plan_tiles(band, sorted(common)))
+        for row in band:
+            rest = frozenset(needed[row]) - common
+            if rest:
+                leftover.setdefault(rest, []).append(row)
+    for cols, group in leftover.items():
+        tiles.extend(plan_tiles(group, sorted(cols)))
+    return tiles
+
+
+def _zero_cell() -> Dict:
+    return {'duration_seconds': 0, 'distance_meters': 0, 'source': 'same_point'}
+
+
+def get_travel_matrix(
+    origins: List[Dict],
+    destinations: List[Dict],
+    api_key: Optional[str] = None,
+    use_api: bool = True,
+) -> List[List[Optional[Dict]]]:
+    """
+    Complete travel matrix in the get_distance_matrix shape:
+    rows[origin_index][dest_index] = {'duration_seconds', 'distance_meters', 'source'}
+    where source is 'cache', 'api', 'estimate' or 'same_point'. Cells are None only for points
+    without coordinates that the API could not resolve.
+    """
+    from .route_utils import estimate_distance_matrix, get_distance_matrix
+
+    api_key = api_key or getattr(settings, 'GOOGLE_MAPS_API_KEY', None) or getattr(settings, 'GOOGLE_PLACES_API_KEY', None)
+    matrix: List[List[Optional[Dict]]] = [[None] * len(destinations) for _ in origins]
+    keys = {}
+    for i, origin in enumerate(origins):
+        for j, destination in enumerate(destinations):
+            key = cell_cache_key(origin, destination)
+            if key is not None and _rounded(origin) == _rounded(destination):
+                matrix[i][j] = _zero_cell()
+            elif key is not None:
+                keys[(i, j)] = key
+
+    cache = get_cache(GEOCODE_CACHE)
+    cached = cache.get_many(set(keys.values())) if keys else {}
+    for (i, j), key in keys.items():
+        if key in cached:
+            matrix[i][j] = {**cached[key], 'source': 'cache'}
+
+    missing = [(i, j) for i in range(len(origins)) for j in range(len(destinations)) if matrix[i][j] is None]
+    if missing and use_api and api_key:
+        needed: Dict[int, List[int]] = {}
+        for i, j in missing:
+            needed.setdefault(i, []).append(j)
+        tiles = plan_cell_tiles(needed)
+        session = get_session()
+
+        def fetch(tile):
+            tile_rows, tile_cols = tile
+            return tile, get_distance_matrix(
+                [origins[i] for i in tile_rows], [destinations[j] for j in tile_cols], api_key, session=session,
+            )
+
+        with ThreadPoolExecutor(max_workers=min(_workers(), len(tiles))) as pool:
+            results = list(pool.map(fetch, tiles))
+        to_cache = {}
+        for (tile_rows, tile_cols), block in results:
+            if not block:
+                continue
+            for a, i in enumerate(tile_rows):
+                for b, j in enumerate(tile_cols):
+                    cell = block[a][b] if a < len(block) and b < len(block[a]) else None
+                    if cell is None:
+                        continue
+                    matrix[i][j] = {**cell, 'source': 'api'}
+                    if (i, j) in keys:
+                        to_cache[keys[(i, j)]] = cell
+        if to_cache:
+            cache.set_many(to_cache, CELL_CACHE_TTL)
+        failed = sum(1 for i, j in missing if matrix[i][j] is None)
+        if failed:
+            logger.warning(f"Distance matrix: {failed} of {len(missing)} cells unavailable from API, using estimates")
+
+    # Whatever is still missing: straight-line estimate (not cached, so the API is retried next time)
+    rows = sorted({i for i, j in missing if matrix[i][j] is None and (i, j) in keys})
+    cols = sorted({j for i, j in missing if matrix[i][j] is None and (i, j) in keys})
+    if rows and cols:
+        estimate = estimate_distance_matrix([origins[i] for i in rows], [destinations[j] for j in cols])
+        for a, i in enumerate(rows):
+            for b, j in enumerate(cols):
+                if matrix[i][j] is None and (i, j) in keys:
+                    matrix[i][j] = {**estimate[a][b], 'source': 'estimate'}
+    return matrix
@@ -0,0 +1,180 @@
+"""
+Offline UK postcode gazetteer.
+
+Postcode -> (lat, lng, town, county) lookups served from a local SQLite file built by
+`python manage.py import_postcodes` from a bulk CSV (e.g. ONS Postcode Directory, or any
+CSV with postcode/latitude/longitude columns). Lookups are a primary-key seek on a read-only
+connection, so validation and geocoding avoid a Google round trip for every known postcode.
+If the file does not exist every lookup misses and callers fall back to Google.
+"""
+import csv
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Column names tried (case-insensitive) when the CSV columns are not given explicitly
+DEFAULT_COLUMNS = {
+    'postcode': ['pcds', 'postcode', 'pcd', 'pcd2'],
+    'lat': ['lat', 'latitude'],
+    'lng': ['long', 'lng', 'longitude'],
+    'town': ['town', 'post_town', 'posttown', 'locality'],
+    'county': ['county', 'county_name', 'district'],
+    'terminated': ['doterm'],
+}
+
+# ONSPD uses 99.999999 / 0.000000 for postcodes without a grid reference
+MISSING_LAT = 99.999999
+
+
+def get_gazetteer_path() -> str:
+    return str(getattr(settings, 'POSTCODE_GAZETTEER_PATH', settings.BASE_DIR / 'data' / 'postcodes.sqlite3'))
+
+
+def normalize_postcode(postcode: Optional[str]) -> str:
+    return (postcode or '').upper().replace(' ', '').strip()
+
+
+def format_postcode(normalized: str) -> str:
+    """'SW1A1AA' -> 'SW1A 1AA' (inward code is always the last three characters)."""
+    return f'{normalized[:-3]} {normalized[-3:]}' if len(normalized) > 3 else normalized
+
+
+_local = threading.local()
+
+
+def _connection() -> Optional[sqlite3.Connection]:
+    """Per-thread read-only connection, reopened when the file is replaced by a refresh."""
+    path = get_gazetteer_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and getattr(_local, 'mtime', None) == mtime:
+        return conn
+    if conn is not None:
+        conn.close()
+    try:
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+    except sqlite3.Error as e:
+        logger.warning(f"Postcode gazetteer unavailable ({path}): {e}")
+        return None
+    _local.conn, _local.mtime = conn, mtime
+    return conn
+
+
+def lookup_postcode(postcode: str) -> Optional[Dict]:
+    """
+    Look up a postcode in the local gazetteer.
+    Returns {'postcode': 'SW1A 1AA', 'lat': float, 'lng': float, 'town': str, 'county': str} or None.
+    """
+    normalized = normalize_postcode(postcode)
+    if not normalized:
+        return None
+    conn = _connection()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(
+            'SELECT lat, lng, town, county FROM postcodes WHERE postcode = ?', (normalized,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Postcode gazetteer lookup failed for {normalized}: {e}")
+        return None
+    if row is None:
+        return None
+    return {
+        'postcode': format_postcode(normalized),
+        'lat': row[0],
+        'lng': row[1],
+        'town': row[2] or '',
+        'county': row[3] or '',
+    }
+
+
+def _resolve_columns(fieldnames, overrides: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    lower = {name.lower().strip(): name for name in fieldnames or []}
+    columns = {}
+    for key, candidates in DEFAULT_COLUMNS.items():
+        if overrides.get(key):
+            columns[key] = overrides[key]
+            continue
+        columns[key] = next((lower[c] for c in candidates if c in lower), None)
+    missing = [key for key in ('postcode', 'lat', 'lng') if not columns[key]]
+    if missing:
+        raise ValueError(f"CSV is missing required column(s): {', '.join(missing)} (found: {', '.join(fieldnames or [])})")
+    return columns
+
+
+def _iter_rows(csv_paths: Iterable[str], overrides: Dict[str, Optional[str]], include_terminated: bool):
+    for csv_path in csv_paths:
+        with open(csv_path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            columns = _resolve_columns(reader.fieldnames, overrides)
+            for row in reader:
+                if not include_terminated and columns['terminated'] and (row.get(columns['terminated']) or '').strip():
+                    continue
+                normalized = normalize_postcode(row.get(columns['postcode']))
+                try:
+                    lat = float(row.get(columns['lat']) or '')
+                    lng = float(row.get(columns['lng']) or '')
+                except ValueError:
+                    continue
+                if not normalized or lat >= MISSING_LAT or (lat == 0 and lng == 0):
+                    continue
+                town = (row.get(columns['town']) or '').strip() if columns['town'] else ''
+                county = (row.get(columns['county']) or '').strip() if columns['county'] else ''
+                yield normalized, lat, lng, town, county
+
+
+def build_gazetteer(
+    csv_paths: Iterable[str],
+    output_path: Optional[str] = None,
+    columns: Optional[Dict[str, Optional[str]]] = None,
+    include_terminated: bool = False,
+    batch_size: int = 50000,
+) -> int:
+    """
+    Build the gazetteer file from CSV(s) and atomically replace output_path.
+    Readers keep using the old file until the swap, then reopen on their next lookup.
+    Returns the number of postcodes stored.
+    """
+    output_path = output_path or get_gazetteer_path()
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.sqlite3', dir=output_dir)
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute(
+            'CREATE TABLE postcodes ('
+            'postcode TEXT PRIMARY KEY, lat REAL NOT NULL, lng REAL NOT NULL, town TEXT, county TEXT'
+            ') WITHOUT ROWID'
+        )
+        batch = []
+        for row in _iter_rows(csv_paths, columns or {}, include_terminated):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany('INSERT OR REPLACE INTO postcodes VALUES (?, ?, ?, ?, ?)', batch)
+                batch = []
+        if batch:
+            conn.executemany('INSERT OR REPLACE INTO postcodes VALUES (?, ?, ?, ?, ?)', batch)
+        conn.commit()
+        count = conn.execute('SELECT COUNT(*) FROM postcodes').fetchone()[0]
+        conn.execute('VACUUM')
+        conn.close()
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
@@ -0,0 +1,153 @@
+"""
+Two-tier geocode cache behind geocode_postcode.
+
+1. In-process LRU (GEOCODE_LRU_SIZE entries): repeated lookups in a worker cost no I/O.
+2. Durable table (GeocodeCacheEntry) keyed by normalized postcode and shared by every
+   worker: a postcode is geocoded by Google once, not once per worker or cache expiry.
+
+Only results with coordinates are stored in the table; results without coordinates (no API
+key configured, postcode Google cannot place) live in the LRU for TRANSIENT_TTL only, and
+failed calls (None) are not cached. Hit/miss counters are per process (see get_stats); `manage.py
+warm_geocode_cache` pre-fills the table from staff areas and customer postcodes.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LRU_SIZE = 10000
+
+# Seconds a result without coordinates is reused from the LRU before asking again
+TRANSIENT_TTL = 10 * 60
+
+# normalized postcode -> (result, monotonic expiry or None for durable results)
+_lru: 'OrderedDict[str, Tuple[Dict, Optional[float]]]' = OrderedDict()
+_lock = threading.Lock()
+_stats = {'lru_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0}
+
+
+def normalize_postcode(postcode: Optional[str]) -> str:
+    return (postcode or '').upper().replace(' ', '').strip()
+
+
+def _lru_size() -> int:
+    return int(getattr(settings, 'GEOCODE_LRU_SIZE', DEFAULT_LRU_SIZE))
+
+
+def _count(counter: str, n: int = 1) -> None:
+    with _lock:
+        _stats[counter] += n
+
+
+def _lru_put(normalized: str, result: Dict, expires_at: Optional[float] = None) -> None:
+    with _lock:
+        _lru[normalized] = (result, expires_at)
+        _lru.move_to_end(normalized)
+        size = _lru_size()
+        while len(_lru) > size:
+            _lru.popitem(last=False)
+
+
+def _is_cacheable(result: Optional[Dict]) -> bool:
+    return bool(result) and result.get('lat') is not None and result.get('lng') is not None
+
+
+def get_cached_geocode(postcode: str) -> Optional[Dict]:
+    """Cached result for a postcode (LRU, then table), or None. Counts a miss on None."""
+    normalized = normalize_postcode(postcode)
+    if not normalized:
+        return None
+    with _lock:
+        entry = _lru.get(normalized)
+        if entry is not None:
+            result, expires_at = entry
+            if expires_at is None or expires_at > time.monotonic():
+                _lru.move_to_end(normalized)
+                _stats['lru_hits'] += 1
+                return result
+            del _lru[normalized]
+    from .models import GeocodeCacheEntry
+    try:
+        result = GeocodeCacheEntry.objects.filter(postcode=normalized).values_list('result', flat=True).first()
+    except DatabaseError as e:
+        logger.warning(f"Geocode cache table unavailable: {e}")
+        result = None
+    if result is None:
+        _count('misses')
+        return None
+    _count('db_hits')
+    _lru_put(normalized, result)
+    return result
+
+
+def store_geocode(postcode: str, result: Optional[Dict]) -> bool:
+    """
+    Store a geocode result in both tiers. Returns False for results without coordinates,
+    which are only kept in the LRU for TRANSIENT_TTL (None is not cached at all).
+    """
+    normalized = normalize_postcode(postcode)
+    if not normalized or not result:
+        return False
+    if not _is_cacheable(result):
+        _lru_put(normalized, result, time.monotonic() + TRANSIENT_TTL)
+        return False
+    from .models import GeocodeCacheEntry
+    try:
+        GeocodeCacheEntry.objects.update_or_create(
+            postcode=normalized,
+            defaults={'lat': result['lat'], 'lng': result['lng'], 'result': result},
+        )
+    except (IntegrityError, DatabaseError) as e:
+        # Another worker stored it first, or the table is unavailable; the LRU still helps
+        logger.warning(f"Could not persist geocode for {normalized}: {e}")
+    _lru_put(normalized, result)
+    _count('stores')
+    return True
+
+
+def prefetch_geocodes(postcodes: Iterable[str]) -> int:
+    """
+    Load stored results for many postcodes into the LRU with one query (e.g. before building
+    the coverage index). Returns how many were loaded.
+    """
+    with _lock:
+        wanted = {normalize_postcode(p) for p in postcodes} - set(_lru) - {''}
+    if not wanted:
+        return 0
+    from .models import GeocodeCacheEntry
+    try:
+        rows = list(GeocodeCacheEntry.objects.filter(postcode__in=wanted).values_list('postcode', 'result'))
+    except DatabaseError as e:
+        logger.warning(f"Geocode cache table unavailable: {e}")
+        return 0
+    for normalized, result in rows:
+        _lru_put(normalized, result)
+    return len(rows)
+
+
+def stored_postcodes(postcodes: Iterable[str]) -> Set[str]:
+    """Subset of (normalized) postcodes that already have a durable entry."""
+    from .models import GeocodeCacheEntry
+    normalized = {normalize_postcode(p) for p in postcodes} - {''}
+    return set(GeocodeCacheEntry.objects.filter(postcode__in=normalized).values_list('postcode', flat=True))
+
+
+def get_stats() -> Dict[str, int]:
+    """Per-process counters: lru_hits, db_hits, misses, stores, lru_size."""
+    with _lock:
+        return {**_stats, 'lru_size': len(_lru)}
+
+
+def clear_lru(reset_stats: bool = True) -> None:
+    """Drop this process's LRU (the table is untouched)."""
+    with _lock:
+        _lru.clear()
+        if reset_stats:
+            for key in _stats:
+                _stats[key] = 0
@@ -0,0 +1,179 @@
+"""
+Durable background jobs for side effects that should not run inside a request
+(calendar pushes, emails).
+
+enqueue() writes a BackgroundJob row in the caller's transaction, so a job exists exactly when
+the change that needs it is committed. How jobs run depends on JOBS_BACKEND:
+- 'celery': one Celery task per job, sent on commit (worker: celery -A config worker);
+- 'database': `manage.py run_jobs`, a polling runner for environments without a broker;
+- 'inline': in-process right after commit (development without a worker).
+With any backend `run_jobs` also picks up jobs whose retry is due or whose worker died.
+
+Handlers are registered with @job(name) and called with the payload as keyword arguments. A
+handler that raises is retried with exponential backoff until max_attempts, then marked failed.
+Jobs are claimed with a conditional UPDATE, so several runners never run the same job twice.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+try:
+    from celery import shared_task
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+
+DEFAULT_MAX_ATTEMPTS = 5
+# Retry n waits RETRY_BASE_SECONDS * 2**(n-1): 30s, 1m, 2m, 4m, ...
+RETRY_BASE_SECONDS = 30
+# A job running longer than this is assumed lost (worker killed) and may be claimed again
+LOCK_TIMEOUT_SECONDS = 10 * 60
+
+_handlers: Dict[str, Callable] = {}
+
+
+def job(name: str):
+    """Register a job handler: @job('orders.send_confirmation_email') def handler(order_id): ..."""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def _backend() -> str:
+    return getattr(settings, 'JOBS_BACKEND', 'database')
+
+
+def _lock_timeout() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'JOBS_LOCK_TIMEOUT_SECONDS', LOCK_TIMEOUT_SECONDS))
+
+
+def _claimable(now) -> Q:
+    return Q(status='pending', run_after__lte=now) | Q(status='running', started_at__lt=now - _lock_timeout())
+
+
+def enqueue(name: str, payload: Optional[Dict] = None, dedupe_key: Optional[str] = None, max_attempts: Optional[int] = None):
+    """
+    Create a job (or return the pending/running job already holding dedupe_key).
+    The job is dispatched to the backend once the surrounding transaction commits.
+    """
+    from .models import BackgroundJob
+
+    if name not in _handlers:
+        raise ValueError(f"No job handler registered for '{name}'")
+    active = BackgroundJob.objects.filter(dedupe_key=dedupe_key, status__in=BackgroundJob.ACTIVE_STATUSES)
+    if dedupe_key:
+        existing = active.first()
+        if existing:
+            return existing
+    try:
+        with transaction.atomic():
+            background_job = BackgroundJob.objects.create(
+                name=name,
+                payload=payload or {},
+                dedupe_key=dedupe_key,
+                max_attempts=max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+            )
+    except IntegrityError:
+        # A concurrent enqueue with the same key won
+        existing = active.first() if dedupe_key else None
+        if existing is None:
+            raise
+        return existing
+    job_id = background_job.pk
+    transaction.on_commit(lambda: dispatch(job_id))
+    return background_job
+
+
+def dispatch(job_id: int, countdown: float = 0):
+    """Hand a committed job to the configured backend ('database': left for run_jobs)."""
+    backend = _backend()
+    if backend == 'celery' and CELERY_AVAILABLE:
+        try:
+            run_background_job.apply_async((job_id,), countdown=countdown)
+        except Exception as e:
+            # Broker down: the row stays pending and run_jobs will pick it up
+            logger.error(f"Could not send background job {job_id} to Celery: {e}")
+    elif backend == 'inline' and not countdown:
+        run_job(job_id)
+
+
+def run_job(job_id: int):
+    """Claim and run one job. Returns the job, or None if it was not claimable (e.g. already taken)."""
+    from .models import BackgroundJob
+
+    now = timezone.now()
+    claimed = BackgroundJob.objects.filter(_claimable(now), pk=job_id).update(
+        status='running', started_at=now, attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return None
+    background_job = BackgroundJob.objects.get(pk=job_id)
+    handler = _handlers.get(background_job.name)
+    retry_in = None
+    try:
+        if handler is None:
+            raise LookupError(f"No job handler registered for '{background_job.name}'")
+        handler(**background_job.payload)
+    except Exception as e:
+        background_job.last_error = traceback.format_exc()
+        if handler is None or background_job.attempts >= background_job.max_attempts:
+            background_job.status = 'failed'
+            background_job.finished_at = timezone.now()
+            logger.error(f"Background job {background_job} failed after {background_job.attempts} attempt(s): {e}")
+        else:
+            retry_in = RETRY_BASE_SECONDS * 2 ** (background_job.attempts - 1)
+            background_job.status = 'pending'
+            background_job.run_after = timezone.now() + timedelta(seconds=retry_in)
+            logger.warning(f"Background job {background_job} attempt {background_job.attempts} failed, retrying in {retry_in}s: {e}")
+    else:
+        background_job.status = 'succeeded'
+        background_job.finished_at = timezone.now()
+        background_job.last_error = ''
+    background_job.save(update_fields=['status', 'run_after', 'finished_at', 'last_error', 'updated_at'])
+    if retry_in is not None and _backend() == 'celery':
+        dispatch(job_id, countdown=retry_in + 1)
+    return background_job
+
+
+def run_due_jobs(limit: int = 100) -> int:
+    """Run up to limit claimable jobs, oldest first. Returns how many were run."""
+    from .models import BackgroundJob
+
+    job_ids = list(
+        BackgroundJob.objects.filter(_claimable(timezone.now()))
+        .order_by('run_after', 'pk')
+        .values_list('pk', flat=True)[:limit]
+    )
+    return sum(1 for job_id in job_ids if run_job(job_id) is not None)
+
+
+def retry_jobs(queryset) -> int:
+    """Reset failed jobs to pending (admin action). Returns how many were requeued."""
+    requeued = 0
+    for background_job in queryset.filter(status='failed'):
+        try:
+            with transaction.atomic():
+                type(background_job).objects.filter(pk=background_job.pk, status='failed').update(
+                    status='pending', attempts=0, run_after=timezone.now(), finished_at=None,
+                )
+        except IntegrityError:
+            # Another job with the same dedupe_key is already queued
+            continue
+        transaction.on_commit(lambda job_id=background_job.pk: dispatch(job_id))
+        requeued += 1
+    return requeued
+
+
+if CELERY_AVAILABLE:
+    @shared_task(name='core.run_background_job', ignore_result=True)
+    def run_background_job(job_id):
+        run_job(job_id)
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: per-pair calculate_distance_miles loop vs vectorized haversine_miles_batch.
+Use: python manage.py benchmark_distance [--sizes 1000,10000,100000] [--repeat 5]
+Runs on synthetic UK coordinates; touches no database.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.postcode_utils import (
+    NUMPY_AVAILABLE,
+    calculate_distance_miles,
+    within_radius_batch,
+)
+
+
+def _best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Compare looped vs vectorized haversine distance + radius mask at several area counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help='Comma-separated area counts')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+
+    def handle(self, *args, **options):
+        if not NUMPY_AVAILABLE:
+            self.stdout.write(self.style.WARNING('NumPy not installed: batch API uses the pure Python fallback.'))
+        rng = random.Random(0)
+        origin_lat, origin_lng = 51.5014, -0.1419
+        repeat = options['repeat']
+
+        self.stdout.write(f"{'areas':>8} {'loop ms':>10} {'batch ms':>10} {'speedup':>8}")
+        for size in [int(x) for x in options['sizes'].split(',') if x.strip()]:
+            lats = [rng.uniform(50.0, 55.5) for _ in range(size)]
+            lngs = [rng.uniform(-5.0, 1.5) for _ in range(size)]
+            radii = [rng.uniform(1.0, 30.0) for _ in range(size)]
+
+            def loop():
+                return [
+                    calculate_distance_miles(origin_lat, origin_lng, lat, lng) <= r
+                    for lat, lng, r in zip(lats, lngs, radii)
+                ]
+
+            columns = (lats, lngs, radii)
+            if NUMPY_AVAILABLE:
+                import numpy as np
+                columns = tuple(np.asarray(c) for c in columns)
+
+            def batch():
+                return within_radius_batch(origin_lat, origin_lng, *columns)
+
+            if list(loop()) != [bool(x) for x in batch()[1]]:
+                self.stdout.write(self.style.WARNING(f'{size}: loop and batch masks differ'))
+            loop_s = _best_of(repeat, loop)
+            batch_s = _best_of(repeat, batch)
+            self.stdout.write(
+                f'{size:>8} {loop_s * 1000:>10.2f} {batch_s * 1000:>10.2f} {loop_s / batch_s:>7.1f}x'
+            )
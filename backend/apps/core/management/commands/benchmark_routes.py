@@ -0,0 +1,76 @@
+"""
+Benchmark: greedy nearest-neighbour tour vs 2-opt/Or-opt local search (route_engine).
+Use: python manage.py benchmark_routes [--sizes 10,25,50,100,200] [--instances 3] [--time-budget-ms 2000] [--time-windows]
+Runs on synthetic Greater London stops with the haversine travel-time estimate; no API calls.
+With --time-windows every stop gets a booked 15-minute arrival window and a 45-minute visit;
+'greedy late' is the lateness of the nearest-neighbour tour under those windows.
+"""
+import random
+
+from django.core.management.base import BaseCommand
+
+from apps.core.route_engine import durations_from_matrix, nearest_neighbour, optimize_route, simulate
+from apps.core.route_utils import estimate_distance_matrix
+
+
+def _instance(rng, size, time_windows):
+    stops = [{'lat': rng.uniform(51.30, 51.70), 'lng': rng.uniform(-0.45, 0.25)} for _ in range(size)]
+    durations = durations_from_matrix(estimate_distance_matrix(stops, stops))
+    kwargs = {}
+    if time_windows:
+        # Windows come from a random but feasible booked day (visit order shuffled, 45-minute
+        # visits, 0-30 minute gaps), so zero lateness is always achievable
+        day_start = 8 * 3600
+        later = list(range(1, size))
+        rng.shuffle(later)
+        windows = [None] * size
+        clock = day_start
+        prev = None
+        for stop in [0] + later:
+            if prev is not None:
+                clock += durations[prev][stop] + rng.uniform(0, 30 * 60)
+            windows[stop] = (clock, clock + 15 * 60)
+            clock += 45 * 60
+            prev = stop
+        kwargs = {
+            'day_start': day_start,
+            'time_windows': windows,
+            'service_seconds': [45 * 60] * size,
+        }
+    return durations, kwargs
+
+
+class Command(BaseCommand):
+    help = 'Compare greedy and local-search tour length, lateness and runtime on synthetic 10-200 stop days.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,25,50,100,200', help='Comma-separated stop counts')
+        parser.add_argument('--instances', type=int, default=3, help='Random instances per size (averaged)')
+        parser.add_argument('--time-budget-ms', type=int, default=2000)
+        parser.add_argument('--time-windows', action='store_true', help='Add arrival windows and visit times')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(
+            f"{'stops':>6} {'greedy min':>11} {'local min':>10} {'gain':>7} "
+            f"{'greedy late':>12} {'local late':>11} {'ms':>8} {'timeouts':>9}"
+        )
+        for size in [int(x) for x in options['sizes'].split(',') if x.strip()]:
+            greedy_total = local_total = greedy_late = local_late = elapsed_total = 0.0
+            timeouts = 0
+            for _ in range(options['instances']):
+                durations, kwargs = _instance(rng, size, options['time_windows'])
+                plan = optimize_route(durations, time_budget_ms=options['time_budget_ms'], **kwargs)
+                greedy_total += plan.initial_duration
+                local_total += plan.total_duration
+                greedy_late += simulate(durations, nearest_neighbour(durations), **kwargs).late_seconds
+                local_late += plan.late_seconds
+                elapsed_total += plan.elapsed_ms
+                timeouts += 1 if plan.timed_out else 0
+            n = options['instances']
+            gain = 100.0 * (greedy_total - local_total) / greedy_total if greedy_total else 0.0
+            self.stdout.write(
+                f'{size:>6} {greedy_total / n / 60:>11.1f} {local_total / n / 60:>10.1f} {gain:>6.1f}% '
+                f'{greedy_late / n / 60:>12.1f} {local_late / n / 60:>11.1f} {elapsed_total / n:>8.1f} {timeouts:>9}'
+            )
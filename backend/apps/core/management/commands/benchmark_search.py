@@ -0,0 +1,106 @@
+"""
+Benchmark: admin search through the search index vs the icontains scans it replaces (wall time).
+Use: python manage.py benchmark_search [--customers 1000000] [--repeat 5]
+Creates synthetic customers (and their search documents) inside a transaction that is rolled
+back at the end, so the database is left unchanged.
+"""
+import random
+import time as timer
+from functools import reduce
+from operator import or_
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.db.models import Q
+
+from apps.core import search
+
+FIRST_NAMES = ['James', 'Olivia', 'Amelia', 'Noah', 'Isla', 'George', 'Ava', 'Leo', 'Freya', 'Arthur',
+               'Priya', 'Mohammed', 'Grace', 'Oscar', 'Sophia', 'Harry', 'Lily', 'Jack', 'Ella', 'Theo']
+LAST_NAMES = ['Smith', 'Jones', 'Taylor', 'Brown', 'Williams', 'Wilson', 'Johnson', 'Davies', 'Patel', 'Wright',
+              'Robinson', 'Thompson', 'Evans', 'Walker', 'White', 'Roberts', 'Green', 'Hall', 'Wood', 'Khan']
+DOMAINS = ['gmail.com', 'outlook.com', 'yahoo.co.uk', 'icloud.com', 'btinternet.com']
+AREAS = ['SW1A', 'EC1A', 'W1A', 'M1', 'B1', 'LS1', 'G1', 'BS1', 'NW3', 'SE10']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def icontains_scan(query):
+    """Customer lookup as CustomerViewSet filters did before search.py: icontains on each field."""
+    from apps.customers.models import Customer
+
+    condition = reduce(or_, [Q(**{f'{name}__icontains': query}) for name in ('name', 'email', 'phone', 'postcode')])
+    return list(Customer.objects.filter(condition).values_list('id', flat=True)[:search.DEFAULT_LIMIT])
+
+
+class Command(BaseCommand):
+    help = 'Compare admin search index lookups with icontains scans over customers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000000, help='Synthetic customers to create')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query (median is reported)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                started = timer.perf_counter()
+                sample = self._fixtures(options['customers'])
+                self.stdout.write(
+                    f"Created and indexed {options['customers']} customers in {timer.perf_counter() - started:.1f}s "
+                    f"({connection.vendor})"
+                )
+                queries = [
+                    ('rare email', sample['email'].split('@')[0]),
+                    ('phone digits', sample['phone'][-7:]),
+                    ('postcode', sample['postcode'].replace(' ', '').lower()),
+                    ('full name', sample['name'].lower()),
+                    ('common surname', 'patel'),
+                    ('mail domain', 'outlook'),
+                    ('miss', 'zzqxj'),
+                ]
+                self.stdout.write(f"{'query':<16} {'term':<22} {'hits':>5} {'index ms':>9} {'scan ms':>9}")
+                for label, term in queries:
+                    hits, index_ms = self._measure(options['repeat'], search.search, term, ['customer'])
+                    _, scan_ms = self._measure(options['repeat'], icontains_scan, term)
+                    self.stdout.write(f'{label:<16} {term:<22} {len(hits):>5} {index_ms:>9.2f} {scan_ms:>9.1f}')
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _measure(self, repeat, func, *args):
+        timings = []
+        for _ in range(repeat):
+            # DEBUG keeps a bounded query log, which the bulk inserts have filled
+            reset_queries()
+            started = timer.perf_counter()
+            result = func(*args)
+            timings.append((timer.perf_counter() - started) * 1000)
+        return result, sorted(timings)[len(timings) // 2]
+
+    def _fixtures(self, count):
+        from apps.customers.models import Customer
+
+        rng = random.Random(0)
+        batch, sample = [], None
+        for i in range(count):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            customer = Customer(
+                name=f'{first} {last}',
+                email=f'{first.lower()}.{last.lower()}{i}@{rng.choice(DOMAINS)}',
+                phone=f'07{rng.randrange(10 ** 9):09d}',
+                postcode=f'{rng.choice(AREAS)} {rng.randrange(10)}{rng.choice("ABDEFGHJLNPQRSTUWXYZ")}'
+                         f'{rng.choice("ABDEFGHJLNPQRSTUWXYZ")}',
+            )
+            if i == count // 2:
+                sample = {'name': customer.name, 'email': customer.email, 'phone': customer.phone,
+                          'postcode': customer.postcode}
+            batch.append(customer)
+            if len(batch) == 10000:
+                Customer.objects.bulk_create(batch)
+                batch = []
+        Customer.objects.bulk_create(batch)
+        # bulk_create skips the signals that index single saves
+        search.rebuild(['customer'])
+        return sample
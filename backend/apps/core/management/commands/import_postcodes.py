@@ -0,0 +1,57 @@
+"""
+Import or refresh the offline UK postcode gazetteer used for validation and geocoding.
+Use: python manage.py import_postcodes ONSPD_FEB_2026_UK.csv [more.csv ...] [--output PATH]
+Accepts the ONS Postcode Directory (pcds/lat/long/doterm columns) or any CSV with
+postcode/latitude/longitude columns; override column names with --postcode-column etc.
+The new file is built next to the old one and swapped in atomically, so running workers
+pick it up on their next lookup without a restart.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.gazetteer import build_gazetteer, get_gazetteer_path, lookup_postcode
+
+
+class Command(BaseCommand):
+    help = 'Build the offline postcode gazetteer (SQLite) from bulk postcode CSV files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_paths', nargs='+', help='CSV file(s) to import')
+        parser.add_argument('--output', default=None, help='Gazetteer file (default: POSTCODE_GAZETTEER_PATH)')
+        parser.add_argument('--postcode-column', default=None)
+        parser.add_argument('--lat-column', default=None)
+        parser.add_argument('--lng-column', default=None)
+        parser.add_argument('--town-column', default=None)
+        parser.add_argument('--county-column', default=None)
+        parser.add_argument(
+            '--include-terminated',
+            action='store_true',
+            help='Keep postcodes with a termination date (ONSPD doterm)',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output'] or get_gazetteer_path()
+        columns = {
+            'postcode': options['postcode_column'],
+            'lat': options['lat_column'],
+            'lng': options['lng_column'],
+            'town': options['town_column'],
+            'county': options['county_column'],
+        }
+        started = time.perf_counter()
+        try:
+            count = build_gazetteer(
+                options['csv_paths'],
+                output_path=output,
+                columns=columns,
+                include_terminated=options['include_terminated'],
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Imported {count} postcodes into {output} in {elapsed:.1f}s'))
+        if not options['output']:
+            sample = lookup_postcode('SW1A 1AA')
+            if sample:
+                self.stdout.write(f"Sample lookup SW1A 1AA -> {sample['lat']}, {sample['lng']}")
@@ -0,0 +1,26 @@
+"""
+Rebuild the admin search documents (see apps/core/search.py) from the customer, order and staff
+tables. Needed after bulk loads or imports that bypass model signals.
+Use: python manage.py rebuild_search_index [--kind customer] [--kind order] [--kind staff]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild admin search documents for customers, orders and staff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', choices=search.KINDS, help='Only rebuild this kind (repeatable)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            counts = search.rebuild(options['kind'] or search.KINDS)
+        for kind, count in counts.items():
+            self.stdout.write(f'{kind}: {count} documents')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index in {time.perf_counter() - started:.1f}s'))
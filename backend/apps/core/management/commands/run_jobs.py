@@ -0,0 +1,32 @@
+"""
+Database-backed background job runner (for environments without a Celery broker).
+Use: python manage.py run_jobs [--once] [--interval 5] [--batch 100]
+Polls core_background_job for due jobs (new, retries whose backoff has passed, and jobs whose
+worker died) and runs them. Safe to run several copies: each job is claimed before it runs.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.core.jobs import run_due_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run pending background jobs (order confirmation emails, calendar pushes).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the due jobs once and exit')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls when idle')
+        parser.add_argument('--batch', type=int, default=100, help='Jobs claimed per poll')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            ran = run_due_jobs(limit=options['batch'])
+            if ran:
+                self.stdout.write(f'Ran {ran} job(s)')
+            if options['once']:
+                return
+            if ran < options['batch']:
+                time.sleep(options['interval'])
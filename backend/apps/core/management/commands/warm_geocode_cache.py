@@ -0,0 +1,81 @@
+"""
+Pre-geocode every postcode the booking flow is likely to look up, so first requests hit the
+durable geocode cache instead of Google.
+Use: python manage.py warm_geocode_cache [--include-orders] [--refresh] [--limit N]
+Sources: StaffArea.postcode, Customer.postcode and Address.postcode (plus Order and
+Subscription postcodes with --include-orders). Postcodes in the offline gazetteer or already
+stored are skipped unless --refresh is given.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core import geocode_cache
+from apps.core.address import _geocode_postcode_from_gazetteer, _geocode_postcode_uncached
+
+
+def _collect_postcodes(include_orders):
+    from apps.customers.models import Address, Customer
+    from apps.staff.models import StaffArea
+
+    querysets = [
+        StaffArea.objects.filter(is_active=True).values_list('postcode', flat=True),
+        Customer.objects.values_list('postcode', flat=True),
+        Address.objects.values_list('postcode', flat=True),
+    ]
+    if include_orders:
+        from apps.orders.models import Order
+        from apps.subscriptions.models import Subscription
+        querysets.append(Order.objects.values_list('postcode', flat=True))
+        querysets.append(Subscription.objects.values_list('postcode', flat=True))
+    postcodes = set()
+    for queryset in querysets:
+        postcodes.update(geocode_cache.normalize_postcode(p) for p in queryset.distinct())
+    postcodes.discard('')
+    return sorted(postcodes)
+
+
+class Command(BaseCommand):
+    help = 'Geocode staff area and customer postcodes into the shared geocode cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--include-orders',
+            action='store_true',
+            help='Also warm postcodes from orders and subscriptions',
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Re-geocode postcodes that are already stored',
+        )
+        parser.add_argument('--limit', type=int, default=None, help='Geocode at most N postcodes')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        postcodes = _collect_postcodes(options['include_orders'])
+        self.stdout.write(f"Found {len(postcodes)} distinct postcodes")
+
+        pending = [p for p in postcodes if _geocode_postcode_from_gazetteer(p) is None]
+        in_gazetteer = len(postcodes) - len(pending)
+        already_cached = 0
+        if not options['refresh']:
+            stored = geocode_cache.stored_postcodes(pending)
+            already_cached = len(stored)
+            pending = [p for p in pending if p not in stored]
+        if options['limit'] is not None:
+            pending = pending[:options['limit']]
+
+        stored_count = failed = 0
+        for postcode in pending:
+            if geocode_cache.store_geocode(postcode, _geocode_postcode_uncached(postcode)):
+                stored_count += 1
+            else:
+                failed += 1
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"In gazetteer: {in_gazetteer}, already cached: {already_cached}, "
+            f"geocoded: {stored_count}, not geocoded: {failed} ({elapsed:.1f}s)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Geocode cache stats: {geocode_cache.get_stats()}"))
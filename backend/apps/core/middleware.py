@@ -1,6 +1,12 @@
 """
-Custom middleware for authentication and role-based access.
+Custom middleware for authentication, role-based access and per-request query instrumentation.
 """
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 from rest_framework.response import Response
 from rest_framework import status
@@ -77,3 +83,82 @@ class RoleBasedAccessMiddleware(MiddlewareMixin):
                 break
         
         return None
+
+
+query_logger = logging.getLogger('apps.core.queries')
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries (and their time) run through it.
+    Installed with connection.execute_wrapper(), so it works without DEBUG and costs two
+    perf_counter() calls per query.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class QueryCountMiddleware:
+    """
+    Count the SQL queries of each request on every database connection.
+    Adds X-DB-Queries (count) and X-DB-Time (milliseconds) headers and logs one structured
+    record per request on the 'apps.core.queries' logger: DEBUG normally, WARNING when the
+    request ran more than DB_QUERY_WARNING_THRESHOLD queries. Queries run while a streaming
+    response is iterated are logged when the stream ends (the headers are already sent).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'DB_QUERY_WARNING_THRESHOLD', 50)
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with self._instrument(counter):
+            response = self.get_response(request)
+        response['X-DB-Queries'] = str(counter.count)
+        response['X-DB-Time'] = f'{counter.duration * 1000:.1f}'
+        if response.streaming:
+            response.streaming_content = self._stream(response.streaming_content, counter, request, response, started)
+        else:
+            self._log(request, response, counter, started)
+        return response
+
+    def _instrument(self, counter):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        return stack
+
+    def _stream(self, content, counter, request, response, started):
+        try:
+            with self._instrument(counter):
+                yield from content
+        finally:
+            self._log(request, response, counter, started)
+
+    def _log(self, request, response, counter, started):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'db_queries': counter.count,
+            'db_time_ms': round(counter.duration * 1000, 1),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        level = logging.WARNING if counter.count > self.threshold else logging.DEBUG
+        query_logger.log(
+            level,
+            ' '.join(f'{key}={value}' for key, value in record.items()),
+            extra=record,
+        )
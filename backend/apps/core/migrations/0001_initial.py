@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('postcode', models.CharField(max_length=10, unique=True)),
+                ('lat', models.FloatField()),
+                ('lng', models.FloatField()),
+                ('result', models.JSONField(default=dict, help_text='Full geocode_postcode result')),
+            ],
+            options={
+                'verbose_name': 'geocode cache entry',
+                'verbose_name_plural': 'geocode cache entries',
+                'db_table': 'core_geocode_cache',
+                'ordering': ['postcode'],
+            },
+        ),
+    ]
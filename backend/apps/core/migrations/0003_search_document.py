@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+from django.db import OperationalError, migrations, models
+
+POSTGRESQL_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX core_search_document_trgm ON core_search_document USING gin (document gin_trgm_ops)',
+    "CREATE INDEX core_search_document_tsv ON core_search_document USING gin (to_tsvector('simple', document))",
+]
+SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE core_search_fts USING fts5(
+        document, content='core_search_document', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER core_search_document_ai AFTER INSERT ON core_search_document BEGIN
+        INSERT INTO core_search_fts(rowid, document) VALUES (new.id, new.document);
+    END""",
+    """CREATE TRIGGER core_search_document_ad AFTER DELETE ON core_search_document BEGIN
+        INSERT INTO core_search_fts(core_search_fts, rowid, document) VALUES ('delete', old.id, old.document);
+    END""",
+    """CREATE TRIGGER core_search_document_au AFTER UPDATE ON core_search_document BEGIN
+        INSERT INTO core_search_fts(core_search_fts, rowid, document) VALUES ('delete', old.id, old.document);
+        INSERT INTO core_search_fts(rowid, document) VALUES (new.id, new.document);
+    END""",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRESQL_INDEXES:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_FTS[0])
+        except OperationalError:
+            # SQLite built without FTS5 (or older than 3.34, no trigram tokenizer): search.py scans instead
+            return
+        for sql in SQLITE_FTS[1:]:
+            schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_search_document_tsv')
+        schema_editor.execute('DROP INDEX IF EXISTS core_search_document_trgm')
+    elif vendor == 'sqlite':
+        for suffix in ('au', 'ad', 'ai'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS core_search_document_{suffix}')
+        schema_editor.execute('DROP TABLE IF EXISTS core_search_fts')
+
+
+def build_search_documents(apps, schema_editor):
+    from apps.core.search import rebuild
+
+    rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_background_job'),
+        ('customers', '0003_customer_customers_c_created_4b8a48_idx'),
+        ('orders', '0004_order_orders_orde_created_0fb29d_idx'),
+        ('staff', '0004_staff_staff_name_not_empty_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customer', 'Customer'), ('order', 'Order'), ('staff', 'Staff')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(blank=True, default='', max_length=255)),
+                ('subtitle', models.CharField(blank=True, default='', max_length=255)),
+                ('document', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'search document',
+                'verbose_name_plural': 'search documents',
+                'db_table': 'core_search_document',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='searchdocument_unique_kind_object')],
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchdocument',
+            index=models.Index(fields=['kind', 'document'], name='search_document_prefix_idx', opclasses=['varchar_pattern_ops', 'text_pattern_ops']),
+        ),
+    ]
@@ -2,6 +2,7 @@
 Core models and utilities.
 """
 from django.db import models
+from django.utils import timezone
 
 
 class TimeStampedModel(models.Model):
@@ -13,3 +14,112 @@ class TimeStampedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class GeocodeCacheEntry(TimeStampedModel):
+    """
+    Durable geocode result for a normalized postcode (e.g. 'SW1A1AA').
+    Shared by all workers behind their in-process LRU (see geocode_cache.py), so each
+    postcode is sent to Google once rather than once per worker per cache expiry.
+    """
+    postcode = models.CharField(max_length=10, unique=True)
+    lat = models.FloatField()
+    lng = models.FloatField()
+    result = models.JSONField(default=dict, help_text='Full geocode_postcode result')
+
+    class Meta:
+        db_table = 'core_geocode_cache'
+        verbose_name = 'geocode cache entry'
+        verbose_name_plural = 'geocode cache entries'
+        ordering = ['postcode']
+
+    def __str__(self):
+        return f"{self.postcode} ({self.lat:.5f}, {self.lng:.5f})"
+
+
+class BackgroundJob(TimeStampedModel):
+    """
+    Durable background job (see jobs.py). Written in the same transaction as the change that
+    needs it, run by Celery or `manage.py run_jobs`, retried with backoff until max_attempts.
+    At most one pending/running job may hold a given dedupe_key.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    ACTIVE_STATUSES = ('pending', 'running')
+
+    name = models.CharField(max_length=100, db_index=True, help_text='Registered job handler name')
+    payload = models.JSONField(default=dict, blank=True, help_text='Keyword arguments for the handler')
+    dedupe_key = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        help_text='Only one pending/running job per key (e.g. order:42:confirmation_email)'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text='Not run before this time (retry backoff)')
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        db_table = 'core_background_job'
+        verbose_name = 'background job'
+        verbose_name_plural = 'background jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['dedupe_key']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='backgroundjob_unique_active_dedupe_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class SearchDocument(models.Model):
+    """
+    Admin search entry for one customer, order or staff member (see search.py): display
+    title/subtitle and the lowercased text queries match. Indexed with pg_trgm/tsvector on
+    PostgreSQL and mirrored into the core_search_fts FTS5 table on SQLite (migration 0003).
+    """
+    KIND_CHOICES = [
+        ('customer', 'Customer'),
+        ('order', 'Order'),
+        ('staff', 'Staff'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255, blank=True, default='')
+    subtitle = models.CharField(max_length=255, blank=True, default='')
+    document = models.TextField(blank=True, default='')
+
+    class Meta:
+        db_table = 'core_search_document'
+        verbose_name = 'search document'
+        verbose_name_plural = 'search documents'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdocument_unique_kind_object'),
+        ]
+        indexes = [
+            # Title-prefix lookups by kind (a document starts with its title); opclasses apply on PostgreSQL only
+            models.Index(
+                fields=['kind', 'document'], name='search_document_prefix_idx',
+                opclasses=['varchar_pattern_ops', 'text_pattern_ops'],
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.title}"
@@ -0,0 +1,134 @@
+"""
+Keyset (cursor) pagination for the high-volume list endpoints.
+
+A page is the rows after (or before) the last row seen, filtered on an indexed (ordering field,
+id) pair rather than skipped with OFFSET, so page 1000 costs the same as page 1 and rows inserted
+meanwhile never shift a page. The count is not computed either.
+
+Cursor mode is opt-in per request, so existing clients keep their response shape:
+    GET /api/ad/appointments/?cursor=            first page
+    GET /api/ad/appointments/?cursor=<next>      following pages (meta.next / meta.previous)
+    &page_size=50                                up to max_page_size
+Without a cursor parameter, requests are paginated by page number (page_numbers = True) or not at
+all (the viewset lists everything, as before).
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_PARAM = 'cursor'
+
+
+class KeysetPagination(PageNumberPagination):
+    """Cursor pagination on (ordering[0], id); subclasses set ordering to match an index."""
+    ordering = ('-created_at', '-id')
+    cursor_query_param = CURSOR_PARAM
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    page_numbers = True
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.cursor = None
+        if self.cursor_query_param not in request.query_params:
+            if self.page_numbers:
+                return super().paginate_queryset(queryset, request, view)
+            return None
+
+        self.cursor = self._decode(request.query_params[self.cursor_query_param], queryset.model)
+        self.page_size = self.get_page_size(request)
+        field = self.ordering[0].lstrip('-')
+        reverse = self.cursor['reverse']
+        ordering = [self._flip(name) for name in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if self.cursor['position'] is not None:
+            value, pk = self.cursor['position']
+            descending = ordering[0].startswith('-')
+            op = 'lt' if descending else 'gt'
+            queryset = queryset.filter(Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'pk__{op}': pk}))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        started = self.cursor['position'] is not None
+        self.has_next = started if reverse else has_more
+        self.has_previous = has_more if reverse else started
+        self.first = self._position(rows[0], field) if rows else None
+        self.last = self._position(rows[-1], field) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        """Return paginated response in shape { success, data, meta }."""
+        return Response({
+            'success': True,
+            'data': data,
+            'meta': self.get_paginated_meta(),
+        })
+
+    def get_paginated_meta(self):
+        if self.cursor is None:
+            return {
+                'count': self.page.paginator.count,
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+            }
+        return {
+            'next': self._link(self.last, False) if self.has_next and self.last else None,
+            'previous': self._link(self.first, True) if self.has_previous and self.first else None,
+            'page_size': self.page_size,
+        }
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    @staticmethod
+    def _position(row, field):
+        value = getattr(row, field)
+        return [value.isoformat() if hasattr(value, 'isoformat') else value, row.pk]
+
+    def _link(self, position, reverse):
+        token = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, base64.urlsafe_b64encode(token.encode()).decode())
+
+    def _decode(self, encoded, model):
+        """Empty cursor is the first page; otherwise {'p': [value, id], 'r': 0|1} as url-safe base64."""
+        if not encoded:
+            return {'position': None, 'reverse': False}
+        try:
+            token = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            value, pk = token['p']
+            field = model._meta.get_field(self.ordering[0].lstrip('-'))
+            return {'position': (field.to_python(value), int(pk)), 'reverse': bool(token.get('r'))}
+        except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class AppointmentCursorPagination(KeysetPagination):
+    """Appointments in start order (index appointments_appointment (start_time, id))."""
+    ordering = ('start_time', 'id')
+    page_numbers = False
+
+
+class OrderCursorPagination(KeysetPagination):
+    """Newest orders first (index orders_order (created_at, id))."""
+
+
+class CustomerCursorPagination(KeysetPagination):
+    """Newest customers first (index customers_customer (created_at, id))."""
+    page_numbers = False
+
+
+class SubscriptionCursorPagination(KeysetPagination):
+    """Newest subscriptions first (index subscriptions_subscription (created_at, id))."""
@@ -3,12 +3,22 @@ Postcode utilities for area-based filtering.
 Includes distance calculation and postcode-to-area mapping logic.
 """
 import math
-from typing import List, Optional, Dict, Any, Set
-from django.db.models import Q, Prefetch
+from typing import List, Optional, Dict, Any
 from django.core.cache import cache
 from apps.core.address import geocode_postcode, validate_postcode_with_google
 from apps.staff.models import StaffArea, Staff
 
+# NumPy is optional: batch distance helpers fall back to pure Python loops without it
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Earth's radius in miles
+EARTH_RADIUS_MILES = 3959.0
+
 
 def calculate_distance_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -22,8 +32,7 @@ def calculate_distance_miles(lat1: float, lon1: float, lat2: float, lon2: float)
     Returns:
         Distance in miles
     """
-    # Earth's radius in miles
-    R = 3959.0  # miles
+    R = EARTH_RADIUS_MILES
     
     # Convert latitude and longitude from degrees to radians
     lat1_rad = math.radians(lat1)
@@ -43,6 +52,48 @@ def calculate_distance_miles(lat1: float, lon1: float, lat2: float, lon2: float)
     return distance
 
 
+def haversine_miles_batch(origin_lat: float, origin_lng: float, lats, lngs):
+    """
+    Distances in miles from one origin to N points in a single vectorized call.
+    lats/lngs: sequences or NumPy arrays of length N.
+    Returns a NumPy array (or a list when NumPy is not installed).
+    """
+    if not NUMPY_AVAILABLE:
+        return [calculate_distance_miles(origin_lat, origin_lng, lat, lng) for lat, lng in zip(lats, lngs)]
+    lat1 = np.radians(origin_lat)
+    lat2 = np.radians(np.asarray(lats, dtype=float))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lngs, dtype=float)) - np.radians(origin_lng)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_MILES * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def haversine_miles_matrix(lats_a, lngs_a, lats_b, lngs_b):
+    """
+    N×M distance matrix in miles between points A (rows) and points B (columns).
+    Returns a NumPy array of shape (N, M) (or a list of lists when NumPy is not installed).
+    """
+    if not NUMPY_AVAILABLE:
+        return [haversine_miles_batch(lat, lng, lats_b, lngs_b) for lat, lng in zip(lats_a, lngs_a)]
+    lat1 = np.radians(np.asarray(lats_a, dtype=float))[:, None]
+    lng1 = np.radians(np.asarray(lngs_a, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(lats_b, dtype=float))[None, :]
+    lng2 = np.radians(np.asarray(lngs_b, dtype=float))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_MILES * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def within_radius_batch(origin_lat: float, origin_lng: float, lats, lngs, radii_miles):
+    """
+    Distances from one origin to N centres and a mask of centres whose radius covers the origin.
+    Returns (distances, mask); NumPy arrays, or lists when NumPy is not installed.
+    """
+    distances = haversine_miles_batch(origin_lat, origin_lng, lats, lngs)
+    if not NUMPY_AVAILABLE:
+        return distances, [d <= r for d, r in zip(distances, radii_miles)]
+    return distances, distances <= np.asarray(radii_miles, dtype=float)
+
+
 # Keep old function name for backward compatibility (converts to miles)
 def calculate_distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -55,27 +106,11 @@ def calculate_distance_km(lat1: float, lon1: float, lat2: float, lon2: float) ->
 
 def _geocode_postcode_cached(postcode: str) -> Optional[Dict[str, Any]]:
     """
-    Geocode a postcode with caching to avoid repeated API calls.
-    Cache key: 'geocode_postcode_{normalized_postcode}'
-    Cache duration: 24 hours (postcodes don't change)
+    Geocode a postcode avoiding repeated API calls.
+    geocode_postcode resolves from the offline gazetteer first, then the shared geocode cache
+    (in-process LRU + durable table), and only then calls Google.
     """
-    # Normalize postcode for cache key
-    normalized = postcode.upper().replace(' ', '').strip()
-    cache_key = f'geocode_postcode_{normalized}'
-    
-    # Try cache first
-    cached_result = cache.get(cache_key)
-    if cached_result is not None:
-        return cached_result
-    
-    # Geocode via API
-    result = geocode_postcode(postcode)
-    
-    # Cache for 24 hours (86400 seconds)
-    if result:
-        cache.set(cache_key, result, 86400)
-    
-    return result
+    return geocode_postcode(postcode)
 
 
 def get_staff_for_postcode(postcode: str, service_id: Optional[int] = None, 
@@ -83,20 +118,23 @@ def get_staff_for_postcode(postcode: str, service_id: Optional[int] = None,
                            area_coords_cache: Optional[Dict[str, Dict]] = None) -> List[Staff]:
     """
     Get staff members who can service a given postcode.
-    Uses StaffArea model to check if postcode is within any staff member's service radius.
+    Uses the StaffArea coverage index (see coverage_index) to find areas whose radius covers the postcode.
     When service_id is provided, only areas that apply to that service (or to all services) are considered.
     
-    OPTIMIZED: Accepts pre-validated postcode and area coordinates cache to avoid redundant API calls.
+    OPTIMIZED: Accepts pre-validated postcode to avoid redundant API calls; area centres are geocoded
+    once per index build, not per request.
     
     Args:
         postcode: UK postcode string (e.g., 'SW1A 1AA')
         service_id: Optional. If set, only staff with an area covering this postcode for this service are returned.
         validation_result: Optional pre-validated postcode result (to avoid re-validation)
-        area_coords_cache: Optional dict mapping postcode -> {lat, lng} to avoid re-geocoding
+        area_coords_cache: Deprecated, ignored (area coordinates live in the coverage index)
     
     Returns:
         List of Staff objects that can service this postcode
     """
+    from apps.core.coverage_index import get_coverage_index
+
     # Validate postcode if not provided
     if validation_result is None:
         validation_result = validate_postcode_with_google(postcode)
@@ -105,61 +143,13 @@ def get_staff_for_postcode(postcode: str, service_id: Optional[int] = None,
         return []
     
     validated_postcode = validation_result.get('formatted', postcode)
-    target_lat = validation_result.get('lat')
-    target_lng = validation_result.get('lng')
-    
-    # Base filter: active areas, active staff
-    area_filter = dict(is_active=True, staff__is_active=True)
-    if service_id is not None:
-        # Area applies if service_id is null (all services) or matches this service
-        areas_qs = StaffArea.objects.filter(**area_filter).filter(
-            Q(service_id__isnull=True) | Q(service_id=service_id)
-        ).select_related('staff')
-    else:
-        areas_qs = StaffArea.objects.filter(**area_filter).select_related('staff')
-    
-    # If we don't have coordinates, we can't calculate distance
-    if target_lat is None or target_lng is None:
-        validated_normalized = validated_postcode.upper().replace(' ', '').strip()
-        matching_staff_ids = set()
-        for area in areas_qs:
-            area_normalized = area.postcode.upper().replace(' ', '').strip()
-            if area_normalized == validated_normalized:
-                matching_staff_ids.add(area.staff_id)
-        return Staff.objects.filter(id__in=matching_staff_ids, is_active=True)
-    
-    # Initialize cache if not provided
-    if area_coords_cache is None:
-        area_coords_cache = {}
-    
-    available_staff_ids = set()
-    for area in areas_qs:
-        # Use cache or geocode with caching
-        area_postcode_normalized = area.postcode.upper().replace(' ', '').strip()
-        
-        if area_postcode_normalized not in area_coords_cache:
-            area_geocode = _geocode_postcode_cached(area.postcode)
-            if area_geocode and area_geocode.get('lat') and area_geocode.get('lng'):
-                area_coords_cache[area_postcode_normalized] = {
-                    'lat': area_geocode['lat'],
-                    'lng': area_geocode['lng']
-                }
-            else:
-                area_coords_cache[area_postcode_normalized] = None
-        
-        coords = area_coords_cache.get(area_postcode_normalized)
-        if coords and coords.get('lat') and coords.get('lng'):
-            area_lat = coords['lat']
-            area_lng = coords['lng']
-            distance_miles = calculate_distance_miles(target_lat, target_lng, area_lat, area_lng)
-            if distance_miles <= float(area.radius_miles):
-                available_staff_ids.add(area.staff_id)
-        else:
-            # Fallback: exact postcode match
-            validated_postcode_normalized = validated_postcode.upper().replace(' ', '').strip()
-            if area_postcode_normalized == validated_postcode_normalized:
-                available_staff_ids.add(area.staff_id)
-    
+    pairs = get_coverage_index().covering_pairs(
+        validation_result.get('lat'),
+        validation_result.get('lng'),
+        postcode=validated_postcode,
+        service_id=service_id,
+    )
+    available_staff_ids = {staff_id for staff_id, _ in pairs}
     return Staff.objects.filter(id__in=available_staff_ids, is_active=True).distinct()
 
 
@@ -167,9 +157,12 @@ def get_services_for_postcode(postcode: str):
     """
     Get services available in a postcode area (cached 10 min per postcode).
     Only approved services are returned.
+    A service is available if a covering area is for that service, or a covering area applies to all
+    services and the staff member actively provides it (StaffService).
     """
     from apps.services.models import Service
     from apps.staff.models import StaffService
+    from apps.core.coverage_index import get_coverage_index
 
     normalized = (postcode or '').upper().replace(' ', '').strip()
     if not normalized:
@@ -183,105 +176,24 @@ def get_services_for_postcode(postcode: str):
     if not validation_result.get('valid') or not validation_result.get('is_uk'):
         return Service.objects.none()
     
-    validated_postcode = validation_result.get('formatted', postcode)
-    target_lat = validation_result.get('lat')
-    target_lng = validation_result.get('lng')
-    
-    # Pre-fetch all active staff areas and geocode them once (with caching)
-    all_areas_qs = StaffArea.objects.filter(
-        is_active=True,
-        staff__is_active=True
-    ).select_related('staff', 'service')
-    
-    # Get unique postcodes and geocode them once (with caching)
-    unique_postcodes = set(all_areas_qs.values_list('postcode', flat=True).distinct())
-    area_coords_cache = {}
-    for area_postcode in unique_postcodes:
-        normalized = area_postcode.upper().replace(' ', '').strip()
-        if normalized not in area_coords_cache:
-            geocode_result = _geocode_postcode_cached(area_postcode)
-            if geocode_result and geocode_result.get('lat') and geocode_result.get('lng'):
-                area_coords_cache[normalized] = {
-                    'lat': geocode_result['lat'],
-                    'lng': geocode_result['lng']
-                }
-            else:
-                area_coords_cache[normalized] = None
-    
-    # Find staff IDs that can service this postcode
-    available_staff_ids = set()
-    validated_normalized = validated_postcode.upper().replace(' ', '').strip()
-    
-    for area in all_areas_qs:
-        area_normalized = area.postcode.upper().replace(' ', '').strip()
-        
-        if target_lat and target_lng:
-            # Check distance-based coverage
-            coords = area_coords_cache.get(area_normalized)
-            if coords and coords.get('lat') and coords.get('lng'):
-                distance_miles = calculate_distance_miles(
-                    target_lat, target_lng,
-                    coords['lat'], coords['lng']
-                )
-                if distance_miles <= float(area.radius_miles):
-                    available_staff_ids.add(area.staff_id)
-            elif area_normalized == validated_normalized:
-                # Exact postcode match fallback
-                available_staff_ids.add(area.staff_id)
-        else:
-            # No coordinates - exact postcode match only
-            if area_normalized == validated_normalized:
-                available_staff_ids.add(area.staff_id)
-    
-    if not available_staff_ids:
-        return Service.objects.none()
-    
-    # Get services that have at least one available staff member
-    # A service is available if:
-    # 1. Staff provides the service (StaffService)
-    # 2. Staff has an area covering the postcode (already checked above)
-    # 3. The area is either per-service (service_id matches) or global (service_id is null)
-    
-    # Get all areas for available staff
-    staff_areas = StaffArea.objects.filter(
-        staff_id__in=available_staff_ids,
-        is_active=True,
-        staff__is_active=True
+    pairs = get_coverage_index().covering_pairs(
+        validation_result.get('lat'),
+        validation_result.get('lng'),
+        postcode=validation_result.get('formatted', postcode),
     )
+    if not pairs:
+        return Service.objects.none()
     
-    # Find services where staff has coverage
-    service_ids_with_coverage = set()
-    
-    for area in staff_areas:
-        # Check if this area covers the postcode
-        area_normalized = area.postcode.upper().replace(' ', '').strip()
-        covers_postcode = False
-        
-        if target_lat and target_lng:
-            coords = area_coords_cache.get(area_normalized)
-            if coords and coords.get('lat') and coords.get('lng'):
-                distance_miles = calculate_distance_miles(
-                    target_lat, target_lng,
-                    coords['lat'], coords['lng']
-                )
-                covers_postcode = distance_miles <= float(area.radius_miles)
-            else:
-                covers_postcode = area_normalized == validated_normalized
-        else:
-            covers_postcode = area_normalized == validated_normalized
-        
-        if covers_postcode:
-            # If area is per-service, add that service
-            # If area is global (service_id is null), get all services for this staff
-            if area.service_id:
-                service_ids_with_coverage.add(area.service_id)
-            else:
-                # Global area - get all services this staff provides
-                staff_services = StaffService.objects.filter(
-                    staff_id=area.staff_id,
-                    is_active=True
-                ).values_list('service_id', flat=True)
-                service_ids_with_coverage.update(staff_services)
+    service_ids_with_coverage = {service_id for _, service_id in pairs if service_id}
+    # Global areas (service_id is null) cover every service the staff member provides
+    global_staff_ids = {staff_id for staff_id, service_id in pairs if not service_id}
+    if global_staff_ids:
+        service_ids_with_coverage.update(
+            StaffService.objects.filter(
+                staff_id__in=global_staff_ids,
+                is_active=True
+            ).values_list('service_id', flat=True)
+        )
     
     qs = Service.objects.filter(
         id__in=service_ids_with_coverage,
@@ -0,0 +1,268 @@
+"""
+Local-search route engine: nearest-neighbour tour improved with 2-opt and Or-opt.
+
+Routes are open paths from a fixed first stop (the staff member drives stop to stop, no return
+leg). Without time windows moves are scored by travel time in O(1) using prefix sums, so
+2-opt works on asymmetric (real road) matrices too. With time windows or a shift end, each
+candidate is scored by simulating the day: arriving early waits for the window, arriving late
+or finishing after the shift adds a penalty, so punctuality wins over a shorter drive.
+
+The search starts from the nearest-neighbour tour (or, with windows, the time-ordered tour when
+that scores better) and stops at a local optimum or when the time budget runs out, keeping the
+best tour found.
+"""
+import time
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+# Unreachable / unknown cell cost (seconds)
+UNREACHABLE_SECONDS = 10 ** 7
+
+# One second late (or past shift end) costs as much as this many seconds of driving
+LATE_PENALTY = 10
+
+# Default search budget when the caller does not give one
+DEFAULT_TIME_BUDGET_MS = 2000
+
+# Or-opt moves segments of 1..OR_OPT_MAX_SEGMENT consecutive stops
+OR_OPT_MAX_SEGMENT = 3
+
+TimeWindow = Optional[Tuple[Optional[float], Optional[float]]]
+
+
+class Schedule(NamedTuple):
+    travel_seconds: float
+    arrivals: List[float]  # per position in the tour; empty without a day start
+    late_seconds: float  # total lateness over all windows
+    overrun_seconds: float  # finish past shift end
+    finish: Optional[float]
+
+
+class RoutePlan(NamedTuple):
+    order: List[int]
+    leg_durations: List[int]
+    total_duration: int
+    initial_duration: int  # nearest-neighbour tour travel, for comparison
+    arrivals: List[float]
+    late_seconds: float
+    overrun_seconds: float
+    iterations: int
+    elapsed_ms: float
+    timed_out: bool
+
+
+def durations_from_matrix(matrix) -> List[List[float]]:
+    """Seconds matrix from get_travel_matrix/get_distance_matrix cells (None -> unreachable)."""
+    return [
+        [cell['duration_seconds'] if cell else UNREACHABLE_SECONDS for cell in row]
+        for row in matrix
+    ]
+
+
+def nearest_neighbour(durations: Sequence[Sequence[float]], start_index: int = 0) -> List[int]:
+    n = len(durations)
+    order = [start_index]
+    remaining = set(range(n)) - {start_index}
+    while remaining:
+        row = durations[order[-1]]
+        nxt = min(remaining, key=lambda j: (row[j], j))
+        order.append(nxt)
+        remaining.discard(nxt)
+    return order
+
+
+def chronological(time_windows: Sequence[TimeWindow], start_index: int = 0) -> List[int]:
+    """start_index first, then stops by window start (stops without a window start last)."""
+    def key(i):
+        window = time_windows[i]
+        earliest = window[0] if window else None
+        return (earliest is None, earliest or 0, i)
+    return [start_index] + sorted((i for i in range(len(time_windows)) if i != start_index), key=key)
+
+
+def travel_seconds(durations, order: Sequence[int]) -> float:
+    return sum(durations[a][b] for a, b in zip(order, order[1:]))
+
+
+def simulate(
+    durations,
+    order: Sequence[int],
+    day_start: Optional[float] = None,
+    time_windows: Optional[Sequence[TimeWindow]] = None,
+    service_seconds: Optional[Sequence[float]] = None,
+    shift_end: Optional[float] = None,
+) -> Schedule:
+    """
+    Walk the tour from day_start (seconds since midnight). Each stop's window is
+    (earliest, latest) arrival; early arrivals wait, late ones accumulate lateness.
+    """
+    travel = travel_seconds(durations, order)
+    if day_start is None:
+        return Schedule(travel, [], 0.0, 0.0, None)
+    clock = day_start
+    arrivals = []
+    late = 0.0
+    prev = None
+    for stop in order:
+        if prev is not None:
+            clock += durations[prev][stop]
+        window = time_windows[stop] if time_windows else None
+        if window:
+            earliest, latest = window
+            if earliest is not None and clock < earliest:
+                clock = earliest
+            if latest is not None and clock > latest:
+                late += clock - latest
+        arrivals.append(clock)
+        clock += service_seconds[stop] if service_seconds else 0
+        prev = stop
+    overrun = max(0.0, clock - shift_end) if shift_end is not None else 0.0
+    return Schedule(travel, arrivals, late, overrun, clock)
+
+
+class _Search:
+    """Tour state and move evaluation for one optimize_route call."""
+
+    def __init__(self, durations, order, schedule_args, deadline):
+        self.d = durations
+        self.order = order
+        self.schedule_args = schedule_args
+        self.timed = schedule_args['day_start'] is not None and (
+            any(schedule_args['time_windows'] or []) or schedule_args['shift_end'] is not None
+        )
+        self.deadline = deadline
+        self.iterations = 0
+        self.timed_out = False
+        self.cost = self.score(order)
+
+    def score(self, order) -> float:
+        if not self.timed:
+            return travel_seconds(self.d, order)
+        s = simulate(self.d, order, **self.schedule_args)
+        return s.travel_seconds + LATE_PENALTY * (s.late_seconds + s.overrun_seconds)
+
+    def out_of_time(self) -> bool:
+        self.iterations += 1
+        if self.iterations % 256 == 0 and time.perf_counter() > self.deadline:
+            self.timed_out = True
+        return self.timed_out
+
+    def _prefix(self):
+        d, order = self.d, self.order
+        fwd, bwd = [0.0], [0.0]
+        for a, b in zip(order, order[1:]):
+            fwd.append(fwd[-1] + d[a][b])
+            bwd.append(bwd[-1] + d[b][a])
+        return fwd, bwd
+
+    def two_opt(self) -> bool:
+        """Reverse order[i..k] (first stop fixed). Returns True if the tour improved."""
+        d, order, n = self.d, self.order, len(self.order)
+        fwd, bwd = self._prefix()
+        for i in range(1, n - 1):
+            for k in range(i + 1, n):
+                if self.out_of_time():
+                    return False
+                a, b, c = order[i - 1], order[i], order[k]
+                after = order[k + 1] if k + 1 < n else None
+                delta = d[a][c] - d[a][b] + (bwd[k] - bwd[i]) - (fwd[k] - fwd[i])
+                if after is not None:
+                    delta += d[b][after] - d[c][after]
+                if self.timed:
+                    candidate = order[:i] + order[i:k + 1][::-1] + order[k + 1:]
+                    cost = self.score(candidate)
+                    if cost < self.cost - 1e-9:
+                        self.order, self.cost = candidate, cost
+                        return True
+                elif delta < -1e-9:
+                    order[i:k + 1] = order[i:k + 1][::-1]
+                    self.cost += delta
+                    return True
+        return False
+
+    def or_opt(self) -> bool:
+        """Move a segment of 1..OR_OPT_MAX_SEGMENT stops elsewhere. Returns True if improved."""
+        d, order, n = self.d, self.order, len(self.order)
+        for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+            for i in range(1, n - length + 1):
+                j = i + length - 1  # segment order[i..j]
+                prev, first, last = order[i - 1], order[i], order[j]
+                nxt = order[j + 1] if j + 1 < n else None
+                removal = d[prev][first] + d[last][nxt] - d[prev][nxt] if nxt is not None else d[prev][first]
+                rest = order[:i] + order[j + 1:]
+                segment = order[i:j + 1]
+                for p in range(len(rest)):
+                    if self.out_of_time():
+                        return False
+                    if p == i - 1:
+                        continue  # same place
+                    a = rest[p]
+                    b = rest[p + 1] if p + 1 < len(rest) else None
+                    insertion = d[a][first] + (d[last][b] - d[a][b] if b is not None else 0)
+                    if self.timed:
+                        candidate = rest[:p + 1] + segment + rest[p + 1:]
+                        cost = self.score(candidate)
+                        if cost < self.cost - 1e-9:
+                            self.order, self.cost = candidate, cost
+                            return True
+                    elif insertion - removal < -1e-9:
+                        self.order = rest[:p + 1] + segment + rest[p + 1:]
+                        self.cost += insertion - removal
+                        return True
+        return False
+
+
+def optimize_route(
+    durations: Sequence[Sequence[float]],
+    start_index: int = 0,
+    day_start: Optional[float] = None,
+    time_windows: Optional[Sequence[TimeWindow]] = None,
+    service_seconds: Optional[Sequence[float]] = None,
+    shift_end: Optional[float] = None,
+    time_budget_ms: Optional[float] = None,
+    initial_order: Optional[List[int]] = None,
+) -> RoutePlan:
+    """
+    Best open tour from start_index found within time_budget_ms.
+
+    durations: n x n travel seconds (see durations_from_matrix).
+    day_start, shift_end, time_windows: seconds since midnight; a window is (earliest, latest)
+    arrival with either end None. Windows and shift end are only used when day_start is given.
+    service_seconds: time spent at each stop.
+    """
+    started = time.perf_counter()
+    n = len(durations)
+    if n <= 1:
+        return RoutePlan(list(range(n)), [], 0, 0, [day_start] if n and day_start is not None else [], 0.0, 0.0, 0, 0.0, False)
+    budget = DEFAULT_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+    schedule_args = {
+        'day_start': day_start,
+        'time_windows': time_windows,
+        'service_seconds': service_seconds,
+        'shift_end': shift_end,
+    }
+    greedy = nearest_neighbour(durations, start_index)
+    initial = travel_seconds(durations, greedy)
+    search = _Search(durations, list(initial_order or greedy), schedule_args, started + budget / 1000.0)
+    if search.timed and time_windows and not initial_order:
+        # Booked windows: the time-ordered tour is usually a far better start than the nearest one
+        by_time = chronological(time_windows, start_index)
+        cost = search.score(by_time)
+        if cost < search.cost:
+            search.order, search.cost = by_time, cost
+    while not search.timed_out and (search.two_opt() or search.or_opt()):
+        pass
+    order = search.order
+    schedule = simulate(durations, order, **schedule_args)
+    legs = [int(round(durations[a][b])) for a, b in zip(order, order[1:])]
+    return RoutePlan(
+        order=order,
+        leg_durations=legs,
+        total_duration=sum(legs),
+        initial_duration=int(round(initial)),
+        arrivals=schedule.arrivals,
+        late_seconds=schedule.late_seconds,
+        overrun_seconds=schedule.overrun_seconds,
+        iterations=search.iterations,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        timed_out=search.timed_out,
+    )
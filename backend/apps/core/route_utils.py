@@ -1,10 +1,18 @@
 """
 Route optimization utilities.
-Google Maps integration: geocode address, Distance Matrix API, greedy route ordering.
+Google Maps integration: geocode address, Distance Matrix API (one request; tiled, cached and
+concurrent for larger matrices in distance_matrix.py, with haversine estimate fallback),
+greedy route ordering.
 """
 import requests
 from django.conf import settings
 
+# Average door-to-door driving speed used to turn straight-line distance into travel time
+# when the Distance Matrix API is unavailable
+AVERAGE_SPEED_MPH = 20.0
+
+METERS_PER_MILE = 1609.344
+
 
 def geocode_address(address_line1, city=None, postcode=None, country='United Kingdom'):
     """
@@ -37,9 +45,11 @@ def geocode_address(address_line1, city=None, postcode=None, country='United Kin
     return None
 
 
-def get_distance_matrix(origins, destinations, api_key=None):
+def get_distance_matrix(origins, destinations, api_key=None, session=None):
     """
     Get travel time (seconds) and distance (meters) matrix via Google Distance Matrix API.
+    One request: at most 25 origins/destinations and 100 elements (see distance_matrix.get_travel_matrix).
+    session: optional requests.Session to reuse pooled connections.
     origins: list of dicts [{'lat': float, 'lng': float}] or [{'address': str}]
     destinations: same format.
     Returns:
@@ -65,7 +75,7 @@ def get_distance_matrix(origins, destinations, api_key=None):
         'units': 'metric',
     }
     try:
-        resp = requests.get(url, params=params, timeout=15)
+        resp = (session or requests).get(url, params=params, timeout=15)
         if resp.status_code != 200:
             return None
         data = resp.json()
@@ -91,6 +101,30 @@ def get_distance_matrix(origins, destinations, api_key=None):
         return None
 
 
+def estimate_distance_matrix(origins, destinations):
+    """
+    Straight-line (haversine) estimate in the get_distance_matrix shape, computed in one vectorized call.
+    origins/destinations: lists of {'lat': float, 'lng': float}.
+    Travel time assumes AVERAGE_SPEED_MPH.
+    """
+    from apps.core.postcode_utils import haversine_miles_matrix
+
+    miles = haversine_miles_matrix(
+        [o['lat'] for o in origins], [o['lng'] for o in origins],
+        [d['lat'] for d in destinations], [d['lng'] for d in destinations],
+    )
+    return [
+        [
+            {
+                'duration_seconds': int(round(float(m) / AVERAGE_SPEED_MPH * 3600)),
+                'distance_meters': int(round(float(m) * METERS_PER_MILE)),
+            }
+            for m in row
+        ]
+        for row in miles
+    ]
+
+
 def optimize_route_greedy(stops_lat_lng, start_index=0):
     """
     Greedy nearest-neighbour route optimization.
@@ -104,12 +138,9 @@ def optimize_route_greedy(stops_lat_lng, start_index=0):
     n = len(stops_lat_lng)
     if n <= 1:
         return list(range(n)), [], 0
-    api_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', None) or getattr(settings, 'GOOGLE_PLACES_API_KEY', None)
-    if not api_key:
-        return list(range(n)), [], 0
-    matrix = get_distance_matrix(stops_lat_lng, stops_lat_lng, api_key)
-    if not matrix or len(matrix) != n:
-        return list(range(n)), [], 0
+    from .distance_matrix import get_travel_matrix
+    # Tiled/cached API matrix; cells the API cannot provide use the straight-line estimate
+    matrix = get_travel_matrix(stops_lat_lng, stops_lat_lng)
     order = [start_index]
     remaining = set(range(n)) - {start_index}
     leg_durations = []
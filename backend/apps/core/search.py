@@ -0,0 +1,279 @@
+"""
+Admin search over customers, orders and staff.
+
+Every searchable row has a SearchDocument holding its display title/subtitle and a lowercased
+document: names, emails, phone numbers (also as digits only), postcodes (also without the space)
+and order numbers. signals.py writes documents on save/delete; after bulk loads that bypass
+signals run `manage.py rebuild_search_index`.
+
+Matching is index-backed on both supported databases:
+- PostgreSQL: a pg_trgm GIN index on document serves substring matches (LIKE '%term%') and a
+  GIN tsvector index serves words in any order; rank is the better of word_similarity and ts_rank.
+- SQLite: the core_search_fts FTS5 table (trigram tokenizer), kept in step with
+  core_search_document by triggers. bm25 would read every match's doclist, so candidates are
+  ranked by where the term first appears instead: in the name or order number (the start of the
+  document) before an email or postcode, and shorter documents first.
+Other databases (or SQLite without FTS5) fall back to an unindexed icontains scan.
+
+Titles starting with the query rank first. Ranking looks at no more than MAX_CANDIDATES matches,
+so a term found in most rows (a mail domain) costs about as much as a rare one. A document starts
+with its lowercased title, so title-prefix matches are read separately from the (kind, document)
+b-tree index as a prefix range and always join the candidates, however many other rows match.
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+
+from django.apps import apps as django_apps
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+KINDS = ('customer', 'order', 'staff')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_CANDIDATES = 1000
+REBUILD_BATCH = 5000
+FTS_TABLE = 'core_search_fts'
+# FTS5 trigram tokens are three characters; shorter words are matched with LIKE
+MIN_FTS_WORD = 3
+# Upper bound of a prefix range: sorts after every string starting with the prefix
+PREFIX_END = '\U0010ffff'
+
+# kind -> model, document fields, title field, subtitle fields (first non-empty wins)
+SOURCES = {
+    'customer': {
+        'model': 'customers.Customer',
+        'fields': ('name', 'email', 'phone', 'postcode'),
+        'title': 'name',
+        'subtitle': ('email', 'postcode'),
+    },
+    'order': {
+        'model': 'orders.Order',
+        'fields': ('order_number', 'guest_name', 'guest_email', 'guest_phone', 'postcode'),
+        'title': 'order_number',
+        'subtitle': ('guest_email', 'guest_name', 'postcode'),
+    },
+    'staff': {
+        'model': 'staff.Staff',
+        'fields': ('name', 'email', 'phone'),
+        'title': 'name',
+        'subtitle': ('email', 'phone'),
+    },
+}
+
+_fts_available = None
+
+
+def build_document(values: Iterable) -> str:
+    """Lowercased search text; spaced values are added compacted too, phone-like values as digits."""
+    terms = []
+    for value in values:
+        text = str(value or '').strip().lower()
+        if not text:
+            continue
+        terms.append(text)
+        compact = text.replace(' ', '')
+        if compact != text:
+            terms.append(compact)
+        digits = re.sub(r'\D', '', text)
+        if len(digits) >= 6 and digits != compact:
+            terms.append(digits)
+    return ' '.join(terms)
+
+
+def document_fields(kind: str, row: Dict) -> Dict[str, str]:
+    """title, subtitle and document for one source row (a dict of its SOURCES fields)."""
+    source = SOURCES[kind]
+    subtitle = next((str(row[name]) for name in source['subtitle'] if row.get(name)), '')
+    return {
+        'title': str(row.get(source['title']) or '')[:255],
+        'subtitle': subtitle[:255],
+        'document': build_document(row.get(name) for name in source['fields']),
+    }
+
+
+def index_instance(kind: str, instance, created: bool = False) -> None:
+    """Write instance's document: one UPDATE for an existing row, one INSERT for a new one."""
+    from apps.core.models import SearchDocument
+
+    row = {name: getattr(instance, name) for name in SOURCES[kind]['fields']}
+    fields = document_fields(kind, row)
+    if not created and SearchDocument.objects.filter(kind=kind, object_id=instance.pk).update(**fields):
+        return
+    SearchDocument.objects.create(kind=kind, object_id=instance.pk, **fields)
+
+
+def remove_instance(kind: str, pk) -> None:
+    from apps.core.models import SearchDocument
+
+    SearchDocument.objects.filter(kind=kind, object_id=pk).delete()
+
+
+def rebuild(kinds: Iterable[str] = KINDS, apps=django_apps) -> Dict[str, int]:
+    """Recreate the documents of kinds from their tables; apps may be a migration's historical apps."""
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    counts = {}
+    for kind in kinds:
+        source = SOURCES[kind]
+        SearchDocument.objects.filter(kind=kind).delete()
+        fields = ('pk',) + source['fields']
+        rows = apps.get_model(*source['model'].split('.')).objects.order_by().values_list(*fields)
+        batch, count = [], 0
+        for values in rows.iterator(chunk_size=REBUILD_BATCH):
+            row = dict(zip(fields, values))
+            batch.append(SearchDocument(kind=kind, object_id=row['pk'], **document_fields(kind, row)))
+            if len(batch) == REBUILD_BATCH:
+                SearchDocument.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        counts[kind] = count + len(batch)
+    return counts
+
+
+def _like(term: str) -> str:
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _has_fts() -> bool:
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def _kind_filter(kinds, column):
+    if not kinds:
+        return '', []
+    return f" AND {column} IN ({', '.join(['%s'] * len(kinds))})", list(kinds)
+
+
+def _postgresql(query, kinds, limit):
+    kind_sql, kind_params = _kind_filter(kinds, 'kind')
+    prefix_kind_sql, prefix_kind_params = _kind_filter(kinds or KINDS, 'kind')
+    columns = "id, kind, object_id, title, subtitle, document"
+    sql = (
+        "SELECT kind, object_id, title, subtitle,"
+        " GREATEST(word_similarity(%s, document),"
+        " ts_rank(to_tsvector('simple', document), plainto_tsquery('simple', %s))) AS score FROM ("
+        # Title-prefix matches (text_pattern_ops index), then any matches
+        f" (SELECT {columns} FROM core_search_document WHERE document LIKE %s{prefix_kind_sql} LIMIT %s)"
+        " UNION"
+        f" (SELECT {columns} FROM core_search_document"
+        " WHERE (document LIKE %s OR to_tsvector('simple', document) @@ plainto_tsquery('simple', %s))"
+        f"{kind_sql} LIMIT %s)"
+        ") candidates ORDER BY title ILIKE %s DESC, score DESC, object_id LIMIT %s"
+    )
+    params = [
+        query, query, f'{_like(query)}%', *prefix_kind_params, MAX_CANDIDATES,
+        f'%{_like(query)}%', query, *kind_params, MAX_CANDIDATES, f'{_like(query)}%', limit,
+    ]
+    return sql, params
+
+
+def _sqlite(query, kinds, limit):
+    words = query.split()
+    long_words = [word for word in words if len(word) >= MIN_FTS_WORD]
+    if not long_words:
+        return None
+    kind_sql, kind_params = _kind_filter(kinds, 'd.kind')
+    # The prefix range always names the kinds, so it is served by the (kind, document) index
+    prefix_kind_sql, prefix_kind_params = _kind_filter(kinds or KINDS, 'd.kind')
+    short_sql = ''.join(" AND d.document LIKE %s ESCAPE '\\'" for word in words if len(word) < MIN_FTS_WORD)
+    match = ' AND '.join('"%s"' % word.replace('"', '""') for word in long_words)
+    columns = "d.id, d.kind, d.object_id, d.title, d.subtitle, d.document"
+    sql = (
+        "SELECT kind, object_id, title, subtitle, 1.0 / instr(document, %s) AS score FROM ("
+        # Title-prefix matches: a range on the document index (binary collation)
+        f" SELECT * FROM (SELECT {columns} FROM core_search_document d"
+        f" WHERE d.document >= %s AND d.document < %s{prefix_kind_sql} LIMIT %s)"
+        " UNION"
+        # CROSS JOIN keeps the FTS match as the outer loop (SQLite would otherwise scan d by kind)
+        f" SELECT * FROM (SELECT {columns}"
+        f" FROM {FTS_TABLE} CROSS JOIN core_search_document d ON d.id = {FTS_TABLE}.rowid"
+        f" WHERE {FTS_TABLE} MATCH %s{short_sql}{kind_sql} LIMIT %s)"
+        ") ORDER BY title LIKE %s ESCAPE '\\' DESC, score DESC, length(document), object_id LIMIT %s"
+    )
+    params = [
+        long_words[0], query, query + PREFIX_END, *prefix_kind_params, MAX_CANDIDATES,
+        match, *(f'%{_like(word)}%' for word in words if len(word) < MIN_FTS_WORD), *kind_params,
+        MAX_CANDIDATES, f'{_like(query)}%', limit,
+    ]
+    return sql, params
+
+
+def matching_ids(query: str, kind: str) -> Optional[RawSQL]:
+    """
+    Subquery of the object_ids of kind whose document contains every word of query, unranked and
+    unlimited, for filtering a list (pk__in=...). None when the index cannot serve the query
+    (another database, SQLite without FTS5, or only words shorter than MIN_FTS_WORD on SQLite).
+    """
+    words = query.lower().split()
+    if not words:
+        return None
+    likes = [f'%{_like(word)}%' for word in words]
+    if connection.vendor == 'postgresql':
+        return RawSQL(
+            "SELECT object_id FROM core_search_document WHERE kind = %s"
+            + "".join(" AND document LIKE %s" for _ in words),
+            [kind, *likes],
+        )
+    long_words = [word for word in words if len(word) >= MIN_FTS_WORD]
+    if connection.vendor != 'sqlite' or not long_words or not _has_fts():
+        return None
+    match = ' AND '.join('"%s"' % word.replace('"', '""') for word in long_words)
+    short = [like for word, like in zip(words, likes) if len(word) < MIN_FTS_WORD]
+    return RawSQL(
+        f"SELECT d.object_id FROM {FTS_TABLE} CROSS JOIN core_search_document d ON d.id = {FTS_TABLE}.rowid"
+        f" WHERE {FTS_TABLE} MATCH %s AND d.kind = %s"
+        + "".join(" AND d.document LIKE %s ESCAPE '\\'" for _ in short),
+        [match, kind, *short],
+    )
+
+
+def narrow(queryset, kind: str, query: str):
+    """
+    queryset limited to rows whose document matches query, when the index can serve it. Documents
+    hold every searchable field, so a field filter applied afterwards (email__icontains=query)
+    returns the same rows as on its own, without scanning the table.
+    """
+    ids = matching_ids(query, kind)
+    return queryset if ids is None else queryset.filter(pk__in=ids)
+
+
+def _scan(query, kinds, limit):
+    from apps.core.models import SearchDocument
+
+    documents = SearchDocument.objects.all()
+    for word in query.split():
+        documents = documents.filter(document__contains=word)
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+    return [
+        (row['kind'], row['object_id'], row['title'], row['subtitle'], 0.0)
+        for row in documents.order_by('title', 'object_id')
+        .values('kind', 'object_id', 'title', 'subtitle')[:limit]
+    ]
+
+
+def search(query: str, kinds: Optional[Iterable[str]] = None, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+    """Best matches for query, at most limit, as {kind, id, title, subtitle, score}."""
+    query = ' '.join(query.lower().split())
+    if not query:
+        return []
+    kinds = [kind for kind in (kinds or ()) if kind in SOURCES]
+    limit = max(1, min(limit, MAX_LIMIT))
+    statement = None
+    if connection.vendor == 'postgresql':
+        statement = _postgresql(query, kinds, limit)
+    elif connection.vendor == 'sqlite' and _has_fts():
+        statement = _sqlite(query, kinds, limit)
+    if statement is None:
+        rows = _scan(query, kinds, limit)
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(*statement)
+            rows = cursor.fetchall()
+    return [
+        {'kind': kind, 'id': object_id, 'title': title, 'subtitle': subtitle, 'score': round(float(score), 4)}
+        for kind, object_id, title, subtitle, score in rows
+    ]
@@ -0,0 +1,46 @@
+"""
+Shared serializer helpers.
+"""
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _names(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Lets a GET request choose the fields of the top-level objects it gets back:
+        ?fields=id,status,start_time    only these fields
+        ?expand=staff,service           nested objects (Meta.expandable_fields) to include
+    With either parameter, nested objects listed in Meta.expandable_fields are left out unless named
+    in fields or expand; with neither, every field is returned as before. Unknown names are ignored.
+    Nested serializers are never trimmed, only the objects the endpoint lists or returns.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET' or not self._is_root():
+            return fields
+        wanted, expand = _names(request, FIELDS_PARAM), _names(request, EXPAND_PARAM)
+        if wanted is None and expand is None:
+            return fields
+        expandable = set(getattr(self.Meta, 'expandable_fields', ()))
+        keep = (wanted if wanted is not None else set(fields) - expandable) | (expand or set())
+        for name in list(fields):
+            if name not in keep:
+                fields.pop(name)
+        return fields
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
@@ -0,0 +1,42 @@
+"""
+Core signals.
+
+Keep the in-process StaffArea coverage index (see coverage_index) and the admin search
+documents (see search) in step with the database.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.customers.models import Customer
+from apps.orders.models import Order
+from apps.staff.models import Staff, StaffArea
+from . import search
+from .coverage_index import invalidate_coverage_index
+
+SEARCH_KINDS = {Customer: 'customer', Order: 'order', Staff: 'staff'}
+
+
+@receiver(post_save, sender=StaffArea)
+@receiver(post_delete, sender=StaffArea)
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+def invalidate_coverage_for_area(sender, instance, **kwargs):
+    invalidate_coverage_index()
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Staff)
+def index_search_document(sender, instance, created=False, update_fields=None, **kwargs):
+    kind = SEARCH_KINDS[sender]
+    # Saves of other fields only (status, payment, timestamps) leave the document unchanged
+    if update_fields is not None and not set(update_fields) & set(search.SOURCES[kind]['fields']):
+        return
+    search.index_instance(kind, instance, created=created)
+
+
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Staff)
+def remove_search_document(sender, instance, **kwargs):
+    search.remove_instance(SEARCH_KINDS[sender], instance.pk)
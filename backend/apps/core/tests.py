@@ -1,3 +1,605 @@
-from django.test import TestCase
+"""
+Core tests.
 
-# Core tests
+Coverage index: grid lookups return exactly the areas a brute-force haversine scan finds,
+and the process index follows StaffArea changes. Batch haversine matches the scalar formula.
+Offline gazetteer: imported postcodes validate and geocode without Google.
+Geocode cache: Google results are served from the LRU / durable table after the first call.
+Cache namespaces: each alias is a separate store with its own TTL and size.
+Travel matrix: large matrices are tiled within API limits, cached per cell and estimated on failure.
+Route engine: 2-opt/Or-opt never loses to the greedy tour and honours arrival windows.
+Background jobs: deduplicated per key, retried with backoff, claimed once, visible to admins.
+Query instrumentation: every response carries its query count and time, heavy requests are logged.
+Keyset pagination: cursors walk a list once in (ordering field, id) order, both ways, without counting.
+Sparse fieldsets: fields= / expand= trim the listed objects but not their nested serializers.
+Admin search: documents follow saves and deletes, match fragments, rank title prefixes first.
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core import geocode_cache, jobs
+from apps.core.address import geocode_postcode, validate_postcode_with_google
+from apps.core.caches import GEOCODE_CACHE, SLOTS_CACHE, get_cache
+from apps.core.coverage_index import CoverageArea, CoverageIndex, get_coverage_index
+from apps.core.distance_matrix import cell_cache_key, get_travel_matrix
+from apps.core.models import BackgroundJob, GeocodeCacheEntry
+from apps.core.postcode_utils import (
+    calculate_distance_miles,
+    get_staff_for_postcode,
+    haversine_miles_matrix,
+    within_radius_batch,
+)
+from apps.core.route_engine import durations_from_matrix, nearest_neighbour, optimize_route, travel_seconds
+from apps.core.route_utils import estimate_distance_matrix, optimize_route_greedy
+from apps.customers.models import Customer
+from apps.staff.models import Staff, StaffArea
+
+
+class BatchHaversineTests(SimpleTestCase):
+    """Vectorized distance helpers agree with calculate_distance_miles."""
+
+    def test_batch_and_matrix_match_scalar(self):
+        rng = random.Random(1)
+        points = [(rng.uniform(50.0, 55.0), rng.uniform(-4.0, 1.0)) for _ in range(20)]
+        lats, lngs = [p[0] for p in points], [p[1] for p in points]
+        radii = [10.0] * len(points)
+        distances, mask = within_radius_batch(51.5, -0.1, lats, lngs, radii)
+        matrix = haversine_miles_matrix(lats[:5], lngs[:5], lats, lngs)
+        for j, (lat, lng) in enumerate(points):
+            expected = calculate_distance_miles(51.5, -0.1, lat, lng)
+            self.assertAlmostEqual(float(distances[j]), expected, places=6)
+            self.assertEqual(bool(mask[j]), expected <= 10.0)
+            for i in range(5):
+                self.assertAlmostEqual(
+                    float(matrix[i][j]), calculate_distance_miles(lats[i], lngs[i], lat, lng), places=6
+                )
+
+
+class CoverageIndexTests(SimpleTestCase):
+    """CoverageIndex.covering against a brute-force scan."""
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.areas = [
+            CoverageArea(
+                area_id=i, staff_id=i % 50, service_id=(i % 3) or None, postcode=f'AB{i}1AA',
+                radius_miles=rng.uniform(1, 30), lat=rng.uniform(50.0, 55.0), lng=rng.uniform(-4.0, 1.0),
+            )
+            for i in range(500)
+        ]
+        self.areas.append(CoverageArea(999, 7, None, 'SW1A1AA', 5.0, None, None))
+        self.index = CoverageIndex(self.areas)
+        self.rng = rng
+
+    def test_matches_brute_force(self):
+        for _ in range(200):
+            lat, lng = self.rng.uniform(50.0, 55.0), self.rng.uniform(-4.0, 1.0)
+            expected = {
+                a.area_id for a in self.areas
+                if a.lat is not None and calculate_distance_miles(lat, lng, a.lat, a.lng) <= a.radius_miles
+            }
+            self.assertEqual({a.area_id for a in self.index.covering(lat, lng)}, expected)
+
+    def test_service_filter_and_postcode_fallback(self):
+        pairs = self.index.covering_pairs(None, None, postcode='sw1a 1aa', service_id=2)
+        self.assertEqual(pairs, {(7, None)})
+        lat, lng = self.areas[0].lat, self.areas[0].lng
+        for area in self.index.covering(lat, lng, service_id=1):
+            self.assertIn(area.service_id, (None, 1))
+
+
+class CoverageIndexInvalidationTests(TestCase):
+    """get_staff_for_postcode follows StaffArea changes through the process index."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_area_changes_rebuild_index(self):
+        staff = Staff.objects.create(name='Alice', email='alice@test.com')
+        self.assertEqual(list(get_staff_for_postcode('SW1A 1AA')), [])
+        area = StaffArea.objects.create(staff=staff, postcode='SW1A 1AA', radius_miles=5)
+        self.assertEqual(list(get_staff_for_postcode('SW1A 1AA')), [staff])
+        index = get_coverage_index()
+        self.assertIs(get_coverage_index(), index)
+        area.is_active = False
+        area.save()
+        self.assertEqual(list(get_staff_for_postcode('SW1A 1AA')), [])
+
+
+class GazetteerTests(SimpleTestCase):
+    """import_postcodes builds a lookup file that geocode_postcode/validate use before Google."""
+
+    def setUp(self):
+        cache.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'postcodes.sqlite3')
+        csv_path = os.path.join(self.tmpdir.name, 'onspd.csv')
+        with open(csv_path, 'w') as f:
+            f.write('pcd,pcds,doterm,lat,long\n')
+            f.write('SW1A1AA,SW1A 1AA,,51.501009,-0.141588\n')
+            f.write('EC1A1BB,EC1A 1BB,200101,51.520180,-0.097444\n')
+            f.write('ZZ991ZZ,ZZ99 1ZZ,,99.999999,0.000000\n')
+        call_command('import_postcodes', csv_path, output=self.path, stdout=StringIO())
+
+    def test_geocode_and_validate_from_gazetteer(self):
+        with override_settings(POSTCODE_GAZETTEER_PATH=self.path, GOOGLE_MAPS_API_KEY='unused'):
+            result = geocode_postcode('sw1a1aa')
+            self.assertEqual(result['source'], 'gazetteer')
+            self.assertAlmostEqual(result['lat'], 51.501009)
+            validation = validate_postcode_with_google('SW1A 1AA')
+            self.assertTrue(validation['valid'])
+            self.assertAlmostEqual(validation['lng'], -0.141588)
+
+    def test_terminated_and_missing_coordinates_skipped(self):
+        from apps.core.gazetteer import lookup_postcode
+        with override_settings(POSTCODE_GAZETTEER_PATH=self.path):
+            self.assertIsNotNone(lookup_postcode('SW1A 1AA'))
+            self.assertIsNone(lookup_postcode('EC1A 1BB'))
+            self.assertIsNone(lookup_postcode('ZZ99 1ZZ'))
+
+
+def fake_google(postcode):
+    return {'lat': 51.5, 'lng': -0.12, 'formatted_address': postcode, 'valid': True, 'is_uk': True}
+
+
+@override_settings(POSTCODE_GAZETTEER_PATH='/nonexistent/postcodes.sqlite3')
+class GeocodeCacheTests(TestCase):
+    """geocode_postcode: LRU -> durable table -> Google, with counters and warm-up."""
+
+    def setUp(self):
+        geocode_cache.clear_lru()
+        self.addCleanup(geocode_cache.clear_lru)
+
+    def test_google_called_once_then_lru_then_table(self):
+        with mock.patch('apps.core.address._geocode_postcode_uncached', side_effect=fake_google) as google:
+            self.assertEqual(geocode_postcode('sw1a 1aa')['lat'], 51.5)
+            self.assertEqual(geocode_postcode('SW1A1AA')['lat'], 51.5)
+            self.assertEqual(google.call_count, 1)
+            self.assertTrue(GeocodeCacheEntry.objects.filter(postcode='SW1A1AA').exists())
+
+            geocode_cache.clear_lru()  # e.g. another worker or a restart
+            with self.assertNumQueries(1):
+                self.assertEqual(geocode_postcode('SW1A 1AA')['lng'], -0.12)
+            self.assertEqual(google.call_count, 1)
+        self.assertEqual(geocode_cache.get_stats()['db_hits'], 1)
+
+    def test_results_without_coordinates_kept_in_lru_only(self):
+        no_coords = {'lat': None, 'lng': None, 'valid': True, 'is_uk': True}
+        with mock.patch('apps.core.address._geocode_postcode_uncached', return_value=no_coords) as google:
+            geocode_postcode('SW1A 1AA')
+            geocode_postcode('SW1A 1AA')
+            self.assertEqual(google.call_count, 1)
+            self.assertFalse(GeocodeCacheEntry.objects.exists())
+            with mock.patch('apps.core.geocode_cache.time.monotonic', return_value=time.monotonic() + 3600):
+                geocode_postcode('SW1A 1AA')
+            self.assertEqual(google.call_count, 2)
+
+    @override_settings(GEOCODE_LRU_SIZE=2)
+    def test_lru_evicts_least_recently_used(self):
+        for postcode in ('A11AA', 'B11BB', 'C11CC'):
+            geocode_cache.store_geocode(postcode, fake_google(postcode))
+        self.assertEqual(geocode_cache.get_stats()['lru_size'], 2)
+        geocode_cache.get_cached_geocode('A11AA')
+        self.assertEqual(geocode_cache.get_stats()['db_hits'], 1)
+
+    def test_warm_command_geocodes_staff_and_customer_postcodes(self):
+        staff = Staff.objects.create(name='Alice', email='alice@test.com')
+        StaffArea.objects.create(staff=staff, postcode='SW1A 1AA', radius_miles=5)
+        Customer.objects.create(name='Bob', email='bob@test.com', postcode='ec1a 1bb')
+        with mock.patch(
+            'apps.core.management.commands.warm_geocode_cache._geocode_postcode_uncached',
+            side_effect=fake_google,
+        ) as google:
+            call_command('warm_geocode_cache', stdout=StringIO())
+            call_command('warm_geocode_cache', stdout=StringIO())
+        self.assertEqual(google.call_count, 2)
+        self.assertEqual(
+            set(GeocodeCacheEntry.objects.values_list('postcode', flat=True)), {'SW1A1AA', 'EC1A1BB'}
+        )
+
+
+class CacheNamespaceTests(SimpleTestCase):
+    """Namespace aliases are isolated stores; unknown aliases fall back to default."""
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def test_geocode_noise_does_not_evict_slots(self):
+        get_cache(SLOTS_CACHE).set('slots_hot', 'payload')
+        geocode = get_cache(GEOCODE_CACHE)
+        max_entries = settings.CACHES[GEOCODE_CACHE]['OPTIONS']['MAX_ENTRIES']
+        geocode.set_many({f'addr_autocomplete_{i}': i for i in range(max_entries + 10)})
+        self.assertEqual(get_cache(SLOTS_CACHE).get('slots_hot'), 'payload')
+        self.assertIsNone(cache.get('slots_hot'))
+        self.assertIs(get_cache('not_configured'), caches['default'])
+
+    def test_redis_backend_config(self):
+        from config.settings.base import CACHE_NAMESPACES, build_caches
+        redis_caches = build_caches('redis')
+        self.assertEqual(set(redis_caches), set(CACHE_NAMESPACES))
+        self.assertEqual(redis_caches['slots']['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+        self.assertEqual(redis_caches['slots']['KEY_PREFIX'], 'slots')
+        self.assertEqual(redis_caches['auth_state']['TIMEOUT'], CACHE_NAMESPACES['auth_state'][0])
+
+
+@override_settings(GOOGLE_MAPS_API_KEY='test-key')
+class TravelMatrixTests(SimpleTestCase):
+    """get_travel_matrix: tiling, per-cell cache and haversine fallback for 50+ stops."""
+
+    def setUp(self):
+        get_cache(GEOCODE_CACHE).clear()
+        rng = random.Random(7)
+        self.stops = [{'lat': rng.uniform(51.3, 51.7), 'lng': rng.uniform(-0.4, 0.2)} for _ in range(60)]
+        self.calls = []
+
+    def fake_api(self, origins, destinations, api_key=None, session=None):
+        self.calls.append((len(origins), len(destinations)))
+        return estimate_distance_matrix(origins, destinations)
+
+    def test_tiles_within_api_limits_then_served_from_cache(self):
+        with mock.patch('apps.core.route_utils.get_distance_matrix', side_effect=self.fake_api):
+            matrix = get_travel_matrix(self.stops, self.stops)
+            self.assertTrue(self.calls)
+            for rows, cols in self.calls:
+                self.assertLessEqual(rows, 25)
+                self.assertLessEqual(cols, 25)
+                self.assertLessEqual(rows * cols, 100)
+            # Every cell but the same-point diagonal, each requested once
+            self.assertEqual(sum(r * c for r, c in self.calls), 60 * 60 - 60)
+            self.assertEqual(matrix[0][0]['source'], 'same_point')
+            self.assertEqual(matrix[0][1]['source'], 'api')
+
+            self.calls.clear()
+            again = get_travel_matrix(self.stops, self.stops)
+            self.assertEqual(self.calls, [])
+            self.assertEqual(again[5][9]['source'], 'cache')
+            self.assertEqual(again[5][9]['duration_seconds'], matrix[5][9]['duration_seconds'])
+
+    def test_scattered_misses_request_only_uncached_cells(self):
+        with mock.patch('apps.core.route_utils.get_distance_matrix', side_effect=self.fake_api):
+            get_travel_matrix(self.stops, self.stops)
+            get_cache(GEOCODE_CACHE).delete(cell_cache_key(self.stops[5], self.stops[9]))
+            self.calls.clear()
+            matrix = get_travel_matrix(self.stops, self.stops)
+            self.assertEqual(self.calls, [(1, 1)])
+            self.assertEqual(matrix[5][9]['source'], 'api')
+
+            for i, j in ((2, 7), (2, 40), (30, 7), (44, 3)):
+                get_cache(GEOCODE_CACHE).delete(cell_cache_key(self.stops[i], self.stops[j]))
+            self.calls.clear()
+            get_travel_matrix(self.stops, self.stops)
+            self.assertEqual(sum(r * c for r, c in self.calls), 4)
+
+    def test_api_failure_falls_back_to_estimate(self):
+        with mock.patch('apps.core.route_utils.get_distance_matrix', return_value=None):
+            matrix = get_travel_matrix(self.stops, self.stops)
+            order, legs, total = optimize_route_greedy(self.stops)
+        self.assertEqual(matrix[3][4]['source'], 'estimate')
+        self.assertEqual(sorted(order), list(range(60)))
+        self.assertEqual(len(legs), 59)
+        self.assertGreater(total, 0)
+        self.assertIsNone(get_cache(GEOCODE_CACHE).get(cell_cache_key(self.stops[3], self.stops[4])))
+
+
+class RouteEngineTests(SimpleTestCase):
+    """optimize_route: local search over the greedy tour, with and without time windows."""
+
+    def setUp(self):
+        rng = random.Random(3)
+        self.stops = [{'lat': rng.uniform(51.3, 51.7), 'lng': rng.uniform(-0.4, 0.2)} for _ in range(40)]
+        self.durations = durations_from_matrix(estimate_distance_matrix(self.stops, self.stops))
+
+    def test_improves_on_greedy(self):
+        plan = optimize_route(self.durations, time_budget_ms=5000)
+        self.assertEqual(sorted(plan.order), list(range(40)))
+        self.assertEqual(plan.order[0], 0)
+        greedy = travel_seconds(self.durations, nearest_neighbour(self.durations))
+        self.assertEqual(plan.initial_duration, int(round(greedy)))
+        self.assertLess(plan.total_duration, plan.initial_duration)
+        self.assertEqual(plan.total_duration, sum(plan.leg_durations))
+
+    def test_time_windows_override_shorter_drive(self):
+        # Stops on a line 0-1-2-3: the shortest tour is 0,1,2,3 but the windows book 3 before 1
+        durations = [[abs(i - j) * 600 for j in range(4)] for i in range(4)]
+        hour = 3600
+        windows = [None, (12 * hour, 12 * hour + 900), (13 * hour, 13 * hour + 900), (10 * hour, 10 * hour + 900)]
+        self.assertEqual(optimize_route(durations).order, [0, 1, 2, 3])
+        plan = optimize_route(durations, day_start=9 * hour, time_windows=windows, service_seconds=[1800] * 4)
+        self.assertEqual(plan.order, [0, 3, 1, 2])
+        self.assertEqual(plan.late_seconds, 0)
+        self.assertEqual(plan.arrivals[1], 10 * hour)
+
+    def test_time_budget_respected(self):
+        plan = optimize_route(self.durations, time_budget_ms=0)
+        self.assertTrue(plan.timed_out)
+        self.assertEqual(sorted(plan.order), list(range(40)))
+
+
+class RouteOptimizeViewTests(TestCase):
+    """POST /api/ad/routes/optimize/ - local search by default, windows reported per stop."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email='admin@test.com', password='testpass123', role='admin', username='admin1',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_optimize_with_windows(self):
+        stops = [
+            {'lat': 51.50, 'lng': -0.10, 'label': 'Depot'},
+            {'lat': 51.51, 'lng': -0.10, 'window_start': '11:00', 'window_end': '11:15', 'service_minutes': 30},
+            {'lat': 51.52, 'lng': -0.10, 'window_start': '09:00', 'window_end': '09:15', 'service_minutes': 30},
+        ]
+        with mock.patch('apps.core.route_utils.get_distance_matrix', return_value=None):
+            response = self.client.post(
+                '/api/ad/routes/optimize/', {'stops': stops, 'start_time': '08:30'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        data = response.data['data']
+        self.assertEqual(data['algorithm'], 'local_search')
+        self.assertEqual(data['order_indices'], [0, 2, 1])
+        self.assertEqual(data['late_stops'], 0)
+        self.assertEqual(data['ordered_stops'][1]['arrival_time'], '09:00')
+
+    def test_rejects_unknown_algorithm(self):
+        response = self.client.post(
+            '/api/ad/routes/optimize/', {'stops': [{'lat': 51.5, 'lng': -0.1}], 'algorithm': 'magic'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error']['code'], 'INVALID_ALGORITHM')
+
+
+_job_calls = []
+
+
+@jobs.job('tests.record')
+def _record_job(value, fail_times=0):
+    _job_calls.append(value)
+    if _job_calls.count(value) <= fail_times:
+        raise RuntimeError('temporary failure')
+
+
+class BackgroundJobTests(TestCase):
+    """apps.core.jobs with the database runner."""
+
+    def setUp(self):
+        _job_calls.clear()
+
+    def test_dedupe_key_allows_one_active_job(self):
+        first = jobs.enqueue('tests.record', {'value': 'a'}, dedupe_key='k1')
+        second = jobs.enqueue('tests.record', {'value': 'a'}, dedupe_key='k1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(jobs.run_due_jobs(), 1)
+        # Finished jobs no longer hold the key
+        third = jobs.enqueue('tests.record', {'value': 'a'}, dedupe_key='k1')
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_retry_with_backoff_then_fail(self):
+        background_job = jobs.enqueue('tests.record', {'value': 'b', 'fail_times': 5}, max_attempts=2)
+        self.assertEqual(jobs.run_due_jobs(), 1)
+        background_job.refresh_from_db()
+        self.assertEqual((background_job.status, background_job.attempts), ('pending', 1))
+        self.assertGreater(background_job.run_after, timezone.now())
+        self.assertEqual(jobs.run_due_jobs(), 0)  # backoff not over yet
+
+        BackgroundJob.objects.filter(pk=background_job.pk).update(run_after=timezone.now())
+        jobs.run_due_jobs()
+        background_job.refresh_from_db()
+        self.assertEqual((background_job.status, background_job.attempts), ('failed', 2))
+        self.assertIn('temporary failure', background_job.last_error)
+
+        self.assertEqual(jobs.retry_jobs(BackgroundJob.objects.all()), 1)
+        background_job.refresh_from_db()
+        self.assertEqual((background_job.status, background_job.attempts), ('pending', 0))
+
+    def test_claimed_once(self):
+        background_job = jobs.enqueue('tests.record', {'value': 'c'})
+        self.assertIsNotNone(jobs.run_job(background_job.pk))
+        self.assertIsNone(jobs.run_job(background_job.pk))
+        self.assertEqual(_job_calls, ['c'])
+
+    @override_settings(JOBS_BACKEND='inline')
+    def test_inline_backend_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            background_job = jobs.enqueue('tests.record', {'value': 'd'})
+            self.assertEqual(_job_calls, [])
+        background_job.refresh_from_db()
+        self.assertEqual(background_job.status, 'succeeded')
+
+    def test_admin_status_view(self):
+        jobs.enqueue('tests.record', {'value': 'e'}, dedupe_key='order:7:confirmation_email')
+        jobs.enqueue('tests.record', {'value': 'f'}, dedupe_key='order:8:confirmation_email')
+        user = get_user_model().objects.create_user(
+            email='admin@test.com', password='testpass123', role='admin', username='admin1',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/ad/jobs/', {'order_id': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([j['dedupe_key'] for j in response.data['data']], ['order:7:confirmation_email'])
+        self.assertEqual(response.data['meta']['counts']['pending'], 2)
+        self.assertEqual(APIClient().get('/api/ad/jobs/').status_code, 401)
+
+
+class QueryCountMiddlewareTests(TestCase):
+
+    def setUp(self):
+        admin = get_user_model().objects.create_user(
+            email='admin@test.com', password='testpass123', role='admin', username='admin1',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=admin)
+
+    def test_headers_and_log_record(self):
+        with self.assertLogs('apps.core.queries', level='DEBUG') as logs:
+            response = self.client.get('/api/ad/jobs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-DB-Queries'], '2')
+        self.assertGreaterEqual(float(response['X-DB-Time']), 0)
+        [record] = logs.records
+        self.assertEqual(record.levelname, 'DEBUG')
+        self.assertEqual((record.path, record.status, record.db_queries), ('/api/ad/jobs/', 200, 2))
+
+    @override_settings(DB_QUERY_WARNING_THRESHOLD=1)
+    def test_requests_over_threshold_log_warning(self):
+        # The threshold is read when the client's handler loads the middleware (first request)
+        with self.assertLogs('apps.core.queries', level='WARNING') as logs:
+            self.client.get('/api/ad/jobs/')
+        self.assertIn('db_queries=2', logs.output[0])
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        from apps.appointments.models import Appointment
+        from apps.services.models import Category, Service
+        from apps.staff.models import Staff
+
+        admin = get_user_model().objects.create_user(
+            email='admin@test.com', password='testpass123', role='admin', username='admin1',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=admin)
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        service = Service.objects.create(category=category, name='Clean', slug='clean', duration=60, price=50)
+        staff = Staff.objects.create(name='Sam', email='sam@test.com')
+        start = timezone.now().replace(microsecond=0)
+        # Three appointments per start time, so pages split ties on start_time
+        Appointment.objects.bulk_create([
+            Appointment(staff=staff, service=service, start_time=start + timedelta(hours=i // 3),
+                        end_time=start + timedelta(hours=i // 3, minutes=30), status='confirmed')
+            for i in range(11)
+        ])
+        self.expected = list(Appointment.objects.order_by('start_time', 'id').values_list('id', flat=True))
+
+    def _get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cursor_walks_every_row_once_in_order_and_back(self):
+        seen, url, pages = [], '/api/ad/appointments/?cursor=&page_size=4', []
+        while url:
+            body = self._get(url)
+            self.assertNotIn('count', body['meta'])
+            pages.append(url)
+            seen += [row['id'] for row in body['data']]
+            url = body['meta']['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+
+        body = self._get(pages[2])
+        back = self._get(body['meta']['previous'])
+        self.assertEqual([row['id'] for row in back['data']], self.expected[4:8])
+        self.assertEqual([row['id'] for row in self._get(back['meta']['previous'])['data']], self.expected[:4])
+
+    def test_without_cursor_lists_keep_their_shape(self):
+        body = self._get('/api/ad/appointments/')
+        self.assertEqual(body['meta'], {'count': 11})
+        self.assertEqual(set(self._get('/api/ad/orders/')['meta']), {'count', 'next', 'previous'})
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get('/api/ad/appointments/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.data['success'])
+
+    def test_sparse_fieldsets(self):
+        row = self._get('/api/ad/appointments/?fields=id,status')['data'][0]
+        self.assertEqual(set(row), {'id', 'status'})
+        row = self._get('/api/ad/appointments/?fields=id&expand=staff')['data'][0]
+        self.assertEqual(set(row), {'id', 'staff'})
+        # Nested serializers keep every field
+        self.assertIn('service_areas', row['staff'])
+        row = self._get('/api/ad/appointments/?expand=service')['data'][0]
+        self.assertIn('service', row)
+        self.assertNotIn('staff', row)
+        self.assertIn('start_time', row)
+
+
+class AdminSearchTests(TestCase):
+
+    def setUp(self):
+        from apps.customers.models import Customer
+        from apps.orders.models import Order
+        from apps.staff.models import Staff
+
+        admin = get_user_model().objects.create_user(
+            email='admin@test.com', password='testpass123', role='admin', username='admin1',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=admin)
+        self.customer = Customer.objects.create(
+            name='Priya Patel', email='priya.patel@example.com', phone='07700 900123', postcode='SW1A 1AA',
+        )
+        Customer.objects.create(name='Jack Smith', email='jack@patelandco.com', postcode='EC1A 1BB')
+        self.order = Order.objects.create(
+            order_number='ORD-2026-000042', guest_email='guest@mail.com', guest_name='Gita Guest',
+            scheduled_date=timezone.now().date(), scheduled_time=timezone.now().time(), total_price=50,
+            address_line1='1 High St', city='London', postcode='M1 2AB',
+        )
+        Staff.objects.create(name='Sam Cleaner', email='sam@clean.co.uk', phone='020 7946 0000')
+
+    def _search(self, q, **params):
+        response = self.client.get('/api/ad/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(row['kind'], row['title']) for row in response.data['data']]
+
+    def test_matches_fragments_of_every_field(self):
+        self.assertEqual(self._search('000042'), [('order', 'ORD-2026-000042')])
+        self.assertEqual(self._search('guest@mail'), [('order', 'ORD-2026-000042')])
+        self.assertEqual(self._search('sw1a1aa'), [('customer', 'Priya Patel')])
+        self.assertEqual(self._search('900123'), [('customer', 'Priya Patel')])
+        self.assertEqual(self._search('clean 020'), [('staff', 'Sam Cleaner')])
+        self.assertEqual(self._search('nobody'), [])
+
+    def test_title_prefix_ranks_first_and_kind_filters(self):
+        self.assertEqual(self._search('patel'), [('customer', 'Priya Patel'), ('customer', 'Jack Smith')])
+        self.assertEqual(self._search('jack'), [('customer', 'Jack Smith')])
+        self.assertEqual(self._search('patel', kind='staff'), [])
+        response = self.client.get('/api/ad/search/', {'q': 'patel', 'kind': 'invoice'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/ad/search/').status_code, 400)
+
+    def test_title_match_ranked_beyond_candidate_limit(self):
+        from apps.core import search
+        from apps.customers.models import Customer
+
+        Customer.objects.bulk_create([
+            Customer(name=f'Amit Patel {i}', email=f'amit{i}@patel.com') for i in range(search.MAX_CANDIDATES + 100)
+        ])
+        Customer.objects.create(name='Patel', email='p@test.com')
+        search.rebuild(['customer'])
+        self.assertEqual(self._search('patel', kind='customer', limit=1), [('customer', 'Patel')])
+
+    def test_documents_follow_saves_and_deletes(self):
+        self.customer.email = 'priya@newmail.org'
+        self.customer.save()
+        self.assertEqual(self._search('newmail'), [('customer', 'Priya Patel')])
+        self.assertEqual(self._search('example.com'), [])
+        self.customer.delete()
+        self.assertEqual(self._search('newmail'), [])
+
+    def test_rebuild_indexes_bulk_created_rows(self):
+        from apps.customers.models import Customer
+
+        Customer.objects.bulk_create([Customer(name='Bulk Loaded', email='bulk@import.com')])
+        self.assertEqual(self._search('bulk'), [])
+        call_command('rebuild_search_index', '--kind', 'customer', stdout=StringIO())
+        self.assertEqual(self._search('bulk'), [('customer', 'Bulk Loaded')])
+        self.assertEqual(self._search('priya'), [('customer', 'Priya Patel')])
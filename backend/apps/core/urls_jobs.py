@@ -0,0 +1,13 @@
+"""
+Background job status URLs.
+Admin/manager: /api/ad/jobs/
+"""
+from django.urls import path
+from . import views_jobs
+
+app_name = 'jobs'
+
+urlpatterns = [
+    path('', views_jobs.job_list_view, name='list'),
+    path('<int:job_id>/retry/', views_jobs.job_retry_view, name='retry'),
+]
@@ -0,0 +1,12 @@
+"""
+Admin search URLs.
+Admin/manager: /api/ad/search/
+"""
+from django.urls import path
+from . import views_search
+
+app_name = 'search'
+
+urlpatterns = [
+    path('', views_search.search_view, name='search'),
+]
@@ -0,0 +1,74 @@
+"""
+Background job status views (admin/manager).
+GET /api/ad/jobs/ - recent jobs with status counts; filters: status, name, order_id
+POST /api/ad/jobs/<id>/retry/ - requeue a failed job
+"""
+from django.db.models import Count
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from apps.core.jobs import retry_jobs
+from apps.core.models import BackgroundJob
+from apps.core.permissions import IsAdminOrManager
+
+MAX_JOBS_LISTED = 200
+
+
+def _job_data(job):
+    return {
+        'id': job.id,
+        'name': job.name,
+        'payload': job.payload,
+        'dedupe_key': job.dedupe_key,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_after': job.run_after.isoformat() if job.run_after else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        # Last line of the traceback is enough for the list; full text is in Django admin
+        'last_error': job.last_error.strip().splitlines()[-1] if job.last_error.strip() else '',
+        'created_at': job.created_at.isoformat(),
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOrManager])
+def job_list_view(request):
+    jobs = BackgroundJob.objects.all()
+    if request.query_params.get('status'):
+        jobs = jobs.filter(status=request.query_params['status'])
+    if request.query_params.get('name'):
+        jobs = jobs.filter(name=request.query_params['name'])
+    if request.query_params.get('order_id'):
+        jobs = jobs.filter(dedupe_key__startswith=f"order:{request.query_params['order_id']}:")
+    counts = {row['status']: row['total'] for row in BackgroundJob.objects.values('status').annotate(total=Count('id'))}
+    return Response({
+        'success': True,
+        'data': [_job_data(job) for job in jobs.order_by('-created_at')[:MAX_JOBS_LISTED]],
+        'meta': {
+            'counts': {value: counts.get(value, 0) for value, _ in BackgroundJob.STATUS_CHOICES},
+        },
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminOrManager])
+def job_retry_view(request, job_id):
+    queryset = BackgroundJob.objects.filter(pk=job_id)
+    if not queryset.exists():
+        return Response({
+            'success': False,
+            'error': {'code': 'NOT_FOUND', 'message': 'Job not found'},
+        }, status=status.HTTP_404_NOT_FOUND)
+    if not retry_jobs(queryset):
+        return Response({
+            'success': False,
+            'error': {'code': 'NOT_RETRYABLE', 'message': 'Only failed jobs without a queued duplicate can be retried'},
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'success': True,
+        'data': _job_data(queryset.get()),
+        'meta': {'message': 'Job requeued'},
+    })
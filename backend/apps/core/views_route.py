@@ -1,15 +1,154 @@
 """
 Route optimization API.
 Week 11 Day 1-2: Distance calculation, route optimization, multi-stop routing, travel time estimates.
+Visit order comes from the local-search engine (route_engine.py): greedy tour improved with
+2-opt/Or-opt, optionally honouring arrival windows and shift end, within a time budget.
 """
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
 from apps.core.permissions import IsAdminOrManager
+from apps.core.route_engine import durations_from_matrix, optimize_route
 from apps.core.route_utils import geocode_address, optimize_route_greedy
 
+# The travel matrix is tiled into API-sized requests, so routes are not limited to 25 stops
+MAX_ROUTE_STOPS = 200
+
+# Upper bound for a client-supplied search budget
+MAX_TIME_BUDGET_MS = 10000
+
+# Staff-day routes: arriving up to this long after the booked start counts as on time
+APPOINTMENT_LATE_TOLERANCE_MINUTES = 15
+
+
+def _parse_clock(value):
+    """'HH:MM' or ISO datetime -> seconds since local midnight (None if empty). Raises ValueError."""
+    if value in (None, ''):
+        return None
+    value = str(value)
+    if 'T' in value:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if timezone.is_aware(dt):
+            dt = timezone.localtime(dt)
+        return dt.hour * 3600 + dt.minute * 60 + dt.second
+    hours, minutes = value.split(':')[:2]
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def _format_clock(seconds):
+    if seconds is None:
+        return None
+    seconds = int(round(seconds))
+    return f'{seconds // 3600:02d}:{seconds % 3600 // 60:02d}'
+
+
+def _geocode_stop(stop):
+    """lat/lng for a stop: given coordinates, full address, then postcode (gazetteer/cache)."""
+    if stop.get('lat') is not None and stop.get('lng') is not None:
+        return {'lat': float(stop['lat']), 'lng': float(stop['lng'])}
+    line1 = stop.get('address_line1') or stop.get('address') or ''
+    city = stop.get('city') or ''
+    postcode = stop.get('postcode') or ''
+    geo = geocode_address(line1, city=city or None, postcode=postcode or None) if line1 or city else None
+    if not geo and postcode:
+        from apps.core.address import geocode_postcode
+        result = geocode_postcode(postcode)
+        if result and result.get('lat') is not None and result.get('lng') is not None:
+            geo = {'lat': result['lat'], 'lng': result['lng'], 'formatted_address': result.get('formatted_address', '')}
+    return geo
+
+
+def _plan_route(points, start_index=0, day_start=None, shift_end=None, algorithm='local_search', time_budget_ms=None):
+    """
+    Order points ({'lat', 'lng', optional 'window', 'service_seconds'}) and describe the route
+    (route_optimize_view response data).
+    """
+    from apps.core.distance_matrix import get_travel_matrix
+
+    stops_lat_lng = [{'lat': p['lat'], 'lng': p['lng']} for p in points]
+    windows = [p.get('window') for p in points]
+    if day_start is None:
+        starts = [w[0] for w in windows if w and w[0] is not None]
+        day_start = min(starts) if starts else None
+    if algorithm == 'greedy':
+        order, leg_durations, total_duration = optimize_route_greedy(stops_lat_lng, start_index=start_index)
+        durations = None
+        plan = None
+    else:
+        durations = durations_from_matrix(get_travel_matrix(stops_lat_lng, stops_lat_lng))
+        plan = optimize_route(
+            durations,
+            start_index=start_index,
+            day_start=day_start,
+            time_windows=windows if any(windows) else None,
+            service_seconds=[p.get('service_seconds', 0) for p in points],
+            shift_end=shift_end,
+            time_budget_ms=time_budget_ms,
+        )
+        order, leg_durations, total_duration = plan.order, plan.leg_durations, plan.total_duration
+
+    arrivals = plan.arrivals if plan else []
+    ordered_stops = []
+    late_stops = 0
+    for idx, pos in enumerate(order):
+        pt = points[pos]
+        leg_sec = leg_durations[idx] if idx < len(leg_durations) else None
+        stop = {
+            'index': pos,
+            'order_position': idx + 1,
+            'lat': pt['lat'],
+            'lng': pt['lng'],
+            'label': pt.get('label', f'Stop {pos+1}'),
+            'formatted_address': pt.get('formatted_address', ''),
+            'travel_time_to_next_seconds': leg_sec,
+            'travel_time_to_next_minutes': round(leg_sec / 60, 1) if leg_sec is not None else None,
+        }
+        if pt.get('appointment_id'):
+            stop['appointment_id'] = pt['appointment_id']
+        if arrivals:
+            arrival = arrivals[idx]
+            window = pt.get('window')
+            late = max(0.0, arrival - window[1]) if window and window[1] is not None else 0.0
+            late_stops += 1 if late > 0 else 0
+            stop['arrival_time'] = _format_clock(arrival)
+            stop['late_minutes'] = round(late / 60, 1)
+        ordered_stops.append(stop)
+
+    data = {
+        'ordered_stops': ordered_stops,
+        'order_indices': order,
+        'leg_durations_seconds': leg_durations,
+        'total_duration_seconds': total_duration,
+        'total_duration_minutes': round(total_duration / 60, 1),
+        'points': [{'lat': p['lat'], 'lng': p['lng'], 'label': p.get('label', '')} for p in points],
+        'algorithm': algorithm,
+    }
+    if plan:
+        data.update({
+            'initial_duration_seconds': plan.initial_duration,
+            'improvement_percent': round(
+                100.0 * (plan.initial_duration - plan.total_duration) / plan.initial_duration, 1
+            ) if plan.initial_duration else 0.0,
+            'late_stops': late_stops,
+            'shift_overrun_minutes': round(plan.overrun_seconds / 60, 1),
+            'search': {
+                'elapsed_ms': round(plan.elapsed_ms, 1),
+                'iterations': plan.iterations,
+                'timed_out': plan.timed_out,
+            },
+        })
+    return data
+
+
+def _time_budget(value):
+    default = getattr(settings, 'ROUTE_OPTIMIZE_TIME_BUDGET_MS', None)
+    if value in (None, ''):
+        return default
+    return max(0, min(int(value), MAX_TIME_BUDGET_MS))
+
 
 @api_view(['POST'])
 @permission_classes([IsAdminOrManager])
@@ -19,12 +158,18 @@ def route_optimize_view(request):
     POST /api/ad/routes/optimize/
     Body: {
         "stops": [
-            {"address_line1": "...", "city": "...", "postcode": "..."},
+            {"address_line1": "...", "city": "...", "postcode": "...",
+             "window_start": "09:00", "window_end": "09:15", "service_minutes": 60},  // window/service optional
             ...
         ],
-        "start_index": 0  // optional, which stop to start from (default 0)
+        "start_index": 0,  // optional, which stop to start from (default 0)
+        "start_time": "08:30",  // optional day start (default: earliest window_start)
+        "shift_end": "17:00",  // optional
+        "algorithm": "local_search",  // or "greedy"
+        "time_budget_ms": 2000  // optional search budget (max 10000)
     }
-    Returns: ordered stop indices, leg travel times (seconds), total travel time, geocoded points for map.
+    Returns: ordered stop indices, leg travel times (seconds), total travel time, geocoded points for map;
+    with windows also arrival times and lateness per stop.
     """
     stops = request.data.get('stops') or []
     start_index = max(0, min(int(request.data.get('start_index', 0)), len(stops) - 1)) if stops else 0
@@ -33,62 +178,57 @@ def route_optimize_view(request):
             'success': False,
             'error': {'code': 'MISSING_STOPS', 'message': 'At least one stop is required'},
         }, status=status.HTTP_400_BAD_REQUEST)
-    if len(stops) > 25:
+    if len(stops) > MAX_ROUTE_STOPS:
+        return Response({
+            'success': False,
+            'error': {'code': 'TOO_MANY_STOPS', 'message': f'Maximum {MAX_ROUTE_STOPS} stops per request'},
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    algorithm = request.data.get('algorithm') or 'local_search'
+    if algorithm not in ('local_search', 'greedy'):
+        return Response({
+            'success': False,
+            'error': {'code': 'INVALID_ALGORITHM', 'message': 'algorithm must be local_search or greedy'},
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        day_start = _parse_clock(request.data.get('start_time'))
+        shift_end = _parse_clock(request.data.get('shift_end'))
+        time_budget_ms = _time_budget(request.data.get('time_budget_ms'))
+        windows = [
+            (_parse_clock(s.get('window_start')), _parse_clock(s.get('window_end')))
+            for s in stops
+        ]
+        service_seconds = [float(s.get('service_minutes') or 0) * 60 for s in stops]
+    except (TypeError, ValueError):
         return Response({
             'success': False,
-            'error': {'code': 'TOO_MANY_STOPS', 'message': 'Maximum 25 stops per request (Google API limit)'},
+            'error': {'code': 'INVALID_TIME', 'message': 'Times must be HH:MM or ISO datetimes; numbers must be numeric'},
         }, status=status.HTTP_400_BAD_REQUEST)
 
     points = []
     for i, s in enumerate(stops):
-        line1 = s.get('address_line1') or s.get('address') or ''
-        city = s.get('city') or ''
-        postcode = s.get('postcode') or ''
-        if s.get('lat') is not None and s.get('lng') is not None:
-            points.append({'lat': float(s['lat']), 'lng': float(s['lng']), 'label': s.get('label', f'Stop {i+1}')})
-        else:
-            geo = geocode_address(line1, city=city or None, postcode=postcode or None)
-            if geo:
-                points.append({
-                    'lat': geo['lat'],
-                    'lng': geo['lng'],
-                    'formatted_address': geo.get('formatted_address', ''),
-                    'label': s.get('label', f'Stop {i+1}'),
-                })
-            else:
-                return Response({
-                    'success': False,
-                    'error': {'code': 'GEOCODE_FAILED', 'message': f'Could not geocode stop {i+1}. Check address and GOOGLE_MAPS_API_KEY.'},
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-    stops_lat_lng = [{'lat': p['lat'], 'lng': p['lng']} for p in points]
-    order, leg_durations, total_duration = optimize_route_greedy(stops_lat_lng, start_index=start_index)
-
-    ordered_stops = []
-    for idx, pos in enumerate(order):
-        pt = points[pos]
-        leg_sec = leg_durations[idx] if idx < len(leg_durations) else None
-        ordered_stops.append({
-            'index': pos,
-            'order_position': idx + 1,
-            'lat': pt['lat'],
-            'lng': pt['lng'],
-            'label': pt.get('label', f'Stop {pos+1}'),
-            'formatted_address': pt.get('formatted_address', ''),
-            'travel_time_to_next_seconds': leg_sec,
-            'travel_time_to_next_minutes': round(leg_sec / 60, 1) if leg_sec is not None else None,
+        geo = _geocode_stop(s)
+        if not geo:
+            return Response({
+                'success': False,
+                'error': {'code': 'GEOCODE_FAILED', 'message': f'Could not geocode stop {i+1}. Check address and GOOGLE_MAPS_API_KEY.'},
+            }, status=status.HTTP_400_BAD_REQUEST)
+        points.append({
+            'lat': geo['lat'],
+            'lng': geo['lng'],
+            'formatted_address': geo.get('formatted_address', ''),
+            'label': s.get('label', f'Stop {i+1}'),
+            'window': windows[i] if any(w is not None for w in windows[i]) else None,
+            'service_seconds': service_seconds[i],
         })
 
+    data = _plan_route(
+        points, start_index=start_index, day_start=day_start, shift_end=shift_end,
+        algorithm=algorithm, time_budget_ms=time_budget_ms,
+    )
     return Response({
         'success': True,
-        'data': {
-            'ordered_stops': ordered_stops,
-            'order_indices': order,
-            'leg_durations_seconds': leg_durations,
-            'total_duration_seconds': total_duration,
-            'total_duration_minutes': round(total_duration / 60, 1),
-            'points': [{'lat': p['lat'], 'lng': p['lng'], 'label': p.get('label', '')} for p in points],
-        },
+        'data': data,
         'meta': {'generated_at': timezone.now().isoformat()},
     }, status=status.HTTP_200_OK)
 
@@ -98,8 +238,11 @@ def route_optimize_view(request):
 def route_staff_day_view(request):
     """
     Get appointments for a staff member on a date and return addresses for route optimization.
-    GET /api/ad/routes/staff-day/?staff_id=1&date=2026-02-01
-    Returns: list of stops (address_line1, city, postcode) from orders linked to those appointments.
+    GET /api/ad/routes/staff-day/?staff_id=1&date=2026-02-01[&optimize=true&time_budget_ms=2000]
+    Returns: list of stops (address_line1, city, postcode) from orders linked to those appointments,
+    each with its arrival window (booked start + APPOINTMENT_LATE_TOLERANCE_MINUTES) and duration.
+    With optimize=true also returns 'route': the optimized visit order (see route_optimize_view)
+    starting from the staff member's shift start and respecting the windows and shift end.
     """
     staff_id = request.query_params.get('staff_id')
     date_str = request.query_params.get('date')
@@ -131,6 +274,12 @@ def route_staff_day_view(request):
     )
     stops = []
     for apt in appointments:
+        local_start = timezone.localtime(apt.start_time)
+        window = {
+            'window_start': local_start.strftime('%H:%M'),
+            'window_end': (local_start + timedelta(minutes=APPOINTMENT_LATE_TOLERANCE_MINUTES)).strftime('%H:%M'),
+            'service_minutes': int((apt.end_time - apt.start_time).total_seconds() // 60) if apt.end_time else 0,
+        }
         if apt.order_id and apt.order:
             o = apt.order
             stops.append({
@@ -140,6 +289,7 @@ def route_staff_day_view(request):
                 'city': o.city or '',
                 'postcode': o.postcode or '',
                 'label': f"#{apt.id} {o.address_line1 or 'No address'}",
+                **window,
             })
         else:
             stops.append({
@@ -149,14 +299,53 @@ def route_staff_day_view(request):
                 'city': '',
                 'postcode': '',
                 'label': f'Appointment #{apt.id} (no order address)',
+                **window,
+            })
+
+    data = {
+        'staff_id': int(staff_id),
+        'date': date_str,
+        'stops': stops,
+    }
+    if request.query_params.get('optimize', '').lower() in ('1', 'true', 'yes'):
+        from apps.staff.models import StaffSchedule
+
+        try:
+            time_budget_ms = _time_budget(request.query_params.get('time_budget_ms'))
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': {'code': 'INVALID_TIME', 'message': 'time_budget_ms must be a number'},
+            }, status=status.HTTP_400_BAD_REQUEST)
+        schedule = StaffSchedule.objects.filter(
+            staff_id=int(staff_id), day_of_week=date.weekday(), is_active=True
+        ).first()
+        day_start = _parse_clock(schedule.start_time.strftime('%H:%M')) if schedule else None
+        shift_end = _parse_clock(schedule.end_time.strftime('%H:%M')) if schedule else None
+        points, unrouted = [], []
+        for stop in stops:
+            geo = _geocode_stop(stop) if (stop['address_line1'] or stop['postcode']) else None
+            if not geo:
+                unrouted.append(stop['appointment_id'])
+                continue
+            points.append({
+                'lat': geo['lat'],
+                'lng': geo['lng'],
+                'formatted_address': geo.get('formatted_address', ''),
+                'label': stop['label'],
+                'appointment_id': stop['appointment_id'],
+                'window': (_parse_clock(stop['window_start']), _parse_clock(stop['window_end'])),
+                'service_seconds': stop['service_minutes'] * 60,
             })
+        route = _plan_route(points, day_start=day_start, shift_end=shift_end, time_budget_ms=time_budget_ms) if points else None
+        if route:
+            route['shift_start'] = _format_clock(day_start)
+            route['shift_end'] = _format_clock(shift_end)
+        data['route'] = route
+        data['unrouted_appointment_ids'] = unrouted
 
     return Response({
         'success': True,
-        'data': {
-            'staff_id': int(staff_id),
-            'date': date_str,
-            'stops': stops,
-        },
+        'data': data,
         'meta': {'generated_at': timezone.now().isoformat()},
     }, status=status.HTTP_200_OK)
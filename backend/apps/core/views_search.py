@@ -0,0 +1,41 @@
+"""
+Admin search view (admin/manager).
+GET /api/ad/search/?q=smith - ranked customers, orders and staff; filters: kind (comma-separated), limit
+"""
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from apps.core import search
+from apps.core.permissions import IsAdminOrManager
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOrManager])
+def search_view(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({
+            'success': False,
+            'error': {'code': 'VALIDATION_ERROR', 'message': 'q parameter is required'},
+        }, status=status.HTTP_400_BAD_REQUEST)
+    kinds = [kind.strip() for kind in request.query_params.get('kind', '').split(',') if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in search.SOURCES]
+    if unknown:
+        return Response({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': f"Unknown kind: {', '.join(unknown)} (expected {', '.join(search.KINDS)})",
+            },
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', search.DEFAULT_LIMIT))
+    except ValueError:
+        limit = search.DEFAULT_LIMIT
+    results = search.search(query, kinds=kinds, limit=limit)
+    return Response({
+        'success': True,
+        'data': results,
+        'meta': {'query': query, 'count': len(results)},
+    })
@@ -5,3 +5,7 @@ class CouponsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.coupons'
     verbose_name = 'Coupons'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.coupons.signals  # noqa
@@ -1,12 +1,25 @@
 """
 Coupons app models.
 Coupon model with validation, usage tracking, expiry management, and service restrictions.
+
+Redemption (Coupon.redeem) claims a use with a conditional UPDATE, so concurrent checkouts can
+never push used_count past max_uses; service restriction id sets are cached per coupon and
+invalidated by signals when the M2M relations change.
 """
-from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.utils import timezone
+from apps.core.caches import DEFAULT_CACHE, get_cache
 from apps.core.models import TimeStampedModel
 
+# Applicable/excluded service id sets per coupon
+SERVICE_RESTRICTIONS_CACHE_TTL = 60 * 60
+
+
+class CouponRedemptionError(Exception):
+    """Coupon could not be redeemed; str(error) is the customer-facing reason."""
+
 
 class Coupon(TimeStampedModel):
     """
@@ -206,23 +219,104 @@ class Coupon(TimeStampedModel):
             if customer_usage_count >= self.max_uses_per_customer:
                 return False, f'You have already used this coupon {customer_usage_count} time(s). Maximum allowed: {self.max_uses_per_customer}'
         
-        # Check minimum order amount
+        return self._check_order(order_amount, service_ids)
+    
+    def _check_order(self, order_amount, service_ids):
+        """Minimum amount and service restrictions (no queries once restrictions are cached)."""
         if order_amount < self.minimum_order_amount:
             return False, f'Minimum order amount of £{self.minimum_order_amount} required'
         
-        # Check service restrictions
         if service_ids:
+            applicable, excluded = self.service_restrictions()
+            requested = {int(service_id) for service_id in service_ids}
             # Check if any service is excluded
-            if self.excluded_services.filter(id__in=service_ids).exists():
+            if requested & excluded:
                 return False, 'This coupon cannot be used with one or more selected services'
             
             # Check if coupon applies to specific services only
-            if self.applicable_services.exists():
-                if not self.applicable_services.filter(id__in=service_ids).exists():
-                    return False, 'This coupon does not apply to the selected services'
+            if applicable and not requested & applicable:
+                return False, 'This coupon does not apply to the selected services'
         
         return True, ''
     
+    @staticmethod
+    def service_restrictions_cache_key(coupon_id):
+        return f'coupon_services_{coupon_id}'
+    
+    def service_restrictions(self):
+        """
+        (applicable service ids, excluded service ids) as frozensets, cached per coupon.
+        An empty applicable set means the coupon applies to every service.
+        """
+        cache = get_cache(DEFAULT_CACHE)
+        key = self.service_restrictions_cache_key(self.pk)
+        cached = cache.get(key)
+        if cached is None:
+            applicable = frozenset(self.applicable_services.values_list('id', flat=True))
+            excluded = frozenset(self.excluded_services.values_list('id', flat=True))
+            cached = (applicable, excluded)
+            cache.set(key, cached, SERVICE_RESTRICTIONS_CACHE_TTL)
+        return cached
+    
+    @classmethod
+    def invalidate_service_restrictions(cls, coupon_id):
+        get_cache(DEFAULT_CACHE).delete(cls.service_restrictions_cache_key(coupon_id))
+    
+    def redeem(self, order_amount, customer=None, guest_email=None, service_ids=None, order=None, subscription=None):
+        """
+        Validate the coupon and record one use atomically.
+        
+        The use is claimed with a single conditional UPDATE (active, within validity dates,
+        used_count < max_uses), so concurrent redemptions cannot exceed max_uses. The claimed
+        row stays locked until the transaction ends, which also serialises the per-customer
+        limit check; if it fails the increment is rolled back.
+        
+        Returns:
+            CouponUsage for the redemption
+        
+        Raises:
+            CouponRedemptionError: coupon not valid for this customer/order
+        """
+        is_valid, error_message = self._check_order(order_amount, service_ids)
+        if not is_valid:
+            raise CouponRedemptionError(error_message)
+        
+        now = timezone.now()
+        with transaction.atomic():
+            claimed = Coupon.objects.filter(
+                Q(valid_until__isnull=True) | Q(valid_until__gte=now),
+                Q(max_uses__isnull=True) | Q(used_count__lt=F('max_uses')),
+                pk=self.pk,
+                status='active',
+                valid_from__lte=now,
+            ).update(used_count=F('used_count') + 1)
+            if not claimed:
+                self.refresh_from_db()
+                is_valid, error_message = self.is_valid(customer=customer, order_amount=order_amount)
+                raise CouponRedemptionError(error_message or 'Coupon is no longer available')
+            
+            if customer and self.max_uses_per_customer:
+                customer_usage_count = self.usages.filter(customer=customer).count()
+                if customer_usage_count >= self.max_uses_per_customer:
+                    raise CouponRedemptionError(
+                        f'You have already used this coupon {customer_usage_count} time(s). '
+                        f'Maximum allowed: {self.max_uses_per_customer}'
+                    )
+            
+            self.refresh_from_db(fields=['used_count'])
+            discount_amount = self.calculate_discount(order_amount)
+            usage = CouponUsage.objects.create(
+                coupon=self,
+                customer=customer,
+                guest_email=guest_email if not customer else None,
+                order=order,
+                subscription=subscription,
+                discount_amount=discount_amount,
+                order_amount=order_amount,
+                final_amount=order_amount - discount_amount,
+            )
+        return usage
+    
     def calculate_discount(self, order_amount):
         """
         Calculate discount amount for given order amount.
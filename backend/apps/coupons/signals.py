@@ -0,0 +1,33 @@
+"""
+Coupon signals.
+
+Drop a coupon's cached service restriction ids when the coupon or its applicable/excluded
+services change.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Coupon
+
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def invalidate_coupon_restrictions(sender, instance, **kwargs):
+    Coupon.invalidate_service_restrictions(instance.pk)
+
+
+@receiver(m2m_changed, sender=Coupon.applicable_services.through)
+@receiver(m2m_changed, sender=Coupon.excluded_services.through)
+def invalidate_coupon_restrictions_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        Coupon.invalidate_service_restrictions(instance.pk)
+    elif pk_set:
+        # service.coupons.add(...) etc.: instance is the Service, pk_set the coupon ids
+        for coupon_id in pk_set:
+            Coupon.invalidate_service_restrictions(coupon_id)
+    else:
+        # service.coupons.clear(): pk_set is None; restrictions on every coupon may have changed
+        for coupon_id in Coupon.objects.values_list('pk', flat=True):
+            Coupon.invalidate_service_restrictions(coupon_id)
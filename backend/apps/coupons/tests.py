@@ -0,0 +1,151 @@
+"""
+Coupons tests.
+
+Redemption: Coupon.redeem claims a use with a conditional UPDATE, so max_uses holds under
+concurrent checkouts; service restriction ids are cached and invalidated on M2M changes.
+"""
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db import OperationalError, close_old_connections, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.coupons.models import Coupon, CouponRedemptionError, CouponUsage
+from apps.customers.models import Customer
+from apps.services.models import Category, Service
+
+
+def make_coupon(**kwargs):
+    fields = {
+        'code': 'SAVE10',
+        'name': 'Save 10',
+        'discount_type': 'fixed',
+        'discount_value': Decimal('10'),
+        'valid_from': timezone.now() - timedelta(days=1),
+    }
+    fields.update(kwargs)
+    return Coupon.objects.create(**fields)
+
+
+class CouponRedeemTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.service = Service.objects.create(category=category, name='Clean', slug='clean', duration=60, price=50)
+        self.other = Service.objects.create(category=category, name='Oven', slug='oven', duration=60, price=40)
+        self.customer = Customer.objects.create(name='Bob', email='bob@test.com')
+
+    def test_redeem_records_usage_and_increments(self):
+        coupon = make_coupon(max_uses=2)
+        usage = coupon.redeem(order_amount=Decimal('50'), customer=self.customer, service_ids=[self.service.id])
+        self.assertEqual(usage.discount_amount, Decimal('10'))
+        self.assertEqual(usage.final_amount, Decimal('40'))
+        self.assertEqual(coupon.used_count, 1)
+        self.assertEqual(Coupon.objects.get(pk=coupon.pk).used_count, 1)
+
+    def test_per_customer_limit_rolls_back_increment(self):
+        coupon = make_coupon(max_uses_per_customer=1)
+        coupon.redeem(order_amount=Decimal('50'), customer=self.customer)
+        with self.assertRaises(CouponRedemptionError):
+            coupon.redeem(order_amount=Decimal('50'), customer=self.customer)
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 1)
+        self.assertEqual(coupon.usages.count(), 1)
+
+    def test_used_up_and_inactive(self):
+        coupon = make_coupon(max_uses=1, max_uses_per_customer=None)
+        coupon.redeem(order_amount=Decimal('50'), guest_email='a@test.com')
+        with self.assertRaisesMessage(CouponRedemptionError, 'maximum usage limit'):
+            coupon.redeem(order_amount=Decimal('50'), guest_email='b@test.com')
+        Coupon.objects.filter(pk=coupon.pk).update(status='inactive', max_uses=None)
+        with self.assertRaisesMessage(CouponRedemptionError, 'not active'):
+            coupon.redeem(order_amount=Decimal('50'), guest_email='b@test.com')
+
+    def test_service_restrictions_cached_and_invalidated(self):
+        coupon = make_coupon()
+        coupon.excluded_services.add(self.other)
+        self.assertFalse(coupon.is_valid(order_amount=50, service_ids=[self.other.id])[0])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(coupon.is_valid(order_amount=50, service_ids=[self.service.id])[0])
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        coupon.applicable_services.add(self.other)
+        coupon.excluded_services.remove(self.other)
+        valid, message = coupon.is_valid(order_amount=50, service_ids=[self.service.id])
+        self.assertFalse(valid)
+        self.assertIn('does not apply', message)
+        # Reverse side (service.coupons) invalidates too
+        self.service.coupons.add(coupon)
+        self.assertTrue(coupon.is_valid(order_amount=50, service_ids=[self.service.id])[0])
+
+    def test_checkout_redeems_coupon_with_order(self):
+        coupon = make_coupon(max_uses=1, max_uses_per_customer=None)
+        payload = {
+            'items': [{'service_id': self.service.id, 'quantity': 1}],
+            'scheduled_date': str(timezone.now().date() + timedelta(days=3)),
+            'guest_name': 'Guest', 'guest_email': 'guest@test.com',
+            'address_line1': '1 High St', 'city': 'London', 'postcode': 'SW1A 1AA',
+            'coupon_code': 'save10',
+        }
+        response = APIClient().post('/api/bkg/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.data['data']['total_price']), Decimal('40'))
+        usage = CouponUsage.objects.get(coupon=coupon)
+        self.assertEqual(usage.order.order_number, response.data['meta']['order_number'])
+
+        response = APIClient().post('/api/bkg/orders/', {**payload, 'guest_email': 'other@test.com'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error']['code'], 'INVALID_COUPON')
+
+
+class ConcurrentRedemptionTests(TransactionTestCase):
+    """Many checkouts race for the last uses of a coupon: exactly max_uses succeed."""
+
+    THREADS = 12
+    MAX_USES = 5
+
+    def _redeem(self, coupon_id, email, barrier, results):
+        try:
+            barrier.wait()
+            for attempt in range(50):
+                try:
+                    Coupon.objects.get(pk=coupon_id).redeem(order_amount=Decimal('50'), guest_email=email)
+                    results.append('ok')
+                    return
+                except CouponRedemptionError:
+                    results.append('rejected')
+                    return
+                except OperationalError:
+                    # SQLite test databases lock instead of waiting; retry like a client would
+                    time.sleep(0.005 * (attempt + 1))
+            results.append('locked')
+        finally:
+            close_old_connections()
+            connection.close()
+
+    def test_concurrent_redemptions_never_exceed_max_uses(self):
+        caches['default'].clear()
+        coupon = make_coupon(max_uses=self.MAX_USES, max_uses_per_customer=None)
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        threads = [
+            threading.Thread(target=self._redeem, args=(coupon.pk, f'guest{i}@test.com', barrier, results))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        coupon.refresh_from_db()
+        self.assertEqual(results.count('ok'), self.MAX_USES)
+        self.assertEqual(results.count('rejected'), self.THREADS - self.MAX_USES)
+        self.assertEqual(coupon.used_count, self.MAX_USES)
+        self.assertEqual(CouponUsage.objects.filter(coupon=coupon).count(), self.MAX_USES)
@@ -3,6 +3,7 @@ Customers app models.
 Customer and Address models.
 """
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth import get_user_model
 from apps.core.models import TimeStampedModel
 
@@ -90,9 +91,12 @@ class Customer(TimeStampedModel):
         db_table = 'customers_customer'
         ordering = ['name']
         indexes = [
-            models.Index(fields=['email']),
+            # Case-insensitive email checks (email__lower=...)
+            models.Index(Lower('email'), name='customer_email_lower_idx'),
             models.Index(fields=['postcode']),
             models.Index(fields=['user']),
+            # Keyset pagination (core/pagination.py)
+            models.Index(fields=['created_at', 'id']),
         ]
         constraints = [
             models.CheckConstraint(
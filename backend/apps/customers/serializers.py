@@ -3,6 +3,7 @@ Customers app serializers.
 Customer and Address serializers.
 """
 from rest_framework import serializers
+from apps.core.serializers import SparseFieldsetMixin
 from .models import Customer, Address
 from apps.accounts.serializers import UserSerializer
 
@@ -36,7 +37,7 @@ class CustomerSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CustomerListSerializer(serializers.ModelSerializer):
+class CustomerListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Simplified customer serializer for list views.
     """
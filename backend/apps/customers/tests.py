@@ -1,3 +1,51 @@
+"""
+Customers tests.
+
+Admin list filters (email, postcode, name, phone) are narrowed through the search index
+(core/search.py) before the field's icontains check, so they return the same rows without
+scanning the table.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.customers.models import Customer
+
+
+class CustomerListFilterTests(TestCase):
+
+    def setUp(self):
+        admin = get_user_model().objects.create_user(
+            email='admin@test.com', password='testpass123', role='admin', username='admin1',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=admin)
+        Customer.objects.create(name='Priya Patel', email='priya@example.com', phone='07700 900123', postcode='SW1A 1AA')
+        # patel only in the email: matches the index, not the name filter
+        Customer.objects.create(name='Jack Smith', email='jack@patelandco.com', postcode='EC1A 1BB')
+
+    def _names(self, **params):
+        response = self.client.get('/api/ad/customers/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['name'] for row in response.data['data'])
+
+    def test_filters_keep_field_semantics(self):
+        self.assertEqual(self._names(name='patel'), ['Priya Patel'])
+        self.assertEqual(self._names(email='PATEL'), ['Jack Smith'])
+        self.assertEqual(self._names(postcode='sw1a'), ['Priya Patel'])
+        self.assertEqual(self._names(phone='900123'), ['Priya Patel'])
+        self.assertEqual(self._names(name='patel', email='example'), ['Priya Patel'])
+        self.assertEqual(self._names(name='nobody'), [])
+        # Shorter than a trigram: plain icontains
+        self.assertEqual(self._names(postcode='1b'), ['Jack Smith'])
 
-# Customers tests
+    def test_filters_use_search_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self._names(email='patel')
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        if connection.vendor == 'sqlite':
+            self.assertIn('core_search_fts', sql)
+        else:
+            self.assertIn('core_search_document', sql)
@@ -6,6 +6,8 @@ from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from apps.core import search
+from apps.core.pagination import CustomerCursorPagination
 from apps.core.permissions import IsCustomer, IsAdminOrManager, IsOwnerOrAdmin
 from .models import Customer, Address
 from .serializers import (
@@ -24,6 +26,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.select_related('user').prefetch_related('addresses').all()
     serializer_class = CustomerSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CustomerCursorPagination
     
     def get_serializer_class(self):
         """Use simplified serializer for list views."""
@@ -44,13 +47,13 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 queryset = queryset.none()
         # Admin/Manager can see all customers
         elif self.request.user.role in ['admin', 'manager']:
-            # Apply filters if provided
+            # Apply filters if provided; the search index narrows the rows each icontains checks
             email = self.request.query_params.get('email')
             if email:
-                queryset = queryset.filter(email__icontains=email)
+                queryset = search.narrow(queryset, 'customer', email).filter(email__icontains=email)
             postcode = self.request.query_params.get('postcode')
             if postcode:
-                queryset = queryset.filter(postcode__icontains=postcode)
+                queryset = search.narrow(queryset, 'customer', postcode).filter(postcode__icontains=postcode)
         
         return queryset
     
@@ -81,10 +84,10 @@ class CustomerViewSet(viewsets.ModelViewSet):
         if request.user.role in ['admin', 'manager']:
             name = request.query_params.get('name')
             if name:
-                queryset = queryset.filter(name__icontains=name)
+                queryset = search.narrow(queryset, 'customer', name).filter(name__icontains=name)
             phone = request.query_params.get('phone')
             if phone:
-                queryset = queryset.filter(phone__icontains=phone)
+                queryset = search.narrow(queryset, 'customer', phone).filter(phone__icontains=phone)
             tags = request.query_params.get('tags')
             if tags:
                 # Filter by tags (JSON array search)
@@ -96,6 +99,11 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 elif has_user_account.lower() == 'false':
                     queryset = queryset.filter(user__isnull=True)
         
+        # ?cursor= pages by (created_at, id); otherwise every customer is listed
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(queryset, many=True)
         return Response({
             'success': True,
@@ -114,20 +122,22 @@ class CustomerViewSet(viewsets.ModelViewSet):
         from apps.orders.models import Order
         from apps.subscriptions.models import Subscription
         
+        from apps.appointments.serializers import AppointmentSerializer, prefetch_appointment_relations
+        from apps.orders.serializers import OrderSerializer, prefetch_order_relations
+        from apps.subscriptions.serializers import SubscriptionSerializer, prefetch_subscription_relations
+        
         # Get appointments (Appointment has OneToOne customer_booking -> CustomerAppointment, not customer_appointments)
-        appointments = Appointment.objects.filter(
-            customer_booking__customer=customer
-        ).select_related('staff', 'service', 'customer_booking').order_by('-start_time')
+        appointments = list(prefetch_appointment_relations(
+            Appointment.objects.filter(customer_booking__customer=customer)
+        ).order_by('-start_time'))
         
         # Get orders
-        orders = Order.objects.filter(customer=customer).prefetch_related('items').order_by('-created_at')
+        orders = list(prefetch_order_relations(Order.objects.filter(customer=customer)).order_by('-created_at'))
         
         # Get subscriptions
-        subscriptions = Subscription.objects.filter(customer=customer).order_by('-created_at')
-        
-        from apps.appointments.serializers import AppointmentSerializer
-        from apps.orders.serializers import OrderSerializer
-        from apps.subscriptions.serializers import SubscriptionSerializer
+        subscriptions = list(
+            prefetch_subscription_relations(Subscription.objects.filter(customer=customer)).order_by('-created_at')
+        )
         
         return Response({
             'success': True,
@@ -137,9 +147,9 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 'subscriptions': SubscriptionSerializer(subscriptions, many=True).data,
             },
             'meta': {
-                'appointments_count': appointments.count(),
-                'orders_count': orders.count(),
-                'subscriptions_count': subscriptions.count(),
+                'appointments_count': len(appointments),
+                'orders_count': len(orders),
+                'subscriptions_count': len(subscriptions),
             }
         })
     
@@ -8,4 +8,5 @@ class OrdersConfig(AppConfig):
     
     def ready(self):
         """Import signals when app is ready."""
-        import apps.orders.signals  # noqa
\ No newline at end of file
+        import apps.orders.signals  # noqa
+        import apps.orders.jobs  # noqa
\ No newline at end of file
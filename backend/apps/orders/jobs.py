@@ -0,0 +1,58 @@
+"""
+Order background jobs: side effects of confirming an order, run outside the admin's request
+(see apps/core/jobs.py). Calendar pushes and the confirmation email are separate jobs so a
+failing email is retried without creating the calendar events again.
+"""
+import logging
+
+from apps.core.jobs import enqueue, job
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+SYNC_CALENDARS_JOB = 'orders.sync_calendars'
+CONFIRMATION_EMAIL_JOB = 'orders.send_confirmation_email'
+
+
+def enqueue_confirmation_side_effects(order):
+    """Queue calendar sync and confirmation email for a confirmed order (once per order while queued)."""
+    enqueue(SYNC_CALENDARS_JOB, {'order_id': order.pk}, dedupe_key=f'order:{order.pk}:calendar_sync')
+    enqueue(CONFIRMATION_EMAIL_JOB, {'order_id': order.pk}, dedupe_key=f'order:{order.pk}:confirmation_email')
+
+
+def _get_order(order_id):
+    try:
+        return Order.objects.select_related('customer__user').get(pk=order_id)
+    except Order.DoesNotExist:
+        logger.warning(f"Order {order_id} no longer exists - skipping job")
+        return None
+
+
+@job(SYNC_CALENDARS_JOB)
+def sync_calendars(order_id):
+    from .signals import sync_order_to_calendars
+
+    order = _get_order(order_id)
+    if order is None:
+        return
+    failed = sum(stats.failed for stats in sync_order_to_calendars(order).values())
+    if failed:
+        # Raising makes the job retry with backoff; events already pushed are skipped then
+        # (their CalendarEventSync hash matches)
+        raise RuntimeError(f"Calendar sync of order {order.order_number}: {failed} event(s) failed")
+
+
+@job(CONFIRMATION_EMAIL_JOB)
+def send_confirmation(order_id):
+    from apps.notifications.email_service import send_booking_confirmation
+
+    order = _get_order(order_id)
+    if order is None:
+        return
+    if not (order.customer and order.customer.email) and not order.guest_email:
+        logger.warning(f"Order {order.order_number} has no email address - confirmation not sent")
+        return
+    if not send_booking_confirmation(order):
+        # Raising makes the job retry with backoff
+        raise RuntimeError(f"Confirmation email for order {order.order_number} was not sent")
+    logger.info(f"Confirmation email sent for order {order.order_number}")
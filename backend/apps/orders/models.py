@@ -184,6 +184,8 @@ class Order(TimeStampedModel):
             models.Index(fields=['is_guest_order', 'guest_email']),
             models.Index(fields=['status', 'scheduled_date']),
             models.Index(fields=['postcode']),
+            # Keyset pagination (core/pagination.py)
+            models.Index(fields=['created_at', 'id']),
         ]
         constraints = [
             models.CheckConstraint(
@@ -2,12 +2,36 @@
 Orders app serializers.
 Order and OrderItem serializers with guest checkout support.
 """
+from django.db.models import Prefetch
 from rest_framework import serializers
+from apps.core.serializers import SparseFieldsetMixin
 from .models import Order, OrderItem, ChangeRequest
 from apps.services.serializers import ServiceListSerializer
-from apps.staff.serializers import StaffListSerializer
+from apps.staff.serializers import StaffListSerializer, active_service_areas
 from apps.customers.serializers import CustomerListSerializer, GuestCustomerSerializer
-from apps.appointments.serializers import AppointmentSerializer
+from apps.appointments.models import Appointment
+from apps.coupons.models import CouponUsage
+from apps.appointments.serializers import AppointmentSerializer, prefetch_appointment_relations
+
+
+def prefetch_order_relations(queryset):
+    """
+    Load everything OrderSerializer reads (items, appointments, coupon usage and what their
+    nested serializers read), so a page of orders costs a fixed number of queries.
+    """
+    items = prefetch_appointment_relations(
+        OrderItem.objects.select_related('service__category', 'staff').prefetch_related(
+            active_service_areas('staff__service_areas')
+        ),
+        prefix='appointment__',
+    )
+    return queryset.select_related('customer__user').prefetch_related(
+        Prefetch('items', queryset=items),
+        Prefetch('appointments', queryset=prefetch_appointment_relations(Appointment.objects.all()),
+                 to_attr='prefetched_appointments'),
+        Prefetch('coupon_usages', queryset=CouponUsage.objects.select_related('coupon'),
+                 to_attr='prefetched_coupon_usages'),
+    )
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -28,7 +52,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'total_price', 'created_at', 'updated_at']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Order serializer with guest checkout support (multi-service orders).
     """
@@ -50,6 +74,7 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'order_number', 'tracking_token', 'account_linked_at',
                              'can_cancel', 'can_reschedule', 'cancellation_deadline',
                              'created_at', 'updated_at']
+        expandable_fields = ['customer', 'items', 'appointments', 'coupon_used']
         extra_kwargs = {
             'guest_email': {'required': False, 'allow_blank': True},
             'guest_name': {'required': False, 'allow_blank': True},
@@ -57,13 +82,19 @@ class OrderSerializer(serializers.ModelSerializer):
         }
     
     def get_appointments(self, obj):
-        """Get all appointments for this order."""
-        appointments = obj.appointments.all()
+        """Get all appointments for this order (prefetched by prefetch_order_relations())."""
+        appointments = getattr(obj, 'prefetched_appointments', None)
+        if appointments is None:
+            appointments = obj.appointments.all()
         return AppointmentSerializer(appointments, many=True).data
     
     def get_coupon_used(self, obj):
         """Return coupon applied to this order (from CouponUsage) for display."""
-        usage = obj.coupon_usages.select_related('coupon').first()
+        usages = getattr(obj, 'prefetched_coupon_usages', None)
+        if usages is None:
+            usage = obj.coupon_usages.select_related('coupon').first()
+        else:
+            usage = usages[0] if usages else None
         if not usage:
             return None
         return {
@@ -1,7 +1,8 @@
 """
 Order signals.
 
-Handles order status changes and triggers appointment creation, calendar sync, and email notifications.
+Handles order status changes: appointments are created when an order is confirmed; calendar
+sync and the confirmation email are queued as background jobs (see jobs.py) once it is saved.
 """
 import logging
 from django.db.models.signals import pre_save, post_save
@@ -24,18 +25,18 @@ def on_order_status_changed(sender, instance, **kwargs):
         return
     
     try:
-        # Get the old order from database
-        old_order = Order.objects.get(pk=instance.pk)
+        # Get the old status from database
+        old_status = Order.objects.values_list('status', flat=True).get(pk=instance.pk)
         
         # Check if status changed from something to 'confirmed'
-        if old_order.status != 'confirmed' and instance.status == 'confirmed':
+        if old_status != 'confirmed' and instance.status == 'confirmed':
             logger.info(f"Order {instance.order_number} status changed to 'confirmed' - creating appointments")
             
             # Create appointments for each order item
             create_appointments_for_order(instance)
             
-            # Send confirmation email
-            send_confirmation_email(instance)
+            # Calendar sync and confirmation email are queued after save (post_save)
+            instance._queue_confirmation_side_effects = True
             
     except Order.DoesNotExist:
         # Order doesn't exist yet (first save)
@@ -44,20 +45,40 @@ def on_order_status_changed(sender, instance, **kwargs):
         logger.error(f"Error in on_order_status_changed for order {instance.order_number}: {e}")
 
 
+@receiver(post_save, sender=Order)
+def queue_order_confirmation_jobs(sender, instance, created, **kwargs):
+    """Queue calendar sync and confirmation email for an order that was just confirmed."""
+    if not getattr(instance, '_queue_confirmation_side_effects', False):
+        return
+    instance._queue_confirmation_side_effects = False
+    from .jobs import enqueue_confirmation_side_effects
+    enqueue_confirmation_side_effects(instance)
+
+
 def create_appointments_for_order(order):
     """
     Create Appointment records for each OrderItem when order is confirmed.
     Also creates CustomerAppointment for each so they appear in customer My Bookings.
     
+    Items are loaded once with their service and staff, back-to-back windows are computed in
+    memory and all rows are written with bulk_create/bulk_update, so the query count does not
+    grow with the number of items.
+    
     Args:
         order: Order instance that was just confirmed
+    
+    Returns:
+        List of created appointments
     """
+    from django.db import transaction
     from apps.appointments.models import Appointment, CustomerAppointment
+    from apps.appointments.slots_cache import bump_appointment_windows
+    from apps.reports.analytics import bump_version_on_commit as bump_analytics_version_on_commit
     from apps.core.utils import can_cancel_or_reschedule
     
     if not order.scheduled_date:
         logger.warning(f"Order {order.order_number} has no scheduled_date - cannot create appointments")
-        return
+        return []
     
     # Use scheduled_time or default to 9:00 AM
     scheduled_time = order.scheduled_time or time_obj(9, 0)
@@ -70,10 +91,12 @@ def create_appointments_for_order(order):
     # Track current time offset for multiple items
     current_start = start_datetime
     
-    for item in order.items.all():
+    pending_items = []
+    appointments = []
+    for item in order.items.select_related('service', 'staff').order_by('id'):
         # Skip if appointment already exists
-        if item.appointment:
-            logger.info(f"OrderItem {item.id} already has appointment {item.appointment.id}")
+        if item.appointment_id:
+            logger.info(f"OrderItem {item.id} already has appointment {item.appointment_id}")
             continue
         
         # Ensure staff is assigned (required for appointment)
@@ -85,8 +108,8 @@ def create_appointments_for_order(order):
         duration_minutes = item.service.duration
         end_datetime = current_start + timedelta(minutes=duration_minutes)
         
-        # Create appointment (pending - admin/manager will confirm later)
-        appointment = Appointment.objects.create(
+        # Appointment is pending - admin/manager will confirm later
+        appointments.append(Appointment(
             staff=item.staff,
             service=item.service,
             start_time=current_start,
@@ -94,39 +117,57 @@ def create_appointments_for_order(order):
             status='pending',
             appointment_type='order_item',
             order=order,  # Link to order
-        )
-        
-        # Link appointment to order item
-        item.appointment = appointment
-        item.save()
-        
-        # Create CustomerAppointment so customer sees this in My Bookings (/cus/appointments/)
-        if order.customer:
-            policy_hours = getattr(order, 'cancellation_policy_hours', 24) or 24
-            can_cancel_val, can_reschedule_val, deadline = can_cancel_or_reschedule(
-                appointment.start_time, policy_hours
-            )
-            CustomerAppointment.objects.create(
-                customer=order.customer,
-                appointment=appointment,
-                number_of_persons=1,
-                total_price=item.total_price,
-                payment_status=order.payment_status or 'pending',
-                cancellation_policy_hours=policy_hours,
-                can_cancel=can_cancel_val,
-                can_reschedule=can_reschedule_val,
-                cancellation_deadline=deadline,
-            )
-            logger.info(f"Created CustomerAppointment for appointment {appointment.id} (Order {order.order_number})")
-        
-        logger.info(f"Created appointment {appointment.id} for OrderItem {item.id} (Order {order.order_number})")
+        ))
+        pending_items.append(item)
         
         # Move to next time slot (account for padding time)
         padding_minutes = item.service.padding_time or 0
         current_start = end_datetime + timedelta(minutes=padding_minutes)
     
-    # After all appointments are created, sync to calendars
-    sync_order_to_calendars(order)
+    if not appointments:
+        return []
+    
+    with transaction.atomic():
+        Appointment.objects.bulk_create(appointments)
+        
+        # Link appointments to order items
+        for item, appointment in zip(pending_items, appointments):
+            item.appointment = appointment
+        OrderItem.objects.bulk_update(pending_items, ['appointment'])
+        
+        # Create CustomerAppointment so customer sees these in My Bookings (/cus/appointments/)
+        if order.customer_id:
+            policy_hours = getattr(order, 'cancellation_policy_hours', 24) or 24
+            customer_appointments = []
+            for item, appointment in zip(pending_items, appointments):
+                can_cancel_val, can_reschedule_val, deadline = can_cancel_or_reschedule(
+                    appointment.start_time, policy_hours
+                )
+                customer_appointments.append(CustomerAppointment(
+                    customer_id=order.customer_id,
+                    appointment=appointment,
+                    number_of_persons=1,
+                    total_price=item.total_price,
+                    payment_status=order.payment_status or 'pending',
+                    cancellation_policy_hours=policy_hours,
+                    can_cancel=can_cancel_val,
+                    can_reschedule=can_reschedule_val,
+                    cancellation_deadline=deadline,
+                ))
+            CustomerAppointment.objects.bulk_create(customer_appointments)
+        
+        # bulk_create sends no post_save, so invalidate cached slots for the booked days
+        # and cached appointment analytics here
+        transaction.on_commit(lambda: bump_appointment_windows(
+            (a.staff_id, a.start_time, a.end_time) for a in appointments
+        ))
+        bump_analytics_version_on_commit()
+    
+    logger.info(
+        f"Created {len(appointments)} appointment(s) for order {order.order_number}: "
+        f"{', '.join(str(a.id) for a in appointments)}"
+    )
+    return appointments
 
 
 def sync_order_to_calendars(order):
@@ -140,71 +181,48 @@ def sync_order_to_calendars(order):
     
     Args:
         order: Order instance
+
+    Returns:
+        {profile pk: SyncStats} for the calendars pushed to
     """
     from apps.calendar_sync.services import (
-        CalendarSyncService,
         build_customer_event_data,
         build_staff_event_data,
-        build_manager_event_data
+        build_manager_event_data,
+        push_calendar_events,
     )
-    from apps.appointments.models import Appointment
-    
+
     # Get all appointments for this order
-    appointments = order.appointments.all()
-    
-    if not appointments.exists():
+    appointments = list(order.appointments.select_related('service', 'staff__user__profile'))
+
+    if not appointments:
         logger.info(f"No appointments found for order {order.order_number} - skipping calendar sync")
-        return
-    
+        return {}
+
+    def connected(profile):
+        return profile.calendar_sync_enabled and profile.calendar_provider not in ('none', None, '')
+
+    # profile pk -> (profile, [(appointment, event_data)]); pushed in one batch per calendar account
+    groups = {}
+
+    def add(profile, appointment, event_data):
+        groups.setdefault(profile.pk, (profile, []))[1].append((appointment, event_data))
+
+    customer_profile = None
+    if order.customer and order.customer.user:
+        customer_profile = order.customer.user.profile
+
     for appointment in appointments:
         # 1. Sync to CUSTOMER calendar (if has account + sync enabled)
-        if order.customer and order.customer.user:
-            customer_profile = order.customer.user.profile
-            if customer_profile.calendar_sync_enabled and customer_profile.calendar_provider != 'none':
-                try:
-                    event_data = build_customer_event_data(order, appointment)
-                    event_id = CalendarSyncService.create_event(appointment, customer_profile, event_data)
-                    
-                    if event_id:
-                        # Update appointment.calendar_event_id
-                        appointment.calendar_event_id = appointment.calendar_event_id or {}
-                        appointment.calendar_event_id[customer_profile.calendar_provider] = event_id
-                        
-                        # Update appointment.calendar_synced_to
-                        synced_to = appointment.calendar_synced_to or []
-                        if customer_profile.calendar_provider not in synced_to:
-                            synced_to.append(customer_profile.calendar_provider)
-                        appointment.calendar_synced_to = synced_to
-                        appointment.save()
-                        
-                        logger.info(f"Synced appointment {appointment.id} to customer {order.customer.user.email} calendar ({customer_profile.calendar_provider})")
-                except Exception as e:
-                    logger.error(f"Error syncing appointment {appointment.id} to customer calendar: {e}")
-        
+        if customer_profile and connected(customer_profile):
+            add(customer_profile, appointment, build_customer_event_data(order, appointment))
+
         # 2. Sync to STAFF calendar (if sync enabled)
         if appointment.staff and appointment.staff.user:
             staff_profile = appointment.staff.user.profile
-            if staff_profile.calendar_sync_enabled and staff_profile.calendar_provider != 'none':
-                try:
-                    event_data = build_staff_event_data(order, appointment)
-                    event_id = CalendarSyncService.create_event(appointment, staff_profile, event_data)
-                    
-                    if event_id:
-                        # Update appointment.calendar_event_id
-                        appointment.calendar_event_id = appointment.calendar_event_id or {}
-                        appointment.calendar_event_id[staff_profile.calendar_provider] = event_id
-                        
-                        # Update appointment.calendar_synced_to
-                        synced_to = appointment.calendar_synced_to or []
-                        if staff_profile.calendar_provider not in synced_to:
-                            synced_to.append(staff_profile.calendar_provider)
-                        appointment.calendar_synced_to = synced_to
-                        appointment.save()
-                        
-                        logger.info(f"Synced appointment {appointment.id} to staff {appointment.staff.user.email} calendar ({staff_profile.calendar_provider})")
-                except Exception as e:
-                    logger.error(f"Error syncing appointment {appointment.id} to staff calendar: {e}")
-        
+            if connected(staff_profile):
+                add(staff_profile, appointment, build_staff_event_data(order, appointment))
+
         # 3. Sync to MANAGER calendar (if manager exists + sync enabled)
         # Note: Staff model doesn't have a manager field yet, so this is a placeholder
         # When manager relationship is added, uncomment this:
@@ -218,20 +236,12 @@ def sync_order_to_calendars(order):
         #         except Exception as e:
         #             logger.error(f"Error syncing appointment {appointment.id} to manager calendar: {e}")
 
-
-def send_confirmation_email(order):
-    """Send booking confirmation email when order is confirmed."""
-    try:
-        from apps.notifications.email_service import send_booking_confirmation
-        
-        # Send confirmation email
-        success = send_booking_confirmation(order)
-        
-        if success:
-            logger.info(f"Confirmation email sent for order {order.order_number}")
+    # Only this order's events: other events in these calendars are left alone (prune=False)
+    results = push_calendar_events(list(groups.values()), prune=False)
+    for profile_pk, stats in results.items():
+        if stats.failed:
+            logger.error(f"Calendar sync of order {order.order_number} to profile {profile_pk}: {stats.failed} event(s) failed")
         else:
-            logger.warning(f"Failed to send confirmation email for order {order.order_number}")
-            
-    except Exception as e:
-        logger.error(f"Error sending confirmation email for order {order.order_number}: {e}")
-        # Don't raise exception - email failure shouldn't break order confirmation
+            logger.info(f"Synced order {order.order_number} to profile {profile_pk} calendar: {stats.as_dict()}")
+    return results
+
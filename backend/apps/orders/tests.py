@@ -1,3 +1,151 @@
+"""
+Orders tests.
+
+Confirmation: appointments are created in the confirming request with a fixed number of
+queries (bulk_create/bulk_update); calendar sync and the confirmation email are queued as
+background jobs (one per order) and sent by the runner.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core import mail
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.accounts.models import Profile, User
+from apps.appointments.models import Appointment, CustomerAppointment
+from apps.calendar_sync.fake_provider import FakeCalendarProvider
+from apps.core.jobs import run_due_jobs
+from apps.core.models import BackgroundJob
+from apps.customers.models import Customer
+from apps.orders.models import Order, OrderItem
+from apps.services.models import Category, Service
+from apps.staff.models import Staff
+
+
+class OrderConfirmationJobTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.service = Service.objects.create(category=category, name='Clean', slug='clean', duration=60, price=50)
+        self.staff = Staff.objects.create(name='Alice', email='alice@test.com')
+        self.order = Order.objects.create(
+            status='pending', total_price=50, scheduled_date=timezone.now().date() + timedelta(days=3),
+            scheduled_time=time(10, 0), guest_email='guest@test.com', guest_name='Guest',
+            address_line1='1 High St', city='London', postcode='SW1A 1AA',
+        )
+        OrderItem.objects.create(
+            order=self.order, service=self.service, staff=self.staff, quantity=1, unit_price=50, total_price=50,
+        )
+
+    def _confirm(self):
+        self.order.status = 'confirmed'
+        self.order.save()
+
+    def test_confirm_queues_side_effects(self):
+        self._confirm()
+        self.assertEqual(Appointment.objects.filter(order=self.order).count(), 1)
+        self.assertEqual(
+            set(BackgroundJob.objects.values_list('dedupe_key', flat=True)),
+            {f'order:{self.order.pk}:calendar_sync', f'order:{self.order.pk}:confirmation_email'},
+        )
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(run_due_jobs(), 2)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['guest@test.com'])
+        self.assertEqual(
+            set(BackgroundJob.objects.values_list('status', 'attempts')), {('succeeded', 1)},
+        )
+
+    def test_failed_calendar_push_is_retried(self):
+        provider = FakeCalendarProvider().start()
+        self.addCleanup(provider.stop)
+        user = User.objects.create_user(email='alice@test.com', password='testpass123', role='staff', username='alice')
+        Profile.objects.update_or_create(user=user, defaults={
+            'calendar_sync_enabled': True, 'calendar_provider': 'google', 'calendar_access_token': 'valid',
+            'calendar_refresh_token': 'refresh',
+        })
+        self.staff.user = user
+        self.staff.save()
+        self._confirm()
+        provider.failures = 1
+        with self.settings(**provider.settings()):
+            run_due_jobs()
+            calendar_job = BackgroundJob.objects.get(dedupe_key=f'order:{self.order.pk}:calendar_sync')
+            self.assertEqual((calendar_job.status, calendar_job.attempts), ('pending', 1))
+            self.assertGreater(calendar_job.run_after, timezone.now())
+            self.assertEqual(provider.events['google'], {})
+
+            # Backoff elapsed
+            BackgroundJob.objects.filter(pk=calendar_job.pk).update(run_after=timezone.now())
+            self.assertEqual(run_due_jobs(), 1)
+        calendar_job.refresh_from_db()
+        self.assertEqual((calendar_job.status, calendar_job.attempts), ('succeeded', 2))
+        self.assertEqual(len(provider.events['google']), 1)
+
+    def test_jobs_deduplicated_per_order(self):
+        self._confirm()
+        self.order.status = 'pending'
+        self.order.save()
+        self._confirm()
+        self.assertEqual(BackgroundJob.objects.count(), 2)
+
+
+class OrderConfirmationQueryTests(TestCase):
+    """Confirming an order: back-to-back appointments, query count independent of item count."""
+
+    # Status lookup, items, appointment insert + item link + customer booking insert (in a
+    # savepoint), order update, search document update, then per queued job a dedupe check and
+    # an insert in a savepoint
+    CONFIRM_QUERIES = 17
+
+    def setUp(self):
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.services = [
+            Service.objects.create(
+                category=category, name=f'Service {i}', slug=f'service-{i}', duration=60 + 30 * i, price=50, padding_time=15,
+            )
+            for i in range(5)
+        ]
+        self.staff = Staff.objects.create(name='Alice', email='alice@test.com')
+        self.customer = Customer.objects.create(name='Bob', email='bob@test.com')
+
+    def _order(self, item_count):
+        order = Order.objects.create(
+            customer=self.customer, status='pending', total_price=50 * item_count,
+            scheduled_date=timezone.now().date() + timedelta(days=3), scheduled_time=time(9, 0),
+            address_line1='1 High St', city='London', postcode='SW1A 1AA',
+        )
+        for service in self.services[:item_count]:
+            OrderItem.objects.create(
+                order=order, service=service, staff=self.staff, quantity=1, unit_price=50, total_price=50,
+            )
+        return order
+
+    def _confirm(self, order):
+        order.status = 'confirmed'
+        order.save()
+
+    def test_back_to_back_windows_and_bookings(self):
+        order = self._order(3)
+        self._confirm(order)
+        items = list(order.items.select_related('appointment'))
+        start = timezone.make_aware(datetime.combine(order.scheduled_date, time(9, 0)))
+        self.assertEqual(items[0].appointment.start_time, start)
+        # 60 minutes + 15 padding, then 90 minutes + 15 padding
+        self.assertEqual(items[1].appointment.start_time, start + timedelta(minutes=75))
+        self.assertEqual(items[2].appointment.start_time, start + timedelta(minutes=180))
+        self.assertEqual(items[2].appointment.end_time, start + timedelta(minutes=300))
+        self.assertEqual(CustomerAppointment.objects.filter(customer=self.customer).count(), 3)
+
+        # Confirming again does not duplicate appointments
+        order.status = 'pending'
+        order.save()
+        self._confirm(order)
+        self.assertEqual(Appointment.objects.filter(order=order).count(), 3)
 
-# Orders tests
+    def test_query_count_pinned(self):
+        for item_count in (1, 5):
+            order = self._order(item_count)
+            with self.assertNumQueries(self.CONFIRM_QUERIES):
+                self._confirm(order)
@@ -6,16 +6,19 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.db import transaction
 from django.utils import timezone
 from datetime import datetime, timedelta, time as time_obj
 from django.contrib.auth import get_user_model
+from apps.core.pagination import OrderCursorPagination
 from apps.core.permissions import (
     IsCustomer, IsAdminOrManager, IsStaff, IsStaffOrManager, IsOwnerOrAdmin
 )
 from apps.core.utils import can_cancel_or_reschedule
 from .models import Order, OrderItem, ChangeRequest
 from .serializers import (
-    OrderSerializer, OrderItemSerializer, OrderCreateSerializer, ChangeRequestSerializer
+    OrderSerializer, OrderItemSerializer, OrderCreateSerializer, ChangeRequestSerializer,
+    prefetch_order_relations,
 )
 from apps.services.models import Service
 from apps.staff.models import Staff
@@ -32,7 +35,7 @@ class OrderPublicViewSet(viewsets.ModelViewSet):
     POST /api/bkg/orders/
     GET /api/bkg/guest/order/{order_number}/
     """
-    queryset = Order.objects.prefetch_related('items', 'appointments').all()
+    queryset = prefetch_order_relations(Order.objects.all())
     serializer_class = OrderSerializer
     permission_classes = [AllowAny]  # Public write access for guest checkout
     
@@ -180,19 +183,15 @@ class OrderPublicViewSet(viewsets.ModelViewSet):
                 'total_price': item_total,
             })
         
-        # Apply coupon discount if valid
+        # Apply coupon discount (the use is claimed atomically with the order below)
+        order_amount = total_price
         if coupon:
-            # Re-validate with actual order amount
+            # Re-validate with actual order amount (per-customer limit is checked on redemption)
             is_valid, error_message = coupon.is_valid(
-                customer=customer,
                 order_amount=total_price,
                 service_ids=[item['service'].id for item in order_items]
             )
-            
-            if is_valid:
-                discount_amount = coupon.calculate_discount(total_price)
-                total_price = total_price - discount_amount
-            else:
+            if not is_valid:
                 return Response({
                     'success': False,
                     'error': {
@@ -200,6 +199,8 @@ class OrderPublicViewSet(viewsets.ModelViewSet):
                         'message': error_message,
                     }
                 }, status=status.HTTP_400_BAD_REQUEST)
+            discount_amount = coupon.calculate_discount(total_price)
+            total_price = total_price - discount_amount
         
         # Guest/display fields: always store from payload when provided (for invoices & display)
         # When customer_id is sent (logged-in user), still save guest_* so order has full info
@@ -211,74 +212,80 @@ class OrderPublicViewSet(viewsets.ModelViewSet):
         if guest_email and not guest_phone and customer:
             guest_phone = getattr(customer, 'phone', None)
 
-        # Create order (pending first so we have pk for signal)
-        order = Order.objects.create(
-            customer=customer,
-            status='pending',
-            total_price=total_price,
-            deposit_paid=0,
-            payment_status='pending',
-            scheduled_date=scheduled_date,
-            scheduled_time=scheduled_time,
-            cancellation_policy_hours=24,
-            # Guest/display fields (always set so order has full info)
-            guest_email=guest_email,
-            guest_name=guest_name,
-            guest_phone=guest_phone,
-            address_line1=serializer.validated_data['address_line1'],
-            address_line2=serializer.validated_data.get('address_line2'),
-            city=serializer.validated_data['city'],
-            postcode=serializer.validated_data['postcode'],
-            country=serializer.validated_data.get('country', 'United Kingdom'),
-            notes=serializer.validated_data.get('notes'),
-        )
+        from apps.coupons.models import CouponRedemptionError
+        try:
+            with transaction.atomic():
+                # Create order (pending first so we have pk for signal)
+                order = Order.objects.create(
+                    customer=customer,
+                    status='pending',
+                    total_price=total_price,
+                    deposit_paid=0,
+                    payment_status='pending',
+                    scheduled_date=scheduled_date,
+                    scheduled_time=scheduled_time,
+                    cancellation_policy_hours=24,
+                    # Guest/display fields (always set so order has full info)
+                    guest_email=guest_email,
+                    guest_name=guest_name,
+                    guest_phone=guest_phone,
+                    address_line1=serializer.validated_data['address_line1'],
+                    address_line2=serializer.validated_data.get('address_line2'),
+                    city=serializer.validated_data['city'],
+                    postcode=serializer.validated_data['postcode'],
+                    country=serializer.validated_data.get('country', 'United Kingdom'),
+                    notes=serializer.validated_data.get('notes'),
+                )
         
-        # Create order items
-        for item_data in order_items:
-            OrderItem.objects.create(
-                order=order,
-                service=item_data['service'],
-                staff=item_data['staff'],
-                quantity=item_data['quantity'],
-                unit_price=item_data['unit_price'],
-                total_price=item_data['total_price'],
-                status='pending',
-            )
+                # Create order items
+                for item_data in order_items:
+                    OrderItem.objects.create(
+                        order=order,
+                        service=item_data['service'],
+                        staff=item_data['staff'],
+                        quantity=item_data['quantity'],
+                        unit_price=item_data['unit_price'],
+                        total_price=item_data['total_price'],
+                        status='pending',
+                    )
         
-        # Calculate cancellation deadline
-        if scheduled_date and scheduled_time:
-            scheduled_datetime = timezone.make_aware(
-                datetime.combine(scheduled_date, scheduled_time)
-            )
-            can_cancel_val, can_reschedule_val, deadline = can_cancel_or_reschedule(
-                scheduled_datetime,
-                order.cancellation_policy_hours
-            )
-            order.can_cancel = can_cancel_val
-            order.can_reschedule = can_reschedule_val
-            order.cancellation_deadline = deadline
-            order.save()
+                # Calculate cancellation deadline
+                if scheduled_date and scheduled_time:
+                    scheduled_datetime = timezone.make_aware(
+                        datetime.combine(scheduled_date, scheduled_time)
+                    )
+                    can_cancel_val, can_reschedule_val, deadline = can_cancel_or_reschedule(
+                        scheduled_datetime,
+                        order.cancellation_policy_hours
+                    )
+                    order.can_cancel = can_cancel_val
+                    order.can_reschedule = can_reschedule_val
+                    order.cancellation_deadline = deadline
+                    order.save()
         
-        # Order remains 'pending' - admin/manager will confirm it later
-        # When order status changes to 'confirmed', the signal handler will:
-        # - Create appointments for order items
-        # - Send confirmation email
+                # Order remains 'pending' - admin/manager will confirm it later
+                # When order status changes to 'confirmed', the signal handler will:
+                # - Create appointments for order items
+                # - Send confirmation email
         
-        # Track coupon usage if coupon was applied
-        if coupon and discount_amount > 0:
-            from apps.coupons.models import CouponUsage
-            CouponUsage.objects.create(
-                coupon=coupon,
-                customer=customer,
-                guest_email=serializer.validated_data.get('guest_email') if not customer else None,
-                order=order,
-                discount_amount=discount_amount,
-                order_amount=total_price + discount_amount,  # Original amount before discount
-                final_amount=total_price,
-            )
-            # Update coupon used count
-            coupon.used_count += 1
-            coupon.save(update_fields=['used_count'])
+                # Redeem coupon: validity, usage limits and used_count increment in one step;
+                # if the coupon was used up meanwhile the order is rolled back
+                if coupon and discount_amount > 0:
+                    coupon.redeem(
+                        order_amount=order_amount,
+                        customer=customer,
+                        guest_email=serializer.validated_data.get('guest_email'),
+                        service_ids=[item['service'].id for item in order_items],
+                        order=order,
+                    )
+        except CouponRedemptionError as e:
+            return Response({
+                'success': False,
+                'error': {
+                    'code': 'INVALID_COUPON',
+                    'message': str(e),
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Serialize response
         order_serializer = OrderSerializer(order)
@@ -449,11 +456,10 @@ class OrderViewSet(viewsets.ModelViewSet):
     Admin/Manager: Full CRUD, approve change requests
     GET, PUT, PATCH, DELETE /api/cus/orders/ or /api/ad/orders/
     """
-    queryset = Order.objects.select_related('customer').prefetch_related(
-        'items', 'appointments'
-    ).all()
+    queryset = prefetch_order_relations(Order.objects.all())
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OrderCursorPagination
     
     def get_serializer_class(self):
         """Use simplified serializer for list views."""
@@ -507,19 +513,6 @@ class OrderViewSet(viewsets.ModelViewSet):
             'meta': {'count': queryset.count()},
         }, status=status.HTTP_200_OK)
 
-    def get_paginated_response(self, data):
-        """Return paginated response in shape { success, data, meta }."""
-        pagination = self.paginator
-        return Response({
-            'success': True,
-            'data': data,
-            'meta': {
-                'count': pagination.page.paginator.count,
-                'next': pagination.get_next_link(),
-                'previous': pagination.get_previous_link(),
-            },
-        }, status=status.HTTP_200_OK)
-
     def _manager_can_manage_orders(self, request):
         """Return True if admin or manager with can_manage_appointments."""
         if getattr(request.user, 'role', None) == 'admin':
@@ -908,10 +901,10 @@ def guest_check_email_view(request):
     email = email.lower().strip()
     
     # Check if user exists
-    email_exists = User.objects.filter(email__iexact=email).exists()
+    email_exists = User.objects.filter(email__lower=email.lower()).exists()
     
     # Check if customer exists (with or without user account)
-    customer_exists = Customer.objects.filter(email__iexact=email).exists()
+    customer_exists = Customer.objects.filter(email__lower=email.lower()).exists()
     
     return Response({
         'success': True,
@@ -1203,8 +1196,10 @@ def guest_order_link_register_view(request, order_number):
             }
         }, status=status.HTTP_400_BAD_REQUEST)
     
+    email_clean = email.lower().strip()
+    
     # Check if email already exists
-    if User.objects.filter(email__iexact=email).exists():
+    if User.objects.filter(email__lower=email_clean).exists():
         return Response({
             'success': False,
             'error': {
@@ -1233,7 +1228,6 @@ def guest_order_link_register_view(request, order_number):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     # Generate username from email if not provided
-    email_clean = email.lower().strip()
     base_username = email_clean.split('@')[0]
     username = base_username
     counter = 1
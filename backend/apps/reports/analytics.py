@@ -0,0 +1,149 @@
+"""
+Appointment analytics for the appointment report.
+
+Every metric (status counts, daily trend, popular services, peak hours and weekdays,
+cancellation and conversion rates) is folded from one grouped query over the range: one row
+per (start time, service) with a conditional count per status. The query only reads columns of
+the (start_time, service, status) index, so it is an index range scan in index order whatever
+the range, and the rows are streamed rather than loaded at once. Service names for the top list
+take a second, tiny query.
+
+Results are cached in the 'reports' namespace per (range, version). The version token is bumped
+after any commit that saves or deletes appointments (signals.py, and the bulk create paths of
+orders and subscriptions), so a cached result never outlives the data it was built from; the
+namespace TIMEOUT bounds staleness for writes that bypass both (queryset.update()).
+"""
+import secrets
+from datetime import datetime
+from typing import Any, Dict
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.core.caches import REPORTS_CACHE, get_cache
+
+VERSION_KEY = 'appointment_analytics_version'
+TOP_SERVICES = 20
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def _cache():
+    return get_cache(REPORTS_CACHE)
+
+
+def _statuses():
+    from apps.appointments.models import Appointment
+
+    return [value for value, _ in Appointment.STATUS_CHOICES]
+
+
+def get_version() -> str:
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, secrets.token_hex(8), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version() -> None:
+    """Invalidate every cached analytics result."""
+    _cache().set(VERSION_KEY, secrets.token_hex(8), None)
+
+
+def bump_version_on_commit() -> None:
+    # After commit, so a report computed meanwhile from the old rows is cached under the old token
+    transaction.on_commit(bump_version)
+
+
+def _rate(count: int, total: int) -> float:
+    return round((count / total * 100), 2) if total else 0
+
+
+def compute_appointment_analytics(start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+    """All appointment report metrics for start_date..end_date (inclusive), uncached."""
+    from apps.appointments.models import Appointment
+    from apps.services.models import Service
+
+    statuses = _statuses()
+    # Grouped on the stored start_time (not a truncation of it), so the database can aggregate
+    # straight off the index; appointments start on slot boundaries, so there are few distinct
+    # values. Local day and hour are derived here, once per distinct start time.
+    rows = (
+        Appointment.objects.filter(start_time__gte=start_date, start_time__lte=end_date)
+        .values('start_time', 'service_id')
+        .annotate(**{status: Count('id', filter=Q(status=status)) for status in statuses})
+        .order_by()
+    )
+
+    status_counts = dict.fromkeys(statuses, 0)
+    day_counts, service_counts = {}, {}
+    hour_counts, weekday_counts = [0] * 24, [0] * 7
+    local_times = {}
+    for row in rows.iterator(chunk_size=5000):
+        count = 0
+        for status in statuses:
+            status_counts[status] += row[status]
+            count += row[status]
+        hour = local_times.get(row['start_time'])
+        if hour is None:
+            hour = local_times[row['start_time']] = timezone.localtime(row['start_time'])
+        day = hour.date()
+        day_counts[day] = day_counts.get(day, 0) + count
+        service_counts[row['service_id']] = service_counts.get(row['service_id'], 0) + count
+        hour_counts[hour.hour] += count
+        weekday_counts[day.weekday()] += count
+
+    total = sum(status_counts.values())
+    by_status = sorted(
+        ({'status': status, 'count': count} for status, count in status_counts.items() if count),
+        key=lambda item: -item['count'],
+    )
+    top = sorted(service_counts.items(), key=lambda item: (-item[1], item[0]))[:TOP_SERVICES]
+    names = dict(Service.objects.filter(pk__in=[sid for sid, _ in top]).values_list('id', 'name')) if top else {}
+
+    cancelled = status_counts['cancelled']
+    completed = status_counts['completed']
+    no_show = status_counts['no_show']
+    return {
+        'appointment_statistics': {
+            'by_status': by_status,
+            'total': total,
+            'period_start': start_date.isoformat(),
+            'period_end': end_date.isoformat(),
+        },
+        'booking_trends': [{'date': day.isoformat(), 'count': count} for day, count in sorted(day_counts.items())],
+        'popular_services': [
+            {'service_id': sid, 'service_name': names.get(sid) or '—', 'count': count} for sid, count in top
+        ],
+        'peak_times': {
+            'by_hour': [{'hour': h, 'count': hour_counts[h]} for h in range(24)],
+            'by_day_of_week': [
+                {'day_of_week': dow, 'day_name': DAY_NAMES[dow], 'count': weekday_counts[dow]} for dow in range(7)
+            ],
+        },
+        'cancellation_rates': {
+            'cancelled_count': cancelled,
+            'total_count': total,
+            'cancellation_rate_pct': _rate(cancelled, total),
+        },
+        'conversion_metrics': {
+            'completed_count': completed,
+            'completed_rate_pct': _rate(completed, total),
+            'no_show_count': no_show,
+            'no_show_rate_pct': _rate(no_show, total),
+            'confirmed_or_pending_count': status_counts['confirmed'] + status_counts['pending'],
+        },
+    }
+
+
+def appointment_analytics(start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+    """compute_appointment_analytics(), cached per (range, version)."""
+    cache = _cache()
+    key = f'appointment_analytics_{get_version()}_{start_date.isoformat()}_{end_date.isoformat()}'
+    data = cache.get(key)
+    if data is None:
+        data = compute_appointment_analytics(start_date, end_date)
+        cache.set(key, data)
+    return data
@@ -5,3 +5,7 @@ class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reports'
     verbose_name = 'Reports'
+
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.reports.signals  # noqa
@@ -0,0 +1,358 @@
+"""
+Streaming report exports (CSV, XLSX, PDF).
+
+A report export is a title plus a list of sections, each a (heading, header row, rows) triple
+whose rows may be any iterable, including a queryset iterator. Every writer is a generator that
+yields the file piece by piece while it consumes the rows, and export_response() wraps it in a
+StreamingHttpResponse, so memory stays flat however many rows a section has.
+
+XLSX and PDF are written directly (stdlib zipfile and a minimal PDF 1.4 writer) rather than
+through openpyxl or reportlab, which build the whole document before saving it:
+- XLSX: one worksheet with inline strings (no shared string table to hold), deflated on the fly
+  into a zip written with data descriptors, so it needs no seekable output.
+- PDF: landscape A4 pages of monospaced text, one content stream per page; the page tree and
+  cross-reference table that close the file only need an array of object offsets.
+"""
+import csv
+import zlib
+import zipfile
+from array import array
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+Section = Tuple[str, Sequence[str], Iterable[Sequence[Any]]]
+
+EXPORT_FORMATS = ('csv', 'xlsx', 'pdf')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+# Rows buffered before a chunk is yielded
+CHUNK_ROWS = 500
+
+
+class _ExportRenderer(JSONRenderer):
+    """
+    Lets ?format=csv|xlsx|pdf through DRF content negotiation (which otherwise answers 404 for
+    a format no renderer claims). Exports bypass renderers (StreamingHttpResponse); error
+    responses of an export request are still rendered as JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return super().render(data, None, renderer_context)
+
+
+class CSVExportRenderer(_ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class XLSXExportRenderer(_ExportRenderer):
+    media_type = CONTENT_TYPES['xlsx']
+    format = 'xlsx'
+
+
+class PDFExportRenderer(_ExportRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+EXPORT_RENDERERS = [JSONRenderer, CSVExportRenderer, XLSXExportRenderer, PDFExportRenderer]
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return str(value)
+
+
+def _lines(title: str, sections: Iterable[Section]) -> Iterator[Tuple[str, Sequence[Any]]]:
+    """The report as ('title'|'heading'|'header'|'row'|'blank', cells) lines, in order."""
+    yield 'title', [title]
+    for heading, header, rows in sections:
+        yield 'blank', []
+        yield 'heading', [heading]
+        yield 'header', header
+        for row in rows:
+            yield 'row', row
+
+
+# CSV
+
+class _Echo:
+    """File-like object whose write() returns the value (csv.writer then returns the line)."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(title: str, sections: Iterable[Section]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    chunk = []
+    for _, cells in _lines(title, sections):
+        chunk.append(writer.writerow([_text(cell) for cell in cells]))
+        if len(chunk) >= CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+# XLSX
+
+class _Pipe:
+    """Write-only, unseekable sink for zipfile; drain() hands over what was written so far."""
+
+    def __init__(self):
+        self.parts = []
+        self.offset = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Style 1 is bold (titles, headings and header rows)
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="2"><xf fontId="0"/><xf fontId="1" applyFont="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+
+def _workbook_xml(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name, {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _xlsx_cell(value: Any, style: str) -> str:
+    if isinstance(value, bool) or value is None:
+        value = _text(value)
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c{style}><v>{value}</v></c>'
+    text = escape(_text(value))
+    return f'<c t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(title: str, sections: Iterable[Section]) -> Iterator[bytes]:
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        sheet_name = ''.join(char for char in title if char not in '[]:*?/\\')[:31] or 'Report'
+        archive.writestr('xl/workbook.xml', _workbook_xml(sheet_name))
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            chunk = []
+            for number, (kind, cells) in enumerate(_lines(title, sections), start=1):
+                style = '' if kind == 'row' else ' s="1"'
+                chunk.append(f'<row r="{number}">{"".join(_xlsx_cell(cell, style) for cell in cells)}</row>')
+                if len(chunk) >= CHUNK_ROWS:
+                    sheet.write(''.join(chunk).encode('utf-8'))
+                    chunk = []
+                    data = pipe.drain()
+                    if data:
+                        yield data
+            chunk.append('</sheetData></worksheet>')
+            sheet.write(''.join(chunk).encode('utf-8'))
+    yield pipe.drain()
+
+
+# PDF
+
+PAGE_WIDTH, PAGE_HEIGHT = 842, 595  # A4 landscape, points
+MARGIN = 36
+FONT_SIZE = 8
+LEADING = 10
+CHAR_WIDTH = FONT_SIZE * 0.6  # Courier
+LINE_CHARS = int((PAGE_WIDTH - 2 * MARGIN) / CHAR_WIDTH)
+PAGE_LINES = int((PAGE_HEIGHT - 2 * MARGIN) / LEADING)
+
+
+def _pdf_string(text: str) -> bytes:
+    data = text.encode('cp1252', errors='replace')  # WinAnsiEncoding
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _pdf_line(kind: str, cells: Sequence[Any], width: int) -> Tuple[str, bool]:
+    """(text, bold) of one report line; table cells are padded or cut to a fixed column width."""
+    if kind in ('title', 'heading', 'blank'):
+        return (_text(cells[0]) if cells else '')[:LINE_CHARS], kind != 'blank'
+    texts = [_text(cell) for cell in cells]
+    line = ''.join(
+        (text[:width - 1] + '~' if len(text) >= width else text.ljust(width)) if i < len(texts) - 1 else text
+        for i, text in enumerate(texts)
+    )
+    return line[:LINE_CHARS], kind == 'header'
+
+
+class _PdfWriter:
+    """
+    Objects are numbered in the order written: 1 is the catalog, 3 and 4 the fonts, then a
+    content stream and a page per page (so pages are 6, 8, ...), and 2, the page tree, last.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = array('q', [0] * 5)
+        self.page_count = 0
+
+    def object(self, number: int, body: bytes) -> bytes:
+        if number < len(self.offsets):
+            self.offsets[number] = self.offset
+        else:
+            self.offsets.append(self.offset)
+        data = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        self.offset += len(data)
+        return data
+
+    def raw(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def page(self, lines: List[Tuple[str, bool]]) -> bytes:
+        ops = [b'BT', b'%d TL' % LEADING, b'%d %d Td' % (MARGIN, PAGE_HEIGHT - MARGIN - FONT_SIZE)]
+        bold = None
+        for text, is_bold in lines:
+            if is_bold != bold:
+                ops.append(b'/F%d %d Tf' % (2 if is_bold else 1, FONT_SIZE))
+                bold = is_bold
+            ops.append(_pdf_string(text) + b' Tj T*')
+        ops.append(b'ET')
+        stream = zlib.compress(b'\n'.join(ops))
+        content = len(self.offsets)
+        self.page_count += 1
+        return self.object(
+            content, b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream',
+        ) + self.object(
+            content + 1,
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>' % (PAGE_WIDTH, PAGE_HEIGHT, content),
+        )
+
+    def close(self) -> Iterator[bytes]:
+        """Page tree, cross-reference table and trailer, in chunks."""
+        self.offsets[2] = self.offset
+        yield self.raw(b'2 0 obj\n<< /Type /Pages /Count %d /Kids [' % self.page_count)
+        for first in range(0, self.page_count, CHUNK_ROWS):
+            pages = range(first, min(first + CHUNK_ROWS, self.page_count))
+            yield self.raw(b''.join(b' %d 0 R' % (6 + 2 * i) for i in pages))
+        yield self.raw(b' ] >>\nendobj\n')
+        size = len(self.offsets)
+        yield b'xref\n0 %d\n0000000000 65535 f \n' % size
+        for first in range(1, size, CHUNK_ROWS):
+            yield b''.join(b'%010d 00000 n \n' % self.offsets[n] for n in range(first, min(first + CHUNK_ROWS, size)))
+        yield b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, self.offset)
+
+
+def stream_pdf(title: str, sections: Iterable[Section]) -> Iterator[bytes]:
+    writer = _PdfWriter()
+    yield writer.raw(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n') + writer.object(
+        1, b'<< /Type /Catalog /Pages 2 0 R >>',
+    ) + writer.object(
+        3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>',
+    ) + writer.object(
+        4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>',
+    )
+    lines = []
+    width = LINE_CHARS
+    for kind, cells in _lines(title, sections):
+        if kind == 'header':
+            width = max(LINE_CHARS // max(len(cells), 1), 4)
+        lines.append(_pdf_line(kind, cells, width))
+        if len(lines) == PAGE_LINES:
+            yield writer.page(lines)
+            lines = []
+    if lines or not writer.page_count:
+        yield writer.page(lines)
+    yield from writer.close()
+
+
+WRITERS = {'csv': stream_csv, 'xlsx': stream_xlsx, 'pdf': stream_pdf}
+
+
+def export_response(export_format: str, filename: str, title: str, sections: Iterable[Section]) -> StreamingHttpResponse:
+    """Stream a report as csv, xlsx or pdf; filename is given without extension."""
+    response = StreamingHttpResponse(
+        WRITERS[export_format](title, sections), content_type=CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+def requested_format(request) -> Optional[str]:
+    """The export format asked for with ?format=, or None for the JSON response."""
+    value = request.query_params.get('format', 'json')
+    return value if value in EXPORT_FORMATS else None
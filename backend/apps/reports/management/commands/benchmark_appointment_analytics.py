@@ -0,0 +1,117 @@
+"""
+Benchmark: appointment report metrics, per-metric queries vs one grouped scan (query count and wall time).
+Use: python manage.py benchmark_appointment_analytics [--appointments 1000000] [--years 4] [--ranges 90,365,1460]
+Creates synthetic services, staff and appointments spread over the last --years years inside a
+transaction that is rolled back at the end, so the database is left unchanged.
+"""
+import random
+import time as timer
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate, TruncHour
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.reports.analytics import appointment_analytics, bump_version, compute_appointment_analytics
+
+
+class _Rollback(Exception):
+    pass
+
+
+def per_metric_queries(start_date, end_date):
+    """The report as it was computed before analytics.py: one query per metric."""
+    from apps.appointments.models import Appointment
+
+    base_qs = Appointment.objects.filter(start_time__gte=start_date, start_time__lte=end_date)
+    list(base_qs.values('status').annotate(count=Count('id')).order_by('-count'))
+    list(base_qs.annotate(day=TruncDate('start_time')).values('day').annotate(count=Count('id')).order_by('day'))
+    list(base_qs.values('service__id', 'service__name').annotate(count=Count('id')).order_by('-count')[:20])
+    list(base_qs.annotate(hour=TruncHour('start_time')).values('hour').annotate(count=Count('id')).order_by('hour'))
+    for week_day in range(1, 8):
+        base_qs.filter(start_time__week_day=week_day).count()
+    for status in ('cancelled', 'completed', 'no_show'):
+        base_qs.filter(status=status).count()
+    base_qs.filter(status__in=['confirmed', 'pending']).count()
+
+
+class Command(BaseCommand):
+    help = 'Compare query count and wall time of per-metric and single-scan appointment analytics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=1000000, help='Synthetic appointments to create')
+        parser.add_argument('--years', type=int, default=4, help='Years of history the appointments cover')
+        parser.add_argument('--ranges', default='90,365,1460', help='Comma-separated report ranges in days')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                started = timer.perf_counter()
+                end = self._fixtures(options['appointments'], options['years'])
+                self.stdout.write(
+                    f"Created {options['appointments']} appointments in {timer.perf_counter() - started:.1f}s"
+                )
+                self.stdout.write(
+                    f"{'days':>5} {'rows':>8} {'per-metric q':>13} {'per-metric ms':>14} "
+                    f"{'scan q':>7} {'scan ms':>8} {'cached ms':>10}"
+                )
+                for days in [int(d) for d in options['ranges'].split(',') if d.strip()]:
+                    self._compare(end - timedelta(days=days), end, days)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _measure(self, func, *args):
+        # DEBUG keeps a bounded query log, which the bulk inserts have filled
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            started = timer.perf_counter()
+            result = func(*args)
+            elapsed = (timer.perf_counter() - started) * 1000
+        return result, len(queries.captured_queries), elapsed
+
+    def _compare(self, start_date, end_date, days):
+        _, per_metric_q, per_metric_ms = self._measure(per_metric_queries, start_date, end_date)
+        data, scan_q, scan_ms = self._measure(compute_appointment_analytics, start_date, end_date)
+        bump_version()
+        appointment_analytics(start_date, end_date)
+        _, _, cached_ms = self._measure(appointment_analytics, start_date, end_date)
+        rows = data['appointment_statistics']['total']
+        self.stdout.write(
+            f'{days:>5} {rows:>8} {per_metric_q:>13} {per_metric_ms:>14.1f} '
+            f'{scan_q:>7} {scan_ms:>8.1f} {cached_ms:>10.2f}'
+        )
+
+    def _fixtures(self, count, years):
+        from apps.appointments.models import Appointment
+        from apps.services.models import Category, Service
+        from apps.staff.models import Staff
+
+        rng = random.Random(0)
+        category = Category.objects.create(name='Benchmark', slug='benchmark-analytics')
+        services = [
+            Service.objects.create(
+                category=category, name=f'Benchmark service {i}', slug=f'benchmark-analytics-{i}',
+                duration=60, price=50, approval_status='approved',
+            )
+            for i in range(30)
+        ]
+        staff = [Staff.objects.create(name=f'Benchmark staff {i}', email=f'benchmark-analytics{i}@example.com') for i in range(50)]
+        statuses = ['completed'] * 6 + ['cancelled', 'no_show', 'confirmed', 'pending']
+        end = timezone.now().replace(minute=0, second=0, microsecond=0)
+        hours = years * 365 * 24
+        batch = []
+        for _ in range(count):
+            start = end - timedelta(hours=rng.randrange(hours))
+            batch.append(Appointment(
+                staff=rng.choice(staff), service=rng.choice(services), start_time=start,
+                end_time=start + timedelta(hours=1), status=rng.choice(statuses),
+            ))
+            if len(batch) == 10000:
+                Appointment.objects.bulk_create(batch)
+                batch = []
+        Appointment.objects.bulk_create(batch)
+        return end
@@ -0,0 +1,45 @@
+"""
+Reconcile the daily revenue rollup (RevenueDaily) with orders, subscriptions and bookings.
+Signals keep it current; this corrects changes that bypass them (queryset.update, bulk_update).
+Run nightly via cron, e.g. 0 3 * * * python manage.py reconcile_revenue_rollup
+Use: python manage.py reconcile_revenue_rollup [--days 7] [--since 2024-01-01] [--until 2024-12-31] [--all]
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.reports.rollup import oldest_day, rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily revenue facts from raw rows and report how many were corrected.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Reconcile the last N days (default: 7)')
+        parser.add_argument('--since', help='First date (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Last date (YYYY-MM-DD, default: today)')
+        parser.add_argument('--all', action='store_true', help='From the oldest order, subscription or booking')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        try:
+            until = datetime.strptime(options['until'], '%Y-%m-%d').date() if options['until'] else today
+            if options['all']:
+                since = oldest_day() or until
+            elif options['since']:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            else:
+                since = until - timedelta(days=max(options['days'], 1) - 1)
+        except ValueError:
+            raise CommandError('Dates must be YYYY-MM-DD')
+        if since > until:
+            raise CommandError('--since is after --until')
+
+        totals = rebuild_all(since, until)
+
+        corrected = sum(totals.values())
+        detail = ', '.join(f'{source}: {count}' for source, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled revenue rollup {since} to {until}: {corrected} fact(s) corrected ({detail})'
+        ))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('services', '0003_category_category_name_not_empty_and_more'),
+        ('staff', '0004_staff_staff_name_not_empty_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField(help_text='Local date the revenue was booked (created_at)')),
+                ('source', models.CharField(choices=[('order', 'Order'), ('order_item', 'Order item'), ('subscription', 'Subscription'), ('appointment', 'Appointment')], max_length=20)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0, help_text='Orders, items, subscriptions or bookings')),
+                ('service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='services.service')),
+                ('staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='staff.staff')),
+            ],
+            options={
+                'verbose_name': 'daily revenue',
+                'verbose_name_plural': 'daily revenue',
+                'db_table': 'reports_revenue_daily',
+                'ordering': ['date', 'source'],
+                'indexes': [models.Index(fields=['date', 'source'], name='reports_rev_date_47d059_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_revenue_daily(apps, schema_editor):
+    """Build the facts for all existing history; revenue reports read only the rollup."""
+    from apps.reports.rollup import oldest_day, rebuild_all
+
+    since = oldest_day(apps)
+    if since is not None:
+        rebuild_all(since, timezone.localdate(), apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_revenue_daily'),
+        ('appointments', '0006_appointment_appointment_start_t_073569_idx'),
+        ('orders', '0004_order_orders_orde_created_0fb29d_idx'),
+        ('subscriptions', '0004_subscription_subscriptio_created_086be6_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_revenue_daily, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+"""
+Reports app models.
+"""
+from django.db import models
+
+from apps.core.models import TimeStampedModel
+
+
+class RevenueDaily(TimeStampedModel):
+    """
+    Daily revenue facts by (date, source, service, staff), maintained by rollup.py.
+    Revenue reports sum these rows instead of re-aggregating orders, subscriptions and
+    appointments; years of history are a few thousand rows.
+    Sources: 'order' (order totals, no service/staff), 'order_item' (items by service/staff),
+    'subscription' and 'appointment' (paid customer bookings).
+    """
+    SOURCE_CHOICES = [
+        ('order', 'Order'),
+        ('order_item', 'Order item'),
+        ('subscription', 'Subscription'),
+        ('appointment', 'Appointment'),
+    ]
+
+    date = models.DateField(help_text='Local date the revenue was booked (created_at)')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    service = models.ForeignKey(
+        'services.Service',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    staff = models.ForeignKey(
+        'staff.Staff',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0, help_text='Orders, items, subscriptions or bookings')
+
+    class Meta:
+        db_table = 'reports_revenue_daily'
+        verbose_name = 'daily revenue'
+        verbose_name_plural = 'daily revenue'
+        ordering = ['date', 'source']
+        indexes = [
+            models.Index(fields=['date', 'source']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.source}: {self.revenue} ({self.count})"
@@ -1,274 +1,117 @@
 """
 Revenue calculation utilities.
 Aggregates revenue from orders, subscriptions, and appointments.
+
+Reads the daily rollup (RevenueDaily, see rollup.py): one query over pre-aggregated rows per
+report, whatever the range. Ranges are whole local days: start_date and end_date are both
+included in full.
 """
-from django.db.models import Sum, Count, Q, DecimalField
-from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
 
+# Facts that make up each report (see RevenueDaily.SOURCE_CHOICES)
+TOTAL_SOURCES = ('order', 'subscription', 'appointment')
+BREAKDOWN_SOURCES = ('order_item', 'subscription', 'appointment')
+COUNT_KEYS = {
+    'order': 'order_count',
+    'order_item': 'order_count',
+    'subscription': 'subscription_count',
+    'appointment': 'appointment_count',
+}
+
+
+def _local_dates(start_date, end_date):
+    """(first, last) local dates of a range given as dates or datetimes."""
+    def to_date(value):
+        if isinstance(value, datetime):
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            return timezone.localdate(value)
+        return value
+    return to_date(start_date), to_date(end_date)
+
+
+def _facts(start_date, end_date, sources):
+    from .models import RevenueDaily
+
+    start, end = _local_dates(start_date, end_date)
+    return RevenueDaily.objects.filter(date__gte=start, date__lte=end, source__in=sources)
+
+
+def _combine(rows, key_fields, extra):
+    """Fold per-source rows into one entry per key with revenue and per-source counts."""
+    combined = {}
+    for row in rows:
+        key = tuple(row[field] for field in key_fields)
+        if key not in combined:
+            combined[key] = dict(extra(row), revenue=Decimal('0'), order_count=0, subscription_count=0, appointment_count=0)
+        combined[key]['revenue'] += row['revenue'] or Decimal('0')
+        combined[key][COUNT_KEYS[row['source']]] += row['count'] or 0
+    result = []
+    for item in combined.values():
+        item['revenue'] = float(item['revenue'])
+        item['total_count'] = item['order_count'] + item['subscription_count'] + item['appointment_count']
+        result.append(item)
+    return result
+
 
 def calculate_revenue_by_period(start_date, end_date, period='day'):
     """
     Calculate revenue by period (day/week/month).
-    
+
     Args:
         start_date: Start date (datetime or date)
         end_date: End date (datetime or date)
         period: 'day', 'week', or 'month'
-    
+
     Returns:
         List of dicts with period, revenue, order_count, subscription_count
     """
-    from apps.orders.models import Order
-    from apps.subscriptions.models import Subscription
-    from apps.appointments.models import CustomerAppointment
-    
-    # Ensure dates are timezone-aware datetimes
-    if isinstance(start_date, datetime) and timezone.is_naive(start_date):
-        start_date = timezone.make_aware(start_date)
-    elif not isinstance(start_date, datetime):
-        start_date = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
-    
-    if isinstance(end_date, datetime) and timezone.is_naive(end_date):
-        end_date = timezone.make_aware(end_date)
-    elif not isinstance(end_date, datetime):
-        end_date = timezone.make_aware(datetime.combine(end_date, datetime.max.time()))
-    
-    # Filter completed orders
-    orders = Order.objects.filter(
-        status='completed',
-        payment_status__in=['paid', 'partial'],
-        created_at__gte=start_date,
-        created_at__lte=end_date
-    )
-    
-    # Filter active/completed subscriptions
-    subscriptions = Subscription.objects.filter(
-        status__in=['active', 'completed'],
-        payment_status__in=['paid', 'partial'],
-        created_at__gte=start_date,
-        created_at__lte=end_date
-    )
-    
-    # Filter completed appointments with payments
-    appointments = CustomerAppointment.objects.filter(
-        appointment__status='completed',
-        payment_status__in=['paid', 'partial'],
-        created_at__gte=start_date,
-        created_at__lte=end_date
-    )
-    
-    # Group by period
     if period == 'day':
-        trunc_func = TruncDate('created_at')
+        trunc_func = F('date')
     elif period == 'week':
-        trunc_func = TruncWeek('created_at')
+        trunc_func = TruncWeek('date')
     else:  # month
-        trunc_func = TruncMonth('created_at')
-    
-    # Aggregate orders
-    order_data = orders.annotate(
-        period=trunc_func
-    ).values('period').annotate(
-        revenue=Sum('total_price'),
-        count=Count('id')
-    ).order_by('period')
-    
-    # Aggregate subscriptions
-    subscription_data = subscriptions.annotate(
-        period=trunc_func
-    ).values('period').annotate(
-        revenue=Sum('total_price'),
-        count=Count('id')
-    ).order_by('period')
-    
-    # Aggregate appointments
-    appointment_data = appointments.annotate(
+        trunc_func = TruncMonth('date')
+
+    rows = _facts(start_date, end_date, TOTAL_SOURCES).annotate(
         period=trunc_func
-    ).values('period').annotate(
-        revenue=Sum('total_price'),
-        count=Count('id')
+    ).values('period', 'source').annotate(
+        revenue=Sum('revenue'),
+        count=Sum('count')
     ).order_by('period')
-    
-    # Combine data
-    period_dict = {}
-    
-    for item in order_data:
-        period_key = str(item['period'])
-        if period_key not in period_dict:
-            period_dict[period_key] = {
-                'period': item['period'],
-                'revenue': Decimal('0'),
-                'order_count': 0,
-                'subscription_count': 0,
-                'appointment_count': 0,
-            }
-        period_dict[period_key]['revenue'] += Decimal(str(item['revenue'] or 0))
-        period_dict[period_key]['order_count'] += item['count']
-    
-    for item in subscription_data:
-        period_key = str(item['period'])
-        if period_key not in period_dict:
-            period_dict[period_key] = {
-                'period': item['period'],
-                'revenue': Decimal('0'),
-                'order_count': 0,
-                'subscription_count': 0,
-                'appointment_count': 0,
-            }
-        period_dict[period_key]['revenue'] += Decimal(str(item['revenue'] or 0))
-        period_dict[period_key]['subscription_count'] += item['count']
-    
-    for item in appointment_data:
-        period_key = str(item['period'])
-        if period_key not in period_dict:
-            period_dict[period_key] = {
-                'period': item['period'],
-                'revenue': Decimal('0'),
-                'order_count': 0,
-                'subscription_count': 0,
-                'appointment_count': 0,
-            }
-        period_dict[period_key]['revenue'] += Decimal(str(item['revenue'] or 0))
-        period_dict[period_key]['appointment_count'] += item['count']
-    
-    # Convert to list and format
-    result = []
-    for period_key in sorted(period_dict.keys()):
-        item = period_dict[period_key]
-        result.append({
-            'period': item['period'].isoformat() if hasattr(item['period'], 'isoformat') else str(item['period']),
-            'revenue': float(item['revenue']),
-            'order_count': item['order_count'],
-            'subscription_count': item['subscription_count'],
-            'appointment_count': item['appointment_count'],
-            'total_count': item['order_count'] + item['subscription_count'] + item['appointment_count'],
-        })
-    
+
+    result = _combine(rows, ['period'], lambda row: {'period': row['period']})
+    for item in result:
+        item['period'] = item['period'].isoformat() if hasattr(item['period'], 'isoformat') else str(item['period'])
+    result.sort(key=lambda x: x['period'])
     return result
 
 
 def calculate_revenue_by_service(start_date, end_date):
     """
     Calculate revenue by service.
-    
+
     Args:
         start_date: Start date
         end_date: End date
-    
+
     Returns:
         List of dicts with service_id, service_name, revenue, count
     """
-    from apps.orders.models import Order, OrderItem
-    from apps.subscriptions.models import Subscription
-    from apps.appointments.models import CustomerAppointment
-    
-    # Ensure dates are timezone-aware
-    if isinstance(start_date, datetime) and timezone.is_naive(start_date):
-        start_date = timezone.make_aware(start_date)
-    elif not isinstance(start_date, datetime):
-        start_date = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
-    
-    if isinstance(end_date, datetime) and timezone.is_naive(end_date):
-        end_date = timezone.make_aware(end_date)
-    elif not isinstance(end_date, datetime):
-        end_date = timezone.make_aware(datetime.combine(end_date, datetime.max.time()))
-    
-    # Revenue from order items
-    order_items = OrderItem.objects.filter(
-        order__status='completed',
-        order__payment_status__in=['paid', 'partial'],
-        order__created_at__gte=start_date,
-        order__created_at__lte=end_date
-    ).values('service__id', 'service__name').annotate(
-        revenue=Sum('total_price'),
-        count=Count('id')
-    )
-    
-    # Revenue from subscriptions
-    subscriptions = Subscription.objects.filter(
-        status__in=['active', 'completed'],
-        payment_status__in=['paid', 'partial'],
-        created_at__gte=start_date,
-        created_at__lte=end_date
-    ).values('service__id', 'service__name').annotate(
-        revenue=Sum('total_price'),
-        count=Count('id')
-    )
-    
-    # Revenue from appointments
-    appointments = CustomerAppointment.objects.filter(
-        appointment__status='completed',
-        payment_status__in=['paid', 'partial'],
-        appointment__service__isnull=False,
-        created_at__gte=start_date,
-        created_at__lte=end_date
-    ).values('appointment__service__id', 'appointment__service__name').annotate(
-        revenue=Sum('total_price'),
-        count=Count('id')
+    rows = _facts(start_date, end_date, BREAKDOWN_SOURCES).filter(
+        service__isnull=False
+    ).values('service_id', 'service__name', 'source').annotate(
+        revenue=Sum('revenue'),
+        count=Sum('count')
+    ).order_by()
+
+    result = _combine(
+        rows, ['service_id'], lambda row: {'service_id': row['service_id'], 'service_name': row['service__name']},
     )
-    
-    # Combine data
-    service_dict = {}
-    
-    for item in order_items:
-        service_id = item['service__id']
-        if service_id not in service_dict:
-            service_dict[service_id] = {
-                'service_id': service_id,
-                'service_name': item['service__name'],
-                'revenue': Decimal('0'),
-                'order_count': 0,
-                'subscription_count': 0,
-                'appointment_count': 0,
-            }
-        service_dict[service_id]['revenue'] += Decimal(str(item['revenue'] or 0))
-        service_dict[service_id]['order_count'] += item['count']
-    
-    for item in subscriptions:
-        service_id = item['service__id']
-        if service_id not in service_dict:
-            service_dict[service_id] = {
-                'service_id': service_id,
-                'service_name': item['service__name'],
-                'revenue': Decimal('0'),
-                'order_count': 0,
-                'subscription_count': 0,
-                'appointment_count': 0,
-            }
-        service_dict[service_id]['revenue'] += Decimal(str(item['revenue'] or 0))
-        service_dict[service_id]['subscription_count'] += item['count']
-    
-    for item in appointments:
-        service_id = item['appointment__service__id']
-        if service_id not in service_dict:
-            service_dict[service_id] = {
-                'service_id': service_id,
-                'service_name': item['appointment__service__name'],
-                'revenue': Decimal('0'),
-                'order_count': 0,
-                'subscription_count': 0,
-                'appointment_count': 0,
-            }
-        service_dict[service_id]['revenue'] += Decimal(str(item['revenue'] or 0))
-        service_dict[service_id]['appointment_count'] += item['count']
-    
-    # Convert to list and sort by revenue
-    result = []
-    for service_id in service_dict:
-        item = service_dict[service_id]
-        result.append({
-            'service_id': item['service_id'],
-            'service_name': item['service_name'],
-            'revenue': float(item['revenue']),
-            'order_count': item['order_count'],
-            'subscription_count': item['subscription_count'],
-            'appointment_count': item['appointment_count'],
-            'total_count': item['order_count'] + item['subscription_count'] + item['appointment_count'],
-        })
-    
     result.sort(key=lambda x: x['revenue'], reverse=True)
     return result
 
@@ -276,124 +119,24 @@ def calculate_revenue_by_service(start_date, end_date):
 def calculate_revenue_by_staff(start_date, end_date):
     """
     Calculate revenue by staff member.
-    
+
     Args:
         start_date: Start date
         end_date: End date
-    
+
     Returns:
         List of dicts with staff_id, staff_name, revenue, count
     """
-    from apps.orders.models import Order, OrderItem
-    from apps.subscriptions.models import Subscription
-    from apps.appointments.models import CustomerAppointment
-    
-    # Ensure dates are timezone-aware
-    if isinstance(start_date, datetime) and timezone.is_naive(start_date):
-        start_date = timezone.make_aware(start_date)
-    elif not isinstance(start_date, datetime):
-        start_date = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
-    
-    if isinstance(end_date, datetime) and timezone.is_naive(end_date):
-        end_date = timezone.make_aware(end_date)
-    elif not isinstance(end_date, datetime):
-        end_date = timezone.make_aware(datetime.combine(end_date, datetime.max.time()))
-    
-    # Revenue from order items
-    order_items = OrderItem.objects.filter(
-        order__status='completed',
-        order__payment_status__in=['paid', 'partial'],
-        order__created_at__gte=start_date,
-        order__created_at__lte=end_date,
+    rows = _facts(start_date, end_date, BREAKDOWN_SOURCES).filter(
         staff__isnull=False
-    ).values('staff__id', 'staff__name').annotate(
-        revenue=Sum('total_price'),
-        count=Count('id')
-    )
-    
-    # Revenue from subscriptions
-    subscriptions = Subscription.objects.filter(
-        status__in=['active', 'completed'],
-        payment_status__in=['paid', 'partial'],
-        created_at__gte=start_date,
-        created_at__lte=end_date,
-        staff__isnull=False
-    ).values('staff__id', 'staff__name').annotate(
-        revenue=Sum('total_price'),
-        count=Count('id')
-    )
-    
-    # Revenue from appointments
-    appointments = CustomerAppointment.objects.filter(
-        appointment__status='completed',
-        payment_status__in=['paid', 'partial'],
-        appointment__staff__isnull=False,
-        created_at__gte=start_date,
-        created_at__lte=end_date
-    ).values('appointment__staff__id', 'appointment__staff__name').annotate(
-        revenue=Sum('total_price'),
-        count=Count('id')
+    ).values('staff_id', 'staff__name', 'source').annotate(
+        revenue=Sum('revenue'),
+        count=Sum('count')
+    ).order_by()
+
+    result = _combine(
+        rows, ['staff_id'], lambda row: {'staff_id': row['staff_id'], 'staff_name': row['staff__name']},
     )
-    
-    # Combine data
-    staff_dict = {}
-    
-    for item in order_items:
-        staff_id = item['staff__id']
-        if staff_id not in staff_dict:
-            staff_dict[staff_id] = {
-                'staff_id': staff_id,
-                'staff_name': item['staff__name'],
-                'revenue': Decimal('0'),
-                'order_count': 0,
-                'subscription_count': 0,
-                'appointment_count': 0,
-            }
-        staff_dict[staff_id]['revenue'] += Decimal(str(item['revenue'] or 0))
-        staff_dict[staff_id]['order_count'] += item['count']
-    
-    for item in subscriptions:
-        staff_id = item['staff__id']
-        if staff_id not in staff_dict:
-            staff_dict[staff_id] = {
-                'staff_id': staff_id,
-                'staff_name': item['staff__name'],
-                'revenue': Decimal('0'),
-                'order_count': 0,
-                'subscription_count': 0,
-                'appointment_count': 0,
-            }
-        staff_dict[staff_id]['revenue'] += Decimal(str(item['revenue'] or 0))
-        staff_dict[staff_id]['subscription_count'] += item['count']
-    
-    for item in appointments:
-        staff_id = item['appointment__staff__id']
-        if staff_id not in staff_dict:
-            staff_dict[staff_id] = {
-                'staff_id': staff_id,
-                'staff_name': item['appointment__staff__name'],
-                'revenue': Decimal('0'),
-                'order_count': 0,
-                'subscription_count': 0,
-                'appointment_count': 0,
-            }
-        staff_dict[staff_id]['revenue'] += Decimal(str(item['revenue'] or 0))
-        staff_dict[staff_id]['appointment_count'] += item['count']
-    
-    # Convert to list and sort by revenue
-    result = []
-    for staff_id in staff_dict:
-        item = staff_dict[staff_id]
-        result.append({
-            'staff_id': item['staff_id'],
-            'staff_name': item['staff_name'],
-            'revenue': float(item['revenue']),
-            'order_count': item['order_count'],
-            'subscription_count': item['subscription_count'],
-            'appointment_count': item['appointment_count'],
-            'total_count': item['order_count'] + item['subscription_count'] + item['appointment_count'],
-        })
-    
     result.sort(key=lambda x: x['revenue'], reverse=True)
     return result
 
@@ -401,55 +144,24 @@ def calculate_revenue_by_staff(start_date, end_date):
 def calculate_total_revenue(start_date, end_date):
     """
     Calculate total revenue for a date range.
-    
+
     Args:
         start_date: Start date
         end_date: End date
-    
+
     Returns:
         Dict with total_revenue, order_revenue, subscription_revenue, appointment_revenue
     """
-    from apps.orders.models import Order
-    from apps.subscriptions.models import Subscription
-    from apps.appointments.models import CustomerAppointment
-    
-    # Ensure dates are timezone-aware
-    if isinstance(start_date, datetime) and timezone.is_naive(start_date):
-        start_date = timezone.make_aware(start_date)
-    elif not isinstance(start_date, datetime):
-        start_date = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
-    
-    if isinstance(end_date, datetime) and timezone.is_naive(end_date):
-        end_date = timezone.make_aware(end_date)
-    elif not isinstance(end_date, datetime):
-        end_date = timezone.make_aware(datetime.combine(end_date, datetime.max.time()))
-    
-    # Calculate revenue from orders
-    order_revenue = Order.objects.filter(
-        status='completed',
-        payment_status__in=['paid', 'partial'],
-        created_at__gte=start_date,
-        created_at__lte=end_date
-    ).aggregate(total=Sum('total_price'))['total'] or Decimal('0')
-    
-    # Calculate revenue from subscriptions
-    subscription_revenue = Subscription.objects.filter(
-        status__in=['active', 'completed'],
-        payment_status__in=['paid', 'partial'],
-        created_at__gte=start_date,
-        created_at__lte=end_date
-    ).aggregate(total=Sum('total_price'))['total'] or Decimal('0')
-    
-    # Calculate revenue from appointments
-    appointment_revenue = CustomerAppointment.objects.filter(
-        appointment__status='completed',
-        payment_status__in=['paid', 'partial'],
-        created_at__gte=start_date,
-        created_at__lte=end_date
-    ).aggregate(total=Sum('total_price'))['total'] or Decimal('0')
-    
+    by_source = {
+        row['source']: row['total'] or Decimal('0')
+        for row in _facts(start_date, end_date, TOTAL_SOURCES).values('source').annotate(total=Sum('revenue')).order_by()
+    }
+    order_revenue = by_source.get('order', Decimal('0'))
+    subscription_revenue = by_source.get('subscription', Decimal('0'))
+    appointment_revenue = by_source.get('appointment', Decimal('0'))
+
     total_revenue = order_revenue + subscription_revenue + appointment_revenue
-    
+
     return {
         'total_revenue': float(total_revenue),
         'order_revenue': float(order_revenue),
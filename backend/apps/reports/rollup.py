@@ -0,0 +1,186 @@
+"""
+Daily revenue rollup (RevenueDaily).
+
+Facts are rebuilt per day and source: rebuild() re-aggregates raw Order, OrderItem,
+Subscription and CustomerAppointment rows for a date range and writes only the facts that
+differ. Signals (signals.py) schedule a rebuild of the affected day when a row that counts, or
+counted, towards revenue changes; it runs after commit. Writes that bypass signals
+(queryset.update, bulk_update) are corrected by the nightly `manage.py reconcile_revenue_rollup`.
+
+Revenue is booked on the local date of created_at, as in the original report queries.
+The reports migration 0002 backfills the whole history with rebuild_all().
+"""
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PAID_STATUSES = ('paid', 'partial')
+SOURCES = ('order', 'order_item', 'subscription', 'appointment')
+# Days rebuilt per pass by rebuild_all, so years of data stay within memory
+CHUNK_DAYS = 92
+
+FactKey = Tuple[date, Optional[int], Optional[int]]  # (date, service_id, staff_id)
+
+_pending = threading.local()
+
+
+def _source_models(apps):
+    return [
+        apps.get_model('orders', 'Order'),
+        apps.get_model('orders', 'OrderItem'),
+        apps.get_model('subscriptions', 'Subscription'),
+        apps.get_model('appointments', 'CustomerAppointment'),
+    ]
+
+
+def _sources(apps=django_apps):
+    """source -> (qualifying rows, created_at path, service id path, staff id path)."""
+    Order, OrderItem, Subscription, CustomerAppointment = _source_models(apps)
+
+    return {
+        'order': (
+            Order.objects.filter(status='completed', payment_status__in=PAID_STATUSES),
+            'created_at', None, None,
+        ),
+        'order_item': (
+            OrderItem.objects.filter(order__status='completed', order__payment_status__in=PAID_STATUSES),
+            'order__created_at', 'service_id', 'staff_id',
+        ),
+        'subscription': (
+            Subscription.objects.filter(status__in=['active', 'completed'], payment_status__in=PAID_STATUSES),
+            'created_at', 'service_id', 'staff_id',
+        ),
+        'appointment': (
+            CustomerAppointment.objects.filter(appointment__status='completed', payment_status__in=PAID_STATUSES),
+            'created_at', 'appointment__service_id', 'appointment__staff_id',
+        ),
+    }
+
+
+def day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def compute_facts(source: str, start: date, end: date, apps=django_apps) -> Dict[FactKey, Tuple[Decimal, int]]:
+    """Aggregate raw rows of one source for start..end (local dates, inclusive)."""
+    queryset, date_field, service_field, staff_field = _sources(apps)[source]
+    group = [field for field in (service_field, staff_field) if field]
+    rows = (
+        queryset.filter(**{f'{date_field}__gte': day_start(start), f'{date_field}__lt': day_start(end + timedelta(days=1))})
+        .annotate(day=TruncDate(date_field))
+        .values('day', *group)
+        .annotate(revenue=Sum('total_price'), count=Count('id'))
+        .order_by()
+    )
+    return {
+        (
+            row['day'],
+            row[service_field] if service_field else None,
+            row[staff_field] if staff_field else None,
+        ): (row['revenue'] or Decimal('0'), row['count'])
+        for row in rows
+    }
+
+
+def rebuild(start: date, end: date, sources: Iterable[str] = SOURCES, apps=django_apps) -> Dict[str, int]:
+    """
+    Make the facts for start..end match the raw rows. Only differing facts are written.
+    Returns {source: facts created, updated or deleted}. apps may be a migration's historical apps.
+    """
+    RevenueDaily = apps.get_model('reports', 'RevenueDaily')
+
+    changes = {}
+    now = timezone.now()
+    for source in sources:
+        computed = compute_facts(source, start, end, apps)
+        existing, duplicates = {}, []
+        for fact in RevenueDaily.objects.filter(source=source, date__gte=start, date__lte=end):
+            key = (fact.date, fact.service_id, fact.staff_id)
+            if key in existing:
+                # Two concurrent refreshes both inserted this fact
+                duplicates.append(fact.pk)
+            else:
+                existing[key] = fact
+        new, changed = [], []
+        for key, (revenue, count) in computed.items():
+            fact = existing.pop(key, None)
+            if fact is None:
+                new.append(RevenueDaily(
+                    date=key[0], source=source, service_id=key[1], staff_id=key[2], revenue=revenue, count=count,
+                ))
+            elif fact.revenue != revenue or fact.count != count:
+                fact.revenue, fact.count, fact.updated_at = revenue, count, now
+                changed.append(fact)
+        stale = [fact.pk for fact in existing.values()] + duplicates
+        with transaction.atomic():
+            if new:
+                RevenueDaily.objects.bulk_create(new)
+            if changed:
+                RevenueDaily.objects.bulk_update(changed, ['revenue', 'count', 'updated_at'])
+            if stale:
+                RevenueDaily.objects.filter(pk__in=stale).delete()
+        changes[source] = len(new) + len(changed) + len(stale)
+    return changes
+
+
+def oldest_day(apps=django_apps) -> Optional[date]:
+    """Local date of the oldest order, subscription or booking (None without any)."""
+    Order, _, Subscription, CustomerAppointment = _source_models(apps)
+    oldest = [
+        model.objects.aggregate(first=Min('created_at'))['first']
+        for model in (Order, Subscription, CustomerAppointment)
+    ]
+    oldest = [value for value in oldest if value]
+    return timezone.localdate(min(oldest)) if oldest else None
+
+
+def rebuild_all(since: date, until: date, apps=django_apps) -> Dict[str, int]:
+    """rebuild() for since..until in CHUNK_DAYS passes; returns the summed changes per source."""
+    totals = dict.fromkeys(SOURCES, 0)
+    start = since
+    while start <= until:
+        end = min(start + timedelta(days=CHUNK_DAYS - 1), until)
+        for source, changed in rebuild(start, end, apps=apps).items():
+            totals[source] += changed
+        start = end + timedelta(days=1)
+    return totals
+
+
+def schedule_refresh(created_at, *sources: str):
+    """Rebuild the day of created_at for the given sources once the current transaction commits."""
+    if created_at is None:
+        return
+    pending = getattr(_pending, 'keys', None)
+    if pending is None:
+        pending = _pending.keys = set()
+    day = timezone.localdate(created_at)
+    pending.update((day, source) for source in sources)
+    # Every call registers a flush; the first one to run does the work for the whole
+    # transaction. Keys left by a rolled back transaction are refreshed at the next commit,
+    # which is harmless.
+    transaction.on_commit(_flush, robust=True)
+
+
+def _flush():
+    keys = getattr(_pending, 'keys', None)
+    if not keys:
+        return
+    _pending.keys = set()
+    by_day = {}
+    for day, source in keys:
+        by_day.setdefault(day, set()).add(source)
+    for day, sources in sorted(by_day.items()):
+        try:
+            rebuild(day, day, sorted(sources))
+        except Exception as e:
+            logger.error(f"Revenue rollup refresh of {day} failed (reconcile will fix it): {e}")
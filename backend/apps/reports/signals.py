@@ -0,0 +1,112 @@
+"""
+Reports signals.
+
+Keep the daily revenue rollup in step with orders, subscriptions and customer bookings. Each
+model remembers at load time (post_init) whether the row counted towards revenue; on save or
+delete, the day is refreshed if the row counts now or counted before.
+
+Saving or deleting an appointment also bumps the appointment analytics version (analytics.py).
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.appointments.models import Appointment, CustomerAppointment
+from apps.orders.models import Order, OrderItem
+from apps.subscriptions.models import Subscription
+
+from .analytics import bump_version_on_commit
+from .rollup import PAID_STATUSES, schedule_refresh
+
+
+def _order_counts(order):
+    return order.status == 'completed' and order.payment_status in PAID_STATUSES
+
+
+def _subscription_counts(subscription):
+    return subscription.status in ('active', 'completed') and subscription.payment_status in PAID_STATUSES
+
+
+def _booking_counts(booking):
+    # Whether the appointment is completed is checked by the rebuild itself
+    return booking.payment_status in PAID_STATUSES
+
+
+_COUNTS = {
+    Order: _order_counts,
+    Subscription: _subscription_counts,
+    CustomerAppointment: _booking_counts,
+}
+
+
+@receiver(post_init, sender=Order)
+@receiver(post_init, sender=Subscription)
+@receiver(post_init, sender=CustomerAppointment)
+def remember_revenue_state(sender, instance, **kwargs):
+    # Rows loaded with .only()/.defer() skip the check rather than trigger queries
+    loaded = instance.__dict__
+    if 'payment_status' in loaded and (sender is CustomerAppointment or 'status' in loaded):
+        instance._counted_revenue = _COUNTS[sender](instance)
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_status(sender, instance, **kwargs):
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+def _changed(sender, instance, signal):
+    counts = signal is not post_delete and _COUNTS[sender](instance)
+    counted = getattr(instance, '_counted_revenue', False)
+    instance._counted_revenue = counts
+    return counts or counted
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def refresh_order_revenue(sender, instance, **kwargs):
+    if _changed(sender, instance, kwargs['signal']):
+        schedule_refresh(instance.created_at, 'order', 'order_item')
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_item_revenue(sender, instance, **kwargs):
+    if OrderItem.order.is_cached(instance):
+        order = instance.order
+        state = (order.status, order.payment_status, order.created_at)
+    else:
+        state = Order.objects.filter(pk=instance.order_id).values_list('status', 'payment_status', 'created_at').first()
+    if state and state[0] == 'completed' and state[1] in PAID_STATUSES:
+        schedule_refresh(state[2], 'order_item')
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def refresh_subscription_revenue(sender, instance, **kwargs):
+    if _changed(sender, instance, kwargs['signal']):
+        schedule_refresh(instance.created_at, 'subscription')
+
+
+@receiver(post_save, sender=CustomerAppointment)
+@receiver(post_delete, sender=CustomerAppointment)
+def refresh_booking_revenue(sender, instance, **kwargs):
+    if _changed(sender, instance, kwargs['signal']):
+        schedule_refresh(instance.created_at, 'appointment')
+
+
+@receiver(post_save, sender=Appointment)
+def refresh_completed_appointment_revenue(sender, instance, created, **kwargs):
+    """Completing (or un-completing) an appointment changes whether its paid booking counts."""
+    previous, instance._loaded_status = getattr(instance, '_loaded_status', None), instance.status
+    if created or previous == instance.status or 'completed' not in (previous, instance.status):
+        return
+    booking = CustomerAppointment.objects.filter(
+        appointment=instance, payment_status__in=PAID_STATUSES,
+    ).values_list('created_at', flat=True).first()
+    if booking:
+        schedule_refresh(booking, 'appointment')
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_appointment_analytics(sender, instance, **kwargs):
+    bump_version_on_commit()
@@ -0,0 +1,283 @@
+"""
+Reports tests.
+
+Revenue reports read the daily rollup (RevenueDaily): signals keep it current, and
+reconcile_revenue_rollup corrects writes that bypass signals. Appointment analytics come from
+one grouped scan, cached until an appointment changes. Every report streams as CSV, XLSX or PDF.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+import importlib
+import zipfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.appointments.models import Appointment, CustomerAppointment
+from apps.core.caches import REPORTS_CACHE, get_cache
+from apps.customers.models import Customer
+from apps.orders.models import Order, OrderItem
+from apps.reports.models import RevenueDaily
+from apps.reports.revenue_utils import (
+    calculate_revenue_by_period,
+    calculate_revenue_by_service,
+    calculate_revenue_by_staff,
+    calculate_total_revenue,
+)
+from apps.services.models import Category, Service
+from apps.staff.models import Staff
+from apps.subscriptions.models import Subscription
+
+User = get_user_model()
+
+
+class RevenueRollupTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.clean = Service.objects.create(category=category, name='Clean', slug='clean', duration=60, price=50)
+        self.oven = Service.objects.create(category=category, name='Oven', slug='oven', duration=60, price=40)
+        self.alice = Staff.objects.create(name='Alice', email='alice@test.com')
+        self.bob = Staff.objects.create(name='Bob', email='bob@test.com')
+        self.customer = Customer.objects.create(name='Carol', email='carol@test.com')
+        self.today = timezone.localdate()
+
+    def _order(self, status='completed', payment_status='paid'):
+        order = Order.objects.create(
+            customer=self.customer, status=status, payment_status=payment_status, total_price=Decimal('85'),
+            scheduled_date=self.today, address_line1='1 High St', city='London', postcode='SW1A 1AA',
+        )
+        OrderItem.objects.create(order=order, service=self.clean, staff=self.alice, quantity=1, unit_price=50, total_price=50)
+        OrderItem.objects.create(order=order, service=self.oven, staff=self.bob, quantity=1, unit_price=40, total_price=40)
+        return order
+
+    def _subscription(self):
+        return Subscription.objects.create(
+            customer=self.customer, service=self.clean, staff=self.alice, frequency='weekly', duration_months=1,
+            start_date=self.today, end_date=self.today + timedelta(days=30), total_appointments=4,
+            price_per_appointment=50, total_price=200, status='active', payment_status='paid',
+            address_line1='1 High St', city='London', postcode='SW1A 1AA',
+        )
+
+    def _booking(self, status='completed'):
+        start = timezone.now() - timedelta(hours=3)
+        appointment = Appointment.objects.create(
+            staff=self.bob, service=self.oven, start_time=start, end_time=start + timedelta(hours=1), status=status,
+        )
+        return CustomerAppointment.objects.create(
+            customer=self.customer, appointment=appointment, total_price=Decimal('30'), payment_status='paid',
+        )
+
+    def test_signals_keep_rollup_current(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self._order()
+            self._subscription()
+            booking = self._booking(status='confirmed')
+
+        self.assertEqual(calculate_total_revenue(self.today, self.today), {
+            'total_revenue': 285.0, 'order_revenue': 85.0, 'subscription_revenue': 200.0, 'appointment_revenue': 0.0,
+        })
+        # Completing the appointment makes its paid booking count
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.appointment.status = 'completed'
+            booking.appointment.save()
+        self.assertEqual(calculate_total_revenue(self.today, self.today)['appointment_revenue'], 30.0)
+
+        by_service = {row['service_name']: row for row in calculate_revenue_by_service(self.today, self.today)}
+        self.assertEqual(by_service['Clean']['revenue'], 250.0)
+        self.assertEqual((by_service['Clean']['order_count'], by_service['Clean']['subscription_count']), (1, 1))
+        self.assertEqual(by_service['Oven']['revenue'], 70.0)
+        by_staff = {row['staff_name']: row['revenue'] for row in calculate_revenue_by_staff(self.today, self.today)}
+        self.assertEqual(by_staff, {'Alice': 250.0, 'Bob': 70.0})
+        [day] = calculate_revenue_by_period(self.today, self.today)
+        self.assertEqual((day['period'], day['revenue'], day['total_count']), (self.today.isoformat(), 315.0, 3))
+
+        # A refund takes the order and its items out again
+        with self.captureOnCommitCallbacks(execute=True):
+            order.payment_status = 'refunded'
+            order.save()
+        self.assertEqual(calculate_total_revenue(self.today, self.today)['order_revenue'], 0.0)
+        self.assertFalse(RevenueDaily.objects.filter(source__in=['order', 'order_item']).exists())
+
+    def test_reconcile_corrects_writes_that_bypass_signals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self._order(status='pending', payment_status='pending')
+        self.assertFalse(RevenueDaily.objects.exists())
+        Order.objects.filter(pk=order.pk).update(status='completed', payment_status='paid')
+
+        out = StringIO()
+        call_command('reconcile_revenue_rollup', stdout=out)
+        self.assertIn('3 fact(s) corrected', out.getvalue())
+        self.assertEqual(calculate_total_revenue(self.today, self.today)['order_revenue'], 85.0)
+        out = StringIO()
+        call_command('reconcile_revenue_rollup', stdout=out)
+        self.assertIn('0 fact(s) corrected', out.getvalue())
+
+    def test_migration_backfills_existing_history(self):
+        self._order()
+        self._subscription()
+        RevenueDaily.objects.all().delete()
+        migration = importlib.import_module('apps.reports.migrations.0002_backfill_revenue_daily')
+        state = MigrationExecutor(connection).loader.project_state(('reports', '0002_backfill_revenue_daily'))
+        migration.backfill_revenue_daily(state.apps, None)
+        self.assertEqual(calculate_total_revenue(self.today, self.today)['total_revenue'], 285.0)
+
+    def test_multi_year_report_reads_few_rows_in_four_queries(self):
+        admin = User.objects.create_user(email='admin@test.com', password='testpass123', role='admin', username='admin1')
+        for years_ago in range(1, 5):
+            order = self._order()
+            created = timezone.make_aware(datetime.combine(date(self.today.year - years_ago, 3, 15), time(12, 0)))
+            Order.objects.filter(pk=order.pk).update(created_at=created)
+        call_command('reconcile_revenue_rollup', '--all', stdout=StringIO())
+        self.assertEqual(RevenueDaily.objects.count(), 4 * 3)
+
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        start = date(self.today.year - 4, 1, 1)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/ad/reports/revenue/', {
+                'start_date': start.isoformat(), 'end_date': self.today.isoformat(), 'period': 'month',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries.captured_queries), 4)
+        data = response.data['data']
+        self.assertEqual(data['total_revenue']['order_revenue'], 340.0)
+        self.assertEqual([row['period'] for row in data['by_period']], [f'{self.today.year - n}-03-01' for n in (4, 3, 2, 1)])
+        self.assertEqual(data['by_staff'][0], {
+            'staff_id': self.alice.id, 'staff_name': 'Alice', 'revenue': 200.0,
+            'order_count': 4, 'subscription_count': 0, 'appointment_count': 0, 'total_count': 4,
+        })
+
+
+class AppointmentAnalyticsTests(TestCase):
+
+    def setUp(self):
+        get_cache(REPORTS_CACHE).clear()
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.clean = Service.objects.create(category=category, name='Clean', slug='clean', duration=60, price=50)
+        self.oven = Service.objects.create(category=category, name='Oven', slug='oven', duration=60, price=40)
+        self.staff = Staff.objects.create(name='Alice', email='alice@test.com')
+        self.admin = User.objects.create_user(email='admin@test.com', password='testpass123', role='admin', username='admin1')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        # Monday 2025-03-03
+        self.monday = date(2025, 3, 3)
+
+    def _appointment(self, day, hour, service, status):
+        start = timezone.make_aware(datetime.combine(day, time(hour, 0)))
+        return Appointment.objects.create(
+            staff=self.staff, service=service, start_time=start, end_time=start + timedelta(hours=1), status=status,
+        )
+
+    def _report(self):
+        return self.client.get('/api/ad/reports/appointments/', {'start_date': '2025-03-01', 'end_date': '2025-03-31'})
+
+    def test_metrics_from_one_scan_cached_until_appointments_change(self):
+        tuesday = self.monday + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._appointment(self.monday, 9, self.clean, 'completed')
+            self._appointment(self.monday, 9, self.clean, 'cancelled')
+            self._appointment(self.monday, 14, self.oven, 'no_show')
+            self._appointment(tuesday, 9, self.clean, 'confirmed')
+            pending = self._appointment(tuesday, 10, self.oven, 'pending')
+            self._appointment(date(2025, 4, 1), 9, self.clean, 'completed')  # outside the range
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._report()
+        self.assertEqual(response.status_code, 200)
+        # The grouped appointment scan and the names of the top services
+        self.assertEqual(len(queries.captured_queries), 2)
+        data = response.data['data']
+        self.assertEqual(data['appointment_statistics']['total'], 5)
+        self.assertEqual(
+            {row['status']: row['count'] for row in data['appointment_statistics']['by_status']},
+            {'pending': 1, 'confirmed': 1, 'completed': 1, 'cancelled': 1, 'no_show': 1},
+        )
+        self.assertEqual(data['booking_trends'], [
+            {'date': '2025-03-03', 'count': 3}, {'date': '2025-03-04', 'count': 2},
+        ])
+        self.assertEqual(data['popular_services'], [
+            {'service_id': self.clean.id, 'service_name': 'Clean', 'count': 3},
+            {'service_id': self.oven.id, 'service_name': 'Oven', 'count': 2},
+        ])
+        by_hour = {row['hour']: row['count'] for row in data['peak_times']['by_hour'] if row['count']}
+        self.assertEqual(by_hour, {9: 3, 10: 1, 14: 1})
+        self.assertEqual([row['count'] for row in data['peak_times']['by_day_of_week']], [3, 2, 0, 0, 0, 0, 0])
+        self.assertEqual(data['cancellation_rates'], {'cancelled_count': 1, 'total_count': 5, 'cancellation_rate_pct': 20.0})
+        self.assertEqual(data['conversion_metrics'], {
+            'completed_count': 1, 'completed_rate_pct': 20.0, 'no_show_count': 1, 'no_show_rate_pct': 20.0,
+            'confirmed_or_pending_count': 2,
+        })
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._report().data['data'], data)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        # Any committed appointment change invalidates the cached result
+        with self.captureOnCommitCallbacks(execute=True):
+            pending.status = 'completed'
+            pending.save()
+        data = self._report().data['data']
+        self.assertEqual(data['conversion_metrics']['completed_count'], 2)
+        self.assertEqual(data['conversion_metrics']['confirmed_or_pending_count'], 1)
+
+
+class ReportExportTests(TestCase):
+
+    def setUp(self):
+        get_cache(REPORTS_CACHE).clear()
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.clean = Service.objects.create(category=category, name='Clean', slug='clean', duration=60, price=50)
+        self.staff = Staff.objects.create(name='Alice', email='alice@test.com')
+        admin = User.objects.create_user(email='admin@test.com', password='testpass123', role='admin', username='admin1')
+        self.client = APIClient()
+        self.client.force_authenticate(user=admin)
+        start = timezone.make_aware(datetime(2025, 3, 3, 9, 0))
+        Appointment.objects.bulk_create([
+            Appointment(
+                staff=self.staff, service=self.clean, start_time=start + timedelta(days=i),
+                end_time=start + timedelta(days=i, hours=1), status='completed',
+            )
+            for i in range(20)
+        ])
+        self.params = {'start_date': '2025-03-01', 'end_date': '2025-03-31'}
+
+    def test_reports_stream_as_csv_xlsx_and_pdf(self):
+        response = self.client.get('/api/ad/reports/appointments/', dict(self.params, format='csv'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="appointment_report_2025-03-01_to_2025-03-31.csv"')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Appointment Report 2025-03-01 to 2025-03-31')
+        self.assertIn('Total appointments,20', lines)
+        # Every appointment in the range follows the metrics
+        detail = lines[lines.index('ID,Start,End,Service,Staff,Status') + 1:]
+        self.assertEqual(len(detail), 20)
+        self.assertTrue(detail[0].endswith(',2025-03-03 09:00,2025-03-03 10:00,Clean,Alice,completed'))
+
+        response = self.client.get('/api/ad/reports/staff-performance/', dict(self.params, format='xlsx'))
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<t xml:space="preserve">Alice</t>', sheet)
+        self.assertIn('<c><v>20</v></c>', sheet)
+
+        response = self.client.get('/api/ad/reports/revenue/', dict(self.params, format='pdf'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF-1.4'))
+        self.assertTrue(content.endswith(b'%%EOF\n'))
+
+    def test_export_request_errors_stay_json(self):
+        response = self.client.get('/api/ad/reports/revenue/', {'start_date': 'nope', 'format': 'csv'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error']['code'], 'INVALID_DATE')
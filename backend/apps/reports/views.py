@@ -5,18 +5,17 @@ Dashboard overview for admin (metrics + recent activity).
 Day 3-4: Appointment reports (statistics, trends, popular services, peak times, cancellation, conversion).
 """
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.db.models import Count, Sum
-from django.db.models.functions import TruncDate, TruncHour
 from datetime import datetime, timedelta
-from django.http import HttpResponse
-import csv
 import json
 
 from apps.core.permissions import IsAdminOrManager
+from .analytics import appointment_analytics
+from .exports import EXPORT_RENDERERS, export_response, requested_format
 from .revenue_utils import (
     calculate_revenue_by_period,
     calculate_revenue_by_service,
@@ -120,6 +119,7 @@ def dashboard_overview_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAdminOrManager])
+@renderer_classes(EXPORT_RENDERERS)
 def revenue_report_view(request):
     """
     Get revenue report.
@@ -130,7 +130,7 @@ def revenue_report_view(request):
     - end_date: End date (YYYY-MM-DD)
     - period: 'day', 'week', or 'month' (default: 'day')
     - group_by: 'period', 'service', 'staff', or 'all' (default: 'all')
-    - format: 'json', 'csv', or 'pdf' (default: 'json')
+    - format: 'json', 'csv', 'xlsx', or 'pdf' (default: 'json')
     """
     # Get query parameters
     start_date_str = request.query_params.get('start_date')
@@ -201,20 +201,15 @@ def revenue_report_view(request):
     if group_by in ['all', 'staff']:
         data['by_staff'] = calculate_revenue_by_staff(start_date, end_date)
     
-    # Handle export formats
-    if format_type == 'csv':
-        return export_revenue_csv(data, start_date, end_date)
-    elif format_type == 'pdf':
-        # PDF export requires reportlab library
-        # Install with: pip install reportlab
-        # For now, return JSON with a note
-        return Response({
-            'success': False,
-            'error': {
-                'code': 'PDF_NOT_IMPLEMENTED',
-                'message': 'PDF export requires reportlab library. Install with: pip install reportlab. For now, use CSV or JSON format.',
-            }
-        }, status=status.HTTP_501_NOT_IMPLEMENTED)
+    # Handle export formats (streamed, see exports.py)
+    export_format = requested_format(request)
+    if export_format:
+        return export_response(
+            export_format,
+            f'revenue_report_{data["start_date"]}_to_{data["end_date"]}',
+            f'Revenue Report {data["start_date"]} to {data["end_date"]}',
+            revenue_export_sections(data),
+        )
     
     # Return JSON response
     return Response({
@@ -227,79 +222,92 @@ def revenue_report_view(request):
     }, status=status.HTTP_200_OK)
 
 
-def export_revenue_csv(data, start_date, end_date):
-    """
-    Export revenue data to CSV.
-    """
-    response = HttpResponse(content_type='text/csv')
-    filename = f'revenue_report_{start_date.date()}_to_{end_date.date()}.csv'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    writer = csv.writer(response)
-    
-    # Write header
-    writer.writerow(['Revenue Report'])
-    writer.writerow([f'Period: {start_date.date()} to {end_date.date()}'])
-    writer.writerow(['Generated:', timezone.now().strftime('%Y-%m-%d %H:%M:%S')])
-    writer.writerow([])
-    
-    # Write total revenue
-    writer.writerow(['Total Revenue Summary'])
-    writer.writerow(['Total Revenue', f"£{data['total_revenue']['total_revenue']:.2f}"])
-    writer.writerow(['Order Revenue', f"£{data['total_revenue']['order_revenue']:.2f}"])
-    writer.writerow(['Subscription Revenue', f"£{data['total_revenue']['subscription_revenue']:.2f}"])
-    writer.writerow(['Appointment Revenue', f"£{data['total_revenue']['appointment_revenue']:.2f}"])
-    writer.writerow([])
-    
-    # Write by period
+REVENUE_COLUMNS = ['Revenue', 'Orders', 'Subscriptions', 'Appointments', 'Total Count']
+
+
+def _revenue_rows(items, label_key):
+    for item in items:
+        yield [
+            item[label_key],
+            item['revenue'],
+            item['order_count'],
+            item['subscription_count'],
+            item['appointment_count'],
+            item['total_count'],
+        ]
+
+
+def revenue_export_sections(data):
+    """Sections of the revenue report export (see exports.py)."""
+    totals = data['total_revenue']
+    sections = [('Total Revenue Summary', ['Source', 'Revenue'], [
+        ['Total Revenue', totals['total_revenue']],
+        ['Order Revenue', totals['order_revenue']],
+        ['Subscription Revenue', totals['subscription_revenue']],
+        ['Appointment Revenue', totals['appointment_revenue']],
+    ])]
     if 'by_period' in data:
-        writer.writerow(['Revenue by Period'])
-        writer.writerow(['Period', 'Revenue', 'Orders', 'Subscriptions', 'Appointments', 'Total Count'])
-        for item in data['by_period']:
-            writer.writerow([
-                item['period'],
-                f"£{item['revenue']:.2f}",
-                item['order_count'],
-                item['subscription_count'],
-                item['appointment_count'],
-                item['total_count'],
-            ])
-        writer.writerow([])
-    
-    # Write by service
+        sections.append(('Revenue by Period', ['Period'] + REVENUE_COLUMNS, _revenue_rows(data['by_period'], 'period')))
     if 'by_service' in data:
-        writer.writerow(['Revenue by Service'])
-        writer.writerow(['Service', 'Revenue', 'Orders', 'Subscriptions', 'Appointments', 'Total Count'])
-        for item in data['by_service']:
-            writer.writerow([
-                item['service_name'],
-                f"£{item['revenue']:.2f}",
-                item['order_count'],
-                item['subscription_count'],
-                item['appointment_count'],
-                item['total_count'],
-            ])
-        writer.writerow([])
-    
-    # Write by staff
+        sections.append(('Revenue by Service', ['Service'] + REVENUE_COLUMNS, _revenue_rows(data['by_service'], 'service_name')))
     if 'by_staff' in data:
-        writer.writerow(['Revenue by Staff'])
-        writer.writerow(['Staff', 'Revenue', 'Orders', 'Subscriptions', 'Appointments', 'Total Count'])
-        for item in data['by_staff']:
-            writer.writerow([
-                item['staff_name'],
-                f"£{item['revenue']:.2f}",
-                item['order_count'],
-                item['subscription_count'],
-                item['appointment_count'],
-                item['total_count'],
-            ])
-    
-    return response
+        sections.append(('Revenue by Staff', ['Staff'] + REVENUE_COLUMNS, _revenue_rows(data['by_staff'], 'staff_name')))
+    return sections
+
+
+def _appointment_rows(start_date, end_date):
+    """Every appointment in the range, streamed from the database in start order."""
+    from apps.appointments.models import Appointment
+
+    rows = (
+        Appointment.objects.filter(start_time__gte=start_date, start_time__lte=end_date)
+        .order_by('start_time', 'id')
+        .values_list('id', 'start_time', 'end_time', 'service__name', 'staff__name', 'status')
+    )
+    for pk, start, end, service_name, staff_name, appointment_status in rows.iterator(chunk_size=2000):
+        yield [
+            pk,
+            timezone.localtime(start).strftime('%Y-%m-%d %H:%M'),
+            timezone.localtime(end).strftime('%Y-%m-%d %H:%M'),
+            service_name,
+            staff_name,
+            appointment_status,
+        ]
+
+
+def appointment_export_sections(data, start_date, end_date):
+    """Sections of the appointment report export (see exports.py)."""
+    conversion = data['conversion_metrics']
+    cancellation = data['cancellation_rates']
+    return [
+        ('Summary', ['Metric', 'Value'], [
+            ['Total appointments', data['appointment_statistics']['total']],
+            ['Completed', conversion['completed_count']],
+            ['Completed rate %', conversion['completed_rate_pct']],
+            ['Cancelled', cancellation['cancelled_count']],
+            ['Cancellation rate %', cancellation['cancellation_rate_pct']],
+            ['No-show', conversion['no_show_count']],
+            ['No-show rate %', conversion['no_show_rate_pct']],
+            ['Confirmed or pending', conversion['confirmed_or_pending_count']],
+        ]),
+        ('Appointments by Status', ['Status', 'Count'], (
+            [item['status'], item['count']] for item in data['appointment_statistics']['by_status']
+        )),
+        ('Booking Trends', ['Date', 'Count'], ([item['date'], item['count']] for item in data['booking_trends'])),
+        ('Popular Services', ['Service', 'Count'], (
+            [item['service_name'], item['count']] for item in data['popular_services']
+        )),
+        ('Peak Hours', ['Hour', 'Count'], ([item['hour'], item['count']] for item in data['peak_times']['by_hour'])),
+        ('Peak Days', ['Day', 'Count'], (
+            [item['day_name'], item['count']] for item in data['peak_times']['by_day_of_week']
+        )),
+        ('Appointments', ['ID', 'Start', 'End', 'Service', 'Staff', 'Status'], _appointment_rows(start_date, end_date)),
+    ]
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminOrManager])
+@renderer_classes(EXPORT_RENDERERS)
 def appointment_reports_view(request):
     """
     Day 3-4: Appointment analytics and performance metrics.
@@ -307,18 +315,19 @@ def appointment_reports_view(request):
     Query params: start_date (YYYY-MM-DD), end_date (YYYY-MM-DD). Default: last 90 days.
     Returns: appointment statistics, booking trends, popular services, peak times,
              cancellation rates, conversion metrics.
+    format=csv|xlsx|pdf exports the metrics followed by every appointment in the range.
     """
-    from apps.appointments.models import Appointment
-
     now = timezone.now()
     end_date_str = request.query_params.get('end_date')
     start_date_str = request.query_params.get('start_date')
+    # The default range ends at the current minute, so repeated requests share a cache entry
+    default_end = now.replace(second=0, microsecond=0)
     try:
         end_date = timezone.make_aware(
             datetime.strptime(end_date_str, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
-        ) if end_date_str else now
+        ) if end_date_str else default_end
     except ValueError:
-        end_date = now
+        end_date = default_end
     try:
         start_date = timezone.make_aware(
             datetime.strptime(start_date_str, '%Y-%m-%d').replace(hour=0, minute=0, second=0)
@@ -328,101 +337,36 @@ def appointment_reports_view(request):
     if start_date > end_date:
         start_date, end_date = end_date, start_date
 
-    base_qs = Appointment.objects.filter(
-        start_time__gte=start_date,
-        start_time__lte=end_date,
-    ).select_related('service', 'staff')
-
-    # 1. Appointment statistics (counts by status)
-    by_status = list(
-        base_qs.values('status').annotate(count=Count('id')).order_by('-count')
-    )
-    total = sum(s['count'] for s in by_status)
-    appointment_statistics = {
-        'by_status': by_status,
-        'total': total,
-        'period_start': start_date.isoformat(),
-        'period_end': end_date.isoformat(),
-    }
-
-    # 2. Booking trends (appointments over time by day)
-    trends_qs = (
-        base_qs.annotate(day=TruncDate('start_time'))
-        .values('day')
-        .annotate(count=Count('id'))
-        .order_by('day')
-    )
-    booking_trends = [
-        {'date': item['day'].isoformat() if item['day'] else None, 'count': item['count']}
-        for item in trends_qs
-    ]
-
-    # 3. Popular services (top by appointment count)
-    popular_services = list(
-        base_qs.values('service__id', 'service__name')
-        .annotate(count=Count('id'))
-        .order_by('-count')[:20]
-    )
-    popular_services = [
-        {'service_id': s['service__id'], 'service_name': s['service__name'] or '—', 'count': s['count']}
-        for s in popular_services
-    ]
-
-    # 4. Peak times: by hour of day (0-23), by day of week (0=Monday)
-    by_hour = (
-        base_qs.annotate(hour=TruncHour('start_time'))
-        .values('hour')
-        .annotate(count=Count('id'))
-        .order_by('hour')
-    )
-    hour_counts = {h['hour'].hour if h['hour'] else 0: h['count'] for h in by_hour}
-    peak_times = {
-        'by_hour': [{'hour': h, 'count': hour_counts.get(h, 0)} for h in range(24)],
-        'by_day_of_week': [],
-    }
-    # Django week_day: 1=Sunday, 2=Monday, ..., 7=Saturday
-    day_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    for dow in range(7):
-        week_day = (dow + 2) if dow < 6 else 1
-        cnt = base_qs.filter(start_time__week_day=week_day).count()
-        peak_times['by_day_of_week'].append({'day_of_week': dow, 'day_name': day_names[dow], 'count': cnt})
-
-    # 5. Cancellation rates
-    cancelled = base_qs.filter(status='cancelled').count()
-    cancellation_rates = {
-        'cancelled_count': cancelled,
-        'total_count': total,
-        'cancellation_rate_pct': round((cancelled / total * 100), 2) if total else 0,
-    }
-
-    # 6. Conversion metrics (completed vs total, no_show rate)
-    completed = base_qs.filter(status='completed').count()
-    no_show = base_qs.filter(status='no_show').count()
-    confirmed_or_pending = base_qs.filter(status__in=['confirmed', 'pending']).count()
-    conversion_metrics = {
-        'completed_count': completed,
-        'completed_rate_pct': round((completed / total * 100), 2) if total else 0,
-        'no_show_count': no_show,
-        'no_show_rate_pct': round((no_show / total * 100), 2) if total else 0,
-        'confirmed_or_pending_count': confirmed_or_pending,
-    }
-
+    # Every metric from one grouped scan, cached per (range, version); see analytics.py
+    data = appointment_analytics(start_date, end_date)
+    export_format = requested_format(request)
+    if export_format:
+        return export_response(
+            export_format,
+            f'appointment_report_{start_date.date()}_to_{end_date.date()}',
+            f'Appointment Report {start_date.date()} to {end_date.date()}',
+            appointment_export_sections(data, start_date, end_date),
+        )
     return Response({
         'success': True,
-        'data': {
-            'appointment_statistics': appointment_statistics,
-            'booking_trends': booking_trends,
-            'popular_services': popular_services,
-            'peak_times': peak_times,
-            'cancellation_rates': cancellation_rates,
-            'conversion_metrics': conversion_metrics,
-        },
+        'data': data,
         'meta': {'generated_at': now.isoformat(), 'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()},
     }, status=status.HTTP_200_OK)
 
 
+STAFF_PERFORMANCE_COLUMNS = [
+    'Staff', 'Email', 'Jobs Completed', 'Total Appointments', 'Utilization %', 'Revenue',
+    'Rank by Jobs', 'Rank by Revenue', 'Rank by Utilization',
+]
+STAFF_PERFORMANCE_KEYS = [
+    'staff_name', 'email', 'jobs_completed', 'total_appointments', 'utilization_rate_pct', 'revenue',
+    'rank_by_jobs', 'rank_by_revenue', 'rank_by_utilization',
+]
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminOrManager])
+@renderer_classes(EXPORT_RENDERERS)
 def staff_performance_view(request):
     """
     Day 5: Staff performance reports.
@@ -430,6 +374,7 @@ def staff_performance_view(request):
     Query params: start_date (YYYY-MM-DD), end_date (YYYY-MM-DD). Default: last 90 days.
     Returns: jobs completed, revenue per staff, utilization rate, performance comparisons.
     Customer ratings: placeholder (no rating model yet).
+    format=csv|xlsx|pdf exports the per-staff table.
     """
     from apps.appointments.models import Appointment
     from apps.staff.models import Staff
@@ -519,6 +464,17 @@ def staff_performance_view(request):
         row['rank_by_utilization'] = i + 1
     performance_list.sort(key=lambda x: (x['jobs_completed'], x['revenue']), reverse=True)
 
+    export_format = requested_format(request)
+    if export_format:
+        return export_response(
+            export_format,
+            f'staff_performance_{start_date.date()}_to_{end_date.date()}',
+            f'Staff Performance {start_date.date()} to {end_date.date()}',
+            [('Staff Performance', STAFF_PERFORMANCE_COLUMNS, (
+                [row[key] for key in STAFF_PERFORMANCE_KEYS] for row in performance_list
+            ))],
+        )
+
     return Response({
         'success': True,
         'data': {
@@ -302,28 +302,13 @@ class ServiceViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         validated_postcode = validation_result.get('formatted', postcode)
-        from apps.staff.models import StaffArea, StaffService
-        from apps.core.postcode_utils import get_staff_for_postcode, _geocode_postcode_cached
+        from apps.staff.models import StaffService
+        from apps.core.postcode_utils import get_staff_for_postcode
         from django.db.models import Count
 
-        all_areas = StaffArea.objects.filter(
-            is_active=True,
-            staff__is_active=True
-        ).values_list('postcode', flat=True).distinct()
-        area_coords_cache = {}
-        for area_postcode in all_areas:
-            norm = area_postcode.upper().replace(' ', '').strip()
-            if norm not in area_coords_cache:
-                geocode_result = _geocode_postcode_cached(area_postcode)
-                if geocode_result and geocode_result.get('lat') and geocode_result.get('lng'):
-                    area_coords_cache[norm] = {'lat': geocode_result['lat'], 'lng': geocode_result['lng']}
-                else:
-                    area_coords_cache[norm] = None
-
         available_staff = get_staff_for_postcode(
             validated_postcode,
             validation_result=validation_result,
-            area_coords_cache=area_coords_cache
         )
         queryset = Service.objects.filter(
             is_active=True,
@@ -2,6 +2,7 @@
 Staff app serializers.
 Staff, StaffSchedule, StaffService, and StaffArea serializers.
 """
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Staff, StaffSchedule, StaffService, StaffArea
 from apps.services.serializers import ServiceListSerializer
@@ -112,6 +113,14 @@ class StaffSerializer(serializers.ModelSerializer):
             return None
 
 
+def active_service_areas(lookup='service_areas'):
+    """
+    Prefetch of active areas read by StaffListSerializer.get_service_areas. lookup is the path to
+    Staff.service_areas from the model being listed (e.g. 'staff__service_areas' for appointments).
+    """
+    return Prefetch(lookup, queryset=StaffArea.objects.filter(is_active=True), to_attr='active_service_areas')
+
+
 class StaffListSerializer(serializers.ModelSerializer):
     """
     Simplified staff serializer for public list views (filtered by postcode/area).
@@ -123,8 +132,10 @@ class StaffListSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'email', 'phone', 'photo', 'bio', 'service_areas', 'is_active']
     
     def get_service_areas(self, obj):
-        """Return active service areas for this staff member."""
-        areas = obj.service_areas.filter(is_active=True)
+        """Return active service areas for this staff member (prefetched by active_service_areas())."""
+        areas = getattr(obj, 'active_service_areas', None)
+        if areas is None:
+            areas = obj.service_areas.filter(is_active=True)
         return [{'postcode': area.postcode, 'radius_miles': float(area.radius_miles)} 
                 for area in areas]
 
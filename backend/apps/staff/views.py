@@ -11,7 +11,8 @@ from apps.core.permissions import IsAdmin, IsAdminOrManager, IsStaff, IsStaffOrM
 from .models import Staff, StaffSchedule, StaffService, StaffArea
 from .serializers import (
     StaffSerializer, StaffListSerializer, AdminStaffListSerializer,
-    StaffScheduleSerializer, StaffServiceSerializer, StaffAreaSerializer
+    StaffScheduleSerializer, StaffServiceSerializer, StaffAreaSerializer,
+    active_service_areas,
 )
 from apps.services.models import Service, Category
 from apps.services.serializers import ServiceListSerializer, StaffServiceCreateUpdateSerializer, CategorySerializer
@@ -24,7 +25,7 @@ class StaffPublicViewSet(viewsets.ReadOnlyModelViewSet):
     GET /api/stf/
     GET /api/stf/by-postcode/?postcode=SW1A1AA
     """
-    queryset = Staff.objects.filter(is_active=True)
+    queryset = Staff.objects.filter(is_active=True).prefetch_related(active_service_areas())
     serializer_class = StaffListSerializer
     permission_classes = [AllowAny]
     
@@ -37,7 +38,7 @@ class StaffPublicViewSet(viewsets.ReadOnlyModelViewSet):
         if postcode:
             # Find staff with service areas covering this postcode
             from apps.core.postcode_utils import get_staff_for_postcode
-            queryset = get_staff_for_postcode(postcode)
+            queryset = get_staff_for_postcode(postcode).prefetch_related(active_service_areas())
         
         serializer = self.get_serializer(queryset, many=True)
         return Response({
@@ -94,7 +95,7 @@ class StaffPublicViewSet(viewsets.ReadOnlyModelViewSet):
         
         # Get staff available for this postcode using StaffArea model
         from apps.core.postcode_utils import get_staff_for_postcode
-        queryset = get_staff_for_postcode(validated_postcode)
+        queryset = get_staff_for_postcode(validated_postcode).prefetch_related(active_service_areas())
         serializer = StaffListSerializer(queryset, many=True)
         
         return Response({
@@ -125,6 +126,12 @@ class StaffViewSet(viewsets.ModelViewSet):
         if self.action == 'list':
             return AdminStaffListSerializer
         return StaffSerializer
+
+    def get_queryset(self):
+        """The list serializer only reads active service areas; skip the detail prefetches."""
+        if self.action == 'list':
+            return Staff.objects.prefetch_related(active_service_areas())
+        return super().get_queryset()
     
     def list(self, request, *args, **kwargs):
         """List all staff members."""
@@ -392,7 +399,7 @@ class StaffServiceViewSet(viewsets.ModelViewSet):
     Staff-Service relationship ViewSet (protected - admin/manager).
     GET, POST, PUT, PATCH, DELETE /api/ad/staff-services/ or /api/ad/staff/{id}/services/
     """
-    queryset = StaffService.objects.select_related('staff', 'service').all()
+    queryset = StaffService.objects.select_related('staff', 'service__category').all()
     serializer_class = StaffServiceSerializer
     permission_classes = [IsAdminOrManager]
     
@@ -481,13 +488,14 @@ class StaffSelfServiceViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset()
         # Include approval_status, created_by_me, and staff overrides
         from apps.services.serializers import ServiceListSerializer
+        overrides = {ss.service_id: ss for ss in StaffService.objects.filter(staff=staff, service__in=queryset)}
         items = []
         for svc in queryset:
             data = ServiceListSerializer(svc).data
             data['approval_status'] = svc.approval_status
             data['extras'] = getattr(svc, 'extras', []) or []
             data['created_by_me'] = (svc.created_by_staff_id == staff.id)
-            ss = StaffService.objects.filter(staff=staff, service=svc).first()
+            ss = overrides.get(svc.id)
             data['my_price_override'] = float(ss.price_override) if ss and ss.price_override is not None else None
             data['my_duration_override'] = ss.duration_override if ss else None
             items.append(data)
@@ -0,0 +1,248 @@
+"""
+Benchmark: per-visit vs bulk subscription appointment generation (query count and wall time).
+Use: python manage.py benchmark_subscription_generation [--months 1,3,12] [--frequency weekly] [--staff 5]
+Creates a synthetic service, staff (weekday schedules, some fully booked days) and customer
+inside a transaction that is rolled back at the end, so the database is left unchanged.
+"""
+import random
+import time as timer
+from datetime import datetime, time, timedelta
+from typing import List, Optional
+
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.core.utils import can_cancel_or_reschedule
+from apps.subscriptions.models import Subscription, SubscriptionAppointment
+from apps.subscriptions.subscription_utils import (
+    calculate_subscription_dates,
+    find_available_slot_for_date,
+    find_next_available_date,
+    generate_subscription_appointments,
+)
+
+POSTCODE = 'ZZ99 9ZZ'
+
+
+class _Rollback(Exception):
+    pass
+
+
+def generate_per_visit(
+    subscription: Subscription,
+    preferred_time: Optional[time] = None
+) -> List[SubscriptionAppointment]:
+    """
+    Previous generate_subscription_appointments: slot lookup and inserts per visit (queries grow
+    with visits and searched days). The baseline this benchmark compares against; subscriptions
+    tests check the bulk path plans the same visits.
+    Intelligently finds available slots, moving to next day if needed.
+    
+    Args:
+        subscription: Subscription instance
+        preferred_time: Preferred time for appointments (optional)
+    
+    Returns:
+        List of created SubscriptionAppointment instances
+    """
+    from apps.appointments.models import Appointment, CustomerAppointment
+    from apps.staff.models import Staff
+    
+    # Get subscription details
+    service = subscription.service
+    staff = subscription.staff
+    
+    # Get postcode from subscription or customer
+    postcode = subscription.postcode
+    if not postcode and subscription.customer:
+        postcode = subscription.customer.postcode
+    
+    if not postcode:
+        raise ValueError("Postcode is required to generate subscription appointments. Please provide postcode in subscription or customer address.")
+    
+    # Calculate all appointment dates
+    appointment_dates = calculate_subscription_dates(
+        start_date=subscription.start_date,
+        frequency=subscription.frequency,
+        duration_months=subscription.duration_months
+    )
+    
+    created_appointments = []
+    preferred_staff_id = staff.id if staff else None
+    
+    # Track preferred time for consistency (use first appointment's time for subsequent ones)
+    current_preferred_time = preferred_time
+    
+    for sequence, appointment_date in enumerate(appointment_dates, start=1):
+        # Find available slot for this date
+        slot_result = find_available_slot_for_date(
+            postcode=postcode,
+            service_id=service.id,
+            target_date=appointment_date,
+            preferred_staff_id=preferred_staff_id,
+            preferred_time=current_preferred_time
+        )
+        
+        # If no slot available on this date, find next available date
+        if not slot_result:
+            next_available = find_next_available_date(
+                postcode=postcode,
+                service_id=service.id,
+                start_date=appointment_date,
+                preferred_staff_id=preferred_staff_id,
+                preferred_time=current_preferred_time,
+                max_days_ahead=14  # Look up to 2 weeks ahead
+            )
+            
+            if not next_available:
+                # Skip this appointment if no slots found within reasonable time
+                continue
+            
+            appointment_date, slot_time, assigned_staff_id = next_available
+        else:
+            slot_time, assigned_staff_id = slot_result
+        
+        # Update preferred time for consistency (use first appointment's time)
+        if sequence == 1:
+            current_preferred_time = slot_time
+        
+        # Get staff instance
+        try:
+            assigned_staff = Staff.objects.get(id=assigned_staff_id)
+        except Staff.DoesNotExist:
+            continue
+        
+        # Calculate start and end datetime
+        start_datetime = timezone.make_aware(
+            datetime.combine(appointment_date, slot_time)
+        )
+        end_datetime = start_datetime + timedelta(minutes=service.duration)
+        
+        # Create appointment
+        appointment = Appointment.objects.create(
+            staff=assigned_staff,
+            service=service,
+            start_time=start_datetime,
+            end_time=end_datetime,
+            status='pending',
+            appointment_type='subscription',
+        )
+        
+        # Create customer appointment if customer exists
+        customer_appointment = None
+        if subscription.customer:
+            customer_appointment = CustomerAppointment.objects.create(
+                customer=subscription.customer,
+                appointment=appointment,
+                number_of_persons=1,
+                total_price=subscription.price_per_appointment,
+                payment_status='pending',
+            )
+            
+            # Calculate cancellation deadline
+            can_cancel_val, can_reschedule_val, deadline = can_cancel_or_reschedule(
+                start_datetime,
+                subscription.cancellation_policy_hours
+            )
+            customer_appointment.can_cancel = can_cancel_val
+            customer_appointment.can_reschedule = can_reschedule_val
+            customer_appointment.cancellation_deadline = deadline
+            customer_appointment.save()
+        
+        # Create subscription appointment
+        subscription_appointment = SubscriptionAppointment.objects.create(
+            subscription=subscription,
+            appointment=appointment,
+            sequence_number=sequence,
+            scheduled_date=appointment_date,
+            status='scheduled',
+        )
+        
+        created_appointments.append(subscription_appointment)
+    
+    # Update subscription next_appointment_date
+    if created_appointments:
+        first_appointment = created_appointments[0].appointment
+        subscription.next_appointment_date = first_appointment.start_time.date()
+        subscription.save(update_fields=['next_appointment_date'])
+    
+    return created_appointments
+
+
+class Command(BaseCommand):
+    help = 'Compare query count and wall time of per-visit and bulk subscription appointment generation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', default='1,3,12', help='Comma-separated subscription durations')
+        parser.add_argument('--frequency', default='weekly', choices=['weekly', 'biweekly', 'monthly'])
+        parser.add_argument('--staff', type=int, default=5, help='Staff members covering the postcode')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'months':>6} {'visits':>7} {'per-visit q':>12} {'per-visit ms':>13} {'bulk q':>7} {'bulk ms':>8}"
+        )
+        try:
+            with transaction.atomic():
+                fixtures = self._fixtures(options['staff'])
+                for months in [int(m) for m in options['months'].split(',') if m.strip()]:
+                    row = [months]
+                    for generate in (generate_per_visit, generate_subscription_appointments):
+                        sid = transaction.savepoint()
+                        subscription = self._subscription(fixtures, months, options['frequency'])
+                        with CaptureQueriesContext(connection) as queries:
+                            started = timer.perf_counter()
+                            visits = generate(subscription)
+                            elapsed = (timer.perf_counter() - started) * 1000
+                        row.extend([len(visits), len(queries.captured_queries), elapsed])
+                        transaction.savepoint_rollback(sid)
+                    _, visits, per_visit_q, per_visit_ms, _, bulk_q, bulk_ms = row
+                    self.stdout.write(
+                        f'{months:>6} {visits:>7} {per_visit_q:>12} {per_visit_ms:>13.1f} {bulk_q:>7} {bulk_ms:>8.1f}'
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _fixtures(self, staff_count):
+        from apps.appointments.models import Appointment
+        from apps.customers.models import Customer
+        from apps.services.models import Category, Service
+        from apps.staff.models import Staff, StaffArea, StaffSchedule, StaffService
+
+        rng = random.Random(0)
+        category = Category.objects.create(name='Benchmark', slug='benchmark-subscriptions')
+        service = Service.objects.create(
+            category=category, name='Benchmark clean', slug='benchmark-clean',
+            duration=120, price=50, approval_status='approved',
+        )
+        start = timezone.now().date() + timedelta(days=1)
+        for i in range(staff_count):
+            staff = Staff.objects.create(name=f'Benchmark staff {i}', email=f'benchmark{i}@example.com')
+            StaffService.objects.create(staff=staff, service=service)
+            StaffArea.objects.create(staff=staff, postcode=POSTCODE, radius_miles=5)
+            for day in range(5):
+                StaffSchedule.objects.create(
+                    staff=staff, day_of_week=day, start_time=time(9, 0), end_time=time(17, 0),
+                    breaks=[{'start': '12:00', 'end': '13:00'}],
+                )
+            # Existing bookings so the search has to skip days
+            for offset in rng.sample(range(400), 120):
+                booked = timezone.make_aware(datetime.combine(start + timedelta(days=offset), time(9, 0)))
+                Appointment.objects.create(
+                    staff=staff, service=service, start_time=booked,
+                    end_time=booked + timedelta(hours=8), status='confirmed',
+                )
+        customer = Customer.objects.create(name='Benchmark customer', email='benchmark-customer@example.com', postcode=POSTCODE)
+        return {'service': service, 'customer': customer, 'start': start}
+
+    def _subscription(self, fixtures, months, frequency):
+        start = fixtures['start']
+        return Subscription.objects.create(
+            customer=fixtures['customer'], service=fixtures['service'],
+            frequency=frequency, duration_months=months, start_date=start,
+            end_date=start + relativedelta(months=months), total_appointments=months * 4,
+            price_per_appointment=50, total_price=months * 200, postcode=POSTCODE,
+        )
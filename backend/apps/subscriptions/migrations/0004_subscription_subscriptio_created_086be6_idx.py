@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_customer_customers_c_created_4b8a48_idx'),
+        ('services', '0003_category_category_name_not_empty_and_more'),
+        ('staff', '0004_staff_staff_name_not_empty_and_more'),
+        ('subscriptions', '0003_subscription_subscription_valid_frequency_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['created_at', 'id'], name='subscriptio_created_086be6_idx'),
+        ),
+    ]
@@ -209,6 +209,8 @@ class Subscription(TimeStampedModel):
             models.Index(fields=['customer', 'status']),
             models.Index(fields=['is_guest_subscription', 'guest_email']),
             models.Index(fields=['status', 'next_appointment_date']),
+            # Keyset pagination (core/pagination.py)
+            models.Index(fields=['created_at', 'id']),
         ]
         constraints = [
             models.CheckConstraint(
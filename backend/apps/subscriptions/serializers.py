@@ -2,12 +2,26 @@
 Subscriptions app serializers.
 Subscription and SubscriptionAppointment serializers with guest checkout support.
 """
+from django.db.models import Prefetch
 from rest_framework import serializers
+from apps.core.serializers import SparseFieldsetMixin
 from .models import Subscription, SubscriptionAppointment
 from apps.services.serializers import ServiceListSerializer
-from apps.staff.serializers import StaffListSerializer
+from apps.staff.serializers import StaffListSerializer, active_service_areas
 from apps.customers.serializers import CustomerListSerializer, GuestCustomerSerializer
-from apps.appointments.serializers import AppointmentSerializer
+from apps.appointments.serializers import AppointmentSerializer, prefetch_appointment_relations
+
+
+def prefetch_subscription_relations(queryset):
+    """
+    Load everything SubscriptionSerializer reads (service, staff, customer and each scheduled
+    appointment), so a page of subscriptions costs a fixed number of queries.
+    """
+    appointments = prefetch_appointment_relations(SubscriptionAppointment.objects.all(), prefix='appointment__')
+    return queryset.select_related('service__category', 'staff', 'customer__user').prefetch_related(
+        active_service_areas('staff__service_areas'),
+        Prefetch('subscription_appointments', queryset=appointments),
+    )
 
 
 class SubscriptionAppointmentSerializer(serializers.ModelSerializer):
@@ -27,7 +41,7 @@ class SubscriptionAppointmentSerializer(serializers.ModelSerializer):
                              'created_at', 'updated_at']
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Subscription serializer with guest checkout support.
     """
@@ -53,6 +67,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'subscription_number', 'tracking_token',
                              'account_linked_at', 'total_appointments',
                              'created_at', 'updated_at']
+        expandable_fields = ['service', 'staff', 'customer', 'appointments']
         extra_kwargs = {
             'guest_email': {'required': False, 'allow_blank': True},
             'guest_name': {'required': False, 'allow_blank': True},
@@ -103,7 +118,7 @@ class SubscriptionCreateSerializer(serializers.Serializer):
         return attrs
 
 
-class SubscriptionListSerializer(serializers.ModelSerializer):
+class SubscriptionListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Simplified subscription serializer for list views.
     """
@@ -1,12 +1,28 @@
 """
 Subscription utilities for automatic appointment generation.
+
+generate_subscription_appointments plans every visit in memory (plan_subscription_visits):
+staff coverage is resolved once and schedules and bookings for the whole horizon are loaded
+in one query each, then all rows are written with bulk_create in one transaction. The query
+count no longer grows with the number of visits or with days searched for a free slot.
 """
 from datetime import datetime, timedelta, date, time
-from typing import List, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from django.db import transaction
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 from apps.appointments.models import Appointment, CustomerAppointment
-from apps.appointments.slots_utils import get_available_slots
+from apps.appointments.slots_cache import bump_appointment_windows
+from apps.reports.analytics import bump_version_on_commit as bump_analytics_version_on_commit
+from apps.appointments.slots_utils import (
+    _split_busy_by_date,
+    build_day_slots,
+    get_available_slots,
+    get_service_duration,
+    load_busy_intervals,
+    load_schedules_by_staff,
+    resolve_slot_staff_ids,
+)
 from apps.customers.models import Customer
 from apps.core.utils import can_cancel_or_reschedule
 from .models import Subscription, SubscriptionAppointment
@@ -79,7 +95,15 @@ def find_available_slot_for_date(
         target_date=target_date,
         staff_id=preferred_staff_id
     )
-    
+    return pick_slot(slots, preferred_staff_id, preferred_time)
+
+
+def pick_slot(
+    slots: List[Dict],
+    preferred_staff_id: Optional[int] = None,
+    preferred_time: Optional[time] = None
+) -> Optional[Tuple[time, int]]:
+    """Preferred time if free, else the first free slot: (time, staff_id) or None."""
     if not slots:
         return None
     
@@ -145,140 +169,178 @@ def find_next_available_date(
     return None
 
 
-def generate_subscription_appointments(
-    subscription: Subscription,
-    preferred_time: Optional[time] = None
-) -> List[SubscriptionAppointment]:
-    """
-    Generate all appointments for a subscription.
-    Intelligently finds available slots, moving to next day if needed.
-    
-    Args:
-        subscription: Subscription instance
-        preferred_time: Preferred time for appointments (optional)
-    
-    Returns:
-        List of created SubscriptionAppointment instances
-    """
-    from apps.services.models import Service
-    from apps.staff.models import Staff
-    
-    # Get subscription details
-    service = subscription.service
-    staff = subscription.staff
-    
-    # Get postcode from subscription or customer
+# A visit with no free slot on its date moves to the first free day within this many days
+RESCHEDULE_DAYS_AHEAD = 14
+
+
+class PlannedVisit(NamedTuple):
+    sequence: int
+    scheduled_date: date
+    start_time: time
+    staff_id: int
+
+
+def _subscription_postcode(subscription: Subscription) -> str:
     postcode = subscription.postcode
     if not postcode and subscription.customer:
         postcode = subscription.customer.postcode
-    
     if not postcode:
         raise ValueError("Postcode is required to generate subscription appointments. Please provide postcode in subscription or customer address.")
+    return postcode
+
+
+def plan_subscription_visits(
+    subscription: Subscription,
+    preferred_time: Optional[time] = None,
+    days_ahead: int = RESCHEDULE_DAYS_AHEAD
+) -> List[PlannedVisit]:
+    """
+    Assign a date, time and staff member to every visit of a subscription without writing.
     
-    # Calculate all appointment dates
+    Same rules as the per-visit path: the preferred time (after the first visit, the first
+    visit's time) if free, else the first free slot of the day, else the first free slot in
+    the next days_ahead days; visits with nothing free are skipped. Visits already planned
+    block their slot for later visits.
+    Queries: staff coverage, schedules and bookings for the whole horizon, once each.
+    """
+    service = subscription.service
+    postcode = _subscription_postcode(subscription)
     appointment_dates = calculate_subscription_dates(
         start_date=subscription.start_date,
         frequency=subscription.frequency,
         duration_months=subscription.duration_months
     )
+    if not appointment_dates:
+        return []
     
-    created_appointments = []
-    preferred_staff_id = staff.id if staff else None
+    preferred_staff_id = subscription.staff_id
+    staff_ids = resolve_slot_staff_ids(postcode, service.id, staff_id=preferred_staff_id)
+    if not staff_ids:
+        return []
+    schedules = load_schedules_by_staff(staff_ids)
+    horizon_start = timezone.make_aware(datetime.combine(appointment_dates[0], time.min))
+    horizon_end = timezone.make_aware(
+        datetime.combine(appointment_dates[-1] + timedelta(days=days_ahead + 1), time.min)
+    )
+    busy_by_date = _split_busy_by_date(load_busy_intervals(list(schedules), horizon_start, horizon_end))
+    slot_duration = get_service_duration(service)
     
-    # Track preferred time for consistency (use first appointment's time for subsequent ones)
-    current_preferred_time = preferred_time
+    def free_slot(day):
+        day_schedules = {
+            sid: by_day[day.weekday()] for sid, by_day in schedules.items() if day.weekday() in by_day
+        }
+        if not day_schedules:
+            return None
+        slots = build_day_slots(day, slot_duration, day_schedules, busy_by_date.get(day, {}))
+        return pick_slot(slots, preferred_staff_id, current_preferred_time)
     
+    planned = []
+    current_preferred_time = preferred_time
     for sequence, appointment_date in enumerate(appointment_dates, start=1):
-        # Find available slot for this date
-        slot_result = find_available_slot_for_date(
-            postcode=postcode,
-            service_id=service.id,
-            target_date=appointment_date,
-            preferred_staff_id=preferred_staff_id,
-            preferred_time=current_preferred_time
-        )
-        
-        # If no slot available on this date, find next available date
-        if not slot_result:
-            next_available = find_next_available_date(
-                postcode=postcode,
-                service_id=service.id,
-                start_date=appointment_date,
-                preferred_staff_id=preferred_staff_id,
-                preferred_time=current_preferred_time,
-                max_days_ahead=14  # Look up to 2 weeks ahead
-            )
-            
-            if not next_available:
-                # Skip this appointment if no slots found within reasonable time
-                continue
-            
-            appointment_date, slot_time, assigned_staff_id = next_available
-        else:
-            slot_time, assigned_staff_id = slot_result
-        
-        # Update preferred time for consistency (use first appointment's time)
+        found = None
+        for offset in range(days_ahead + 1):
+            day = appointment_date + timedelta(days=offset)
+            slot_result = free_slot(day)
+            if slot_result:
+                found = (day, slot_result[0], slot_result[1])
+                break
+        if not found or not found[2]:
+            continue
+        day, slot_time, staff_id = found
         if sequence == 1:
             current_preferred_time = slot_time
+        planned.append(PlannedVisit(sequence, day, slot_time, staff_id))
         
-        # Get staff instance
-        try:
-            assigned_staff = Staff.objects.get(id=assigned_staff_id)
-        except Staff.DoesNotExist:
-            continue
-        
-        # Calculate start and end datetime
-        start_datetime = timezone.make_aware(
-            datetime.combine(appointment_date, slot_time)
-        )
-        end_datetime = start_datetime + timedelta(minutes=service.duration)
-        
-        # Create appointment
-        appointment = Appointment.objects.create(
-            staff=assigned_staff,
+        # The new booking blocks its interval for the following visits
+        start = timezone.make_aware(datetime.combine(day, slot_time))
+        end = start + timedelta(minutes=service.duration)
+        for booked_day, by_staff in _split_busy_by_date({staff_id: [(start, end)]}).items():
+            busy_by_date.setdefault(booked_day, {}).setdefault(staff_id, []).extend(by_staff[staff_id])
+    return planned
+
+
+def generate_subscription_appointments(
+    subscription: Subscription,
+    preferred_time: Optional[time] = None
+) -> List[SubscriptionAppointment]:
+    """
+    Generate all appointments for a subscription.
+    Plans every visit in memory (see plan_subscription_visits), then bulk-creates the
+    Appointment, CustomerAppointment and SubscriptionAppointment rows in one transaction.
+    
+    Args:
+        subscription: Subscription instance
+        preferred_time: Preferred time for appointments (optional)
+    
+    Returns:
+        List of created SubscriptionAppointment instances
+    """
+    service = subscription.service
+    visits = plan_subscription_visits(subscription, preferred_time=preferred_time)
+    if not visits:
+        return []
+    
+    appointments = []
+    for visit in visits:
+        start_datetime = timezone.make_aware(datetime.combine(visit.scheduled_date, visit.start_time))
+        appointments.append(Appointment(
+            staff_id=visit.staff_id,
             service=service,
             start_time=start_datetime,
-            end_time=end_datetime,
+            end_time=start_datetime + timedelta(minutes=service.duration),
             status='pending',
             appointment_type='subscription',
-        )
+        ))
+    
+    with transaction.atomic():
+        Appointment.objects.bulk_create(appointments)
         
-        # Create customer appointment if customer exists
-        customer_appointment = None
         if subscription.customer:
-            customer_appointment = CustomerAppointment.objects.create(
-                customer=subscription.customer,
-                appointment=appointment,
-                number_of_persons=1,
-                total_price=subscription.price_per_appointment,
-                payment_status='pending',
-            )
-            
-            # Calculate cancellation deadline
+            customer_appointments = []
+            for appointment in appointments:
+                can_cancel_val, can_reschedule_val, deadline = can_cancel_or_reschedule(
+                    appointment.start_time,
+                    subscription.cancellation_policy_hours
+                )
+                customer_appointments.append(CustomerAppointment(
+                    customer=subscription.customer,
+                    appointment=appointment,
+                    number_of_persons=1,
+                    total_price=subscription.price_per_appointment,
+                    payment_status='pending',
+                    can_cancel=can_cancel_val,
+                    can_reschedule=can_reschedule_val,
+                    cancellation_deadline=deadline,
+                ))
+            CustomerAppointment.objects.bulk_create(customer_appointments)
+        
+        subscription_appointments = []
+        for visit, appointment in zip(visits, appointments):
+            # bulk_create skips SubscriptionAppointment.save(), so set its deadline fields here
             can_cancel_val, can_reschedule_val, deadline = can_cancel_or_reschedule(
-                start_datetime,
+                appointment.start_time,
                 subscription.cancellation_policy_hours
             )
-            customer_appointment.can_cancel = can_cancel_val
-            customer_appointment.can_reschedule = can_reschedule_val
-            customer_appointment.cancellation_deadline = deadline
-            customer_appointment.save()
-        
-        # Create subscription appointment
-        subscription_appointment = SubscriptionAppointment.objects.create(
-            subscription=subscription,
-            appointment=appointment,
-            sequence_number=sequence,
-            scheduled_date=appointment_date,
-            status='scheduled',
-        )
+            subscription_appointments.append(SubscriptionAppointment(
+                subscription=subscription,
+                appointment=appointment,
+                sequence_number=visit.sequence,
+                scheduled_date=visit.scheduled_date,
+                status='scheduled',
+                can_cancel=can_cancel_val,
+                can_reschedule=can_reschedule_val,
+                cancellation_deadline=deadline,
+            ))
+        SubscriptionAppointment.objects.bulk_create(subscription_appointments)
         
-        created_appointments.append(subscription_appointment)
-    
-    # Update subscription next_appointment_date
-    if created_appointments:
-        first_appointment = created_appointments[0].appointment
-        subscription.next_appointment_date = first_appointment.start_time.date()
+        subscription.next_appointment_date = appointments[0].start_time.date()
         subscription.save(update_fields=['next_appointment_date'])
+        
+        # bulk_create sends no post_save, so invalidate cached slots for the booked days
+        # and cached appointment analytics here
+        transaction.on_commit(lambda: bump_appointment_windows(
+            (a.staff_id, a.start_time, a.end_time) for a in appointments
+        ))
+        bump_analytics_version_on_commit()
     
-    return created_appointments
+    return subscription_appointments
@@ -1,3 +1,100 @@
+"""
+Subscriptions tests.
+
+Appointment generation: every visit is planned in memory and written with bulk_create, giving
+the same visits as the per-visit path with a query count independent of the horizon.
+"""
+from datetime import datetime, time, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.appointments.models import Appointment, CustomerAppointment
+from apps.customers.models import Customer
+from apps.services.models import Category, Service
+from apps.staff.models import Staff, StaffArea, StaffSchedule, StaffService
+from apps.subscriptions.models import Subscription, SubscriptionAppointment
+from apps.subscriptions.management.commands.benchmark_subscription_generation import generate_per_visit
+from apps.subscriptions.subscription_utils import generate_subscription_appointments, plan_subscription_visits
+
+POSTCODE = 'SW1A 1AA'
+
+
+def next_monday():
+    today = timezone.now().date()
+    return today + timedelta(days=(0 - today.weekday()) % 7 or 7)
+
+
+class SubscriptionGenerationTests(TestCase):
+    """generate_subscription_appointments: weekly visits for staff who work Mondays 09:00-17:00."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Cleaning', slug='cleaning')
+        self.service = Service.objects.create(
+            category=category, name='Standard clean', slug='standard-clean',
+            duration=60, price=50, approval_status='approved',
+        )
+        self.staff = Staff.objects.create(name='Alice', email='alice@test.com')
+        StaffService.objects.create(staff=self.staff, service=self.service)
+        StaffArea.objects.create(staff=self.staff, postcode=POSTCODE, radius_miles=5)
+        StaffSchedule.objects.create(staff=self.staff, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        self.customer = Customer.objects.create(name='Bob', email='bob@test.com', postcode=POSTCODE)
+        self.start = next_monday()
+
+    def _subscription(self, months=3):
+        return Subscription.objects.create(
+            customer=self.customer, service=self.service, staff=self.staff,
+            frequency='weekly', duration_months=months, start_date=self.start,
+            end_date=self.start + relativedelta(months=months), total_appointments=months * 4,
+            price_per_appointment=50, total_price=months * 200, postcode=POSTCODE,
+        )
+
+    def _book_whole_day(self, day):
+        start = timezone.make_aware(datetime.combine(day, time(9, 0)))
+        Appointment.objects.create(
+            staff=self.staff, service=self.service, start_time=start,
+            end_time=start + timedelta(hours=8), status='confirmed',
+        )
+
+    def _visits(self, subscription):
+        return [
+            (sa.sequence_number, sa.scheduled_date, timezone.localtime(sa.appointment.start_time).time(), sa.appointment.staff_id)
+            for sa in subscription.subscription_appointments.select_related('appointment').order_by('sequence_number')
+        ]
+
+    def test_matches_per_visit_path(self):
+        self._book_whole_day(self.start + timedelta(days=14))
+        subscription = self._subscription()
+        planned = [tuple(v) for v in plan_subscription_visits(subscription)]
+        generate_per_visit(subscription)
+        self.assertEqual(planned, self._visits(subscription))
+
+    def test_bulk_rows_and_rescheduled_visit(self):
+        blocked = self.start + timedelta(days=14)
+        self._book_whole_day(blocked)
+        subscription = self._subscription()
+        created = generate_subscription_appointments(subscription)
+        visits = self._visits(subscription)
+        self.assertEqual(len(created), len(visits))
+        self.assertEqual(CustomerAppointment.objects.filter(customer=self.customer).count(), len(visits))
+        by_sequence = {v[0]: v for v in visits}
+        self.assertEqual(by_sequence[1][1:3], (self.start, time(9, 0)))
+        # Week 3 is fully booked: that visit moves to week 4, whose own visit takes the next slot
+        self.assertEqual(by_sequence[3][1:3], (blocked + timedelta(days=7), time(9, 0)))
+        self.assertEqual(by_sequence[4][1:3], (blocked + timedelta(days=7), time(10, 0)))
+        visit = SubscriptionAppointment.objects.get(subscription=subscription, sequence_number=1)
+        self.assertIsNotNone(visit.cancellation_deadline)
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.next_appointment_date, self.start)
 
-# Subscriptions tests
+    def test_query_count_independent_of_horizon(self):
+        with CaptureQueriesContext(connection) as short:
+            generate_subscription_appointments(self._subscription(months=1))
+        Appointment.objects.all().delete()
+        with CaptureQueriesContext(connection) as long:
+            created = generate_subscription_appointments(self._subscription(months=12))
+        self.assertGreater(len(created), 50)
+        self.assertEqual(len(long.captured_queries), len(short.captured_queries))
@@ -9,12 +9,14 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.utils import timezone
 from datetime import datetime, timedelta, time as time_obj
 from dateutil.relativedelta import relativedelta  # Requires python-dateutil (already in requirements.txt)
+from apps.core.pagination import SubscriptionCursorPagination
 from apps.core.permissions import IsCustomer, IsAdminOrManager, IsOwnerOrAdmin
 from apps.core.utils import can_cancel_or_reschedule
 from .models import Subscription, SubscriptionAppointment, SubscriptionAppointmentChangeRequest
 from .serializers import (
     SubscriptionSerializer, SubscriptionListSerializer,
-    SubscriptionAppointmentSerializer, SubscriptionCreateSerializer
+    SubscriptionAppointmentSerializer, SubscriptionCreateSerializer,
+    prefetch_subscription_relations,
 )
 from apps.customers.models import Customer
 from apps.services.models import Service
@@ -29,9 +31,7 @@ class SubscriptionPublicViewSet(viewsets.ModelViewSet):
     POST /api/bkg/subscriptions/
     GET /api/bkg/guest/subscription/{subscription_number}/
     """
-    queryset = Subscription.objects.select_related('service', 'staff', 'customer').prefetch_related(
-        'subscription_appointments'
-    ).all()
+    queryset = prefetch_subscription_relations(Subscription.objects.all())
     serializer_class = SubscriptionSerializer
     permission_classes = [AllowAny]  # Public write access for guest checkout
     
@@ -180,11 +180,10 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
     Admin/Manager: Full CRUD
     GET, PUT, PATCH, DELETE /api/cus/subscriptions/ or /api/ad/subscriptions/
     """
-    queryset = Subscription.objects.select_related('service', 'staff', 'customer').prefetch_related(
-        'subscription_appointments'
-    ).all()
+    queryset = Subscription.objects.select_related('service', 'customer__user').all()
     serializer_class = SubscriptionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SubscriptionCursorPagination
     
     def get_serializer_class(self):
         """Use simplified serializer for list views."""
@@ -195,6 +194,9 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filter by current user if customer, or all if admin/manager."""
         queryset = super().get_queryset()
+        if self.action != 'list':
+            # SubscriptionListSerializer only reads service and customer
+            queryset = prefetch_subscription_relations(queryset)
         
         # Customer can only see their own subscriptions
         if self.request.user.role == 'customer':
@@ -231,19 +233,6 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
             'data': serializer.data,
             'meta': {'count': queryset.count()},
         }, status=status.HTTP_200_OK)
-
-    def get_paginated_response(self, data):
-        """Return paginated response in shape { success, data, meta }."""
-        pagination = self.paginator
-        return Response({
-            'success': True,
-            'data': data,
-            'meta': {
-                'count': pagination.page.paginator.count,
-                'next': pagination.get_next_link(),
-                'previous': pagination.get_previous_link(),
-            },
-        }, status=status.HTTP_200_OK)
     
     def retrieve(self, request, *args, **kwargs):
         """Return subscription detail in shape { success, data } for frontend."""
@@ -1 +1,9 @@
 # Django Config Package
+
+try:
+    from .celery import app as celery_app
+except ImportError:
+    # Celery is optional: JOBS_BACKEND=database/inline run jobs without a broker
+    celery_app = None
+
+__all__ = ['celery_app']
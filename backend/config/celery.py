@@ -0,0 +1,13 @@
+"""
+Celery application for background jobs (JOBS_BACKEND=celery, see apps/core/jobs.py).
+Worker: celery -A config worker -l info
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.production')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -72,6 +72,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.QueryCountMiddleware',  # X-DB-Queries / X-DB-Time headers, per-request query log
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -202,14 +203,47 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
-# Cache: default LocMem; production overrides with Redis when REDIS_URL is set
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'OPTIONS': {'MAX_ENTRIES': 2000},
-    }
+# Cache: one alias per namespace, each with its own TTL and size, so hot slot payloads are not
+# evicted by geocode/autocomplete noise. CACHE_BACKEND=redis shares every alias across workers
+# (REDIS_URL, key-prefixed per alias; CACHE_<ALIAS>_URL points an alias at its own Redis db so
+# maxmemory eviction is per namespace). Otherwise each alias is a per-process LocMemCache.
+# Per alias overrides: CACHE_<ALIAS>_TIMEOUT, CACHE_<ALIAS>_MAX_ENTRIES, CACHE_<ALIAS>_URL.
+CACHE_NAMESPACES = {
+    # alias: (default TTL seconds, LocMem MAX_ENTRIES)
+    'default': (300, 2000),
+    'geocode': (24 * 60 * 60, 20000),  # geocodes, address autocomplete, place details
+    'slots': (6 * 60 * 60, 10000),  # slot payloads and their version tokens
+    'reports': (15 * 60, 500),  # report/analytics payloads
+    'auth_state': (10 * 60, 1000),  # OAuth state (one-time, must survive across workers)
 }
 
+
+def build_caches(backend):
+    """CACHES for every namespace alias on the given backend ('locmem' or 'redis')."""
+    caches = {}
+    for alias, (timeout, max_entries) in CACHE_NAMESPACES.items():
+        prefix = f'CACHE_{alias.upper()}_'
+        timeout = env.int(prefix + 'TIMEOUT', default=timeout)
+        if backend == 'redis':
+            caches[alias] = {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': env(prefix + 'URL', default=env('REDIS_URL', default='redis://localhost:6379/0')),
+                'KEY_PREFIX': alias,
+                'TIMEOUT': timeout,
+            }
+        else:
+            caches[alias] = {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': alias,
+                'TIMEOUT': timeout,
+                'OPTIONS': {'MAX_ENTRIES': env.int(prefix + 'MAX_ENTRIES', default=max_entries)},
+            }
+    return caches
+
+
+CACHE_BACKEND = env('CACHE_BACKEND', default='locmem')
+CACHES = build_caches(CACHE_BACKEND)
+
 # CORS Settings (for Next.js frontend on localhost:3000 and EC2 test server)
 CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS', default=[
     'http://localhost:3000',
@@ -303,6 +337,22 @@ if not GOOGLE_PLACES_API_KEY and GOOGLE_MAPS_API_KEY:
 # If GOOGLE_PLACES_API_KEY is set but GOOGLE_MAPS_API_KEY is not, use GOOGLE_PLACES_API_KEY
 if not GOOGLE_MAPS_API_KEY and GOOGLE_PLACES_API_KEY:
     GOOGLE_MAPS_API_KEY = GOOGLE_PLACES_API_KEY
+# Concurrent Distance Matrix tile requests for route optimization (see apps/core/distance_matrix.py)
+DISTANCE_MATRIX_WORKERS = env.int('DISTANCE_MATRIX_WORKERS', default=4)
+# Local-search budget for route optimization (2-opt/Or-opt, see apps/core/route_engine.py)
+ROUTE_OPTIMIZE_TIME_BUDGET_MS = env.int('ROUTE_OPTIMIZE_TIME_BUDGET_MS', default=2000)
+
+# Offline UK postcode gazetteer (SQLite, built by `manage.py import_postcodes`).
+# Postcodes found here are validated/geocoded locally; misses fall back to Google.
+POSTCODE_GAZETTEER_PATH = env('POSTCODE_GAZETTEER_PATH', default=str(BASE_DIR / 'data' / 'postcodes.sqlite3'))
+
+# Geocode results from Google are stored in core_geocode_cache and kept in a per-process LRU
+GEOCODE_LRU_SIZE = env.int('GEOCODE_LRU_SIZE', default=10000)
+
+# Background jobs (apps/core/jobs.py): 'database' (manage.py run_jobs), 'celery' or 'inline'
+JOBS_BACKEND = env('JOBS_BACKEND', default='database')
+JOBS_MAX_ATTEMPTS = env.int('JOBS_MAX_ATTEMPTS', default=5)
+JOBS_LOCK_TIMEOUT_SECONDS = env.int('JOBS_LOCK_TIMEOUT_SECONDS', default=600)
 
 # Google OAuth (separate credentials for login and calendar)
 # Login/Authentication credentials (from first OAuth client)
@@ -323,6 +373,18 @@ GOOGLE_REDIRECT_URI = env('GOOGLE_REDIRECT_URI', default='http://localhost:8000/
 MICROSOFT_CLIENT_ID = env('MICROSOFT_CLIENT_ID', default='')
 MICROSOFT_CLIENT_SECRET = env('MICROSOFT_CLIENT_SECRET', default='')
 
+# Calendar sync worker (apps/calendar_sync/sync_worker.py): profiles pushed in parallel,
+# per-request timeout, provider endpoints (overridden in tests by the local fake provider)
+CALENDAR_SYNC_WORKERS = env.int('CALENDAR_SYNC_WORKERS', default=8)
+CALENDAR_SYNC_TIMEOUT = env.int('CALENDAR_SYNC_TIMEOUT', default=15)
+CALENDAR_GOOGLE_API_URL = 'https://www.googleapis.com'
+CALENDAR_GOOGLE_TOKEN_URL = 'https://oauth2.googleapis.com/token'
+CALENDAR_GRAPH_API_URL = 'https://graph.microsoft.com/v1.0'
+CALENDAR_MICROSOFT_TOKEN_URL = 'https://login.microsoftonline.com/common/oauth2/v2.0/token'
+
+# Requests running more queries than this are logged as WARNING by QueryCountMiddleware
+DB_QUERY_WARNING_THRESHOLD = env.int('DB_QUERY_WARNING_THRESHOLD', default=50)
+
 # Supabase (DB via DATABASE_URL in dev/prod; API for auth/storage)
 SUPABASE_URL = env('SUPABASE_URL', default='')
 SUPABASE_ANON_KEY = env('SUPABASE_ANON_KEY', default='')
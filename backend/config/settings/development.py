@@ -97,6 +97,9 @@ else:
     # No email config in .env - use console backend for development
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Background jobs run right after commit unless a worker is configured
+JOBS_BACKEND = env('JOBS_BACKEND', default='inline')
+
 # Static files served by Django in development
 # In production, these should be served by a web server
 STATICFILES_DIRS = [
@@ -76,14 +76,10 @@ SECURE_HSTS_SECONDS = 31536000  # 1 year
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
 
-# Redis Cache (optional, for production)
+# Redis Cache (optional, for production): all cache namespaces shared across workers
 if env('REDIS_URL', default=None):
-    CACHES = {
-        'default': {
-            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-            'LOCATION': env('REDIS_URL'),
-        }
-    }
+    CACHE_BACKEND = env('CACHE_BACKEND', default='redis')
+    CACHES = build_caches(CACHE_BACKEND)
 
 # Celery Configuration (for background tasks)
 if env('REDIS_URL', default=None):
@@ -93,6 +89,8 @@ if env('REDIS_URL', default=None):
     CELERY_TASK_SERIALIZER = 'json'
     CELERY_RESULT_SERIALIZER = 'json'
     CELERY_TIMEZONE = TIME_ZONE
+    CELERY_TASK_ACKS_LATE = True
+    JOBS_BACKEND = env('JOBS_BACKEND', default='celery')
 
 # Logging - Production level (use project logs dir so no /var/log/multibook needed)
 import os
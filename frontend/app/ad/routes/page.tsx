@@ -12,6 +12,9 @@ interface StopInput {
   city: string
   postcode: string
   label?: string
+  window_start?: string
+  window_end?: string
+  service_minutes?: number
 }
 
 interface OrderedStop {
@@ -23,6 +26,8 @@ interface OrderedStop {
   formatted_address: string
   travel_time_to_next_seconds: number | null
   travel_time_to_next_minutes: number | null
+  arrival_time?: string
+  late_minutes?: number
 }
 
 interface RouteResult {
@@ -32,6 +37,10 @@ interface RouteResult {
   total_duration_seconds: number
   total_duration_minutes: number
   points: { lat: number; lng: number; label: string }[]
+  algorithm?: string
+  initial_duration_seconds?: number
+  improvement_percent?: number
+  late_stops?: number
 }
 
 interface StaffOption {
@@ -92,6 +101,9 @@ export default function RouteOptimizationPage() {
             city: s.city || '',
             postcode: s.postcode || '',
             label: s.label || `#${s.appointment_id || ''}`,
+            window_start: s.window_start,
+            window_end: s.window_end,
+            service_minutes: s.service_minutes,
           }))
         )
         setResult(null)
@@ -320,12 +332,22 @@ export default function RouteOptimizationPage() {
                 <h2 className="text-lg font-semibold mb-2">Optimized order & travel times</h2>
                 <p className="text-sm text-muted-foreground mb-4">
                   Total estimated travel time: <strong>{result.total_duration_minutes} min</strong>
+                  {result.improvement_percent != null && result.improvement_percent > 0 && (
+                    <> ({result.improvement_percent}% shorter than nearest-neighbour)</>
+                  )}
+                  {!!result.late_stops && <> · {result.late_stops} stop(s) late</>}
                 </p>
                 <ul className="space-y-2">
                   {result.ordered_stops.map((s) => (
                     <li key={s.index} className="flex items-center gap-4 py-2 border-b border-border/50">
                       <span className="font-medium w-8">#{s.order_position}</span>
                       <span className="flex-1">{s.formatted_address || s.label}</span>
+                      {s.arrival_time && (
+                        <span className={s.late_minutes ? 'text-destructive text-sm' : 'text-muted-foreground text-sm'}>
+                          arrive {s.arrival_time}
+                          {s.late_minutes ? ` (${s.late_minutes} min late)` : ''}
+                        </span>
+                      )}
                       {s.travel_time_to_next_minutes != null && (
                         <span className="text-muted-foreground text-sm">
                           → {s.travel_time_to_next_minutes} min to next
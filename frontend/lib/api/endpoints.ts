@@ -83,6 +83,7 @@ export const PUBLIC_ENDPOINTS = {
   // Available Slots (Security: /api/slots/)
   SLOTS: {
     AVAILABLE: '/slots/',
+    RANGE: '/slots/range/',
   },
   
   // Payments (Security: /api/pay/)